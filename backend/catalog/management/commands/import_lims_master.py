@@ -408,6 +408,9 @@ class Command(BaseCommand):
             display_order = self._parse_int(row.get("Display_Order"), default=0)
             panic_low = self._parse_decimal(row.get("Panic_Low_Override"))
             panic_high = self._parse_decimal(row.get("Panic_High_Override"))
+            delta_absolute = self._parse_decimal(row.get("Delta_Absolute"))
+            delta_percent = self._parse_decimal(row.get("Delta_Percent"))
+            delta_window = self._parse_int(row.get("Delta_Window_Days"))
 
             obj, is_created = TestParameter.objects.update_or_create(
                 test=test,
@@ -422,6 +425,9 @@ class Command(BaseCommand):
                     )
                     or "",
                     "delta_check_enabled": delta_check,
+                    "delta_absolute": delta_absolute,
+                    "delta_percent": delta_percent,
+                    "delta_window_days": delta_window,
                     "panic_low_override": panic_low,
                     "panic_high_override": panic_high,
                     "comment_template_id": row.get("Comment_Template_ID") or "",
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0003_increase_reference_range_decimal_precision"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testparameter",
+            name="delta_absolute",
+            field=models.DecimalField(
+                blank=True, decimal_places=4, max_digits=12, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="testparameter",
+            name="delta_percent",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=6, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="testparameter",
+            name="delta_window_days",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
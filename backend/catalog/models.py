@@ -178,6 +178,12 @@ class TestParameter(models.Model):
         show_on_report (BooleanField): Whether the parameter is shown on the report.
         default_reference_profile_id (CharField): The default reference profile ID.
         delta_check_enabled (BooleanField): Whether delta check is enabled.
+        delta_absolute (DecimalField): The largest change from the previous
+            result that is not flagged.
+        delta_percent (DecimalField): The largest change from the previous
+            result, in percent, that is not flagged.
+        delta_window_days (PositiveIntegerField): How old the previous result
+            may be to be compared; defaults to `DELTA_CHECK_WINDOW_DAYS`.
         panic_low_override (DecimalField): An override for the panic low value.
         panic_high_override (DecimalField): An override for the panic high value.
         comment_template_id (CharField): The ID of a comment template.
@@ -199,6 +205,13 @@ class TestParameter(models.Model):
     show_on_report = models.BooleanField(default=True)
     default_reference_profile_id = models.CharField(max_length=50, blank=True)
     delta_check_enabled = models.BooleanField(default=False)
+    delta_absolute = models.DecimalField(
+        max_digits=12, decimal_places=4, null=True, blank=True
+    )
+    delta_percent = models.DecimalField(
+        max_digits=6, decimal_places=2, null=True, blank=True
+    )
+    delta_window_days = models.PositiveIntegerField(null=True, blank=True)
     panic_low_override = models.DecimalField(
         max_digits=10, decimal_places=2, null=True, blank=True
     )
@@ -221,6 +234,29 @@ class TestParameter(models.Model):
         """Returns a string representation of the test-parameter relationship."""
         return f"{self.test.code} - {self.parameter.code}"
 
+    @staticmethod
+    def for_test_codes(test_codes):
+        """
+        Looks up the parameter measured by each single-parameter test.
+
+        Catalog tests are matched to master-data tests by code. A result
+        holds one value per order item, so only tests with exactly one
+        parameter are mapped; panels with several parameters are left out.
+
+        Args:
+            test_codes (Iterable[str]): `TestCatalog` codes.
+
+        Returns:
+            dict[str, TestParameter]: The mapping of each single-parameter
+                test, with its `parameter` loaded.
+        """
+        found = {}
+        for test_parameter in TestParameter.objects.filter(
+            test__code__in=set(test_codes)
+        ).select_related("test", "parameter"):
+            found.setdefault(test_parameter.test.code, []).append(test_parameter)
+        return {code: mapped[0] for code, mapped in found.items() if len(mapped) == 1}
+
 
 class ReferenceRange(models.Model):
     """Represents a reference range for a parameter.
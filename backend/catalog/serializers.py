@@ -174,6 +174,9 @@ class TestParameterSerializer(serializers.ModelSerializer):
             "show_on_report",
             "default_reference_profile_id",
             "delta_check_enabled",
+            "delta_absolute",
+            "delta_percent",
+            "delta_window_days",
             "panic_low_override",
             "panic_high_override",
             "comment_template_id",
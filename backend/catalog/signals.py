@@ -0,0 +1,31 @@
+"""Cache invalidation for catalog data."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate_on_commit
+
+from .models import (
+    Parameter,
+    ParameterQuickText,
+    ReferenceRange,
+    Test,
+    TestCatalog,
+    TestParameter,
+)
+
+CATALOG_MODELS = [
+    TestCatalog,
+    Test,
+    Parameter,
+    TestParameter,
+    ReferenceRange,
+    ParameterQuickText,
+]
+
+
+@receiver([post_save, post_delete])
+def invalidate_catalog(sender, **kwargs):
+    """Invalidates cached catalog lists when any catalog row changes."""
+    if sender in CATALOG_MODELS:
+        invalidate_on_commit("catalog")
@@ -2,6 +2,7 @@
 
 from rest_framework import generics
 
+from core.cache import CachedListMixin
 from core.permissions import IsAdminOrReadOnly
 
 from .models import (
@@ -22,7 +23,7 @@ from .serializers import (
 )
 
 
-class TestCatalogListCreateView(generics.ListCreateAPIView):
+class TestCatalogListCreateView(CachedListMixin, generics.ListCreateAPIView):
     """
     List all tests or create a new test.
 
@@ -36,6 +37,7 @@ class TestCatalogListCreateView(generics.ListCreateAPIView):
     queryset = TestCatalog.objects.all().order_by("code")
     serializer_class = TestCatalogSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_namespaces = ["catalog"]
 
     def get_queryset(self):
         """
@@ -66,7 +68,7 @@ class TestCatalogDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # New LIMS Test Management Views
-class TestListCreateView(generics.ListCreateAPIView):
+class TestListCreateView(CachedListMixin, generics.ListCreateAPIView):
     """
     List all tests or create a new test.
     """
@@ -74,6 +76,7 @@ class TestListCreateView(generics.ListCreateAPIView):
     queryset = Test.objects.all().order_by("code")
     serializer_class = TestSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_namespaces = ["catalog"]
 
     def get_queryset(self):
         """Optionally filters the queryset by active status."""
@@ -95,7 +98,7 @@ class TestDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Parameter Management Views
-class ParameterListCreateView(generics.ListCreateAPIView):
+class ParameterListCreateView(CachedListMixin, generics.ListCreateAPIView):
     """
     List all parameters or create a new parameter.
     """
@@ -103,6 +106,7 @@ class ParameterListCreateView(generics.ListCreateAPIView):
     queryset = Parameter.objects.all().order_by("code")
     serializer_class = ParameterSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_namespaces = ["catalog"]
 
     def get_queryset(self):
         """Optionally filters the queryset by active status."""
@@ -124,7 +128,7 @@ class ParameterDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # TestParameter Relationship Views
-class TestParameterListCreateView(generics.ListCreateAPIView):
+class TestParameterListCreateView(CachedListMixin, generics.ListCreateAPIView):
     """
     List all test-parameter relationships or create a new one.
     """
@@ -132,6 +136,7 @@ class TestParameterListCreateView(generics.ListCreateAPIView):
     queryset = TestParameter.objects.all().select_related("test", "parameter")
     serializer_class = TestParameterSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_namespaces = ["catalog"]
 
     def get_queryset(self):
         """Optionally filters by test ID."""
@@ -153,7 +158,7 @@ class TestParameterDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Reference Range Management Views
-class ReferenceRangeListCreateView(generics.ListCreateAPIView):
+class ReferenceRangeListCreateView(CachedListMixin, generics.ListCreateAPIView):
     """
     List all reference ranges or create a new one.
     """
@@ -161,6 +166,7 @@ class ReferenceRangeListCreateView(generics.ListCreateAPIView):
     queryset = ReferenceRange.objects.all().select_related("parameter")
     serializer_class = ReferenceRangeSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_namespaces = ["catalog"]
 
     def get_queryset(self):
         """Optionally filters by parameter ID."""
@@ -182,7 +188,7 @@ class ReferenceRangeDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Parameter Quick Text Views
-class ParameterQuickTextListCreateView(generics.ListCreateAPIView):
+class ParameterQuickTextListCreateView(CachedListMixin, generics.ListCreateAPIView):
     """
     List all parameter quick texts or create a new one.
     """
@@ -190,6 +196,7 @@ class ParameterQuickTextListCreateView(generics.ListCreateAPIView):
     queryset = ParameterQuickText.objects.all().select_related("parameter")
     serializer_class = ParameterQuickTextSerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_namespaces = ["catalog"]
 
     def get_queryset(self):
         """Optionally filters by parameter ID."""
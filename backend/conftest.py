@@ -0,0 +1,12 @@
+"""Shared pytest fixtures."""
+
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache, as primary keys are reused."""
+    cache.clear()
+    yield
+    cache.clear()
@@ -8,3 +8,12 @@ class CoreConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        """Install the request metrics query timer on database connections."""
+        from django.db.backends.signals import connection_created
+
+        from .middleware import install_query_timer
+
+        connection_created.connect(install_query_timer)
+        install_query_timer()
@@ -0,0 +1,41 @@
+"""Authentication helpers for async (non-DRF) views."""
+
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+
+async def authenticate_request(request):
+    """
+    Authenticates a plain Django request with the DRF authentication classes.
+
+    DRF views are synchronous, so async views authenticate with this helper
+    instead. It runs the configured `DEFAULT_AUTHENTICATION_CLASSES` (JWT) in
+    a worker thread and honours `APIClient.force_authenticate` in tests.
+
+    Args:
+        request (HttpRequest): The incoming request.
+
+    Returns:
+        User | None: The authenticated user, or None if the credentials are
+            missing or invalid.
+    """
+    drf_request = Request(
+        request,
+        authenticators=[
+            authenticator()
+            for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ],
+    )
+
+    def resolve_user():
+        try:
+            return drf_request.user
+        except APIException:
+            return None
+
+    user = await sync_to_async(resolve_user)()
+    if user is None or not user.is_authenticated:
+        return None
+    return user
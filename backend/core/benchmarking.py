@@ -0,0 +1,203 @@
+"""Helpers shared by the benchmark management commands."""
+
+import json
+import math
+import platform
+import subprocess
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+DEFAULT_OUTPUT_DIR = Path("benchmark-results")
+
+
+def percentile(values, q):
+    """
+    Returns the `q`-th percentile of `values` by the nearest-rank method.
+
+    Args:
+        values (list[float]): The measurements, in any order.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        float | None: The percentile, or None when there are no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LatencyRecorder:
+    """
+    Collects per-step request latencies from one or more worker threads.
+
+    Appending to a list is atomic in CPython, so workers can share one
+    recorder without locking.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        """Marks the start of the measured run."""
+        self.started = time.perf_counter()
+
+    def stop(self):
+        """Marks the end of the measured run."""
+        self.finished = time.perf_counter()
+
+    def record(self, step, duration, status_code=200):
+        """
+        Records one request of `step`.
+
+        Args:
+            step (str): The name of the measured step.
+            duration (float): The request latency in seconds.
+            status_code (int): The response status; 4xx and 5xx count as errors.
+        """
+        self.durations[step].append(duration)
+        if status_code >= 400:
+            self.errors[step][status_code] += 1
+
+    def summary(self):
+        """
+        Summarizes the recorded latencies per step.
+
+        `rps` is the requests of a step completed per second of the measured
+        run, between `start` and `stop`, whatever else the workers did.
+
+        Returns:
+            dict: Wall time, overall throughput and statistics per step.
+        """
+        wall = (self.finished or time.perf_counter()) - self.started
+        steps = {}
+        for step, durations in self.durations.items():
+            steps[step] = {
+                "count": len(durations),
+                "errors": sum(self.errors[step].values()),
+                "error_statuses": dict(self.errors[step]),
+                "mean_ms": sum(durations) / len(durations) * 1000,
+                "p50_ms": percentile(durations, 50) * 1000,
+                "p95_ms": percentile(durations, 95) * 1000,
+                "p99_ms": percentile(durations, 99) * 1000,
+                "max_ms": max(durations) * 1000,
+                "rps": len(durations) / wall if wall else None,
+            }
+        total = sum(len(durations) for durations in self.durations.values())
+        return {
+            "wall_seconds": wall,
+            "requests": total,
+            "errors": sum(step["errors"] for step in steps.values()),
+            "rps": total / wall if wall else None,
+            "steps": steps,
+        }
+
+
+def server_name():
+    """Returns a host name accepted by `ALLOWED_HOSTS` for in-process requests."""
+    host = next(iter(settings.ALLOWED_HOSTS), "*").lstrip(".")
+    return "testserver" if host in ("", "*") else host
+
+
+def git_revision():
+    """Returns the current git commit hash, or None outside a checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_metadata(**parameters):
+    """
+    Describes the environment of a benchmark run.
+
+    Args:
+        **parameters: The benchmark parameters to record.
+
+    Returns:
+        dict: Commit, timestamp, database and Python details.
+    """
+    return {
+        "commit": git_revision(),
+        "timestamp": timezone.now().isoformat(),
+        "database": connection.vendor,
+        "python": platform.python_version(),
+        "parameters": parameters,
+    }
+
+
+def write_results(name, payload, output=None):
+    """
+    Saves benchmark results as JSON.
+
+    Args:
+        name (str): The benchmark name, used for the default file name.
+        payload (dict): The results to save.
+        output (str | None): The target path. Defaults to
+            `benchmark-results/<name>-<commit>-<timestamp>.json`.
+
+    Returns:
+        Path: The path of the written file.
+    """
+    if output:
+        path = Path(output)
+    else:
+        commit = payload.get("meta", {}).get("commit") or "nogit"
+        path = (
+            DEFAULT_OUTPUT_DIR
+            / f"{name}-{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, default=str))
+    return path
+
+
+def format_summary(summary, baseline=None):
+    """
+    Formats a step summary as a text table.
+
+    Args:
+        summary (dict): The output of `LatencyRecorder.summary`.
+        baseline (dict | None): A previous summary; when given, the p95
+            change per step is shown.
+
+    Returns:
+        list[str]: The table lines.
+    """
+    header = f"{'step':<16}{'count':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}"
+    header += f"{'p99 ms':>10}{'req/s':>10}"
+    if baseline:
+        header += f"{'p95 Δ':>9}"
+    lines = [header]
+    for step, stats in summary["steps"].items():
+        line = (
+            f"{step:<16}{stats['count']:>7}{stats['errors']:>5}"
+            f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+            f"{stats['p99_ms']:>10.1f}{stats['rps'] or 0:>10.1f}"
+        )
+        previous = (baseline or {}).get("steps", {}).get(step)
+        if previous and previous.get("p95_ms"):
+            change = (stats["p95_ms"] / previous["p95_ms"] - 1) * 100
+            line += f"{change:>+8.0f}%"
+        if stats["errors"]:
+            statuses = ", ".join(
+                f"{code}×{count}" for code, count in stats["error_statuses"].items()
+            )
+            line += f"  ({statuses})"
+        lines.append(line)
+    return lines
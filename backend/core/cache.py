@@ -0,0 +1,198 @@
+"""Cache-aside helpers for hot read endpoints.
+
+Cached values are stored under keys that embed the current version of one or
+more namespaces (e.g. ``catalog`` or ``order:42``). Invalidating a namespace
+bumps its version, so every key built from it is orphaned at once and simply
+expires; there is no need to track or delete individual keys.
+
+A miss is rebuilt by a single worker: the first one to take a short lock
+computes the value while the others briefly wait for it to appear, which
+protects the database from cache stampedes on hot keys.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# How long a rebuild may hold the lock, and how long other workers wait for
+# the rebuilt value before computing it themselves.
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _version_key(namespace):
+    return f"ns:{namespace}"
+
+
+def _new_version():
+    # A time-based start value never matches keys written under a version
+    # that was evicted from the cache.
+    return time.time_ns()
+
+
+def namespace_versions(namespaces):
+    """
+    Returns the current version of each namespace, initializing missing ones.
+
+    Args:
+        namespaces (list[str]): The namespaces to look up.
+
+    Returns:
+        list[int]: The versions, in the order of `namespaces`.
+    """
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(*namespaces):
+    """
+    Invalidates every cached value built from any of the given namespaces.
+
+    Args:
+        *namespaces (str): The namespaces to invalidate.
+    """
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, _new_version(), None)
+        except Exception:
+            logger.exception("Failed to invalidate cache namespace %s", namespace)
+
+
+def invalidate_on_commit(*namespaces):
+    """
+    Invalidates the namespaces now and again when the transaction commits.
+
+    The second invalidation evicts values that concurrent requests cached
+    from the not-yet-committed state in between.
+
+    Args:
+        *namespaces (str): The namespaces to invalidate.
+    """
+    invalidate(*namespaces)
+    transaction.on_commit(lambda: invalidate(*namespaces))
+
+
+def cache_aside(key, builder, *, namespaces=(), timeout=None):
+    """
+    Returns the cached value for `key`, building and caching it on a miss.
+
+    Cache errors never fail the caller: if the cache is unreachable the value
+    is built directly.
+
+    Args:
+        key (str): The cache key, unique within its namespaces.
+        builder (callable): Computes the value on a miss. Must return a
+            picklable value.
+        namespaces (list[str]): Namespaces whose invalidation also
+            invalidates this key.
+        timeout (int | None): Time-to-live in seconds. Defaults to
+            `settings.CACHE_TTL`.
+
+    Returns:
+        The cached or freshly built value.
+    """
+    try:
+        versions = namespace_versions(namespaces)
+        full_key = ":".join(
+            [key, *(f"{ns}@{v}" for ns, v in zip(namespaces, versions, strict=True))]
+        )
+        value = cache.get(full_key, _MISSING)
+    except Exception:
+        logger.exception("Cache read failed for %s", key)
+        return builder()
+    if value is not _MISSING:
+        return value
+
+    timeout = settings.CACHE_TTL if timeout is None else timeout
+    lock_key = f"{full_key}:lock"
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        # Another worker is rebuilding this key; wait for its result.
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            value = cache.get(full_key, _MISSING)
+            if value is not _MISSING:
+                return value
+        return builder()
+
+    try:
+        value = builder()
+        cache.set(full_key, value, timeout)
+    finally:
+        cache.delete(lock_key)
+    return value
+
+
+class CachedListMixin:
+    """
+    Caches the serialized `list` response of a DRF list view.
+
+    The key includes the full request path, so filters and pages are cached
+    separately. Set `cache_namespaces` to the namespaces whose invalidation
+    should evict the list.
+    """
+
+    cache_namespaces = ()
+
+    def list(self, request, *args, **kwargs):
+        """Returns the list from the cache, building it on a miss."""
+        data = cache_aside(
+            f"{type(self).__name__}:{request.get_full_path()}",
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs).data,
+            namespaces=list(self.cache_namespaces),
+        )
+        return Response(data)
+
+
+class CachedRetrieveMixin:
+    """
+    Caches the serialized `retrieve` response of a DRF detail view.
+
+    `cache_namespaces` may contain a `{pk}` placeholder, which is replaced
+    with the looked-up primary key (e.g. ``"patient:{pk}"``).
+
+    A cache hit skips `get_object()`, so views whose permission classes
+    check the object itself still load it on every request to run
+    `check_object_permissions`.
+    """
+
+    cache_namespaces = ()
+
+    def has_object_permissions(self):
+        """Returns whether any permission class checks the object itself."""
+        return any(
+            type(permission).has_object_permission
+            is not BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Returns the object from the cache, building it on a miss."""
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        # get_object() runs the object permission checks
+        instance = self.get_object() if self.has_object_permissions() else None
+        data = cache_aside(
+            f"{type(self).__name__}:{pk}",
+            lambda: self.get_serializer(instance or self.get_object()).data,
+            namespaces=[namespace.format(pk=pk) for namespace in self.cache_namespaces],
+        )
+        return Response(data)
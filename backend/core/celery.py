@@ -0,0 +1,16 @@
+"""
+Celery application for background jobs.
+
+Workers are started with `celery -A core worker`. Tasks are discovered in the
+`tasks` module of every installed app.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+app = Celery("core")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -1,13 +1,29 @@
 """Custom exception handler for consistent error responses."""
 
+from rest_framework import status
+from rest_framework.response import Response
 from rest_framework.views import exception_handler
 
+from .transitions import TransitionError
+
 
 def custom_exception_handler(exc, context):
     """
     Custom exception handler that returns a consistent error envelope.
     Format: {error: {code, message, details}}
+
+    A failed workflow transition is returned as {error: message}: 404 if the
+    record does not exist, 400 if it is in the wrong state.
     """
+    if isinstance(exc, TransitionError):
+        return Response(
+            {"error": str(exc)},
+            status=(
+                status.HTTP_404_NOT_FOUND
+                if exc.not_found
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
     response = exception_handler(exc, context)
 
     if response is not None:
@@ -0,0 +1,182 @@
+"""Management command to benchmark database connection reuse."""
+
+import io
+import sys
+import threading
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.benchmarking import (
+    LatencyRecorder,
+    format_summary,
+    run_metadata,
+    server_name,
+    write_results,
+)
+from users.models import User, UserRole
+
+
+class Command(BaseCommand):
+    """Compare requests/sec with and without persistent DB connections."""
+
+    help = (
+        "Benchmark the order-list endpoint with a new database connection per "
+        "request (CONN_MAX_AGE=0) and with persistent connections"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--workers", type=int, default=4, help="Concurrent workers (default: 4)"
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Requests per worker and mode (default: 200)",
+        )
+        parser.add_argument(
+            "--max-age",
+            type=int,
+            default=60,
+            help="CONN_MAX_AGE used for the persistent mode (default: 60)",
+        )
+        parser.add_argument(
+            "--path",
+            type=str,
+            default="/api/orders/",
+            help="Endpoint to request (default: /api/orders/)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=None,
+            help="JSON results file (default: benchmark-results/connections-*.json)",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        workers = options["workers"]
+        if min(workers, options["requests"], options["max_age"]) < 1:
+            raise CommandError("--workers, --requests and --max-age must be >= 1")
+        settings_dict = connections["default"].settings_dict
+        if "pool" in settings_dict.get("OPTIONS", {}):
+            raise CommandError(
+                "A connection pool is configured; unset POSTGRES_POOL to compare "
+                "CONN_MAX_AGE modes"
+            )
+
+        user, _ = User.objects.get_or_create(
+            username="benchmark", defaults={"role": UserRole.ADMIN}
+        )
+        # Requests go through the full WSGI handler, so Django closes or keeps
+        # connections at the end of every request exactly as under gunicorn.
+        handler = WSGIHandler()
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": options["path"],
+            "QUERY_STRING": "",
+            "SERVER_NAME": server_name(),
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(user)}",
+            "wsgi.url_scheme": "http",
+            "wsgi.errors": sys.stderr,
+        }
+
+        original_max_age = settings_dict["CONN_MAX_AGE"]
+        modes = {}
+        try:
+            for mode, max_age in (
+                ("reconnect", 0),
+                ("persistent", options["max_age"]),
+            ):
+                settings_dict["CONN_MAX_AGE"] = max_age
+                connections.close_all()
+                modes[mode] = self.run_mode(
+                    mode, handler, environ, workers, options["requests"]
+                )
+        finally:
+            settings_dict["CONN_MAX_AGE"] = original_max_age
+            connections.close_all()
+
+        reconnect = modes["reconnect"]["rps"]
+        persistent = modes["persistent"]["rps"]
+        payload = {
+            "meta": run_metadata(
+                path=options["path"],
+                workers=workers,
+                requests=options["requests"],
+                max_age=options["max_age"],
+            ),
+            "modes": modes,
+            "speedup": persistent / reconnect if reconnect else None,
+        }
+        path = write_results("connections", payload, options["output"])
+
+        for line in format_summary(
+            {"steps": {mode: summary["steps"][mode] for mode, summary in modes.items()}}
+        ):
+            self.stdout.write(line)
+        for mode, summary in modes.items():
+            self.stdout.write(
+                f"{mode}: {summary['rps']:.1f} req/s, "
+                f"{summary['connections_opened']} connections opened"
+            )
+        if payload["speedup"]:
+            self.stdout.write(f"Persistent connections: {payload['speedup']:.2f}x")
+        self.stdout.write(self.style.SUCCESS(f"✓ Results saved to {path}"))
+
+    def run_mode(self, mode, handler, environ, workers, requests):
+        """
+        Sends `requests` requests from each of `workers` threads.
+
+        Returns:
+            dict: The latency summary plus the number of connections opened.
+        """
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        recorder = LatencyRecorder()
+
+        def work():
+            statuses = []
+
+            def start_response(status, headers, exc_info=None):
+                statuses.append(int(status.split()[0]))
+
+            try:
+                for _ in range(requests):
+                    request_environ = {**environ, "wsgi.input": io.BytesIO()}
+                    start = time.perf_counter()
+                    response = handler(request_environ, start_response)
+                    b"".join(response)
+                    # Sends request_finished, which closes the connection
+                    # unless CONN_MAX_AGE keeps it open
+                    response.close()
+                    recorder.record(mode, time.perf_counter() - start, statuses[-1])
+            finally:
+                connections.close_all()
+
+        connection_created.connect(count_connection)
+        threads = [threading.Thread(target=work) for _ in range(workers)]
+        recorder.start()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            recorder.stop()
+            connection_created.disconnect(count_connection)
+
+        summary = recorder.summary()
+        summary["connections_opened"] = len(opened)
+        return summary
@@ -0,0 +1,231 @@
+"""Management command to compare WSGI and ASGI serving under slow clients."""
+
+import asyncio
+import io
+import sys
+import threading
+import time
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.benchmarking import (
+    LatencyRecorder,
+    format_summary,
+    run_metadata,
+    server_name,
+    write_results,
+)
+
+
+class Command(BaseCommand):
+    """Serve the same endpoint through WSGI and ASGI to slow clients."""
+
+    help = (
+        "Benchmark an endpoint with slow clients through the WSGI handler with "
+        "a fixed number of sync workers and through the ASGI handler"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=50,
+            help="Concurrent slow clients (default: 50)",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=5,
+            help="Requests per client and mode (default: 5)",
+        )
+        parser.add_argument(
+            "--sync-workers",
+            type=int,
+            default=4,
+            help="Sync workers available in WSGI mode (default: 4)",
+        )
+        parser.add_argument(
+            "--client-delay",
+            type=float,
+            default=0.05,
+            help="Seconds each client takes to read a response (default: 0.05)",
+        )
+        parser.add_argument(
+            "--path",
+            type=str,
+            default="/api/health/",
+            help="Endpoint to request (default: /api/health/)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=None,
+            help="JSON results file (default: benchmark-results/slow-clients-*.json)",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        if min(options["clients"], options["requests"], options["sync_workers"]) < 1:
+            raise CommandError("--clients, --requests and --sync-workers must be >= 1")
+        if options["client_delay"] < 0:
+            raise CommandError("--client-delay must be >= 0")
+
+        modes = {
+            "wsgi": self.run_wsgi(options),
+            "asgi": self.run_asgi(options),
+        }
+        connections.close_all()
+
+        wsgi = modes["wsgi"]["rps"]
+        asgi = modes["asgi"]["rps"]
+        payload = {
+            "meta": run_metadata(
+                path=options["path"],
+                clients=options["clients"],
+                requests=options["requests"],
+                sync_workers=options["sync_workers"],
+                client_delay=options["client_delay"],
+            ),
+            "modes": modes,
+            "speedup": asgi / wsgi if wsgi else None,
+        }
+        path = write_results("slow-clients", payload, options["output"])
+
+        for line in format_summary(
+            {"steps": {mode: summary["steps"][mode] for mode, summary in modes.items()}}
+        ):
+            self.stdout.write(line)
+        if payload["speedup"]:
+            self.stdout.write(f"ASGI throughput: {payload['speedup']:.2f}x WSGI")
+        self.stdout.write(self.style.SUCCESS(f"✓ Results saved to {path}"))
+
+    def run_wsgi(self, options):
+        """
+        Serves every client through the WSGI handler.
+
+        A sync worker is busy until the slow client has read the whole
+        response, so at most `--sync-workers` requests are in flight; the
+        rest queue, as with gunicorn sync workers.
+
+        Returns:
+            dict: The latency summary, including the time spent queueing.
+        """
+        handler = WSGIHandler()
+        workers = threading.BoundedSemaphore(options["sync_workers"])
+        recorder = LatencyRecorder()
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": options["path"],
+            "QUERY_STRING": "",
+            "SERVER_NAME": server_name(),
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "wsgi.url_scheme": "http",
+            "wsgi.errors": sys.stderr,
+        }
+
+        def client():
+            statuses = []
+
+            def start_response(status, headers, exc_info=None):
+                statuses.append(int(status.split()[0]))
+
+            try:
+                for _ in range(options["requests"]):
+                    start = time.perf_counter()
+                    with workers:
+                        response = handler(
+                            {**environ, "wsgi.input": io.BytesIO()}, start_response
+                        )
+                        for _chunk in response:
+                            time.sleep(options["client_delay"])
+                        response.close()
+                    recorder.record("wsgi", time.perf_counter() - start, statuses[-1])
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=client) for _ in range(options["clients"])]
+        recorder.start()
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            recorder.stop()
+        return recorder.summary()
+
+    def run_asgi(self, options):
+        """
+        Serves every client through the ASGI handler on one event loop.
+
+        Slow reads only suspend the request's own task, so every client is
+        served concurrently by a single process.
+
+        Returns:
+            dict: The latency summary.
+        """
+        handler = ASGIHandler()
+        recorder = LatencyRecorder()
+        host = server_name().encode()
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": options["path"],
+            "raw_path": options["path"].encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(b"host", host)],
+            "server": (server_name(), 80),
+            "client": ("127.0.0.1", 0),
+        }
+
+        async def request():
+            finished = asyncio.Event()
+            status = []
+            body_sent = False
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                # Django listens for a disconnect while the view runs
+                await finished.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    status.append(message["status"])
+                elif message["type"] == "http.response.body":
+                    if message.get("body"):
+                        await asyncio.sleep(options["client_delay"])
+                    if not message.get("more_body", False):
+                        finished.set()
+
+            await handler(dict(scope), receive, send)
+            finished.set()
+            return status[0]
+
+        async def client():
+            for _ in range(options["requests"]):
+                start = time.perf_counter()
+                status_code = await request()
+                recorder.record("asgi", time.perf_counter() - start, status_code)
+
+        async def main():
+            await asyncio.gather(*(client() for _ in range(options["clients"])))
+
+        recorder.start()
+        try:
+            asyncio.run(main())
+        finally:
+            recorder.stop()
+        return recorder.summary()
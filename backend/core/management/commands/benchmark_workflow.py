@@ -0,0 +1,299 @@
+"""Management command to load-test the end-to-end lab workflow."""
+
+import json
+import logging
+import threading
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from rest_framework.test import APIClient
+
+from catalog.models import TestCatalog
+from core.benchmarking import (
+    LatencyRecorder,
+    format_summary,
+    run_metadata,
+    server_name,
+    write_results,
+)
+from results.models import Result
+from samples.models import Sample
+from settings.utils import should_skip_verification
+from users.models import User, UserRole
+
+WORKFLOW_STEPS = [
+    "register",
+    "create_order",
+    "collect",
+    "receive",
+    "enter_value",
+    "enter",
+    "verify",
+    "publish",
+    "report",
+]
+
+
+class WorkflowRunner:
+    """
+    Drives one worker's workflows through the API with the test client.
+
+    Requests are handled in-process, so the measurements cover URL routing,
+    middleware, views, serialization and the database, but no network.
+    """
+
+    def __init__(self, user, test_ids, recorder):
+        self.client = APIClient(SERVER_NAME=server_name())
+        # Record server errors as 500 responses instead of raising them
+        self.client.raise_request_exception = False
+        self.client.force_authenticate(user=user)
+        self.test_ids = test_ids
+        self.recorder = recorder
+        self.skip_verification = should_skip_verification()
+
+    def request(self, step, method, path, data=None):
+        """
+        Performs one timed request and records its latency.
+
+        Returns:
+            Response | None: The response, or None when the request failed.
+        """
+        start = time.perf_counter()
+        response = getattr(self.client, method)(path, data, format="json")
+        self.recorder.record(step, time.perf_counter() - start, response.status_code)
+        return response if response.status_code < 400 else None
+
+    def run(self, number):
+        """
+        Runs the workflow for one new patient and order.
+
+        Returns:
+            bool: Whether every step succeeded.
+        """
+        response = self.request(
+            "register",
+            "post",
+            "/api/patients/",
+            {
+                "full_name": f"Benchmark Patient {number}",
+                "dob": date(1985, 1, 1).isoformat(),
+                "sex": "F",
+                "phone": "03001234567",
+            },
+        )
+        if response is None:
+            return False
+        response = self.request(
+            "create_order",
+            "post",
+            "/api/orders/",
+            {"patient": response.data["id"], "test_ids": self.test_ids},
+        )
+        if response is None:
+            return False
+        order_id = response.data["id"]
+
+        sample_ids = list(
+            Sample.objects.filter(order_id=order_id).values_list("pk", flat=True)
+        )
+        for step in ("collect", "receive"):
+            for sample_id in sample_ids:
+                if (
+                    self.request(step, "post", f"/api/samples/{sample_id}/{step}/")
+                    is None
+                ):
+                    return False
+
+        result_ids = list(
+            Result.objects.filter(order_item__order_id=order_id).values_list(
+                "pk", flat=True
+            )
+        )
+        steps = ["enter", "publish"] if self.skip_verification else WORKFLOW_STEPS[5:8]
+        for result_id in result_ids:
+            if (
+                self.request(
+                    "enter_value",
+                    "patch",
+                    f"/api/results/{result_id}/",
+                    {"value": "5.4"},
+                )
+                is None
+            ):
+                return False
+            verified = False
+            for step in steps:
+                if step == "verify" and verified:
+                    # Autoverified on entry
+                    continue
+                response = self.request(
+                    step, "post", f"/api/results/{result_id}/{step}/"
+                )
+                if response is None:
+                    return False
+                verified = response.data.get("status") == "VERIFIED"
+
+        report = self.request("report", "post", f"/api/reports/generate/{order_id}/")
+        return report is not None
+
+
+def load_baseline(path):
+    """
+    Loads the summary of a previous run to compare against.
+
+    Args:
+        path (str): The JSON results file of the previous run.
+
+    Returns:
+        dict: Its summary.
+
+    Raises:
+        CommandError: If the file cannot be read or holds no step summary.
+    """
+    try:
+        with open(path) as handle:
+            baseline = json.load(handle)["summary"]
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        raise CommandError(f"Cannot compare against {path}: {error!r}") from error
+    if not isinstance(baseline, dict) or not isinstance(baseline.get("steps"), dict):
+        raise CommandError(f"{path} holds no benchmark_workflow summary")
+    return baseline
+
+
+class Command(BaseCommand):
+    """Benchmark the lab workflow from registration to report."""
+
+    help = (
+        "Drive register → order → collect → receive → enter → verify → publish "
+        "→ report through the API with concurrent workers and report latency "
+        "percentiles and requests/sec per step"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--workers", type=int, default=4, help="Concurrent workers (default: 4)"
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=25,
+            help="Workflows run by each worker (default: 25)",
+        )
+        parser.add_argument(
+            "--tests-per-order",
+            type=int,
+            default=3,
+            help="Tests ordered per workflow (default: 3)",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=1,
+            help="Unmeasured workflows run before the benchmark (default: 1)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=None,
+            help="JSON results file (default: benchmark-results/workflow-*.json)",
+        )
+        parser.add_argument(
+            "--compare",
+            type=str,
+            default=None,
+            help="Previous JSON results file to compare p95 latencies against",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        workers = options["workers"]
+        iterations = options["iterations"]
+        if min(workers, iterations, options["tests_per_order"]) < 1:
+            raise CommandError(
+                "--workers, --iterations and --tests-per-order must be >= 1"
+            )
+        # Read before the run, which a bad file would otherwise waste
+        baseline = load_baseline(options["compare"]) if options["compare"] else None
+
+        test_ids = list(
+            TestCatalog.objects.filter(is_active=True)
+            .order_by("id")
+            .values_list("pk", flat=True)[: options["tests_per_order"]]
+        )
+        if not test_ids:
+            raise CommandError("The test catalog is empty. Run seed_data first.")
+        user, _ = User.objects.get_or_create(
+            username="benchmark", defaults={"role": UserRole.ADMIN}
+        )
+
+        warmup = WorkflowRunner(user, test_ids, LatencyRecorder())
+        for number in range(options["warmup"]):
+            if not warmup.run(f"warmup-{number}"):
+                raise CommandError("Warm-up workflow failed; check the API")
+
+        recorder = LatencyRecorder()
+        failed = []
+
+        def work(worker):
+            runner = WorkflowRunner(user, test_ids, recorder)
+            try:
+                for number in range(iterations):
+                    if not runner.run(f"{worker}-{number}"):
+                        failed.append(worker)
+            finally:
+                if workers > 1:
+                    connections.close_all()
+
+        self.stdout.write(
+            f"Running {workers * iterations} workflows with {workers} workers..."
+        )
+        if workers > 1 and connection.vendor == "sqlite":
+            self.stdout.write(
+                self.style.WARNING(
+                    "SQLite serializes writes; concurrent workers will hit "
+                    "'database is locked' errors. Use PostgreSQL for --workers > 1."
+                )
+            )
+
+        # Failed requests are counted per status code instead of logged
+        request_logger = logging.getLogger("django.request")
+        request_logger.disabled = True
+        recorder.start()
+        try:
+            if workers == 1:
+                work(0)
+            else:
+                threads = [
+                    threading.Thread(target=work, args=(worker,))
+                    for worker in range(workers)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            recorder.stop()
+            request_logger.disabled = False
+
+        summary = recorder.summary()
+        summary["failed_workflows"] = len(failed)
+        payload = {
+            "meta": run_metadata(
+                workers=workers,
+                iterations=iterations,
+                tests_per_order=len(test_ids),
+            ),
+            "summary": summary,
+        }
+        path = write_results("workflow", payload, options["output"])
+
+        for line in format_summary(summary, baseline):
+            self.stdout.write(line)
+        self.stdout.write(
+            f"{summary['requests']} requests in {summary['wall_seconds']:.1f}s "
+            f"({summary['rps']:.1f} req/s), {len(failed)} failed workflows"
+        )
+        self.stdout.write(self.style.SUCCESS(f"✓ Results saved to {path}"))
@@ -0,0 +1,581 @@
+"""Management command to generate production-scale synthetic data."""
+
+import multiprocessing
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import factory.random
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from catalog.models import Test, TestCatalog, TestParameter
+from core.cache import invalidate
+from orders.models import Order, OrderItem, OrderPriority, OrderStatus
+from orders.services import master_tests, specimen_groups
+from patients.factories import PatientFactory
+from patients.models import Patient
+from results.models import Result, ResultStatus
+from samples.models import Sample, SampleStatus
+from users.models import User, UserRole
+
+# Workflow states an order can be generated in, with their relative weights.
+# Each state maps to (order/item status, sample status, result status).
+WORKFLOW_STATES = {
+    "pending": (OrderStatus.NEW, SampleStatus.PENDING, None),
+    "collected": (OrderStatus.COLLECTED, SampleStatus.COLLECTED, None),
+    "rejected": (OrderStatus.COLLECTED, SampleStatus.REJECTED, None),
+    "received": (OrderStatus.IN_PROCESS, SampleStatus.RECEIVED, ResultStatus.DRAFT),
+    "entered": (OrderStatus.IN_PROCESS, SampleStatus.RECEIVED, ResultStatus.ENTERED),
+    "verified": (OrderStatus.VERIFIED, SampleStatus.RECEIVED, ResultStatus.VERIFIED),
+    "published": (
+        OrderStatus.PUBLISHED,
+        SampleStatus.RECEIVED,
+        ResultStatus.PUBLISHED,
+    ),
+    "cancelled": (OrderStatus.CANCELLED, SampleStatus.PENDING, None),
+}
+STATE_WEIGHTS = {
+    "pending": 4,
+    "collected": 4,
+    "rejected": 1,
+    "received": 6,
+    "entered": 8,
+    "verified": 8,
+    "published": 66,
+    "cancelled": 3,
+}
+
+# Number of workflow steps reached in each state, and the typical minutes
+# spent before each step: collection, transport, bench, verification and
+# publication.
+STEPS_REACHED = {
+    "pending": 0,
+    "cancelled": 0,
+    "collected": 1,
+    "rejected": 1,
+    "received": 2,
+    "entered": 3,
+    "verified": 4,
+    "published": 5,
+}
+STEP_FIELDS = [
+    "collected_at",
+    "received_at",
+    "entered_at",
+    "verified_at",
+    "published_at",
+]
+STEP_DELAYS = [(5, 60), (10, 120), (30, 480), (10, 240), (1, 60)]
+
+# Number of tests per order and their relative frequency.
+TESTS_PER_ORDER_WEIGHTS = {1: 30, 2: 25, 3: 18, 4: 12, 5: 8, 6: 4, 8: 2, 10: 1}
+
+# Generated order numbers are `<prefix>-YYYYMMDD-NNNNNNN`
+ORDER_NO_SUFFIX_LENGTH = len("-YYYYMMDD-0000000")
+MAX_PREFIX_LENGTH = (
+    Order._meta.get_field("order_no").max_length - ORDER_NO_SUFFIX_LENGTH
+)
+
+PRIORITY_WEIGHTS = {
+    OrderPriority.ROUTINE: 85,
+    OrderPriority.URGENT: 10,
+    OrderPriority.STAT: 5,
+}
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """
+    Temporarily disables `auto_now`/`auto_now_add` on the given models.
+
+    `bulk_create` would otherwise overwrite the generated historical
+    `created_at`/`updated_at` values with the current time.
+    """
+    toggled = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            for attr in ("auto_now", "auto_now_add"):
+                if getattr(field, attr, False):
+                    setattr(field, attr, False)
+                    toggled.append((field, attr))
+    try:
+        yield
+    finally:
+        for field, attr in toggled:
+            setattr(field, attr, True)
+
+
+class OrderChunkWriter:
+    """
+    Generates and writes one chunk of orders with their items, samples and
+    results.
+
+    Every chunk draws from its own generator seeded with `(seed, chunk)`, so
+    the generated rows are the same whether chunks are written in sequence
+    or by several worker processes in any order.
+    """
+
+    def __init__(
+        self,
+        *,
+        seed,
+        prefix,
+        count,
+        chunk_size,
+        patient_ids,
+        tests,
+        master,
+        parameter_ids,
+        users,
+        range_start,
+        range_seconds,
+    ):
+        self.seed = seed
+        self.prefix = prefix
+        self.count = count
+        self.chunk_size = chunk_size
+        self.patient_ids = patient_ids
+        self.catalog, self.catalog_weights = tests
+        self.master = master
+        self.parameter_ids = parameter_ids
+        self.users = users
+        self.range_start = range_start
+        self.range_seconds = range_seconds
+
+    @property
+    def chunks(self):
+        """The indexes of all chunks to write."""
+        return range(-(-self.count // self.chunk_size))
+
+    def __call__(self, chunk):
+        """
+        Writes chunk number `chunk` in a single transaction.
+
+        Returns:
+            dict: The number of rows created per table.
+        """
+        rng = random.Random(f"{self.seed}:{chunk}")
+        offset = chunk * self.chunk_size
+        plans = [
+            self.plan_order(rng, n)
+            for n in range(offset, min(offset + self.chunk_size, self.count))
+        ]
+
+        with transaction.atomic():
+            orders = Order.objects.bulk_create(
+                [order for order, _, _, _ in plans], batch_size=self.chunk_size
+            )
+            items = OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        order_id=order.pk,
+                        test=test,
+                        status=order.status,
+                        due_at=order.created_at
+                        + timedelta(hours=test.turnaround_time_hours),
+                        created_at=order.created_at,
+                        updated_at=order.updated_at,
+                    )
+                    for order, _, _, ordered in plans
+                    for test in ordered
+                ],
+                batch_size=self.chunk_size,
+            )
+
+            # Tests sharing a specimen and container share a sample, as in
+            # `create_order`
+            samples = []
+            links = []
+            results = []
+            item_iter = iter(items)
+            for order, state, timeline, ordered in plans:
+                _, sample_status, result_status = WORKFLOW_STATES[state]
+                order_items = [next(item_iter) for _ in ordered]
+                groups = specimen_groups(order_items, self.master)
+                for index, (sample_type, container_type, group) in enumerate(
+                    groups, start=1
+                ):
+                    sample = self.build_sample(
+                        rng,
+                        order,
+                        sample_type,
+                        container_type,
+                        f"{order.order_no}-{index}",
+                        sample_status,
+                        timeline,
+                    )
+                    samples.append(sample)
+                    links.extend((sample, item) for item in group)
+                if result_status is not None:
+                    results.extend(
+                        self.build_result(
+                            rng, item, order, item.test, result_status, timeline
+                        )
+                        for item in order_items
+                    )
+            Sample.objects.bulk_create(samples, batch_size=self.chunk_size)
+            Sample.link_order_items(links, batch_size=self.chunk_size)
+            Result.objects.bulk_create(results, batch_size=self.chunk_size)
+
+        return {
+            "orders": len(orders),
+            "items": len(items),
+            "samples": len(samples),
+            "results": len(results),
+        }
+
+    def plan_order(self, rng, n):
+        """
+        Builds the unsaved `n`-th order and picks its state, timeline and tests.
+
+        Returns:
+            tuple: (order, state, timeline, tests)
+        """
+        state = rng.choices(list(STATE_WEIGHTS), list(STATE_WEIGHTS.values()))[0]
+        created_at = self.range_start + timedelta(
+            seconds=rng.randrange(self.range_seconds)
+        )
+
+        timeline = {}
+        current = created_at
+        for field, (low, high) in zip(
+            STEP_FIELDS[: STEPS_REACHED[state]], STEP_DELAYS, strict=False
+        ):
+            current += timedelta(minutes=rng.randint(low, high))
+            timeline[field] = current
+        timeline["updated_at"] = current
+
+        size = rng.choices(
+            list(TESTS_PER_ORDER_WEIGHTS), list(TESTS_PER_ORDER_WEIGHTS.values())
+        )[0]
+        picked = {}
+        while len(picked) < min(size, len(self.catalog)):
+            test = rng.choices(self.catalog, self.catalog_weights)[0]
+            picked[test.pk] = test
+
+        order = Order(
+            order_no=f"{self.prefix}-{created_at:%Y%m%d}-{n + 1:07d}",
+            patient_id=rng.choice(self.patient_ids),
+            priority=rng.choices(
+                list(PRIORITY_WEIGHTS), list(PRIORITY_WEIGHTS.values())
+            )[0],
+            status=WORKFLOW_STATES[state][0],
+            created_at=created_at,
+            updated_at=current,
+        )
+        return order, state, timeline, list(picked.values())
+
+    def build_sample(
+        self, rng, order, sample_type, container_type, barcode, status, timeline
+    ):
+        """Builds an unsaved sample of `order` in `status`."""
+        return Sample(
+            order_id=order.pk,
+            sample_type=sample_type,
+            container_type=container_type,
+            barcode=barcode,
+            status=status,
+            collected_at=timeline.get("collected_at"),
+            collected_by_id=(
+                rng.choice(self.users[UserRole.PHLEBOTOMY])
+                if "collected_at" in timeline
+                else None
+            ),
+            received_at=timeline.get("received_at"),
+            received_by_id=(
+                rng.choice(self.users[UserRole.TECHNOLOGIST])
+                if "received_at" in timeline
+                else None
+            ),
+            rejection_reason=(
+                "Hemolyzed sample" if status == SampleStatus.REJECTED else ""
+            ),
+            created_at=order.created_at,
+            updated_at=timeline["updated_at"],
+        )
+
+    def build_result(self, rng, item, order, test, status, timeline):
+        """Builds an unsaved result for `item` in `status`."""
+        entered = status != ResultStatus.DRAFT
+        return Result(
+            order_item_id=item.pk,
+            patient_id=order.patient_id,
+            parameter_id=self.parameter_ids.get(test.pk),
+            value=f"{rng.lognormvariate(2, 0.6):.2f}" if entered else "",
+            flags=rng.choices(["N", "H", "L"], [80, 12, 8])[0] if entered else "",
+            status=status,
+            entered_at=timeline.get("entered_at"),
+            entered_by_id=(
+                rng.choice(self.users[UserRole.TECHNOLOGIST]) if entered else None
+            ),
+            verified_at=timeline.get("verified_at"),
+            verified_by_id=(
+                rng.choice(self.users[UserRole.PATHOLOGIST])
+                if "verified_at" in timeline
+                else None
+            ),
+            published_at=timeline.get("published_at"),
+            created_at=timeline.get("received_at", item.created_at),
+            updated_at=timeline["updated_at"],
+        )
+
+
+# The chunk writer of a worker process, set by `_init_worker`.
+_writer = None
+
+
+def _init_worker(writer):
+    """Gives a forked worker process its own database connections."""
+    global _writer
+    connections.close_all()
+    _writer = writer
+
+
+def _write_chunk(chunk):
+    """Writes one chunk in a worker process."""
+    with explicit_timestamps(Order, OrderItem, Sample, Result):
+        return _writer(chunk)
+
+
+class Command(BaseCommand):
+    """Generate high-volume synthetic LIMS data for performance testing."""
+
+    help = (
+        "Generate N patients and M orders with samples and results in all "
+        "workflow states, spread over a date range"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--patients", type=int, default=1000, help="Number of patients"
+        )
+        parser.add_argument(
+            "--orders", type=int, default=10000, help="Number of orders"
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Spread orders over this many days ending today (default: 365)",
+        )
+        parser.add_argument(
+            "--end-date",
+            type=str,
+            default=None,
+            help="Last day of the date range (YYYY-MM-DD, default: today)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Number of orders written per bulk_create batch (default: 5000)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "Number of processes writing order chunks in parallel; "
+                "requires PostgreSQL when > 1 (default: 1)"
+            ),
+        )
+        parser.add_argument(
+            "--seed", type=int, default=42, help="Random seed (default: 42)"
+        )
+        parser.add_argument(
+            "--prefix",
+            type=str,
+            default="LD",
+            help=(
+                "Prefix for generated MRNs, order numbers and barcodes, at most "
+                f"{MAX_PREFIX_LENGTH} characters so order numbers fit"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        if options["patients"] < 1 or options["orders"] < 0:
+            raise CommandError("--patients must be >= 1 and --orders >= 0")
+        if min(options["days"], options["chunk_size"], options["workers"]) < 1:
+            raise CommandError("--days, --chunk-size and --workers must be >= 1")
+        if options["workers"] > 1 and connections["default"].vendor != "postgresql":
+            raise CommandError("--workers > 1 requires PostgreSQL")
+
+        prefix = options["prefix"]
+        if not 1 <= len(prefix) <= MAX_PREFIX_LENGTH:
+            raise CommandError(
+                f"--prefix must be 1 to {MAX_PREFIX_LENGTH} characters so "
+                "order numbers fit in Order.order_no"
+            )
+        if Patient.objects.filter(mrn__startswith=f"{prefix}-").exists():
+            raise CommandError(
+                f"Data with prefix '{prefix}' already exists; choose another --prefix"
+            )
+
+        seed = options["seed"]
+        rng = random.Random(seed)
+        factory.random.reseed_random(seed)
+
+        end_date = (
+            datetime.fromisoformat(options["end_date"]).date()
+            if options["end_date"]
+            else timezone.localdate()
+        )
+        range_end = timezone.make_aware(
+            datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        )
+        range_seconds = options["days"] * 86400
+        range_start = range_end - timedelta(seconds=range_seconds)
+
+        tests = self.load_test_mix(rng)
+        test_parameters = TestParameter.for_test_codes(test.code for test in tests[0])
+        users = {
+            role: list(User.objects.filter(role=role).values_list("pk", flat=True))
+            or [None]
+            for role in UserRole.values
+        }
+
+        started = time.perf_counter()
+        with explicit_timestamps(Patient, Order, OrderItem, Sample, Result):
+            patient_ids = self.create_patients(
+                rng,
+                options["patients"],
+                options["chunk_size"],
+                prefix,
+                range_start,
+                range_seconds,
+            )
+            writer = OrderChunkWriter(
+                seed=seed,
+                prefix=prefix,
+                count=options["orders"],
+                chunk_size=options["chunk_size"],
+                patient_ids=patient_ids,
+                tests=tests,
+                master=master_tests(test.code for test in tests[0]),
+                parameter_ids={
+                    test.pk: test_parameter.parameter_id
+                    for test in tests[0]
+                    if (test_parameter := test_parameters.get(test.code))
+                },
+                users=users,
+                range_start=range_start,
+                range_seconds=range_seconds,
+            )
+            totals = self.create_orders(writer, options["workers"])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ Generated {len(patient_ids)} patients, {totals['orders']} orders, "
+                f"{totals['items']} order items, {totals['samples']} samples and "
+                f"{totals['results']} results in {elapsed:.1f}s"
+            )
+        )
+
+    def load_test_mix(self, rng):
+        """
+        Returns the orderable tests with popularity weights.
+
+        Uses the active `TestCatalog`. When it is empty but the LIMS master
+        catalog has been imported, the active `Test` rows are mirrored into
+        `TestCatalog` first.
+
+        Returns:
+            tuple[list, list]: The tests and their relative weights.
+        """
+        tests = list(
+            TestCatalog.objects.filter(is_active=True)
+            .order_by("code")
+            .only("id", "code", "sample_type")
+        )
+        if not tests:
+            master = Test.objects.filter(active=True).order_by("code")
+            TestCatalog.objects.bulk_create(
+                [
+                    TestCatalog(
+                        code=test.code[:20],
+                        name=test.name,
+                        category=test.department or "General",
+                        sample_type=test.specimen_type or "Blood",
+                        price=test.default_charge or Decimal("1.00"),
+                        turnaround_time_hours=max(1, test.default_tat_minutes // 60),
+                    )
+                    for test in master
+                ],
+                ignore_conflicts=True,
+            )
+            # bulk_create does not send post_save
+            invalidate("catalog")
+            tests = list(
+                TestCatalog.objects.filter(is_active=True)
+                .order_by("code")
+                .only("id", "code", "sample_type")
+            )
+            if tests:
+                self.stdout.write(f"Mirrored {len(tests)} imported tests into catalog")
+        if not tests:
+            raise CommandError(
+                "The test catalog is empty. Run seed_data or import_lims_master first."
+            )
+
+        # A long-tailed popularity curve: a few tests make up most orders.
+        rng.shuffle(tests)
+        weights = [1 / (rank + 1) for rank in range(len(tests))]
+        return tests, weights
+
+    def create_patients(self, rng, count, chunk_size, prefix, range_start, seconds):
+        """Creates `count` patients in chunks and returns their primary keys."""
+        self.stdout.write(f"Creating {count} patients...")
+        patient_ids = []
+        for offset in range(0, count, chunk_size):
+            batch = []
+            for n in range(offset, min(offset + chunk_size, count)):
+                created_at = range_start + timedelta(seconds=rng.randrange(seconds))
+                batch.append(
+                    PatientFactory.build(
+                        mrn=f"{prefix}-P{n + 1:08d}",
+                        created_at=created_at,
+                        updated_at=created_at,
+                    )
+                )
+            with transaction.atomic():
+                created = Patient.objects.bulk_create(batch, batch_size=chunk_size)
+            patient_ids.extend(patient.pk for patient in created)
+        return patient_ids
+
+    def create_orders(self, writer, workers):
+        """
+        Writes all order chunks, using `workers` processes when > 1.
+
+        Returns:
+            dict: The number of rows created per table.
+        """
+        self.stdout.write(f"Creating {writer.count} orders...")
+        totals = {"orders": 0, "items": 0, "samples": 0, "results": 0}
+
+        pool = None
+        if workers == 1:
+            counts = map(writer, writer.chunks)
+        else:
+            # Forked children must not share the parent's database connection
+            connections.close_all()
+            pool = multiprocessing.get_context("fork").Pool(
+                workers, initializer=_init_worker, initargs=(writer,)
+            )
+            counts = pool.imap_unordered(_write_chunk, writer.chunks)
+        try:
+            for chunk_counts in counts:
+                for key, value in chunk_counts.items():
+                    totals[key] += value
+                self.stdout.write(f"  {totals['orders']}/{writer.count} orders")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return totals
@@ -0,0 +1,173 @@
+"""In-process request metrics with Prometheus text exposition.
+
+Metrics are aggregated per worker process. Each gunicorn/uvicorn worker keeps
+its own registry, so a scraper should be pointed at each worker (or the
+numbers summed) when running more than one process.
+"""
+
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Upper bounds (in seconds) shared by all timing histograms.
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds for the per-request query count histogram.
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# The metrics sample for the request being processed on this thread/task.
+current_sample: ContextVar["RequestSample | None"] = ContextVar(
+    "current_sample", default=None
+)
+
+
+class RequestSample:
+    """
+    Mutable accumulator for the measurements of a single request.
+
+    Attributes:
+        query_count (int): Number of SQL statements executed.
+        db_time (float): Wall-clock seconds spent inside the database driver.
+        serialize_time (float): Seconds spent rendering the response body.
+    """
+
+    __slots__ = ("query_count", "db_time", "serialize_time")
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+
+class Histogram:
+    """
+    A labelled Prometheus-style histogram.
+
+    Observations are stored as non-cumulative bucket counts and converted to
+    cumulative counts when exposed, keeping `observe` to a bisect and three
+    additions.
+    """
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        """
+        Records a single observation.
+
+        Args:
+            labels (tuple): A tuple of (name, value) label pairs.
+            value (float): The observed value.
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self):
+        """Drops all recorded series."""
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        """
+        Renders the histogram in the Prometheus text format.
+
+        Returns:
+            list[str]: The exposition lines for this histogram.
+        """
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            snapshot = [
+                (labels, list(counts), total)
+                for labels, (counts, total) in sorted(self._series.items())
+            ]
+        for labels, counts, total in snapshot:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts, strict=False):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+                )
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    """Escapes a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_LATENCY = Histogram(
+    "lims_http_request_duration_seconds",
+    "Total time spent handling the request.",
+    TIME_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "lims_http_db_queries",
+    "Number of SQL queries executed per request.",
+    QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    "lims_http_db_duration_seconds",
+    "Time spent executing SQL queries per request.",
+    TIME_BUCKETS,
+)
+SERIALIZE_TIME = Histogram(
+    "lims_http_serialize_duration_seconds",
+    "Time spent rendering the response body per request.",
+    TIME_BUCKETS,
+)
+
+REGISTRY = [REQUEST_LATENCY, DB_QUERIES, DB_TIME, SERIALIZE_TIME]
+
+
+def record_request(view, method, status_code, duration, sample):
+    """
+    Records the measurements of a completed request.
+
+    Args:
+        view (str): The resolved view name.
+        method (str): The HTTP method.
+        status_code (int): The response status code.
+        duration (float): Total request duration in seconds.
+        sample (RequestSample): The database and serialization measurements.
+    """
+    labels = (("view", view), ("method", method), ("status", str(status_code)))
+    REQUEST_LATENCY.observe(labels, duration)
+    DB_QUERIES.observe(labels, sample.query_count)
+    DB_TIME.observe(labels, sample.db_time)
+    SERIALIZE_TIME.observe(labels, sample.serialize_time)
+
+
+def render_prometheus():
+    """
+    Renders every registered metric in the Prometheus text format.
+
+    Returns:
+        str: The exposition document.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    """Clears all recorded series. Intended for tests."""
+    for metric in REGISTRY:
+        metric.clear()
@@ -0,0 +1,116 @@
+"""Request instrumentation middleware."""
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .metrics import RequestSample, current_sample, record_request
+
+
+class QueryTimer:
+    """
+    Database execute wrapper that counts queries and accumulates their time.
+
+    A single instance is installed on every database connection (see
+    `install_query_timer`) and attributes each query to the `RequestSample`
+    of the current context. Database connections are per thread, and under
+    ASGI the ORM runs in worker threads; the context variable follows the
+    request into those threads, so queries are attributed correctly in both
+    WSGI and ASGI mode.
+    """
+
+    def __call__(self, execute, sql, params, many, context):
+        sample = current_sample.get()
+        if sample is None:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            sample.db_time += time.perf_counter() - start
+            sample.query_count += 1
+
+
+query_timer = QueryTimer()
+
+
+def install_query_timer(sender=None, connection=None, **kwargs):
+    """
+    Installs the query timer on a database connection.
+
+    Connected to `connection_created`; also called for connections that were
+    opened before the app was ready.
+    """
+    connections_to_wrap = (
+        [connection] if connection else connections.all(initialized_only=True)
+    )
+    for wrapped in connections_to_wrap:
+        if query_timer not in wrapped.execute_wrappers:
+            wrapped.execute_wrappers.append(query_timer)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, query count, DB time and serialization time per view.
+
+    Measurements are aggregated into the histograms exposed at
+    `/api/health/metrics`. When `METRICS_TIMING_HEADERS` is enabled the
+    measurements of each request are also returned in the `X-Query-Count`
+    and `Server-Timing` response headers for debugging.
+
+    The middleware supports both WSGI and ASGI; for async views it runs in
+    the event loop without a thread switch.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, "METRICS_ENABLED", True):
+            return self.get_response(request)
+
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        return self.finish(request, response, sample, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not getattr(settings, "METRICS_ENABLED", True):
+            return await self.get_response(request)
+
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        return self.finish(request, response, sample, time.perf_counter() - start)
+
+    def finish(self, request, response, sample, duration):
+        """Records the request and adds the optional timing headers."""
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name or match.route) if match else "unmatched"
+        record_request(view, request.method, response.status_code, duration, sample)
+
+        if getattr(settings, "METRICS_TIMING_HEADERS", False):
+            response["X-Query-Count"] = str(sample.query_count)
+            response["Server-Timing"] = (
+                f"db;dur={sample.db_time * 1000:.2f}, "
+                f"serialize;dur={sample.serialize_time * 1000:.2f}, "
+                f"total;dur={duration * 1000:.2f}"
+            )
+        return response
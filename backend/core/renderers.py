@@ -0,0 +1,27 @@
+"""Response renderers."""
+
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from .metrics import current_sample
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """
+    JSON renderer that reports its rendering time to the request metrics.
+
+    The elapsed time is added to the serialization time of the current
+    request sample collected by `RequestMetricsMiddleware`.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Renders `data` to JSON and records the time spent doing so."""
+        sample = current_sample.get()
+        if sample is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            sample.serialize_time += time.perf_counter() - start
@@ -35,6 +35,9 @@ ALLOWED_HOSTS = [
     host.strip() for host in os.environ.get("ALLOWED_HOSTS", "172.237.71.40").split(",")
 ]
 
+# wsgi or asgi, as served by gunicorn.conf.py
+SERVER_MODE = os.environ.get("SERVER_MODE", "wsgi").lower()
+
 
 # Application definition
 
@@ -62,9 +65,14 @@ INSTALLED_APPS = [
     "reports",
     "dashboard",
     "settings",
+    "events",
+    "interfaces",
+    "printing",
+    "exports",
 ]
 
 MIDDLEWARE = [
+    "core.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -75,6 +83,10 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+# WhiteNoise is sync-only: under ASGI it would make Django run every request,
+# async views included, in a thread. nginx serves /static/ instead.
+if SERVER_MODE == "asgi":
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
 
 # Custom user model
 AUTH_USER_MODEL = "users.User"
@@ -112,8 +124,30 @@ if os.environ.get("POSTGRES_HOST"):
             "PASSWORD": os.environ.get("POSTGRES_PASSWORD", "lims"),
             "HOST": os.environ.get("POSTGRES_HOST", "db"),
             "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            # Keep connections open between requests instead of reconnecting
+            # on every API call; health checks drop connections that died
+            # while idle.
+            "CONN_MAX_AGE": int(os.environ.get("POSTGRES_CONN_MAX_AGE", "60")),
+            "CONN_HEALTH_CHECKS": (
+                os.environ.get("POSTGRES_CONN_HEALTH_CHECKS", "True") == "True"
+            ),
         }
     }
+    # Optional psycopg 3 connection pool (requires `psycopg[pool]`).
+    # Pooling replaces persistent connections, so CONN_MAX_AGE must be 0.
+    if os.environ.get("POSTGRES_POOL", "False") == "True":  # pragma: no cover
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
+        DATABASES["default"]["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.environ.get("POSTGRES_POOL_MIN_SIZE", "2")),
+                "max_size": int(os.environ.get("POSTGRES_POOL_MAX_SIZE", "4")),
+                "timeout": int(os.environ.get("POSTGRES_POOL_TIMEOUT", "10")),
+            }
+        }
+    # Persistent connections must be disabled under ASGI, where each
+    # request's connection would be left open; use the pool to reuse them.
+    elif SERVER_MODE == "asgi":
+        DATABASES["default"]["CONN_MAX_AGE"] = 0
 else:
     DATABASES = {
         "default": {
@@ -125,9 +159,118 @@ else:
 # Redis configuration
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 
+# Cache configuration
+# A shared Redis cache when REDIS_URL is set, a per-process cache otherwise
+CACHE_TTL = int(os.environ.get("CACHE_TTL", "300"))
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "lims",
+            "VERSION": int(os.environ.get("CACHE_VERSION", "1")),
+            "TIMEOUT": CACHE_TTL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "lims",
+            "VERSION": int(os.environ.get("CACHE_VERSION", "1")),
+            "TIMEOUT": CACHE_TTL,
+        }
+    }
+
+# Live event stream (/api/events/stream/)
+# Events fan out through Redis pub/sub when REDIS_URL is set; the in-memory
+# broker only reaches clients connected to the same process.
+EVENTS_BROKER = os.environ.get(
+    "EVENTS_BROKER", "redis" if os.environ.get("REDIS_URL") else "memory"
+)
+EVENTS_CHANNEL = os.environ.get("EVENTS_CHANNEL", "lims:events")
+EVENTS_HEARTBEAT = int(os.environ.get("EVENTS_HEARTBEAT", "15"))
+# Seconds a single-use stream ticket (POST /api/events/ticket/) stays valid.
+# Tickets are kept in the cache, so several workers need the Redis cache.
+EVENTS_TICKET_TTL = int(os.environ.get("EVENTS_TICKET_TTL", "30"))
+
+# Delta check defaults, used when a test parameter sets no threshold
+DELTA_CHECK_WINDOW_DAYS = int(os.environ.get("DELTA_CHECK_WINDOW_DAYS", "365"))
+DELTA_CHECK_PERCENT = int(os.environ.get("DELTA_CHECK_PERCENT", "50"))
+
+# ASTM analyzer interface (manage.py astm_listener)
+ASTM_HOST = os.environ.get("ASTM_HOST", "0.0.0.0")
+ASTM_PORT = int(os.environ.get("ASTM_PORT", "4001"))
+# Seconds to wait for the next frame of a message before discarding it
+ASTM_TIMEOUT = float(os.environ.get("ASTM_TIMEOUT", "30"))
+# Results entered per bulk write, and the longest wait for a batch to fill
+ASTM_BATCH_SIZE = int(os.environ.get("ASTM_BATCH_SIZE", "200"))
+ASTM_FLUSH_INTERVAL = float(os.environ.get("ASTM_FLUSH_INTERVAL", "0.2"))
+# Seconds a barcode's tests stay in the host-query index without a refresh
+HOST_QUERY_TTL = int(os.environ.get("HOST_QUERY_TTL", "86400"))
+# Username analyzer results are entered as
+INTERFACE_USERNAME = os.environ.get("INTERFACE_USERNAME", "analyzer")
+
+# HL7 v2 gateway (manage.py hl7_gateway): orders are received over MLLP on
+# HL7_HOST:HL7_PORT and result messages sent to the hospital system at
+# HL7_OUTBOUND_HOST:HL7_OUTBOUND_PORT (no outbound sender when unset)
+HL7_HOST = os.environ.get("HL7_HOST", "0.0.0.0")
+HL7_PORT = int(os.environ.get("HL7_PORT", "2575"))
+HL7_OUTBOUND_HOST = os.environ.get("HL7_OUTBOUND_HOST", "")
+HL7_OUTBOUND_PORT = int(os.environ.get("HL7_OUTBOUND_PORT", "2576"))
+# Seconds to wait for the rest of a message or for an acknowledgement
+HL7_TIMEOUT = float(os.environ.get("HL7_TIMEOUT", "30"))
+# Orders created per transaction, and result messages sent per batch
+HL7_BATCH_SIZE = int(os.environ.get("HL7_BATCH_SIZE", "100"))
+HL7_OUTBOUND_BATCH_SIZE = int(os.environ.get("HL7_OUTBOUND_BATCH_SIZE", "100"))
+# Seconds between checks for due result messages, the delay before the first
+# retry (doubled on every further attempt) and the attempts before giving up
+HL7_POLL_INTERVAL = float(os.environ.get("HL7_POLL_INTERVAL", "1"))
+HL7_RETRY_DELAY = float(os.environ.get("HL7_RETRY_DELAY", "5"))
+HL7_MAX_ATTEMPTS = int(os.environ.get("HL7_MAX_ATTEMPTS", "10"))
+# Seconds before result messages claimed by a stopped sender are sent again;
+# longer than 3 x HL7_TIMEOUT
+HL7_STALE_AFTER = float(os.environ.get("HL7_STALE_AFTER", "300"))
+# Application and facility the laboratory identifies itself as (MSH-3/MSH-4)
+HL7_APPLICATION = os.environ.get("HL7_APPLICATION", "LIMS")
+HL7_FACILITY = os.environ.get("HL7_FACILITY", "LAB")
+
+# Print spooler (manage.py print_spooler): printers used when a request
+# names none (label printer; report printer when the tests name none either)
+PRINT_LABEL_PRINTER = os.environ.get("PRINT_LABEL_PRINTER", "")
+PRINT_REPORT_PRINTER = os.environ.get("PRINT_REPORT_PRINTER", "")
+# Jobs claimed per printer at once, and seconds to wait for a printer
+PRINT_BATCH_SIZE = int(os.environ.get("PRINT_BATCH_SIZE", "50"))
+PRINT_TIMEOUT = float(os.environ.get("PRINT_TIMEOUT", "30"))
+# Seconds between checks for queued jobs, the delay before the first retry
+# (doubled on every further attempt) and the attempts before giving up
+PRINT_POLL_INTERVAL = float(os.environ.get("PRINT_POLL_INTERVAL", "1"))
+PRINT_RETRY_DELAY = float(os.environ.get("PRINT_RETRY_DELAY", "5"))
+PRINT_MAX_ATTEMPTS = int(os.environ.get("PRINT_MAX_ATTEMPTS", "5"))
+# Seconds after which jobs claimed by a stopped worker are printed again
+PRINT_STALE_AFTER = float(os.environ.get("PRINT_STALE_AFTER", "300"))
+
+# TAT monitor (manage.py tat_monitor): minutes before its due time an order
+# item is flagged as due soon, and the most seconds between checks
+TAT_WARNING_MINUTES = int(os.environ.get("TAT_WARNING_MINUTES", "30"))
+TAT_CHECK_INTERVAL = float(os.environ.get("TAT_CHECK_INTERVAL", "60"))
+
+# Parquet export (manage.py export_parquet): the export directory, and the
+# seconds rows must be unchanged before they are exported, so rows written
+# by transactions still committing go out with the next run
+PARQUET_EXPORT_DIR = os.environ.get("PARQUET_EXPORT_DIR", str(BASE_DIR / "parquet"))
+PARQUET_EXPORT_LAG = float(os.environ.get("PARQUET_EXPORT_LAG", "60"))
+
 # Celery configuration (optional for async jobs)
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
+# Without a Redis broker, tasks run inline in the request that enqueues them
+CELERY_TASK_ALWAYS_EAGER = (
+    os.environ.get(
+        "CELERY_TASK_ALWAYS_EAGER", "False" if os.environ.get("REDIS_URL") else "True"
+    )
+    == "True"
+)
 
 
 # Password validation
@@ -195,8 +338,17 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "EXCEPTION_HANDLER": "core.exceptions.custom_exception_handler",
+    "DEFAULT_RENDERER_CLASSES": [
+        "core.renderers.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
+# Request metrics (exposed at /api/health/metrics)
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "True") == "True"
+# Adds X-Query-Count and Server-Timing headers to every response (debug only)
+METRICS_TIMING_HEADERS = os.environ.get("METRICS_TIMING_HEADERS", "False") == "True"
+
 # JWT Settings
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1),
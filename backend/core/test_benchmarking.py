@@ -0,0 +1,171 @@
+"""Tests for the benchmark helpers and benchmark_workflow command."""
+
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import override_settings
+
+from catalog.models import TestCatalog
+from core.benchmarking import LatencyRecorder, format_summary, percentile
+from patients.models import Patient
+from reports.models import Report
+
+
+class TestBenchmarkHelpers:
+    """Test percentile and summary calculations."""
+
+    def test_percentile_nearest_rank(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([3.0], 99) == 3.0
+        assert percentile([], 50) is None
+
+    def test_summary_per_step(self):
+        """Test that latencies and errors are summarized per step."""
+        recorder = LatencyRecorder()
+        recorder.start()
+        for duration in (0.01, 0.02, 0.03, 0.04):
+            recorder.record("enter", duration)
+        recorder.record("verify", 0.5, status_code=500)
+        recorder.stop()
+        recorder.finished = recorder.started + 2
+
+        summary = recorder.summary()
+
+        assert summary["requests"] == 5
+        assert summary["errors"] == 1
+        assert summary["steps"]["enter"]["p50_ms"] == pytest.approx(20)
+        assert summary["steps"]["enter"]["rps"] == pytest.approx(4 / 2)
+        assert summary["rps"] == pytest.approx(5 / 2)
+        assert summary["steps"]["verify"]["error_statuses"] == {500: 1}
+
+        lines = format_summary(summary, baseline=summary)
+        assert lines[1].startswith("enter")
+        assert "+0%" in lines[1]
+        assert "500×1" in lines[2]
+
+
+@pytest.mark.django_db
+class TestBenchmarkWorkflowCommand:
+    """Test the benchmark_workflow command end to end."""
+
+    def test_runs_workflow_and_saves_results(self, tmp_path):
+        """Test that every step is measured and results are saved as JSON."""
+        TestCatalog.objects.create(
+            code="BENCH",
+            name="Benchmark Test",
+            category="Biochemistry",
+            sample_type="Blood",
+            price=100,
+            turnaround_time_hours=24,
+        )
+        output = tmp_path / "workflow.json"
+
+        with override_settings(MEDIA_ROOT=tmp_path):
+            call_command(
+                "benchmark_workflow",
+                workers=1,
+                iterations=2,
+                warmup=0,
+                output=str(output),
+                stdout=StringIO(),
+            )
+
+        results = json.loads(output.read_text())
+        steps = results["summary"]["steps"]
+        assert results["meta"]["parameters"]["workers"] == 1
+        assert results["summary"]["failed_workflows"] == 0
+        assert results["summary"]["errors"] == 0
+        assert list(steps) == [
+            "register",
+            "create_order",
+            "collect",
+            "receive",
+            "enter_value",
+            "enter",
+            "verify",
+            "publish",
+            "report",
+        ]
+        assert all(stats["count"] == 2 for stats in steps.values())
+        assert Report.objects.count() == 2
+
+    def test_checks_the_baseline_before_running(self, tmp_path):
+        """Test that a bad --compare file stops the command before any request."""
+        TestCatalog.objects.create(
+            code="BENCH",
+            name="Benchmark Test",
+            category="Biochemistry",
+            sample_type="Blood",
+            price=100,
+            turnaround_time_hours=24,
+        )
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text('{"meta": {}}')
+
+        for path in (baseline, tmp_path / "missing.json"):
+            with pytest.raises(CommandError, match="compare|summary"):
+                call_command("benchmark_workflow", compare=str(path), stdout=StringIO())
+
+        assert not Patient.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBenchmarkConnectionsCommand:
+    """Test the benchmark_connections command."""
+
+    def test_compares_reconnect_and_persistent(self, tmp_path):
+        """Test that both modes are measured and the setting is restored."""
+        output = tmp_path / "connections.json"
+        max_age = connections["default"].settings_dict["CONN_MAX_AGE"]
+
+        call_command(
+            "benchmark_connections",
+            workers=1,
+            requests=5,
+            output=str(output),
+            stdout=StringIO(),
+        )
+
+        results = json.loads(output.read_text())
+        reconnect = results["modes"]["reconnect"]
+        persistent = results["modes"]["persistent"]
+        assert reconnect["errors"] == 0
+        assert persistent["errors"] == 0
+        assert reconnect["requests"] == persistent["requests"] == 5
+        assert results["speedup"] > 0
+        # The in-memory test database ignores closes, so the number of opened
+        # connections is only meaningful against a real database.
+        assert connections["default"].settings_dict["CONN_MAX_AGE"] == max_age
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBenchmarkSlowClientsCommand:
+    """Test the benchmark_slow_clients command."""
+
+    def test_compares_wsgi_and_asgi(self, tmp_path):
+        """Test that the endpoint is served through both handlers."""
+        output = tmp_path / "slow-clients.json"
+
+        call_command(
+            "benchmark_slow_clients",
+            clients=4,
+            requests=2,
+            sync_workers=1,
+            client_delay=0.01,
+            output=str(output),
+            stdout=StringIO(),
+        )
+
+        results = json.loads(output.read_text())
+        for mode in ("wsgi", "asgi"):
+            assert results["modes"][mode]["requests"] == 8
+            assert results["modes"][mode]["errors"] == 0
+        assert results["meta"]["parameters"]["sync_workers"] == 1
+        assert results["speedup"] > 0
@@ -0,0 +1,213 @@
+"""Tests for the cache-aside layer and cached endpoints."""
+
+from datetime import date
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.permissions import BasePermission
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from catalog.models import TestCatalog
+from core import cache as cache_layer
+from core.cache import cache_aside, invalidate
+from orders.models import Order, OrderItem, OrderStatus
+from patients.models import Patient
+from patients.views import PatientDetailView
+from users.models import User, UserRole
+
+
+class TestCacheAside:
+    """Test cache_aside, namespace versioning and stampede protection."""
+
+    def setup_method(self):
+        """Count builder calls."""
+        self.calls = 0
+
+    def build(self):
+        """A builder that counts its calls."""
+        self.calls += 1
+        return {"value": self.calls}
+
+    def test_miss_then_hit(self):
+        """Test that the builder only runs on a miss."""
+        assert cache_aside("key", self.build) == {"value": 1}
+        assert cache_aside("key", self.build) == {"value": 1}
+        assert self.calls == 1
+
+    def test_invalidate_namespace(self):
+        """Test that invalidating any namespace of a key evicts it."""
+        cache_aside("key", self.build, namespaces=["catalog", "order:1"])
+        cache_aside("other", self.build, namespaces=["order:2"])
+
+        invalidate("order:1")
+
+        assert cache_aside("key", self.build, namespaces=["catalog", "order:1"]) == {
+            "value": 3
+        }
+        assert cache_aside("other", self.build, namespaces=["order:2"]) == {"value": 2}
+
+    def test_evicted_version_does_not_resurrect_old_values(self):
+        """Test that a lost namespace version never matches older keys."""
+        cache_aside("key", self.build, namespaces=["catalog"])
+        cache.delete("ns:catalog")
+
+        assert cache_aside("key", self.build, namespaces=["catalog"]) == {"value": 2}
+
+    def test_waits_for_concurrent_rebuild(self, monkeypatch):
+        """Test that a locked key is awaited instead of rebuilt."""
+        monkeypatch.setattr(cache_layer, "LOCK_POLL_INTERVAL", 0.01)
+        version = cache_layer.namespace_versions(["catalog"])[0]
+        full_key = f"key:catalog@{version}"
+        cache.add(f"{full_key}:lock", 1)
+
+        def fill_cache(seconds):
+            cache.set(full_key, {"value": "rebuilt"})
+
+        monkeypatch.setattr(cache_layer.time, "sleep", fill_cache)
+
+        assert cache_aside("key", self.build, namespaces=["catalog"]) == {
+            "value": "rebuilt"
+        }
+        assert self.calls == 0
+
+    def test_builds_when_lock_holder_is_slow(self, monkeypatch):
+        """Test that waiting is bounded when the lock holder never finishes."""
+        monkeypatch.setattr(cache_layer, "LOCK_WAIT", 0.02)
+        monkeypatch.setattr(cache_layer, "LOCK_POLL_INTERVAL", 0.01)
+        version = cache_layer.namespace_versions(["catalog"])[0]
+        cache.add(f"key:catalog@{version}:lock", 1)
+
+        assert cache_aside("key", self.build, namespaces=["catalog"]) == {"value": 1}
+
+    def test_cache_failure_falls_back_to_builder(self, monkeypatch):
+        """Test that an unreachable cache does not fail the read."""
+
+        def unavailable(*args, **kwargs):
+            raise ConnectionError("cache down")
+
+        monkeypatch.setattr(cache, "get_many", unavailable)
+
+        assert cache_aside("key", self.build, namespaces=["catalog"]) == {"value": 1}
+
+
+def count_queries(func):
+    """Runs `func` and returns its result and the number of SQL queries."""
+    with CaptureQueriesContext(connection) as context:
+        response = func()
+    return response, len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestCachedEndpoints:
+    """Test that hot reads are cached and invalidated on model changes."""
+
+    def setup_method(self):
+        """Set up an authenticated client, a patient and an order."""
+        self.client = APIClient()
+        self.user = User.objects.create(username="cache", role=UserRole.ADMIN)
+        self.client.force_authenticate(user=self.user)
+        self.patient = Patient.objects.create(
+            full_name="Cached Patient",
+            dob=date(1990, 1, 1),
+            sex="F",
+            phone="03001234567",
+        )
+        self.test = TestCatalog.objects.create(
+            code="CBC",
+            name="Complete Blood Count",
+            category="Hematology",
+            sample_type="Blood",
+            price=500,
+            turnaround_time_hours=24,
+        )
+        self.order = Order.objects.create(patient=self.patient)
+        OrderItem.objects.create(order=self.order, test=self.test)
+
+    def test_patient_detail_cached_until_saved(self):
+        """Test that patient detail is served from cache until updated."""
+        url = f"/api/patients/{self.patient.id}/"
+        self.client.get(url)
+
+        response, queries = count_queries(lambda: self.client.get(url))
+        assert response.status_code == 200
+        assert queries == 0
+
+        self.patient.full_name = "Renamed Patient"
+        self.patient.save()
+
+        assert self.client.get(url).data["full_name"] == "Renamed Patient"
+
+    def test_cache_hits_check_object_permissions(self):
+        """Test that object permissions are checked on cache hits."""
+
+        class IsOwnRecord(BasePermission):
+            def has_object_permission(self, request, view, obj):
+                return obj.phone == request.user.phone
+
+        view = PatientDetailView.as_view(
+            permission_classes=[*PatientDetailView.permission_classes, IsOwnRecord]
+        )
+        User.objects.filter(pk=self.user.pk).update(phone=self.patient.phone)
+        self.user.refresh_from_db()
+        other = User.objects.create(username="other", role=UserRole.ADMIN)
+
+        def get(user):
+            request = APIRequestFactory().get(f"/api/patients/{self.patient.id}/")
+            force_authenticate(request, user=user)
+            return view(request, pk=self.patient.pk)
+
+        assert get(self.user).status_code == 200
+        assert get(other).status_code == 403
+        assert get(self.user).status_code == 200
+
+    def test_order_detail_invalidated_by_cancel(self):
+        """Test that cancelling an order evicts its cached detail."""
+        url = f"/api/orders/{self.order.id}/"
+        self.client.get(url)
+        _, queries = count_queries(lambda: self.client.get(url))
+        assert queries == 0
+
+        self.client.post(f"/api/orders/{self.order.id}/cancel/")
+
+        data = self.client.get(url).data
+        assert data["status"] == OrderStatus.CANCELLED
+        assert data["items"][0]["status"] == OrderStatus.CANCELLED
+
+    def test_order_detail_invalidated_by_patient_and_catalog(self):
+        """Test that embedded patient and test details stay fresh."""
+        url = f"/api/orders/{self.order.id}/"
+        self.client.get(url)
+
+        self.patient.full_name = "Renamed Patient"
+        self.patient.save()
+        data = self.client.get(url).data
+        assert data["patient_detail"]["full_name"] == "Renamed Patient"
+
+        self.test.name = "CBC with Differential"
+        self.test.save()
+        data = self.client.get(url).data
+        assert data["items"][0]["test_detail"]["name"] == "CBC with Differential"
+
+    def test_catalog_list_invalidated_on_create(self):
+        """Test that adding a test evicts cached catalog lists."""
+        assert self.client.get("/api/catalog/").data["count"] == 1
+        _, queries = count_queries(lambda: self.client.get("/api/catalog/"))
+        assert queries == 0
+
+        self.client.post(
+            "/api/catalog/",
+            {
+                "code": "LFT",
+                "name": "Liver Function Test",
+                "category": "Biochemistry",
+                "sample_type": "Blood",
+                "price": "800.00",
+                "turnaround_time_hours": 24,
+            },
+            format="json",
+        )
+
+        assert self.client.get("/api/catalog/").data["count"] == 2
+        assert self.client.get("/api/catalog/?is_active=false").data["count"] == 0
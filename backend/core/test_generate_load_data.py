@@ -0,0 +1,134 @@
+"""Tests for generate_load_data management command."""
+
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from catalog.models import Test, TestCatalog
+from orders.models import Order, OrderItem
+from patients.models import Patient
+from results.models import Result
+from samples.models import Sample
+
+
+def generate(**options):
+    """Runs generate_load_data with a fixed date range and silenced output."""
+    call_command(
+        "generate_load_data",
+        end_date="2025-06-30",
+        days=30,
+        stdout=StringIO(),
+        **options,
+    )
+
+
+class GenerateLoadDataCommandTest(TestCase):
+    """Test cases for generate_load_data command."""
+
+    def setUp(self):
+        TestCatalog.objects.bulk_create(
+            [
+                TestCatalog(
+                    code=f"LT{i}",
+                    name=f"Load Test {i}",
+                    category="Biochemistry",
+                    sample_type="Blood",
+                    price=100,
+                    turnaround_time_hours=24,
+                )
+                for i in range(12)
+            ]
+        )
+
+    def snapshot(self, prefix):
+        """Returns the generated orders and their workflow rows."""
+        return list(
+            Order.objects.filter(order_no__startswith=f"{prefix}-")
+            .order_by("order_no")
+            .values_list("order_no", "status", "priority", "created_at")
+        ), list(
+            Sample.objects.filter(barcode__startswith=f"{prefix}-")
+            .order_by("barcode")
+            .values_list("barcode", "status", "collected_at", "received_at")
+        )
+
+    def test_generates_requested_volume(self):
+        """Test that patients, orders and workflow rows are created."""
+        generate(patients=10, orders=50, chunk_size=20, prefix="A")
+
+        self.assertEqual(Patient.objects.filter(mrn__startswith="A-").count(), 10)
+        self.assertEqual(Order.objects.count(), 50)
+        self.assertEqual(Sample.objects.count(), OrderItem.objects.count())
+        self.assertGreater(Result.objects.count(), 0)
+        self.assertEqual(
+            set(Order.objects.values_list("created_at__month", flat=True)), {6}
+        )
+
+    def test_tests_sharing_a_container_share_a_sample(self):
+        """Test that samples are consolidated by specimen and container."""
+        Test.objects.bulk_create(
+            [
+                Test(
+                    code=f"LT{i}",
+                    name=f"Load Test {i}",
+                    specimen_type="Serum",
+                    container_type="Gold SST",
+                )
+                for i in range(6)
+            ]
+        )
+        generate(patients=5, orders=100, chunk_size=30, prefix="A")
+
+        through = Sample.order_items.through
+        self.assertEqual(through.objects.count(), OrderItem.objects.count())
+        self.assertEqual(
+            through.objects.values("orderitem").distinct().count(),
+            OrderItem.objects.count(),
+        )
+        self.assertLess(Sample.objects.count(), OrderItem.objects.count())
+        for sample in Sample.objects.filter(container_type="Gold SST"):
+            codes = {item.test.code for item in sample.order_items.all()}
+            self.assertTrue(codes <= {f"LT{i}" for i in range(6)})
+            self.assertEqual(sample.sample_type, "Serum")
+        self.assertFalse(
+            Sample.objects.filter(container_type="")
+            .annotate(items=Count("order_items"))
+            .exclude(items=1)
+            .exists()
+        )
+
+    def test_same_seed_generates_same_data(self):
+        """Test that a seed reproduces the same data."""
+        generate(patients=5, orders=30, chunk_size=10, seed=7, prefix="A")
+        generate(patients=5, orders=30, chunk_size=10, seed=7, prefix="B")
+
+        orders_a, samples_a = self.snapshot("A")
+        orders_b, samples_b = self.snapshot("B")
+        self.assertEqual([row[1:] for row in orders_a], [row[1:] for row in orders_b])
+        self.assertEqual([row[1:] for row in samples_a], [row[1:] for row in samples_b])
+
+    def test_existing_prefix_is_rejected(self):
+        """Test that generating twice with one prefix fails."""
+        generate(patients=1, orders=1, prefix="A")
+
+        with self.assertRaises(CommandError):
+            generate(patients=1, orders=1, prefix="A")
+
+    def test_long_prefix_is_rejected(self):
+        """Test that prefixes making order numbers too long are rejected."""
+        with self.assertRaises(CommandError):
+            generate(patients=1, orders=1, prefix="LOAD")
+        self.assertFalse(Patient.objects.exists())
+
+        generate(patients=1, orders=1, prefix="LDX")
+        order_no = Order.objects.get().order_no
+        self.assertEqual(len(order_no), Order._meta.get_field("order_no").max_length)
+
+    def test_empty_catalog_is_rejected(self):
+        """Test that the command fails without orderable tests."""
+        TestCatalog.objects.all().delete()
+
+        with self.assertRaises(CommandError):
+            generate(patients=1, orders=1)
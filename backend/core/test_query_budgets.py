@@ -0,0 +1,314 @@
+"""Query-budget regression tests for the API endpoints.
+
+Every endpoint is exercised against orders with 1, 10 and 50 items and must
+stay within a fixed number of SQL queries regardless of the fixture size.
+A change that makes any endpoint's query count grow with data volume (an N+1
+pattern) fails these tests. The cache is cleared before every request, so
+the budgets cover the uncached path.
+"""
+
+from datetime import date
+from itertools import count
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from catalog.models import TestCatalog
+from orders.models import Order, OrderItem, OrderStatus
+from patients.models import Patient
+from results.models import Result, ResultStatus
+from samples.models import Sample, SampleStatus
+from settings.models import WorkflowSettings
+from users.models import User, UserRole
+
+FIXTURE_SIZES = [1, 10, 50]
+
+_fixture_ids = count(1)
+
+
+def seed_order(size, *, sample_status=SampleStatus.RECEIVED, result_status=None):
+    """
+    Creates an order with `size` items, each with a sample and optional result.
+
+    Args:
+        size (int): The number of order items.
+        sample_status (str | None): Status of the sample created per item, or
+            None to create no samples.
+        result_status (str | None): Status of the result created per item, or
+            None to create no results.
+
+    Returns:
+        Order: The seeded order.
+    """
+    fixture_id = next(_fixture_ids)
+    patient = Patient.objects.create(
+        full_name=f"Budget Patient {size}",
+        dob=date(1990, 1, 1),
+        sex="F",
+        phone="03001234567",
+    )
+    tests = TestCatalog.objects.bulk_create(
+        [
+            TestCatalog(
+                code=f"B{fixture_id}T{i}",
+                name=f"Budget Test {i}",
+                category="Biochemistry",
+                sample_type="Blood",
+                price=100,
+                turnaround_time_hours=24,
+            )
+            for i in range(size)
+        ]
+    )
+    order = Order.objects.create(patient=patient, status=OrderStatus.IN_PROCESS)
+    items = OrderItem.objects.bulk_create(
+        [OrderItem(order=order, test=test, status=order.status) for test in tests]
+    )
+    if sample_status is not None:
+        barcodes = Sample.allocate_barcodes(size)
+        samples = Sample.objects.bulk_create(
+            [
+                Sample(
+                    order=order,
+                    sample_type="Blood",
+                    barcode=barcode,
+                    status=sample_status,
+                )
+                for barcode in barcodes
+            ]
+        )
+        Sample.link_order_items(zip(samples, items, strict=True))
+    if result_status is not None:
+        Result.objects.bulk_create(
+            [
+                Result(order_item=item, value="1.0", status=result_status)
+                for item in items
+            ]
+        )
+    return order
+
+
+def count_queries(func):
+    """
+    Runs `func` and returns its result together with the number of queries.
+
+    Args:
+        func (callable): A zero-argument callable performing the request.
+
+    Returns:
+        tuple: The response and the number of SQL queries executed.
+    """
+    with CaptureQueriesContext(connection) as context:
+        response = func()
+    return response, len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestQueryBudgets:
+    """Assert a constant query budget per endpoint for 1, 10 and 50 items."""
+
+    def setup_method(self):
+        """Set up an authenticated client."""
+        self.client = APIClient()
+        self.user = User.objects.create(username="budget", role=UserRole.ADMIN)
+        self.client.force_authenticate(user=self.user)
+
+    def assert_budget(self, budget, build, request):
+        """
+        Asserts that `request` stays within `budget` for every fixture size.
+
+        Args:
+            budget (int): The maximum number of queries allowed.
+            build (callable): Builds the fixture for a given size.
+            request (callable): Performs the request against that fixture.
+        """
+        counts = {}
+        for size in FIXTURE_SIZES:
+            fixture = build(size)
+            cache.clear()
+            response, counts[size] = count_queries(lambda f=fixture: request(f))
+            assert response.status_code < 400, response.content
+        assert len(set(counts.values())) == 1, f"Query count grows: {counts}"
+        assert counts[FIXTURE_SIZES[-1]] <= budget, f"Over budget: {counts}"
+
+    def test_order_list(self):
+        """Listing orders uses a constant number of queries."""
+        self.assert_budget(4, seed_order, lambda order: self.client.get("/api/orders/"))
+
+    def test_order_detail(self):
+        """Retrieving an order uses a constant number of queries."""
+        self.assert_budget(
+            3, seed_order, lambda order: self.client.get(f"/api/orders/{order.id}/")
+        )
+
+    def test_order_create(self):
+        """Creating an order uses a constant number of queries."""
+        patient = seed_order(1).patient
+        # Create the workflow settings singleton outside of the measured request
+        WorkflowSettings.load()
+
+        def build(size):
+            return list(
+                seed_order(size, sample_status=None).items.values_list(
+                    "test_id", flat=True
+                )
+            )
+
+        # Includes the specimen lookup and the sample links of consolidation
+        self.assert_budget(
+            16,
+            build,
+            lambda test_ids: self.client.post(
+                "/api/orders/",
+                {"patient": patient.id, "test_ids": test_ids},
+                format="json",
+            ),
+        )
+
+    def test_cancel_order(self):
+        """Cancelling an order uses a constant number of queries."""
+        self.assert_budget(
+            6,
+            lambda size: seed_order(size, sample_status=SampleStatus.PENDING),
+            lambda order: self.client.post(f"/api/orders/{order.id}/cancel/"),
+        )
+
+    def test_edit_order_tests(self):
+        """Editing order tests uses a constant number of queries."""
+
+        def build(size):
+            order = seed_order(size, sample_status=None)
+            extra = TestCatalog.objects.bulk_create(
+                [
+                    TestCatalog(
+                        code=f"E{size}T{i}",
+                        name=f"Extra Test {i}",
+                        category="Hematology",
+                        sample_type="Blood",
+                        price=100,
+                        turnaround_time_hours=24,
+                    )
+                    for i in range(size)
+                ]
+            )
+            return order, [test.id for test in extra]
+
+        # Two of them load the added tests' TAT for their due times
+        self.assert_budget(
+            11,
+            build,
+            lambda fixture: self.client.patch(
+                f"/api/orders/{fixture[0].id}/edit-tests/",
+                {"tests_to_add": fixture[1]},
+                format="json",
+            ),
+        )
+
+    def test_receive_sample(self):
+        """Receiving a sample uses a constant number of queries."""
+
+        def build(size):
+            order = seed_order(size)
+            sample = Sample.objects.filter(order=order).first()
+            Sample.objects.filter(pk=sample.pk).update(status=SampleStatus.COLLECTED)
+            return sample
+
+        # Includes the parameter lookup of the new results, the status
+        # update of the sample's order items and the savepoint of the
+        # transaction they share with the transition
+        self.assert_budget(
+            9,
+            build,
+            lambda sample: self.client.post(f"/api/samples/{sample.id}/receive/"),
+        )
+
+    def test_verify_batch(self):
+        """Verifying all results of an order uses a constant number of queries."""
+        self.assert_budget(
+            6,
+            lambda size: seed_order(size, result_status=ResultStatus.ENTERED),
+            lambda order: self.client.post(
+                "/api/results/verify-batch/",
+                {"order_ids": [order.id]},
+                format="json",
+            ),
+        )
+
+    def test_worksheet(self):
+        """Entering a worksheet of results uses a constant number of queries."""
+
+        def build(size):
+            order = seed_order(size, result_status=ResultStatus.DRAFT)
+            return [
+                {"barcode": barcode, "test": test} | {"value": "1.5"}
+                for barcode, test in Sample.objects.filter(order=order).values_list(
+                    "barcode", "order_items__test__code"
+                )
+            ]
+
+        # Includes loading the autoverification rules and compiling the
+        # critical limits, which are cached afterwards
+        self.assert_budget(
+            8,
+            build,
+            lambda entries: self.client.post(
+                "/api/results/worksheet/", {"entries": entries}, format="json"
+            ),
+        )
+
+    def test_sample_list(self):
+        """Listing samples uses a constant number of queries."""
+        # Includes prefetching the order items of the page
+        self.assert_budget(
+            3, seed_order, lambda order: self.client.get("/api/samples/")
+        )
+
+    def test_result_list(self):
+        """Listing results uses a constant number of queries."""
+        self.assert_budget(
+            2,
+            lambda size: seed_order(size, result_status=ResultStatus.ENTERED),
+            lambda order: self.client.get("/api/results/"),
+        )
+
+    def test_generate_report(self):
+        """Generating a report uses a constant number of queries."""
+        self.assert_budget(
+            8,
+            lambda size: seed_order(size, result_status=ResultStatus.PUBLISHED),
+            lambda order: self.client.post(f"/api/reports/generate/{order.id}/"),
+        )
+
+    def test_patient_list(self):
+        """Listing patients uses a constant number of queries."""
+        self.assert_budget(
+            2, seed_order, lambda order: self.client.get("/api/patients/")
+        )
+
+    def test_patient_detail(self):
+        """Retrieving a patient uses a constant number of queries."""
+        self.assert_budget(
+            1,
+            seed_order,
+            lambda order: self.client.get(f"/api/patients/{order.patient_id}/"),
+        )
+
+    def test_catalog_list(self):
+        """Listing the test catalog uses a constant number of queries."""
+        self.assert_budget(
+            2, seed_order, lambda order: self.client.get("/api/catalog/")
+        )
+
+    def test_dashboard_analytics(self):
+        """The dashboard uses a constant number of queries for a fixed range."""
+        self.assert_budget(
+            18,
+            lambda size: seed_order(size, result_status=ResultStatus.PUBLISHED),
+            lambda order: self.client.get(
+                "/api/dashboard/analytics/",
+                {"start_date": "2025-01-01", "end_date": "2025-01-07"},
+            ),
+        )
@@ -0,0 +1,161 @@
+"""Tests for the compare-and-set transition engine."""
+
+from datetime import date
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import TestCatalog
+from core.transitions import TRANSITIONS, apply_transition, transition_failure
+from orders.models import Order, OrderItem
+from patients.models import Patient
+from results.models import Result, ResultStatus
+from samples.models import Sample, SampleStatus
+from users.models import User, UserRole
+
+
+@pytest.mark.django_db
+class TestApplyTransition:
+    """Test the conditional UPDATE performed for a transition."""
+
+    def setup_method(self):
+        """Set up an order item with a sample and a result."""
+        self.user = User.objects.create(username="tech", role=UserRole.TECHNOLOGIST)
+        patient = Patient.objects.create(
+            full_name="John Doe",
+            father_name="James Doe",
+            dob=date(1990, 1, 1),
+            sex="M",
+            phone="03001234567",
+        )
+        test = TestCatalog.objects.create(
+            code="CBC",
+            name="Complete Blood Count",
+            category="Hematology",
+            sample_type="Blood",
+            price=500,
+            turnaround_time_hours=24,
+        )
+        self.order_item = OrderItem.objects.create(
+            order=Order.objects.create(patient=patient), test=test
+        )
+        self.sample = Sample.objects.create(
+            order=self.order_item.order, sample_type="Blood"
+        )
+        self.sample.order_items.add(self.order_item)
+        self.result = Result.objects.create(order_item=self.order_item, value="12.5")
+
+    def test_updates_record_in_source_state(self):
+        """Test that the status, timestamp and user are set."""
+        assert apply_transition(Sample, self.sample.pk, "collect", user=self.user) == 1
+
+        self.sample.refresh_from_db()
+        assert self.sample.status == SampleStatus.COLLECTED
+        assert self.sample.collected_by == self.user
+        assert self.sample.collected_at is not None
+
+    def test_skips_record_in_other_state(self):
+        """Test that no row is updated outside the source states."""
+        assert apply_transition(Result, self.result.pk, "verify", user=self.user) == 0
+        assert apply_transition(Result, 99999, "enter", user=self.user) == 0
+
+        self.result.refresh_from_db()
+        assert self.result.status == ResultStatus.DRAFT
+        assert self.result.verified_by is None
+
+    def test_single_update_of_changed_columns(self):
+        """Test that one UPDATE writes only the transition's columns."""
+        with CaptureQueriesContext(connection) as queries:
+            apply_transition(Result, self.result.pk, "enter", user=self.user)
+
+        assert len(queries) == 1
+        sql = queries[0]["sql"]
+        assert sql.startswith("UPDATE")
+        assert '"entered_by_id"' in sql
+        assert '"value"' not in sql
+        assert '"status" IN' in sql
+
+    def test_failure_explains_the_current_state(self):
+        """Test that a failed transition names the status or a missing record."""
+        error = transition_failure(Sample, self.sample.pk, "Sample is {status}")
+        assert str(error) == "Sample is PENDING"
+        assert not error.not_found
+
+        error = transition_failure(Sample, 99999, "Sample is {status}")
+        assert str(error) == "Sample not found"
+        assert error.not_found
+
+    def test_every_target_is_a_valid_status(self):
+        """Test that the transition table only uses declared statuses."""
+        for model, transitions in TRANSITIONS.items():
+            choices = {value for value, _ in model._meta.get_field("status").choices}
+            for transition in transitions.values():
+                assert transition.target in choices
+                assert set(transition.sources) <= choices
+
+
+@pytest.mark.django_db
+class TestTransitionViews:
+    """Test how the workflow endpoints report failed transitions."""
+
+    def setup_method(self):
+        """Set up a client and a collected sample."""
+        self.client = APIClient()
+        self.first = User.objects.create(username="first", role=UserRole.PHLEBOTOMY)
+        self.second = User.objects.create(username="second", role=UserRole.PHLEBOTOMY)
+        patient = Patient.objects.create(
+            full_name="John Doe",
+            father_name="James Doe",
+            dob=date(1990, 1, 1),
+            sex="M",
+            phone="03001234567",
+        )
+        test = TestCatalog.objects.create(
+            code="CBC",
+            name="Complete Blood Count",
+            category="Hematology",
+            sample_type="Blood",
+            price=500,
+            turnaround_time_hours=24,
+        )
+        self.order_item = OrderItem.objects.create(
+            order=Order.objects.create(patient=patient), test=test
+        )
+        self.sample = Sample.objects.create(
+            order=self.order_item.order, sample_type="Blood"
+        )
+        self.sample.order_items.add(self.order_item)
+
+    def test_second_collect_loses(self):
+        """Test that a repeated action fails instead of overwriting the first."""
+        self.client.force_authenticate(user=self.first)
+        response = self.client.post(f"/api/samples/{self.sample.id}/collect/")
+        assert response.status_code == status.HTTP_200_OK
+
+        self.client.force_authenticate(user=self.second)
+        response = self.client.post(f"/api/samples/{self.sample.id}/collect/")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["error"] == "Cannot collect sample with status COLLECTED"
+
+        self.sample.refresh_from_db()
+        assert self.sample.collected_by == self.first
+
+    def test_receive_requires_collected_sample(self):
+        """Test that a pending sample cannot be received."""
+        self.client.force_authenticate(user=self.first)
+        response = self.client.post(f"/api/samples/{self.sample.id}/receive/")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Result.objects.filter(order_item=self.order_item).exists()
+
+    def test_enter_published_result_fails(self):
+        """Test that a published result cannot be entered again."""
+        result = Result.objects.create(
+            order_item=self.order_item, value="12.5", status=ResultStatus.PUBLISHED
+        )
+        self.client.force_authenticate(user=self.first)
+        response = self.client.post(f"/api/results/{result.id}/enter/")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["error"] == "Cannot enter result with status PUBLISHED"
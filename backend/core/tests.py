@@ -1,6 +1,9 @@
 """Tests for core settings."""
 
+import runpy
+
 import pytest
+from django.conf import settings
 
 
 @pytest.mark.django_db
@@ -25,3 +28,19 @@ class TestSettingsConfiguration:
         broker_url = getattr(settings, "CELERY_BROKER_URL", None)
         # May be None if REDIS_URL not set, or configured if set
         assert broker_url is None or broker_url.startswith("redis://")
+
+    def test_asgi_mode(self, monkeypatch):
+        """Test that ASGI mode keeps the middleware async and connections closed."""
+        monkeypatch.setenv("SERVER_MODE", "asgi")
+        monkeypatch.setenv("POSTGRES_HOST", "db")
+        monkeypatch.setenv("POSTGRES_CONN_MAX_AGE", "60")
+        monkeypatch.delenv("POSTGRES_POOL", raising=False)
+        asgi = runpy.run_path(settings.BASE_DIR / "core" / "settings.py")
+
+        assert "whitenoise.middleware.WhiteNoiseMiddleware" not in asgi["MIDDLEWARE"]
+        assert asgi["DATABASES"]["default"]["CONN_MAX_AGE"] == 0
+
+        monkeypatch.setenv("SERVER_MODE", "wsgi")
+        wsgi = runpy.run_path(settings.BASE_DIR / "core" / "settings.py")
+        assert "whitenoise.middleware.WhiteNoiseMiddleware" in wsgi["MIDDLEWARE"]
+        assert wsgi["DATABASES"]["default"]["CONN_MAX_AGE"] == 60
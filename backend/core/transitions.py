@@ -0,0 +1,155 @@
+"""Compare-and-set status transitions for samples, results and alerts.
+
+Every workflow action is one edge in `TRANSITIONS`: the states it may start
+from, the state it moves to, and the timestamp and user columns it stamps.
+Each app registers the edges of its models with `register_transitions`.
+`apply_transition` performs the action as a single conditional UPDATE::
+
+    UPDATE samples SET status=..., collected_at=..., ...
+     WHERE id=... AND status IN (...)
+
+Only the changed columns are written and the status check happens in the
+database, so of two users acting on the same record exactly one succeeds;
+the other updates no row and gets an error instead of overwriting the first.
+"""
+
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+
+@dataclass(frozen=True)
+class Transition:
+    """
+    A state machine edge.
+
+    Attributes:
+        sources (tuple[str, ...]): The statuses the transition may start from.
+        target (str): The status the transition moves to.
+        timestamp_field (str | None): A column set to the current time.
+        user_field (str | None): A foreign key set to the acting user.
+    """
+
+    sources: tuple
+    target: str
+    timestamp_field: str | None = None
+    user_field: str | None = None
+
+
+# Transitions by model and action, registered by each app with its models
+TRANSITIONS = {}
+
+
+def register_transitions(model, transitions):
+    """
+    Registers the workflow actions of a model.
+
+    Args:
+        model (type[Model]): A model with a `status` field.
+        transitions (dict[str, Transition]): The transitions by action name.
+    """
+    TRANSITIONS[model] = transitions
+
+
+def _transition_values(transition, user, fields):
+    now = timezone.now()
+    values = {"status": transition.target, "updated_at": now, **fields}
+    if transition.timestamp_field:
+        values[transition.timestamp_field] = now
+    if transition.user_field:
+        values[transition.user_field] = user
+    return values
+
+
+def apply_transition(model, pk, action, user=None, **fields):
+    """
+    Moves a record along a transition if it is in one of the source states.
+
+    Args:
+        model (type[Model]): The model of the record.
+        pk (int): The primary key of the record.
+        action (str): The transition name in `TRANSITIONS[model]`.
+        user (User | None): The acting user, stored in the transition's
+            user field.
+        **fields: Additional columns to set, e.g. `rejection_reason`.
+
+    Returns:
+        int: The number of updated rows; 0 if the record does not exist or
+            is not in a source state.
+    """
+    transition = TRANSITIONS[model][action]
+    return model.objects.filter(pk=pk, status__in=transition.sources).update(
+        **_transition_values(transition, user, fields)
+    )
+
+
+def apply_transition_batch(model, pks, action, user=None, **fields):
+    """
+    Moves every record in `pks` that is in a source state along a transition.
+
+    The eligible rows are locked and updated with one UPDATE, so the returned
+    ids are exactly the records this call transitioned.
+
+    Args:
+        model (type[Model]): The model of the records.
+        pks (Iterable[int]): The primary keys of the records.
+        action (str): The transition name in `TRANSITIONS[model]`.
+        user (User | None): The acting user, stored in the transition's
+            user field.
+        **fields: Additional columns to set.
+
+    Returns:
+        list[int]: The ids of the transitioned records.
+    """
+    transition = TRANSITIONS[model][action]
+    with transaction.atomic():
+        eligible = list(
+            model.objects.select_for_update()
+            .filter(pk__in=list(pks), status__in=transition.sources)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        if eligible:
+            model.objects.filter(pk__in=eligible).update(
+                **_transition_values(transition, user, fields)
+            )
+    return eligible
+
+
+class TransitionError(Exception):
+    """
+    A transition that updated no row.
+
+    The API turns it into a 404 or 400 error response (see
+    `core.exceptions.custom_exception_handler`).
+
+    Attributes:
+        not_found (bool): Whether the record does not exist.
+    """
+
+    def __init__(self, message, not_found=False):
+        super().__init__(message)
+        self.not_found = not_found
+
+
+def transition_failure(model, pk, message):
+    """
+    Explains a transition that updated no row.
+
+    Args:
+        model (type[Model]): The model of the record.
+        pk (int): The primary key of the record.
+        message (str): The error for a record in the wrong state; `{status}`
+            is replaced with its current status.
+
+    Returns:
+        TransitionError: The error to raise, for a missing record or one in
+            the wrong state.
+    """
+    current = model.objects.filter(pk=pk).values_list("status", flat=True).first()
+    if current is None:
+        return TransitionError(
+            f"{model._meta.verbose_name.capitalize()} not found", not_found=True
+        )
+    return TransitionError(message.format(status=current))
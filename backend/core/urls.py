@@ -32,6 +32,10 @@ urlpatterns = [
     path("api/reports/", include("reports.urls")),
     path("api/dashboard/", include("dashboard.urls")),
     path("api/settings/", include("settings.urls")),
+    path("api/events/", include("events.urls")),
+    path("api/interfaces/", include("interfaces.urls")),
+    path("api/printing/", include("printing.urls")),
+    path("api/exports/", include("exports.urls")),
     path("api/terminals/", LabTerminalListCreateView.as_view(), name="terminal-list"),
     path(
         "api/terminals/<int:pk>/",
@@ -1 +1,30 @@
-# Dashboard admin configuration (no models to register).
+"""Dashboard admin configuration."""
+
+from django.contrib import admin
+
+from .models import DailyTestRollup, DepartmentHourRollup, RolledUpDay
+
+
+@admin.register(DepartmentHourRollup)
+class DepartmentHourRollupAdmin(admin.ModelAdmin):
+    """Admin for department-hour workload rollups."""
+
+    list_display = ["day", "hour", "department", "orders", "tests"]
+    list_filter = ["department"]
+    date_hierarchy = "day"
+
+
+@admin.register(DailyTestRollup)
+class DailyTestRollupAdmin(admin.ModelAdmin):
+    """Admin for test-day workload rollups."""
+
+    list_display = ["day", "test", "tests", "revenue"]
+    date_hierarchy = "day"
+
+
+@admin.register(RolledUpDay)
+class RolledUpDayAdmin(admin.ModelAdmin):
+    """Admin for the days the workload rollups cover."""
+
+    list_display = ["day", "rolled_up_at"]
+    date_hierarchy = "day"
@@ -0,0 +1,102 @@
+"""Management command to benchmark workload analytics."""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.benchmarking import (
+    LatencyRecorder,
+    format_summary,
+    run_metadata,
+    write_results,
+)
+from dashboard.workload import rollup_days, workload
+from orders.models import OrderItem
+
+# Slowest acceptable p95 of the workload summary, in milliseconds
+TARGET_P95_MS = 200
+
+
+class Command(BaseCommand):
+    """Measure how long workload analytics take over a long period."""
+
+    help = (
+        "Benchmark workload analytics over the existing orders: summarizes "
+        "a period from the order items, writes the daily rollups, and "
+        "summarizes it again from the rollups. Run generate_load_data first"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Days summarized, ending today (default: 365)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Summaries per step (default: 20)",
+        )
+        parser.add_argument(
+            "--live-repeat",
+            type=int,
+            default=3,
+            help="Summaries from the order items, which are slow (default: 3)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=None,
+            help="JSON results file (default: benchmark-results/workload-*.json)",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        if min(options["days"], options["repeat"]) < 1 or options["live_repeat"] < 0:
+            raise CommandError("--days and --repeat must be >= 1, --live-repeat >= 0")
+
+        last = timezone.localdate()
+        first = last - timedelta(days=options["days"] - 1)
+        items = OrderItem.objects.filter(order__created_at__date__gte=first).count()
+        self.stdout.write(f"Summarizing {first} to {last} ({items} order items)...")
+
+        recorder = LatencyRecorder()
+        recorder.start()
+        for _ in range(options["live_repeat"]):
+            start = time.perf_counter()
+            workload(first, last, rollups=False)
+            recorder.record("live", time.perf_counter() - start, 200)
+
+        start = time.perf_counter()
+        rollup_days(first, last - timedelta(days=1))
+        recorder.record("rollup-write", time.perf_counter() - start, 200)
+
+        for _ in range(options["repeat"]):
+            start = time.perf_counter()
+            workload(first, last)
+            recorder.record("rollup", time.perf_counter() - start, 200)
+        recorder.stop()
+
+        summary = recorder.summary()
+        payload = {
+            "meta": run_metadata(days=options["days"], order_items=items),
+            "summary": summary,
+            "target_p95_ms": TARGET_P95_MS,
+        }
+        path = write_results("workload", payload, options["output"])
+
+        for line in format_summary(summary):
+            self.stdout.write(line)
+        p95 = summary["steps"]["rollup"]["p95_ms"]
+        if p95 > TARGET_P95_MS:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Rollup p95 {p95:.0f} ms is above the {TARGET_P95_MS} ms target"
+                )
+            )
+        self.stdout.write(self.style.SUCCESS(f"✓ Results saved to {path}"))
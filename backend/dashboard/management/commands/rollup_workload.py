@@ -0,0 +1,86 @@
+"""Management command to write the daily workload rollups."""
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from dashboard.workload import last_rolled_up_day, rollup_days
+from orders.models import Order
+
+# Days written per transaction
+CHUNK_DAYS = 31
+
+
+class Command(BaseCommand):
+    """Roll up the workload of closed days for workload analytics."""
+
+    help = (
+        "Write the department-hour and test-day workload rollups of closed "
+        "days. Run daily after midnight, e.g. from cron"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            default=None,
+            help="First day to roll up, YYYY-MM-DD (default: the day after the "
+            "last rollup, or the first order)",
+        )
+        parser.add_argument(
+            "--until",
+            type=date.fromisoformat,
+            default=None,
+            help="Last day to roll up, YYYY-MM-DD, before today (default: "
+            "yesterday)",
+        )
+        parser.add_argument(
+            "--redo-days",
+            type=int,
+            default=2,
+            help="Also roll up again this many days before the last rollup, "
+            "to pick up orders edited since (default: 2)",
+        )
+
+    def first_day(self, redo_days):
+        """Returns the first day not rolled up yet, less `redo_days`."""
+        last = last_rolled_up_day()
+        if last is not None:
+            return last + timedelta(days=1 - redo_days)
+        first_order = Order.objects.aggregate(first=Min("created_at"))["first"]
+        if first_order is None:
+            return None
+        return timezone.localtime(first_order).date()
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        if options["redo_days"] < 0:
+            raise CommandError("--redo-days must be >= 0")
+        today = timezone.localdate()
+        # A rolled-up day is read from its rollups only, so orders placed
+        # after the run would be missed
+        if options["until"] is not None and options["until"] >= today:
+            raise CommandError("--until must be before today; only closed days")
+        last = options["until"] or today - timedelta(days=1)
+        first = options["since"] or self.first_day(options["redo_days"])
+        if first is None or first > last:
+            self.stdout.write("Nothing to roll up")
+            return
+
+        hours = tests = 0
+        start = first
+        while start <= last:
+            end = min(start + timedelta(days=CHUNK_DAYS - 1), last)
+            written = rollup_days(start, end)
+            hours += written[0]
+            tests += written[1]
+            start = end + timedelta(days=1)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rolled up {first} to {last}: {hours} department-hour and "
+                f"{tests} test-day rows"
+            )
+        )
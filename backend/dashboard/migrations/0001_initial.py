@@ -0,0 +1,80 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("catalog", "0004_testparameter_delta_thresholds"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DepartmentHourRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("weekday", models.PositiveSmallIntegerField()),
+                ("hour", models.PositiveSmallIntegerField()),
+                ("department", models.CharField(max_length=100)),
+                ("orders", models.PositiveIntegerField()),
+                ("tests", models.PositiveIntegerField()),
+            ],
+            options={
+                "db_table": "workload_department_hours",
+                "ordering": ["day", "hour", "department"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "hour", "department"),
+                        name="unique_department_hour_rollup",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyTestRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("tests", models.PositiveIntegerField()),
+                ("revenue", models.DecimalField(decimal_places=2, max_digits=14)),
+                (
+                    "test",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="catalog.testcatalog",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "workload_test_days",
+                "ordering": ["day", "test"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "test"), name="unique_test_day_rollup"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:06
+
+from django.db import migrations, models
+
+
+def mark_rolled_up_days(apps, schema_editor):
+    """Mark the days existing rollup rows were written for.
+
+    Rolled-up days without orders have no rows and stay unmarked, so they
+    are aggregated from the order items until rolled up again.
+    """
+    DepartmentHourRollup = apps.get_model("dashboard", "DepartmentHourRollup")
+    RolledUpDay = apps.get_model("dashboard", "RolledUpDay")
+    RolledUpDay.objects.bulk_create(
+        [
+            RolledUpDay(day=day)
+            for day in DepartmentHourRollup.objects.values_list("day", flat=True)
+            .order_by("day")
+            .distinct()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RolledUpDay",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(unique=True)),
+                ("rolled_up_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "workload_rolled_up_days",
+                "ordering": ["day"],
+            },
+        ),
+        migrations.RunPython(mark_rolled_up_days, migrations.RunPython.noop),
+    ]
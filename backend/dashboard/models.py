@@ -1 +1,100 @@
-# Dashboard models (no custom models needed).
+"""Dashboard models: daily rollups of the workload."""
+
+from django.db import models
+
+
+class DepartmentHourRollup(models.Model):
+    """
+    The orders and tests of one department in one hour of a day.
+
+    Written by the `rollup_workload` command for closed days, so workload
+    analytics over long periods read a few rows per day instead of every
+    order item.
+
+    Attributes:
+        day (DateField): The local date the orders were placed.
+        weekday (PositiveSmallIntegerField): The day of the week, 0 for
+            Monday.
+        hour (PositiveSmallIntegerField): The local hour, 0 to 23.
+        department (CharField): The catalog category of the tests.
+        orders (PositiveIntegerField): The orders with tests of the
+            department.
+        tests (PositiveIntegerField): The tests of the department ordered.
+    """
+
+    day = models.DateField()
+    weekday = models.PositiveSmallIntegerField()
+    hour = models.PositiveSmallIntegerField()
+    department = models.CharField(max_length=100)
+    orders = models.PositiveIntegerField()
+    tests = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = "workload_department_hours"
+        ordering = ["day", "hour", "department"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "hour", "department"],
+                name="unique_department_hour_rollup",
+            )
+        ]
+
+    def __str__(self):
+        """Returns a string representation of the rollup row."""
+        return f"{self.day} {self.hour:02d}h {self.department}: {self.tests}"
+
+
+class DailyTestRollup(models.Model):
+    """
+    The volume and revenue of one test on one day.
+
+    Attributes:
+        day (DateField): The local date the tests were ordered.
+        test (ForeignKey): The catalog test.
+        tests (PositiveIntegerField): The times the test was ordered.
+        revenue (DecimalField): The catalog price of those tests.
+    """
+
+    day = models.DateField()
+    test = models.ForeignKey(
+        "catalog.TestCatalog", on_delete=models.CASCADE, related_name="+"
+    )
+    tests = models.PositiveIntegerField()
+    revenue = models.DecimalField(max_digits=14, decimal_places=2)
+
+    class Meta:
+        db_table = "workload_test_days"
+        ordering = ["day", "test"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "test"], name="unique_test_day_rollup"
+            )
+        ]
+
+    def __str__(self):
+        """Returns a string representation of the rollup row."""
+        return f"{self.day} {self.test_id}: {self.tests}"
+
+
+class RolledUpDay(models.Model):
+    """
+    A day whose workload rollups are written.
+
+    Days without orders have no rollup rows, so these markers, not the
+    rollup rows, tell which days the rollups cover.
+
+    Attributes:
+        day (DateField): The local date rolled up.
+        rolled_up_at (DateTimeField): When the day was last rolled up.
+    """
+
+    day = models.DateField(unique=True)
+    rolled_up_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "workload_rolled_up_days"
+        ordering = ["day"]
+
+    def __str__(self):
+        """Returns a string representation of the marker."""
+        return str(self.day)
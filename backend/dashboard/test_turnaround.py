@@ -0,0 +1,216 @@
+"""Tests for per-stage turnaround analytics."""
+
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import TestCatalog
+from orders.models import Order, OrderStatus
+from patients.models import Patient
+from results.models import Result, ResultStatus
+from samples.models import Sample, SampleStatus
+from users.models import User, UserRole
+
+from .turnaround import STAGES, stage_breakdown
+
+ORDERED = timezone.make_aware(datetime(2024, 3, 4, 9, 0))
+
+
+class TurnaroundStagesTestCase(TestCase):
+    """Test cases for the turnaround stage breakdown."""
+
+    def setUp(self):
+        """Set up a patient and tests in two departments."""
+        self.client = APIClient()
+        self.client.force_authenticate(
+            user=User.objects.create_user(
+                username="admin", password="admin123", role=UserRole.ADMIN
+            )
+        )
+        self.patient = Patient.objects.create(
+            full_name="Test Patient",
+            father_name="Father Name",
+            dob="1990-01-01",
+            sex="M",
+            phone="03001234567",
+        )
+        self.cbc = TestCatalog.objects.create(
+            code="CBC",
+            name="Complete Blood Count",
+            category="Hematology",
+            sample_type="Blood",
+            price=1000,
+            turnaround_time_hours=24,
+        )
+        self.lft = TestCatalog.objects.create(
+            code="LFT",
+            name="Liver Function Test",
+            category="Biochemistry",
+            sample_type="Blood",
+            price=800,
+            turnaround_time_hours=48,
+        )
+        self.url = reverse("dashboard-turnaround")
+
+    def ordered(self, test, minutes, ordered_at=ORDERED, results=1):
+        """
+        Creates an order item that went through the workflow.
+
+        Args:
+            test (TestCatalog): The test ordered.
+            minutes (list[int]): The minutes spent in each stage from
+                collection on; stages past the list are not reached.
+            ordered_at (datetime): When the order was created.
+            results (int): The results of the item, entered a minute apart.
+        """
+        order = Order.objects.create(patient=self.patient)
+        Order.objects.filter(pk=order.pk).update(created_at=ordered_at)
+        item = order.items.create(test=test)
+
+        moments = []
+        moment = ordered_at
+        for stage_minutes in minutes:
+            moment += timedelta(minutes=stage_minutes)
+            moments.append(moment)
+        moments += [None] * (5 - len(moments))
+        collected, received, entered, verified, published = moments
+
+        sample = Sample.objects.create(
+            order=order,
+            sample_type="Blood",
+            status=SampleStatus.RECEIVED,
+            collected_at=collected,
+            received_at=received,
+        )
+        sample.order_items.add(item)
+        for number in range(results):
+            lag = timedelta(minutes=results - 1 - number)
+            Result.objects.create(
+                order_item=item,
+                value="1",
+                status=ResultStatus.PUBLISHED if published else ResultStatus.DRAFT,
+                entered_at=entered and entered - lag,
+                verified_at=verified,
+                published_at=published,
+            )
+        return item
+
+    def breakdown(self):
+        """Returns the breakdown of March 2024."""
+        return stage_breakdown(
+            timezone.make_aware(datetime(2024, 3, 1)),
+            timezone.make_aware(datetime(2024, 3, 31)),
+        )
+
+    def test_stage_durations(self):
+        """Test that each stage is timed between its two events."""
+        self.ordered(self.cbc, [10, 20, 30, 40, 50])
+
+        stages = self.breakdown()["overall"]["stages"]
+        self.assertEqual(
+            [stages[stage]["p50"] for stage in STAGES],
+            [10.0, 20.0, 30.0, 40.0, 50.0, 150.0],
+        )
+        self.assertEqual(stages["bench"]["count"], 1)
+
+    def test_percentiles(self):
+        """Test that p50, p90 and p99 are taken over the items."""
+        for bench in range(1, 101):
+            self.ordered(self.cbc, [5, 5, bench, 5, 5])
+
+        bench = self.breakdown()["overall"]["stages"]["bench"]
+        self.assertEqual(bench["count"], 100)
+        self.assertEqual(bench["p50"], 50.5)
+        self.assertEqual(bench["p90"], 90.1)
+        self.assertEqual(bench["p99"], 99.0)
+
+    def test_incomplete_stages(self):
+        """Test that items count only towards the stages they completed."""
+        self.ordered(self.cbc, [10, 20, 30, 40, 50])
+        self.ordered(self.cbc, [15, 25])
+
+        overall = self.breakdown()["overall"]
+        self.assertEqual(overall["count"], 2)
+        self.assertEqual(overall["stages"]["collection"]["count"], 2)
+        self.assertEqual(overall["stages"]["collection"]["p50"], 12.5)
+        self.assertEqual(overall["stages"]["bench"]["count"], 1)
+        self.assertEqual(overall["stages"]["bench"]["p50"], 30.0)
+
+    def test_last_result_times_the_item(self):
+        """Test that a test with several results is timed by its last one."""
+        self.ordered(self.cbc, [10, 20, 30, 40, 50], results=5)
+
+        overall = self.breakdown()["overall"]
+        self.assertEqual(overall["count"], 1)
+        self.assertEqual(overall["stages"]["bench"]["p50"], 30.0)
+
+    def test_groups(self):
+        """Test the breakdown by department, test and hour of ordering."""
+        self.ordered(self.cbc, [10, 20, 30, 40, 50])
+        self.ordered(self.cbc, [20, 20, 30, 40, 50], ORDERED + timedelta(hours=5))
+        self.ordered(self.lft, [30, 20, 30, 40, 50])
+
+        breakdown = self.breakdown()
+        departments = {
+            group["department"]: group["stages"]["collection"]["p50"]
+            for group in breakdown["by_department"]
+        }
+        self.assertEqual(departments, {"Biochemistry": 30.0, "Hematology": 15.0})
+        tests = [
+            (group["test_code"], group["test_name"], group["count"])
+            for group in breakdown["by_test"]
+        ]
+        self.assertEqual(
+            tests,
+            [("CBC", "Complete Blood Count", 2), ("LFT", "Liver Function Test", 1)],
+        )
+        hours = {group["hour"]: group["count"] for group in breakdown["by_hour"]}
+        self.assertEqual(hours, {9: 2, 14: 1})
+
+    def test_excludes_cancelled_and_out_of_range(self):
+        """Test that cancelled items and other periods are left out."""
+        item = self.ordered(self.cbc, [10])
+        item.status = OrderStatus.CANCELLED
+        item.save()
+        self.ordered(self.cbc, [10], ORDERED - timedelta(days=30))
+
+        self.assertEqual(self.breakdown()["overall"]["count"], 0)
+
+    def test_empty(self):
+        """Test that a period without orders has no percentiles."""
+        breakdown = self.breakdown()
+        self.assertEqual(breakdown["overall"]["count"], 0)
+        self.assertIsNone(breakdown["overall"]["stages"]["total"]["p50"])
+        self.assertEqual(breakdown["by_test"], [])
+
+    def test_endpoint(self):
+        """Test the endpoint over a date range."""
+        self.ordered(self.cbc, [10, 20, 30, 40, 50])
+
+        response = self.client.get(
+            self.url, {"start_date": "2024-03-01", "end_date": "2024-03-31"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["stages"], list(STAGES))
+        self.assertEqual(response.data["percentiles"], [50, 90, 99])
+        self.assertEqual(response.data["overall"]["stages"]["total"]["p99"], 150.0)
+
+    def test_endpoint_invalid_dates(self):
+        """Test that malformed dates are rejected."""
+        response = self.client.get(self.url, {"start_date": "March"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_constant_queries(self):
+        """Test that the breakdown takes one query for any number of items."""
+        for bench in range(20):
+            self.ordered(self.cbc if bench % 2 else self.lft, [5, 5, bench, 5, 5])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.breakdown()
+        self.assertEqual(len(queries), 1)
@@ -0,0 +1,260 @@
+"""Tests for workload analytics."""
+
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import TestCatalog
+from orders.models import Order, OrderStatus
+from patients.models import Patient
+from users.models import User, UserRole
+
+from .models import DailyTestRollup, DepartmentHourRollup, RolledUpDay
+from .workload import HOURS_PER_WEEK, rollup_days, split_days, workload
+
+# A Monday
+MONDAY = date(2024, 3, 4)
+
+
+class WorkloadTestCase(TestCase):
+    """Test cases for workload analytics."""
+
+    def setUp(self):
+        """Set up a patient and tests in two departments."""
+        self.client = APIClient()
+        self.client.force_authenticate(
+            user=User.objects.create_user(
+                username="manager", password="manager123", role=UserRole.ADMIN
+            )
+        )
+        self.patient = Patient.objects.create(
+            full_name="Test Patient",
+            father_name="Father Name",
+            dob="1990-01-01",
+            sex="M",
+            phone="03001234567",
+        )
+        catalog = [
+            ("CBC", "Complete Blood Count", "Hematology", 500),
+            ("ESR", "Erythrocyte Sedimentation Rate", "Hematology", 200),
+            ("LFT", "Liver Function Test", "Biochemistry", 1500),
+        ]
+        self.cbc, self.esr, self.lft = (
+            TestCatalog.objects.create(
+                code=code,
+                name=name,
+                category=category,
+                sample_type="Blood",
+                price=price,
+                turnaround_time_hours=24,
+            )
+            for code, name, category, price in catalog
+        )
+        self.url = reverse("dashboard-workload")
+
+    def order(self, day, hour, *tests):
+        """Creates an order for some tests placed on a day at an hour."""
+        order = Order.objects.create(patient=self.patient)
+        created_at = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        Order.objects.filter(pk=order.pk).update(
+            created_at=created_at + timedelta(hours=hour)
+        )
+        for test in tests:
+            order.items.create(test=test)
+        return order
+
+    def seed(self):
+        """Creates a week of orders."""
+        self.order(MONDAY, 9, self.cbc, self.esr)
+        self.order(MONDAY, 9, self.cbc, self.lft)
+        self.order(MONDAY + timedelta(days=2), 14, self.lft)
+        self.order(MONDAY + timedelta(days=6), 23, self.cbc)
+        cancelled = self.order(MONDAY, 10, self.lft)
+        cancelled.items.update(status=OrderStatus.CANCELLED)
+
+    def test_department_hours(self):
+        """Test the orders and tests of each department by hour of week."""
+        self.seed()
+
+        summary = workload(MONDAY, MONDAY + timedelta(days=6))
+        departments = {row["department"]: row for row in summary["departments"]}
+        self.assertEqual(list(departments), ["Biochemistry", "Hematology"])
+
+        hematology = departments["Hematology"]
+        self.assertEqual(len(hematology["tests"]), HOURS_PER_WEEK)
+        self.assertEqual(hematology["orders"][9], 2)
+        self.assertEqual(hematology["tests"][9], 3)
+        self.assertEqual(hematology["tests"][6 * 24 + 23], 1)
+        self.assertEqual(hematology["total_orders"], 3)
+        self.assertEqual(hematology["total_tests"], 4)
+
+        biochemistry = departments["Biochemistry"]
+        self.assertEqual(biochemistry["tests"][9], 1)
+        self.assertEqual(biochemistry["tests"][10], 0)
+        self.assertEqual(biochemistry["tests"][2 * 24 + 14], 1)
+
+    def test_top_tests(self):
+        """Test the most ordered tests by volume and by revenue."""
+        self.seed()
+
+        top = workload(MONDAY, MONDAY + timedelta(days=6), top=2)["top_tests"]
+        self.assertEqual(
+            [(row["test_code"], row["tests"]) for row in top["volume"]],
+            [("CBC", 3), ("LFT", 2)],
+        )
+        self.assertEqual(
+            [(row["test_code"], row["revenue"]) for row in top["revenue"]],
+            [("LFT", "3000.00"), ("CBC", "1500.00")],
+        )
+        self.assertEqual(top["volume"][0]["department"], "Hematology")
+
+    def test_rollups_match_order_items(self):
+        """Test that the rollups give the same summary as the order items."""
+        self.seed()
+        self.order(MONDAY + timedelta(days=7), 8, self.esr)
+        rollup_days(MONDAY, MONDAY + timedelta(days=6))
+
+        period = (MONDAY - timedelta(days=1), MONDAY + timedelta(days=7))
+        from_rollups = workload(*period)
+        from_items = workload(*period, rollups=False)
+        self.assertEqual(
+            from_rollups.pop("rollups"),
+            [{"first_day": "2024-03-04", "last_day": "2024-03-10"}],
+        )
+        self.assertEqual(from_items.pop("rollups"), [])
+        self.assertEqual(from_rollups, from_items)
+
+    def test_gap_between_rollups_is_aggregated_live(self):
+        """Test that days between two rolled-up periods are not read as empty."""
+        self.seed()
+        rollup_days(MONDAY, MONDAY)
+        rollup_days(MONDAY + timedelta(days=6), MONDAY + timedelta(days=6))
+
+        period = (MONDAY, MONDAY + timedelta(days=6))
+        from_rollups = workload(*period)
+        self.assertEqual(
+            from_rollups.pop("rollups"),
+            [
+                {"first_day": "2024-03-04", "last_day": "2024-03-04"},
+                {"first_day": "2024-03-10", "last_day": "2024-03-10"},
+            ],
+        )
+        from_items = workload(*period, rollups=False)
+        from_items.pop("rollups")
+        self.assertEqual(from_rollups, from_items)
+
+    def test_rollup_replaces_days(self):
+        """Test that rolling up a day again replaces its rows."""
+        self.seed()
+        rollup_days(MONDAY, MONDAY)
+        self.order(MONDAY, 9, self.cbc)
+        rollup_days(MONDAY, MONDAY)
+
+        row = DepartmentHourRollup.objects.get(hour=9, department="Hematology")
+        self.assertEqual((row.weekday, row.orders, row.tests), (0, 3, 4))
+        self.assertEqual(DailyTestRollup.objects.get(test=self.cbc).tests, 3)
+
+    def test_split_days(self):
+        """Test which days are read from rollups and which aggregated live."""
+        day = timedelta(days=1)
+        covered = [(MONDAY, MONDAY + 6 * day)]
+        self.assertEqual(
+            split_days(MONDAY - day, MONDAY + 8 * day, covered),
+            (
+                covered,
+                [(MONDAY - day, MONDAY - day), (MONDAY + 7 * day, MONDAY + 8 * day)],
+            ),
+        )
+        self.assertEqual(
+            split_days(MONDAY + day, MONDAY + 2 * day, covered),
+            ([(MONDAY + day, MONDAY + 2 * day)], []),
+        )
+        self.assertEqual(
+            split_days(MONDAY + 7 * day, MONDAY + 8 * day, covered),
+            ([], [(MONDAY + 7 * day, MONDAY + 8 * day)]),
+        )
+        self.assertEqual(split_days(MONDAY, MONDAY, []), ([], [(MONDAY, MONDAY)]))
+
+        # Days between two runs of rollups are aggregated live
+        runs = [(MONDAY, MONDAY + day), (MONDAY + 5 * day, MONDAY + 6 * day)]
+        self.assertEqual(
+            split_days(MONDAY, MONDAY + 6 * day, runs),
+            (runs, [(MONDAY + 2 * day, MONDAY + 4 * day)]),
+        )
+
+    def test_command(self):
+        """Test that the command rolls up from the first order to yesterday."""
+        yesterday = timezone.localdate() - timedelta(days=1)
+        self.order(yesterday - timedelta(days=40), 9, self.cbc)
+        self.order(yesterday, 9, self.cbc)
+        self.order(timezone.localdate(), 9, self.cbc)
+
+        call_command("rollup_workload", stdout=StringIO())
+        self.assertEqual(
+            sorted(DailyTestRollup.objects.values_list("day", flat=True)),
+            [yesterday - timedelta(days=40), yesterday],
+        )
+
+        # Later runs start from the last rollup
+        out = StringIO()
+        call_command("rollup_workload", stdout=out)
+        self.assertIn(f"Rolled up {yesterday - timedelta(days=1)}", out.getvalue())
+
+    def test_command_rolls_up_closed_days_only(self):
+        """Test that today and later days cannot be rolled up."""
+        for until in (timezone.localdate(), timezone.localdate() + timedelta(days=1)):
+            with self.assertRaises(CommandError):
+                call_command("rollup_workload", until=until)
+        self.assertFalse(RolledUpDay.objects.exists())
+
+    def test_constant_queries(self):
+        """Test that a rolled-up period takes the same queries at any size."""
+        self.seed()
+        rollup_days(MONDAY, MONDAY + timedelta(days=6))
+        with CaptureQueriesContext(connection) as week:
+            workload(MONDAY, MONDAY + timedelta(days=6))
+        for weeks in range(1, 5):
+            self.seed_week(MONDAY + timedelta(weeks=weeks))
+        last = MONDAY + timedelta(weeks=4, days=3)
+        rollup_days(MONDAY, last)
+        with CaptureQueriesContext(connection) as month:
+            workload(MONDAY, last)
+        self.assertEqual(len(month), len(week))
+
+    def seed_week(self, monday):
+        """Creates orders in another week."""
+        self.order(monday, 9, self.cbc, self.esr)
+        self.order(monday + timedelta(days=3), 11, self.lft)
+
+    def test_endpoint(self):
+        """Test the endpoint over a date range."""
+        self.seed()
+
+        response = self.client.get(
+            self.url, {"start_date": "2024-03-04", "end_date": "2024-03-10", "top": 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["start_date"], "2024-03-04")
+        self.assertEqual(response.data["end_date"], "2024-03-10")
+        self.assertEqual(len(response.data["departments"]), 2)
+        self.assertEqual(len(response.data["top_tests"]["volume"]), 1)
+        self.assertEqual(response.data["rollups"], [])
+
+    def test_endpoint_invalid_top(self):
+        """Test that `top` must be a number from 1 to 100."""
+        for top in ("many", "0", "101"):
+            response = self.client.get(self.url, {"top": top})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_endpoint_requires_authentication(self):
+        """Test that workload analytics require a signed-in user."""
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
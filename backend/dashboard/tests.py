@@ -102,17 +102,17 @@ class DashboardAnalyticsTestCase(TestCase):
     def test_dashboard_analytics_with_samples(self):
         """Test dashboard analytics with sample data."""
         order = Order.objects.create(patient=self.patient)
-        order_item = order.items.create(test=self.test_catalog)
+        order.items.create(test=self.test_catalog)
 
         # Create samples with different statuses
         Sample.objects.create(
-            order_item=order_item, sample_type="Blood", status=SampleStatus.PENDING
+            order=order, sample_type="Blood", status=SampleStatus.PENDING
         )
         Sample.objects.create(
-            order_item=order_item, sample_type="Blood", status=SampleStatus.COLLECTED
+            order=order, sample_type="Blood", status=SampleStatus.COLLECTED
         )
         Sample.objects.create(
-            order_item=order_item, sample_type="Blood", status=SampleStatus.RECEIVED
+            order=order, sample_type="Blood", status=SampleStatus.RECEIVED
         )
 
         self.client.force_authenticate(user=self.admin_user)
@@ -0,0 +1,214 @@
+"""Turnaround time broken down by workflow stage.
+
+An order item passes five stages between ordering and publication:
+
+- collection: order created → sample collected
+- transport: sample collected → received in the lab
+- bench: sample received → results entered
+- verification: results entered → verified
+- publication: results verified → published
+
+The durations are computed by the database, one row per order item, from
+the item's samples and results. A test with several parameters is timed
+by its last result, and a recollected sample by its last collection. The
+rows are streamed in chunks into NumPy arrays, and the percentiles of each
+department, test and hour of the day are taken from sorted slices of those
+arrays, so no model instance is built.
+"""
+
+import warnings
+from itertools import islice
+
+import numpy as np
+from django.db.models import DurationField, ExpressionWrapper, F, Max
+from django.db.models.functions import ExtractHour
+
+from orders.models import OrderItem, OrderStatus
+
+STAGES = ("collection", "transport", "bench", "verification", "publication", "total")
+PERCENTILES = (50, 90, 99)
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = 5000
+
+
+def _duration(end, start):
+    return ExpressionWrapper(F(end) - F(start), output_field=DurationField())
+
+
+def stage_rows(start, end):
+    """
+    Returns the stage durations of the order items ordered in a period.
+
+    Args:
+        start (datetime): The start of the period.
+        end (datetime): The end of the period.
+
+    Returns:
+        QuerySet: Tuples of department, test code, test name, hour of
+            ordering and one duration (or None) per stage in `STAGES`.
+    """
+    return (
+        OrderItem.objects.filter(
+            order__created_at__gte=start, order__created_at__lte=end
+        )
+        .exclude(status=OrderStatus.CANCELLED)
+        .annotate(
+            collected=Max("samples__collected_at"),
+            received=Max("samples__received_at"),
+            entered=Max("results__entered_at"),
+            verified=Max("results__verified_at"),
+            published=Max("results__published_at"),
+        )
+        .annotate(
+            hour=ExtractHour("order__created_at"),
+            collection=_duration("collected", "order__created_at"),
+            transport=_duration("received", "collected"),
+            bench=_duration("entered", "received"),
+            verification=_duration("verified", "entered"),
+            publication=_duration("published", "verified"),
+            total=_duration("published", "order__created_at"),
+        )
+        .order_by()
+        .values_list("test__category", "test__code", "test__name", "hour", *STAGES)
+    )
+
+
+def _minutes(durations):
+    """Converts a column of timedeltas, None for missing, to float minutes."""
+    values = np.array(durations, dtype="timedelta64[us]")
+    minutes = values.astype(np.int64) / 60e6
+    minutes[np.isnat(values)] = np.nan
+    return minutes
+
+
+def load_stages(rows):
+    """
+    Reads stage rows into columns.
+
+    Args:
+        rows (QuerySet): The output of `stage_rows`.
+
+    Returns:
+        dict[str, np.ndarray]: The `department`, `test_code`, `test_name`
+            and `hour` columns, and `minutes`: one row per item and one
+            column per stage, NaN where a stage is not complete.
+    """
+    keys = {"department": [], "test_code": [], "test_name": [], "hour": []}
+    minutes = []
+    rows = rows.iterator(chunk_size=CHUNK_SIZE)
+    while chunk := list(islice(rows, CHUNK_SIZE)):
+        minutes.append(_read_chunk(chunk, keys))
+
+    columns = {
+        name: np.concatenate(parts) if parts else np.array([], dtype=object)
+        for name, parts in keys.items()
+    }
+    columns["hour"] = columns["hour"].astype(np.int64)
+    columns["minutes"] = (
+        np.concatenate(minutes) if minutes else np.empty((0, len(STAGES)))
+    )
+    return columns
+
+
+def _read_chunk(chunk, keys):
+    columns = list(zip(*chunk, strict=True))
+    for name, column in zip(keys, columns, strict=False):
+        keys[name].append(np.array(column, dtype=object))
+    return np.column_stack([_minutes(column) for column in columns[len(keys) :]])
+
+
+def summarize(minutes):
+    """
+    Summarizes the stage durations of a group of items.
+
+    Args:
+        minutes (np.ndarray): One row per item and one column per stage.
+
+    Returns:
+        dict: The number of items, and per stage the number of items that
+            completed it and the percentiles of its duration in minutes.
+    """
+    if len(minutes):
+        with warnings.catch_warnings():
+            # A stage no item of the group completed has no percentiles
+            warnings.simplefilter("ignore", RuntimeWarning)
+            values = np.nanpercentile(minutes, PERCENTILES, axis=0)
+    else:
+        values = np.full((len(PERCENTILES), len(STAGES)), np.nan)
+    completed = np.count_nonzero(~np.isnan(minutes), axis=0)
+    return {
+        "count": len(minutes),
+        "stages": {
+            stage: {
+                "count": int(completed[index]),
+                **{
+                    f"p{percentile}": (
+                        None
+                        if np.isnan(values[row, index])
+                        else round(float(values[row, index]), 1)
+                    )
+                    for row, percentile in enumerate(PERCENTILES)
+                },
+            }
+            for index, stage in enumerate(STAGES)
+        },
+    }
+
+
+def group_by(keys, minutes):
+    """
+    Splits stage durations by a key.
+
+    Args:
+        keys (np.ndarray): The key of each item.
+        minutes (np.ndarray): The stage durations of each item.
+
+    Returns:
+        list[tuple[object, int, np.ndarray]]: Each key in order, the index
+            of one of its items, and its items' durations.
+    """
+    if not len(keys):
+        return []
+    order = np.argsort(keys, kind="stable")
+    values, starts = np.unique(keys[order], return_index=True)
+    groups = np.split(minutes[order], starts[1:])
+    return list(zip(values, order[starts], groups, strict=True))
+
+
+def stage_breakdown(start, end):
+    """
+    Computes stage percentiles overall, by department, test and hour.
+
+    Args:
+        start (datetime): The start of the period, by order time.
+        end (datetime): The end of the period.
+
+    Returns:
+        dict: `stages`, `percentiles`, `overall`, `by_department`,
+            `by_test` and `by_hour`, with durations in minutes.
+    """
+    columns = load_stages(stage_rows(start, end))
+    minutes = columns["minutes"]
+    return {
+        "stages": list(STAGES),
+        "percentiles": list(PERCENTILES),
+        "overall": summarize(minutes),
+        "by_department": [
+            {"department": department, **summarize(group)}
+            for department, _, group in group_by(columns["department"], minutes)
+        ],
+        "by_test": [
+            {
+                "test_code": code,
+                "test_name": columns["test_name"][first],
+                "department": columns["department"][first],
+                **summarize(group),
+            }
+            for code, first, group in group_by(columns["test_code"], minutes)
+        ],
+        "by_hour": [
+            {"hour": int(hour), **summarize(group)}
+            for hour, _, group in group_by(columns["hour"], minutes)
+        ],
+    }
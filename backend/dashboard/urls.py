@@ -2,8 +2,10 @@
 
 from django.urls import path
 
-from .views import dashboard_analytics
+from .views import dashboard_analytics, turnaround_stages, workload_analytics
 
 urlpatterns = [
     path("analytics/", dashboard_analytics, name="dashboard-analytics"),
+    path("turnaround/", turnaround_stages, name="dashboard-turnaround"),
+    path("workload/", workload_analytics, name="dashboard-workload"),
 ]
@@ -12,34 +12,33 @@ from orders.models import Order
 from results.models import Result, ResultStatus
 from samples.models import Sample, SampleStatus
 
+from .turnaround import stage_breakdown
+from .workload import MAX_TOP_TESTS, TOP_TESTS, workload
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def dashboard_analytics(request):
-    """Get dashboard analytics and performance metrics.
 
-    Query parameters:
-    - start_date: Filter from date (ISO format, default: 30 days ago)
-    - end_date: Filter to date (ISO format, default: today)
+def date_range(params):
+    """
+    Reads the reporting period from query parameters.
+
+    Args:
+        params (QueryDict): The query parameters, with optional ISO
+            `start_date` (default: 30 days before the end) and `end_date`
+            (default: now).
 
     Returns:
-    - quick_tiles: Total orders today, reports published today
-    - orders_per_day: Daily order counts for the date range
-    - sample_status: Count of pending, received, collected samples
-    - avg_tat: Average turnaround time from order to publish (in hours)
+        tuple[datetime, datetime]: The start and end of the period.
+
+    Raises:
+        ValueError: If a date is malformed or the start is after the end.
     """
-    # Parse date range from query params
-    end_date = request.query_params.get("end_date")
-    start_date = request.query_params.get("start_date")
+    end_date = params.get("end_date")
+    start_date = params.get("start_date")
 
     if end_date:
         try:
             end_date = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
         except ValueError:
-            return Response(
-                {"error": "Invalid end_date format. Use ISO format."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            raise ValueError("Invalid end_date format. Use ISO format.") from None
     else:
         end_date = timezone.now()
 
@@ -47,19 +46,35 @@ def dashboard_analytics(request):
         try:
             start_date = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
         except ValueError:
-            return Response(
-                {"error": "Invalid start_date format. Use ISO format."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            raise ValueError("Invalid start_date format. Use ISO format.") from None
     else:
         start_date = end_date - timedelta(days=30)
 
     # Ensure start_date is before end_date
     if start_date > end_date:
-        return Response(
-            {"error": "start_date must be before end_date"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
+        raise ValueError("start_date must be before end_date")
+    return start_date, end_date
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def dashboard_analytics(request):
+    """Get dashboard analytics and performance metrics.
+
+    Query parameters:
+    - start_date: Filter from date (ISO format, default: 30 days ago)
+    - end_date: Filter to date (ISO format, default: today)
+
+    Returns:
+    - quick_tiles: Total orders today, reports published today
+    - orders_per_day: Daily order counts for the date range
+    - sample_status: Count of pending, received, collected samples
+    - avg_tat: Average turnaround time from order to publish (in hours)
+    """
+    try:
+        start_date, end_date = date_range(request.query_params)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
     # Quick tiles - today's data
     today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
@@ -134,3 +149,79 @@ def dashboard_analytics(request):
         },
         status=status.HTTP_200_OK,
     )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def turnaround_stages(request):
+    """Get turnaround time percentiles per workflow stage.
+
+    Query parameters:
+    - start_date: Filter orders from date (ISO format, default: 30 days ago)
+    - end_date: Filter orders to date (ISO format, default: now)
+
+    Returns:
+    - stages: collection, transport, bench, verification, publication, total
+    - percentiles: The percentiles reported (50, 90, 99)
+    - overall, by_department, by_test, by_hour: Per group, the number of
+      order items and, per stage, the items that completed it and the
+      p50/p90/p99 of its duration in minutes
+    """
+    try:
+        start_date, end_date = date_range(request.query_params)
+    except ValueError as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(
+        {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            **stage_breakdown(start_date, end_date),
+        },
+        status=status.HTTP_200_OK,
+    )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def workload_analytics(request):
+    """Get the workload per department and hour of the week, and top tests.
+
+    Query parameters:
+    - start_date: Filter orders from date (ISO format, default: 30 days ago)
+    - end_date: Filter orders to date (ISO format, default: today)
+    - top: Number of top tests (default: 10, at most 100)
+
+    Returns:
+    - departments: Per department, orders and tests in each of the 168
+      hours of the week (Monday 00:00 first) and their totals
+    - top_tests: The most ordered tests by volume and by revenue
+    - rollups: The runs of days read from the daily rollups
+    """
+    try:
+        start_date, end_date = date_range(request.query_params)
+        top = int(request.query_params.get("top", TOP_TESTS))
+    except ValueError as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= top <= MAX_TOP_TESTS:
+        return Response(
+            {"error": f"top must be between 1 and {MAX_TOP_TESTS}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    first, last = (
+        (
+            timezone.localtime(moment).date()
+            if timezone.is_aware(moment)
+            else moment.date()
+        )
+        for moment in (start_date, end_date)
+    )
+    return Response(
+        {
+            "start_date": first.isoformat(),
+            "end_date": last.isoformat(),
+            **workload(first, last, top),
+        },
+        status=status.HTTP_200_OK,
+    )
@@ -0,0 +1,301 @@
+"""Department workload by hour of the week, and test volumes.
+
+The workload of a period is aggregated by the database, never per order
+item in Python. Closed days are read from the daily rollups written by the
+`rollup_workload` command: a few rows per day instead of every order item,
+so a year is summarized in milliseconds. Days the rollups do not cover,
+such as today, are aggregated from the order items directly.
+
+Hours are local time. Hour of the week `h` is weekday `h // 24` (0 for
+Monday) at hour `h % 24`.
+"""
+
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay, TruncDate
+from django.utils import timezone
+
+from catalog.models import TestCatalog
+from orders.models import OrderItem, OrderStatus
+
+from .models import DailyTestRollup, DepartmentHourRollup, RolledUpDay
+
+HOURS_PER_WEEK = 7 * 24
+
+# Default and largest number of top tests returned
+TOP_TESTS = 10
+MAX_TOP_TESTS = 100
+
+
+def day_start(day):
+    """Returns the local midnight starting a date."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def ordered_items(first, last):
+    """
+    Returns the order items ordered on some days.
+
+    Args:
+        first (date): The first day.
+        last (date): The last day, included.
+
+    Returns:
+        QuerySet[OrderItem]: The items that were not cancelled.
+    """
+    return OrderItem.objects.filter(
+        order__created_at__gte=day_start(first),
+        order__created_at__lt=day_start(last + timedelta(days=1)),
+    ).exclude(status=OrderStatus.CANCELLED)
+
+
+def rollup_days(first, last):
+    """
+    Writes the rollups of some days, replacing any already written.
+
+    Args:
+        first (date): The first day.
+        last (date): The last day, included.
+
+    Returns:
+        tuple[int, int]: The department-hour and test-day rows written.
+    """
+    items = ordered_items(first, last).order_by()
+    department_hours = (
+        items.annotate(
+            day=TruncDate("order__created_at"),
+            weekday=ExtractIsoWeekDay("order__created_at"),
+            hour=ExtractHour("order__created_at"),
+        )
+        .values("day", "weekday", "hour", "test__category")
+        .annotate(orders=Count("order", distinct=True), tests=Count("id"))
+    )
+    test_days = (
+        items.annotate(day=TruncDate("order__created_at"))
+        .values("day", "test")
+        .annotate(tests=Count("id"), revenue=Sum("test__price"))
+    )
+    with transaction.atomic():
+        DepartmentHourRollup.objects.filter(day__range=(first, last)).delete()
+        DailyTestRollup.objects.filter(day__range=(first, last)).delete()
+        RolledUpDay.objects.filter(day__range=(first, last)).delete()
+        hours = DepartmentHourRollup.objects.bulk_create(
+            [
+                DepartmentHourRollup(
+                    day=row["day"],
+                    weekday=row["weekday"] - 1,
+                    hour=row["hour"],
+                    department=row["test__category"],
+                    orders=row["orders"],
+                    tests=row["tests"],
+                )
+                for row in department_hours
+            ],
+            batch_size=1000,
+        )
+        tests = DailyTestRollup.objects.bulk_create(
+            [
+                DailyTestRollup(
+                    day=row["day"],
+                    test_id=row["test"],
+                    tests=row["tests"],
+                    revenue=row["revenue"],
+                )
+                for row in test_days
+            ],
+            batch_size=1000,
+        )
+        RolledUpDay.objects.bulk_create(
+            [
+                RolledUpDay(day=first + timedelta(days=offset))
+                for offset in range((last - first).days + 1)
+            ],
+            batch_size=1000,
+        )
+    return len(hours), len(tests)
+
+
+def last_rolled_up_day():
+    """Returns the last day rolled up, or None if nothing was."""
+    return RolledUpDay.objects.aggregate(last=Max("day"))["last"]
+
+
+def rolled_up_days(first, last):
+    """
+    Returns the days of a period the rollups cover.
+
+    Args:
+        first (date): The first day.
+        last (date): The last day, included.
+
+    Returns:
+        list[tuple[date, date]]: The first and last day of each run of
+            consecutive rolled-up days, in order.
+    """
+    runs = []
+    for day in RolledUpDay.objects.filter(day__range=(first, last)).values_list(
+        "day", flat=True
+    ):
+        if runs and runs[-1][1] + timedelta(days=1) == day:
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+def split_days(first, last, covered):
+    """
+    Splits a period into the days read from rollups and from order items.
+
+    Args:
+        first (date): The first day.
+        last (date): The last day, included.
+        covered (list[tuple[date, date]]): Runs of rolled-up days, in order,
+            as returned by `rolled_up_days`.
+
+    Returns:
+        tuple[list[tuple[date, date]], list[tuple[date, date]]]: The runs
+            of days read from rollups, and the periods aggregated live.
+    """
+    rolled = []
+    live = []
+    day = first
+    for start, end in covered:
+        start, end = max(start, first), min(end, last)
+        if start > end:
+            continue
+        if day < start:
+            live.append((day, start - timedelta(days=1)))
+        rolled.append((start, end))
+        day = end + timedelta(days=1)
+    if day <= last:
+        live.append((day, last))
+    return rolled, live
+
+
+def _days(runs):
+    """Returns a filter on the rollup days of some runs."""
+    condition = Q()
+    for run in runs:
+        condition |= Q(day__range=run)
+    return condition
+
+
+def _department_hour_rows(rolled, live):
+    if rolled:
+        yield from (
+            DepartmentHourRollup.objects.filter(_days(rolled))
+            .values("weekday", "hour", "department")
+            .annotate(orders=Sum("orders"), tests=Sum("tests"))
+            .order_by()
+        )
+    for first, last in live:
+        for row in (
+            ordered_items(first, last)
+            .annotate(
+                weekday=ExtractIsoWeekDay("order__created_at"),
+                hour=ExtractHour("order__created_at"),
+            )
+            .values("weekday", "hour", "test__category")
+            .annotate(orders=Count("order", distinct=True), tests=Count("id"))
+            .order_by()
+        ):
+            yield {
+                "weekday": row["weekday"] - 1,
+                "hour": row["hour"],
+                "department": row["test__category"],
+                "orders": row["orders"],
+                "tests": row["tests"],
+            }
+
+
+def _test_rows(rolled, live):
+    if rolled:
+        yield from (
+            DailyTestRollup.objects.filter(_days(rolled))
+            .values("test")
+            .annotate(tests=Sum("tests"), revenue=Sum("revenue"))
+            .order_by()
+        )
+    for first, last in live:
+        yield from (
+            ordered_items(first, last)
+            .values("test")
+            .annotate(tests=Count("id"), revenue=Sum("test__price"))
+            .order_by()
+        )
+
+
+def workload(first, last, top=TOP_TESTS, rollups=True):
+    """
+    Summarizes the workload of some days.
+
+    Args:
+        first (date): The first day.
+        last (date): The last day, included.
+        top (int): The number of top tests to return.
+        rollups (bool): Whether to read the days the rollups cover from
+            them rather than from the order items.
+
+    Returns:
+        dict: `departments`, one entry per department with its `orders`
+            and `tests` in each hour of the week; `top_tests`, the most
+            ordered tests by `volume` and by `revenue`; and `rollups`, the
+            runs of days read from rollups.
+    """
+    rolled, live = split_days(
+        first, last, rolled_up_days(first, last) if rollups else []
+    )
+
+    departments = {}
+    for row in _department_hour_rows(rolled, live):
+        matrix = departments.setdefault(
+            row["department"],
+            {"orders": [0] * HOURS_PER_WEEK, "tests": [0] * HOURS_PER_WEEK},
+        )
+        hour = row["weekday"] * 24 + row["hour"]
+        matrix["orders"][hour] += row["orders"]
+        matrix["tests"][hour] += row["tests"]
+
+    volumes = {}
+    for row in _test_rows(rolled, live):
+        tests, revenue = volumes.get(row["test"], (0, Decimal(0)))
+        volumes[row["test"]] = (tests + row["tests"], revenue + row["revenue"])
+    by_volume = sorted(volumes, key=lambda test: (-volumes[test][0], test))[:top]
+    by_revenue = sorted(volumes, key=lambda test: (-volumes[test][1], test))[:top]
+    catalog = TestCatalog.objects.in_bulk({*by_volume, *by_revenue})
+
+    def entry(test_id):
+        test = catalog[test_id]
+        tests, revenue = volumes[test_id]
+        return {
+            "test_code": test.code,
+            "test_name": test.name,
+            "department": test.category,
+            "tests": tests,
+            "revenue": f"{revenue:.2f}",
+        }
+
+    return {
+        "departments": [
+            {
+                "department": department,
+                "orders": matrix["orders"],
+                "tests": matrix["tests"],
+                "total_orders": sum(matrix["orders"]),
+                "total_tests": sum(matrix["tests"]),
+            }
+            for department, matrix in sorted(departments.items())
+        ],
+        "top_tests": {
+            "volume": [entry(test_id) for test_id in by_volume],
+            "revenue": [entry(test_id) for test_id in by_revenue],
+        },
+        "rollups": [
+            {"first_day": start.isoformat(), "last_day": end.isoformat()}
+            for start, end in rolled
+        ],
+    }
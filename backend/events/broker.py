@@ -0,0 +1,233 @@
+"""Event brokers for the live status stream.
+
+Workflow views publish compact status-change events once their transaction
+commits; every connection to `/api/events/stream/` holds a subscription and
+forwards the events to its client. With Redis, events published by any
+worker reach subscribers on every worker; the in-memory broker fans out
+within one process and is used for tests and single-process development.
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber; a client that falls further behind loses
+# the oldest events and is expected to refresh its worklist.
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+
+class InMemorySubscription:
+    """A subscriber queue of the in-memory broker."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, message):
+        """Adds a message, dropping the oldest one if the queue is full."""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        """
+        Waits for the next message.
+
+        Args:
+            timeout (float): Seconds to wait.
+
+        Returns:
+            str | None: The message, or None if the timeout expired.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InMemoryBroker:
+    """Fans events out to the subscribers of the current process."""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        """
+        Delivers a message to every subscriber.
+
+        Safe to call from any thread; each message is handed to the event
+        loop that owns the subscriber.
+
+        Args:
+            message (str): The JSON-encoded event.
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, message)
+            except RuntimeError:
+                # The subscriber's event loop has been closed
+                self._discard(subscription)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self):
+        """Subscribes to events until the context exits."""
+        subscription = InMemorySubscription()
+        with self._lock:
+            self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._discard(subscription)
+
+    def _discard(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+
+class RedisSubscription:
+    """A Redis pub/sub subscription."""
+
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        """
+        Waits for the next message.
+
+        Args:
+            timeout (float): Seconds to wait.
+
+        Returns:
+            str | None: The message, or None if the timeout expired.
+        """
+        message = await self.pubsub.get_message(
+            ignore_subscribe_messages=True, timeout=timeout
+        )
+        if message is None:
+            return None
+        return message["data"].decode()
+
+
+class RedisBroker:
+    """Fans events out to every worker through a Redis pub/sub channel."""
+
+    def __init__(self, url, channel):
+        self.url = url
+        self.channel = channel
+        self._client = None
+
+    def publish(self, message):
+        """
+        Publishes a message on the channel.
+
+        Args:
+            message (str): The JSON-encoded event.
+        """
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(self.channel, message)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self):
+        """Subscribes to the channel until the context exits."""
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+            yield RedisSubscription(pubsub)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Returns the broker selected by `EVENTS_BROKER`.
+
+    Returns:
+        InMemoryBroker | RedisBroker: The process-wide broker instance.
+    """
+    backend = settings.EVENTS_BROKER
+    key = (backend, settings.EVENTS_CHANNEL)
+    with _brokers_lock:
+        if key not in _brokers:
+            if backend == "redis":
+                _brokers[key] = RedisBroker(settings.REDIS_URL, settings.EVENTS_CHANNEL)
+            elif backend == "memory":
+                _brokers[key] = InMemoryBroker()
+            else:
+                raise ValueError(f"Unknown EVENTS_BROKER {backend!r}")
+        return _brokers[key]
+
+
+def publish_event(event_type, instance):
+    """
+    Publishes a status-change event once the current transaction commits.
+
+    The event carries only identifiers and the new status; clients refetch
+    the records they display. Sample events name the sample's order, since
+    a sample can carry several order items; other events name the order
+    item. Broker failures are logged and never fail the
+    request that triggered the event.
+
+    Args:
+        event_type (str): The event name, e.g. `sample.collected`.
+        instance (Sample | Result): The record whose status changed.
+    """
+    publish_events(event_type, [instance])
+
+
+def publish_events(event_type, instances):
+    """
+    Publishes one status-change event per record after the commit.
+
+    Args:
+        event_type (str): The event name, e.g. `result.published`.
+        instances (Iterable[Sample | Result | OrderItem]): The records
+            whose status changed.
+    """
+    at = timezone.now().isoformat()
+    messages = [
+        json.dumps(
+            {
+                "type": event_type,
+                "id": instance.pk,
+                "status": instance.status,
+                **(
+                    {"order_item": instance.order_item_id}
+                    if hasattr(instance, "order_item_id")
+                    else {"order": instance.order_id}
+                ),
+                "at": at,
+            }
+        )
+        for instance in instances
+    ]
+
+    def send():
+        try:
+            broker = get_broker()
+            for message in messages:
+                broker.publish(message)
+        except Exception:
+            logger.warning("Could not publish %s event", event_type, exc_info=True)
+
+    if messages:
+        transaction.on_commit(send)
@@ -0,0 +1,238 @@
+"""Tests for the events app."""
+
+import json
+from datetime import date
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, Client, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from catalog.models import TestCatalog
+from orders.models import Order, OrderItem
+from patients.models import Patient
+from results.models import Result
+from samples.models import Sample
+from users.models import User, UserRole
+
+from .broker import InMemoryBroker, RedisBroker, get_broker
+from .tickets import issue_ticket
+
+
+class InMemoryBrokerTestCase(TestCase):
+    """Test the in-memory broker."""
+
+    async def test_fans_out_to_every_subscriber(self):
+        """Test that each subscriber receives every published message."""
+        broker = InMemoryBroker()
+        async with broker.subscribe() as first, broker.subscribe() as second:
+            broker.publish("one")
+            broker.publish("two")
+            self.assertEqual(await first.get(timeout=1), "one")
+            self.assertEqual(await first.get(timeout=1), "two")
+            self.assertEqual(await second.get(timeout=1), "one")
+        self.assertIsNone(await first.get(timeout=0.01))
+
+    async def test_unsubscribes_on_exit(self):
+        """Test that a closed subscription no longer receives messages."""
+        broker = InMemoryBroker()
+        async with broker.subscribe() as subscription:
+            pass
+        broker.publish("ignored")
+        self.assertTrue(subscription.queue.empty())
+
+
+class RedisBrokerTestCase(TestCase):
+    """Test the Redis broker."""
+
+    @patch("events.broker.redis.Redis.from_url")
+    def test_publishes_on_channel(self, mock_from_url):
+        """Test that messages are published on the configured channel."""
+        broker = RedisBroker("redis://redis:6379/0", "lims:events")
+        broker.publish("one")
+        broker.publish("two")
+        mock_from_url.assert_called_once_with("redis://redis:6379/0")
+        mock_from_url.return_value.publish.assert_called_with("lims:events", "two")
+
+    @override_settings(EVENTS_BROKER="redis")
+    def test_selected_by_setting(self):
+        """Test that `EVENTS_BROKER=redis` selects the Redis broker."""
+        self.assertIsInstance(get_broker(), RedisBroker)
+
+
+@override_settings(EVENTS_BROKER="memory")
+class PublishEventTestCase(TestCase):
+    """Test that workflow actions publish status changes."""
+
+    def setUp(self):
+        """Set up an order item with a sample and a result."""
+        self.client = APIClient()
+        self.client.force_authenticate(
+            user=User.objects.create(username="admin", role=UserRole.ADMIN)
+        )
+        patient = Patient.objects.create(
+            full_name="John Doe",
+            father_name="James Doe",
+            dob=date(1990, 1, 1),
+            sex="M",
+            phone="03001234567",
+        )
+        order = Order.objects.create(patient=patient)
+        test = TestCatalog.objects.create(
+            code="CBC",
+            name="Complete Blood Count",
+            category="Hematology",
+            sample_type="Blood",
+            price=500,
+            turnaround_time_hours=24,
+        )
+        self.order_item = OrderItem.objects.create(order=order, test=test)
+        self.sample = Sample.objects.create(order=order, sample_type="Blood")
+        self.sample.order_items.add(self.order_item)
+        self.result = Result.objects.create(
+            order_item=self.order_item, value="12.5", status="ENTERED"
+        )
+
+    def published(self, url):
+        with (
+            patch.object(InMemoryBroker, "publish") as publish,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            response = self.client.post(url, {}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(call.args[0]) for call in publish.call_args_list]
+
+    def test_collect_sample_publishes_event(self):
+        """Test that collecting a sample publishes `sample.collected`."""
+        events = self.published(f"/api/samples/{self.sample.id}/collect/")
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["type"], "sample.collected")
+        self.assertEqual(events[0]["id"], self.sample.id)
+        self.assertEqual(events[0]["status"], "COLLECTED")
+        self.assertEqual(events[0]["order"], self.order_item.order_id)
+
+    def test_verify_result_publishes_event(self):
+        """Test that verifying a result publishes `result.verified`."""
+        events = self.published(f"/api/results/{self.result.id}/verify/")
+        self.assertEqual([event["type"] for event in events], ["result.verified"])
+        self.assertEqual(events[0]["status"], "VERIFIED")
+
+    def test_event_waits_for_commit(self):
+        """Test that nothing is published before the transaction commits."""
+        Sample.objects.filter(pk=self.sample.pk).update(status="COLLECTED")
+        with patch.object(InMemoryBroker, "publish") as publish:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(f"/api/samples/{self.sample.id}/receive/")
+            publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+        publish.assert_called_once()
+
+    def test_broker_failure_does_not_fail_request(self):
+        """Test that an unavailable broker is logged, not raised."""
+        with (
+            self.assertLogs("events.broker", level="WARNING"),
+            patch.object(
+                InMemoryBroker, "publish", side_effect=ConnectionError("redis down")
+            ),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            response = self.client.post(
+                f"/api/samples/{self.sample.id}/reject/",
+                {"rejection_reason": "Hemolyzed"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(EVENTS_BROKER="memory", EVENTS_HEARTBEAT=5)
+class EventStreamTestCase(TestCase):
+    """Test the server-sent events endpoint."""
+
+    def setUp(self):
+        """Create a user and an access token."""
+        self.user = User.objects.create(username="tech", role=UserRole.TECHNOLOGIST)
+        self.token = str(AccessToken.for_user(self.user))
+
+    async def open_stream(self, query=""):
+        response = await AsyncClient().get(
+            f"/api/events/stream/{query}",
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        messages = aiter(response.streaming_content)
+        # The subscription is open once the first message has been sent
+        self.assertEqual(await anext(messages), b"retry: 3000\n\n")
+        return messages
+
+    async def test_streams_published_events(self):
+        """Test that published events are forwarded to the client."""
+        messages = await self.open_stream()
+        message = json.dumps({"type": "result.published", "id": 7})
+        get_broker().publish(message)
+        self.assertEqual(
+            await anext(messages),
+            f"event: result.published\ndata: {message}\n\n".encode(),
+        )
+        await messages.aclose()
+
+    async def test_filters_event_types(self):
+        """Test that `types` limits the stream to the given event groups."""
+        messages = await self.open_stream("?types=sample")
+        get_broker().publish(json.dumps({"type": "result.entered", "id": 1}))
+        get_broker().publish(json.dumps({"type": "sample.received", "id": 2}))
+        self.assertIn(b"event: sample.received\n", await anext(messages))
+        await messages.aclose()
+
+    async def test_sends_keepalive_when_idle(self):
+        """Test that a comment is sent when no event arrives in time."""
+        with self.settings(EVENTS_HEARTBEAT=0):
+            messages = await self.open_stream()
+            self.assertEqual(await anext(messages), b": keepalive\n\n")
+            await messages.aclose()
+
+    async def test_accepts_single_use_ticket(self):
+        """Test that EventSource clients open the stream with a ticket."""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        response = await sync_to_async(client.post)("/api/events/ticket/")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["expires_in"], 30)
+        ticket = response.data["ticket"]
+
+        response = await AsyncClient().get(f"/api/events/stream/?ticket={ticket}")
+        self.assertEqual(response.status_code, 200)
+        await aiter(response.streaming_content).aclose()
+        # A logged stream URL cannot be replayed
+        response = await AsyncClient().get(f"/api/events/stream/?ticket={ticket}")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_expired_ticket_is_rejected(self):
+        """Test that a ticket is only valid for `EVENTS_TICKET_TTL`."""
+        with self.settings(EVENTS_TICKET_TTL=0):
+            ticket = await sync_to_async(issue_ticket)(self.user)
+        response = await AsyncClient().get(f"/api/events/stream/?ticket={ticket}")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_requires_authentication(self):
+        """Test that anonymous, token and unknown-ticket requests are rejected."""
+        response = await AsyncClient().get("/api/events/stream/")
+        self.assertEqual(response.status_code, 401)
+        response = await AsyncClient().get(f"/api/events/stream/?token={self.token}")
+        self.assertEqual(response.status_code, 401)
+        response = await AsyncClient().get("/api/events/stream/?ticket=invalid")
+        self.assertEqual(response.status_code, 401)
+
+    def test_ticket_requires_authentication(self):
+        """Test that only authenticated users get a ticket."""
+        response = APIClient().post("/api/events/ticket/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_requires_asgi(self):
+        """Test that the stream is refused under WSGI."""
+        response = Client().get(
+            "/api/events/stream/", headers={"Authorization": f"Bearer {self.token}"}
+        )
+        self.assertEqual(response.status_code, 501)
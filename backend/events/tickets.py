@@ -0,0 +1,54 @@
+"""Single-use tickets that authenticate an event stream.
+
+`EventSource` cannot send an `Authorization` header, and a JWT access token
+in the query string would be written to access logs and browser history.
+A client instead trades its access token for a ticket with an authenticated
+POST and opens the stream with `?ticket=`. A ticket is random, expires after
+`EVENTS_TICKET_TTL` seconds and is deleted from the cache when redeemed, so
+a logged URL cannot be replayed.
+"""
+
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+
+from users.models import User
+
+
+def _ticket_key(ticket):
+    return f"events:ticket:{ticket}"
+
+
+def issue_ticket(user):
+    """
+    Issues a stream ticket for a user.
+
+    Args:
+        user (User): The authenticated user.
+
+    Returns:
+        str: The ticket.
+    """
+    ticket = secrets.token_urlsafe(32)
+    cache.set(_ticket_key(ticket), user.pk, timeout=settings.EVENTS_TICKET_TTL)
+    return ticket
+
+
+async def redeem_ticket(ticket):
+    """
+    Redeems a stream ticket.
+
+    Args:
+        ticket (str): The ticket from the query string.
+
+    Returns:
+        User | None: The active user the ticket was issued to, or None if
+            it is unknown, expired or already redeemed.
+    """
+    key = _ticket_key(ticket)
+    user_id = await cache.aget(key)
+    # Of two requests with the same ticket, only one deletes it
+    if user_id is None or not await cache.adelete(key):
+        return None
+    return await User.objects.filter(pk=user_id, is_active=True).afirst()
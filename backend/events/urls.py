@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path("ticket/", views.stream_ticket, name="stream_ticket"),
+    path("stream/", views.event_stream, name="event_stream"),
+]
@@ -0,0 +1,111 @@
+"""Event stream views."""
+
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.authentication import authenticate_request
+
+from .broker import get_broker
+from .tickets import issue_ticket, redeem_ticket
+
+# Milliseconds browsers wait before reconnecting a dropped stream
+RECONNECT_DELAY_MS = 3000
+
+
+async def _event_messages(prefixes):
+    async with get_broker().subscribe() as subscription:
+        yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+        while True:
+            message = await subscription.get(timeout=settings.EVENTS_HEARTBEAT)
+            if message is None:
+                # Keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            event_type = json.loads(message)["type"]
+            if prefixes and not event_type.startswith(prefixes):
+                continue
+            yield f"event: {event_type}\ndata: {message}\n\n"
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def stream_ticket(request):
+    """
+    Issues a single-use ticket to open the event stream with.
+
+    Args:
+        request: The request object.
+
+    Returns:
+        Response: The `ticket` and the seconds it stays valid
+            (`expires_in`).
+    """
+    return Response(
+        {
+            "ticket": issue_ticket(request.user),
+            "expires_in": settings.EVENTS_TICKET_TTL,
+        },
+        status=status.HTTP_201_CREATED,
+    )
+
+
+@require_GET
+async def event_stream(request):
+    """
+    Streams sample and result status changes as server-sent events.
+
+    Each event is named after the change (`sample.collected`,
+    `sample.received`, `sample.rejected`, `result.entered`,
+    `result.verified`, `result.published`, `critical.raised`,
+    `critical.acknowledged`) and carries a JSON payload with the record
+    `id`, its new `status`, its `order_item` (the `order` for sample
+    events) and the time of the change. A comment line is sent every
+    `EVENTS_HEARTBEAT` seconds while idle.
+
+    The stream needs the ASGI serving mode (`SERVER_MODE=asgi`): under WSGI
+    every open stream would hold a worker.
+
+    Args:
+        request: The HttpRequest object. The JWT access token is read from
+            the `Authorization` header; `EventSource` clients pass a ticket
+            from `stream_ticket` in the `ticket` query parameter instead.
+            The optional `types` parameter limits the stream to
+            comma-separated event groups, e.g. `types=sample`.
+
+    Returns:
+        StreamingHttpResponse: The `text/event-stream` response.
+    """
+    user = await authenticate_request(request)
+    if user is None and request.GET.get("ticket"):
+        user = await redeem_ticket(request.GET["ticket"])
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "The event stream requires the ASGI serving mode"},
+            status=501,
+        )
+
+    prefixes = tuple(
+        f"{group.strip()}."
+        for group in request.GET.get("types", "").split(",")
+        if group.strip()
+    )
+    response = StreamingHttpResponse(
+        _event_messages(prefixes), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Disables response buffering in nginx
+    response["X-Accel-Buffering"] = "no"
+    return response
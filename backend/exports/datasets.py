@@ -0,0 +1,239 @@
+"""Datasets available for export, and the periods they cover.
+
+Each dataset is one `values_list` query over the orders placed in a
+period. Rows are read with `QuerySet.iterator`, in chunks of `CHUNK_SIZE`
+(a server-side cursor on PostgreSQL), so an export holds one chunk in
+memory however many rows it has.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from catalog.models import Test
+from orders.models import Order, OrderItem, OrderStatus
+from results.models import Result
+
+# Rows fetched from the database at a time
+CHUNK_SIZE = 2000
+
+
+class PeriodError(ValueError):
+    """Raised when an export period is malformed."""
+
+
+@dataclass(frozen=True)
+class Period:
+    """
+    The days of an export, by the date orders were placed.
+
+    Attributes:
+        first (date): The first day.
+        last (date): The last day, included.
+    """
+
+    first: date
+    last: date
+
+    @property
+    def start(self):
+        """Returns the local midnight starting the period."""
+        return timezone.make_aware(datetime.combine(self.first, time.min))
+
+    @property
+    def end(self):
+        """Returns the local midnight ending the period."""
+        return timezone.make_aware(
+            datetime.combine(self.last + timedelta(days=1), time.min)
+        )
+
+    @property
+    def label(self):
+        """Returns the period as used in file names, e.g. `2024-03`."""
+        if self.first.day == 1 and self.last == _month_end(self.first):
+            return f"{self.first:%Y-%m}"
+        return f"{self.first:%Y-%m-%d}_{self.last:%Y-%m-%d}"
+
+
+def _month_end(first):
+    """Returns the last day of the month starting on `first`."""
+    return (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def parse_period(month=None, start_date=None, end_date=None):
+    """
+    Reads an export period.
+
+    Args:
+        month (str | None): A month, `YYYY-MM`.
+        start_date (str | None): The first day, `YYYY-MM-DD`.
+        end_date (str | None): The last day, `YYYY-MM-DD`, included.
+
+    Returns:
+        Period: The month; else the days from `start_date` to `end_date`;
+            else the previous calendar month.
+
+    Raises:
+        PeriodError: If a date is malformed, a month is combined with dates,
+            or the period ends before it starts.
+    """
+    if month and (start_date or end_date):
+        raise PeriodError("Provide either a month or start and end dates")
+    if bool(start_date) != bool(end_date):
+        raise PeriodError("Provide both start_date and end_date")
+    try:
+        if month:
+            first = datetime.strptime(month, "%Y-%m").date()
+            return Period(first, _month_end(first))
+        if start_date:
+            first = date.fromisoformat(start_date)
+            last = date.fromisoformat(end_date)
+        else:
+            last = timezone.localdate().replace(day=1) - timedelta(days=1)
+            first = last.replace(day=1)
+    except ValueError:
+        raise PeriodError(
+            "Use YYYY-MM for month and YYYY-MM-DD for start_date and end_date"
+        ) from None
+    if first > last:
+        raise PeriodError("start_date must not be after end_date")
+    return Period(first, last)
+
+
+def _orders(period):
+    active = ~Q(items__status=OrderStatus.CANCELLED)
+    return (
+        Order.objects.filter(created_at__gte=period.start, created_at__lt=period.end)
+        .annotate(
+            test_count=Count("items", filter=active),
+            amount=Sum("items__test__price", filter=active),
+        )
+        .order_by("created_at", "id")
+    )
+
+
+def _results(period):
+    return Result.objects.filter(
+        order_item__order__created_at__gte=period.start,
+        order_item__order__created_at__lt=period.end,
+    ).order_by("order_item__order__created_at", "order_item_id", "id")
+
+
+def _billing(period):
+    return (
+        OrderItem.objects.filter(
+            order__created_at__gte=period.start, order__created_at__lt=period.end
+        )
+        .exclude(status=OrderStatus.CANCELLED)
+        .annotate(
+            billing_code=Subquery(
+                Test.objects.filter(code=OuterRef("test__code")).values("billing_code")[
+                    :1
+                ]
+            )
+        )
+        .order_by("order__created_at", "order_id", "id")
+    )
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    A table that can be exported.
+
+    Attributes:
+        name (str): The name used in URLs and file names.
+        title (str): The sheet title.
+        columns (tuple[tuple[str, str], ...]): The header and the
+            `values_list` field of each column.
+        queryset (Callable[[Period], QuerySet]): The rows of a period.
+    """
+
+    name: str
+    title: str
+    columns: tuple
+    queryset: object
+
+    @property
+    def headers(self):
+        """Returns the column headers."""
+        return [header for header, _ in self.columns]
+
+    def rows(self, period):
+        """
+        Streams the rows of a period.
+
+        Args:
+            period (Period): The period.
+
+        Returns:
+            Iterator[tuple]: The rows, fetched `CHUNK_SIZE` at a time.
+        """
+        fields = [field for _, field in self.columns]
+        return (
+            self.queryset(period).values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+        )
+
+
+DATASETS = {
+    dataset.name: dataset
+    for dataset in (
+        Dataset(
+            name="orders",
+            title="Orders",
+            columns=(
+                ("Order No", "order_no"),
+                ("Ordered At", "created_at"),
+                ("MRN", "patient__mrn"),
+                ("Patient", "patient__full_name"),
+                ("Priority", "priority"),
+                ("Status", "status"),
+                ("Tests", "test_count"),
+                ("Amount", "amount"),
+            ),
+            queryset=_orders,
+        ),
+        Dataset(
+            name="results",
+            title="Results",
+            columns=(
+                ("Order No", "order_item__order__order_no"),
+                ("Ordered At", "order_item__order__created_at"),
+                ("MRN", "order_item__order__patient__mrn"),
+                ("Patient", "order_item__order__patient__full_name"),
+                ("Sex", "order_item__order__patient__sex"),
+                ("Test Code", "order_item__test__code"),
+                ("Test", "order_item__test__name"),
+                ("Parameter", "parameter__code"),
+                ("Value", "value"),
+                ("Unit", "unit"),
+                ("Reference Range", "reference_range"),
+                ("Flags", "flags"),
+                ("Status", "status"),
+                ("Entered At", "entered_at"),
+                ("Verified At", "verified_at"),
+                ("Published At", "published_at"),
+            ),
+            queryset=_results,
+        ),
+        Dataset(
+            name="billing",
+            title="Billing",
+            columns=(
+                ("Order No", "order__order_no"),
+                ("Ordered At", "order__created_at"),
+                ("MRN", "order__patient__mrn"),
+                ("Patient", "order__patient__full_name"),
+                ("Priority", "order__priority"),
+                ("Test Code", "test__code"),
+                ("Test", "test__name"),
+                ("Department", "test__category"),
+                ("Billing Code", "billing_code"),
+                ("Price", "test__price"),
+            ),
+            queryset=_billing,
+        ),
+    )
+}
@@ -0,0 +1,50 @@
+"""Management command to export orders, results or billing lines."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exports.datasets import DATASETS, PeriodError, parse_period
+from exports.writers import FORMATS, write_csv, write_xlsx
+
+
+class Command(BaseCommand):
+    """Export a dataset of a period to a CSV or XLSX file."""
+
+    help = (
+        "Export the orders, results or billing lines of a month or date range "
+        "(default: the previous month) to a CSV or XLSX file"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument("--month", help="Month to export, YYYY-MM")
+        parser.add_argument("--start-date", help="First day to export, YYYY-MM-DD")
+        parser.add_argument(
+            "--end-date", help="Last day to export, YYYY-MM-DD, included"
+        )
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument(
+            "--output",
+            help="File to write (default: <dataset>-<period>.<format> in the "
+            "current directory)",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        try:
+            period = parse_period(
+                options["month"], options["start_date"], options["end_date"]
+            )
+        except PeriodError as e:
+            raise CommandError(e) from None
+
+        dataset = DATASETS[options["dataset"]]
+        file_format = options["format"]
+        path = options["output"] or f"{dataset.name}-{period.label}.{file_format}"
+        if file_format == "csv":
+            with open(path, "w", newline="", encoding="utf-8") as file:
+                write_csv(dataset, period, file)
+        else:
+            with open(path, "wb") as file:
+                write_xlsx(dataset, period, file)
+        self.stdout.write(self.style.SUCCESS(f"Exported {dataset.name} to {path}"))
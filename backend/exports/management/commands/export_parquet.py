@@ -0,0 +1,58 @@
+"""Management command to export orders, samples and results as Parquet."""
+
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from exports.parquet import TABLES, export_parquet
+
+
+class Command(BaseCommand):
+    """Append the rows changed since the last export to Parquet files."""
+
+    help = (
+        "Export orders, order items, samples, sample links and results as Parquet "
+        "partitioned by month, appending the rows created or changed since "
+        "the last run"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Export directory (default: PARQUET_EXPORT_DIR)",
+        )
+        parser.add_argument(
+            "--tables",
+            default="",
+            help=f"Comma-separated tables to export (default: {','.join(TABLES)})",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Delete the tables' earlier exports and export every row again",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        tables = [table.strip() for table in options["tables"].split(",")]
+        tables = [table for table in tables if table]
+        unknown = sorted(set(tables) - set(TABLES))
+        if unknown:
+            raise CommandError(f"Unknown tables: {', '.join(unknown)}")
+
+        root = Path(options["output"] or settings.PARQUET_EXPORT_DIR)
+        until = timezone.now() - timedelta(seconds=settings.PARQUET_EXPORT_LAG)
+        for export in export_parquet(
+            root, tables or None, until=until, full=options["full"]
+        ):
+            since = export.since.isoformat() if export.since else "the start"
+            self.stdout.write(
+                f"{export.table}: {export.rows} rows changed since {since} "
+                f"in {len(export.files)} files"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Exported to {root}"))
@@ -0,0 +1,306 @@
+"""Incremental Parquet export of orders, order items, samples and results.
+
+Each table is written under its own directory, partitioned by the local
+month its rows were created in, e.g. `results/month=2024-03/`. pandas and
+pyarrow read a table directory as one dataset with a `month` column.
+
+`sample_order_items` links samples to the order items tested on them. The
+links have no timestamps of their own: they carry their sample's
+`created_at` and `updated_at`, and are written again with their sample.
+
+Every run appends the rows created or changed since the previous run. The
+previous run's cut-off is kept per table in `_watermarks.json` at the root
+of the export. A changed row is written again in a new file of its month,
+so readers keep the last version of each `id` by `updated_at`.
+
+Rows are read with `QuerySet.iterator`, in chunks of `CHUNK_SIZE` (a
+server-side cursor on PostgreSQL), unordered, over the `updated_at` index.
+At most `ROW_GROUP_SIZE` rows are held before they are written.
+"""
+
+import json
+import shutil
+from dataclasses import dataclass
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db import models
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from results.models import Result
+from samples.models import Sample
+
+# Rows fetched from the database at a time, and held before writing
+CHUNK_SIZE = 5000
+ROW_GROUP_SIZE = 50_000
+
+WATERMARKS = "_watermarks.json"
+
+TABLES = {
+    "orders": Order,
+    "order_items": OrderItem,
+    "samples": Sample,
+    "sample_order_items": Sample.order_items.through,
+    "results": Result,
+}
+
+# Tables without timestamps, and the parent row they take them from
+TIMESTAMPS_FROM = {"sample_order_items": "sample"}
+
+
+def _arrow_type(field):
+    """Returns the Arrow type of a concrete model field."""
+    if field.is_relation:
+        return _arrow_type(field.target_field)
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    if isinstance(field, (models.AutoField, models.IntegerField)):
+        return pa.int64()
+    return pa.string()
+
+
+def table_columns(table):
+    """
+    Returns the columns of a table.
+
+    Args:
+        table (str): A name in `TABLES`.
+
+    Returns:
+        list[tuple[str, str, Field]]: The name, `values_list` lookup and
+            model field of each column: one per concrete field, named by
+            its attribute, e.g. `order_id` for a foreign key, then the
+            parent's timestamps for tables in `TIMESTAMPS_FROM`.
+    """
+    model = TABLES[table]
+    columns = [
+        (field.attname, field.attname, field) for field in model._meta.concrete_fields
+    ]
+    parent = TIMESTAMPS_FROM.get(table)
+    if parent is not None:
+        parent_model = model._meta.get_field(parent).related_model
+        columns += [
+            (name, f"{parent}__{name}", parent_model._meta.get_field(name))
+            for name in ("created_at", "updated_at")
+        ]
+    return columns
+
+
+def table_schema(table):
+    """
+    Returns the Parquet schema of a table.
+
+    Args:
+        table (str): A name in `TABLES`.
+
+    Returns:
+        pyarrow.Schema: The `table_columns` of the table.
+    """
+    return pa.schema(
+        [
+            pa.field(name, _arrow_type(field), nullable=field.null)
+            for name, _, field in table_columns(table)
+        ]
+    )
+
+
+def read_watermarks(root):
+    """
+    Reads the cut-off of the last export of each table.
+
+    Args:
+        root (Path): The export directory.
+
+    Returns:
+        dict[str, datetime]: The cut-offs by table; tables never exported
+            are missing.
+    """
+    try:
+        with open(root / WATERMARKS) as file:
+            stored = json.load(file)
+    except FileNotFoundError:
+        return {}
+    return {table: datetime.fromisoformat(value) for table, value in stored.items()}
+
+
+def _write_watermarks(root, watermarks):
+    path = root / WATERMARKS
+    temporary = path.with_suffix(".tmp")
+    with open(temporary, "w") as file:
+        json.dump(
+            {table: value.isoformat() for table, value in watermarks.items()},
+            file,
+            indent=2,
+            sort_keys=True,
+        )
+    temporary.replace(path)
+
+
+@dataclass
+class TableExport:
+    """
+    The outcome of exporting one table.
+
+    Attributes:
+        table (str): The table name.
+        rows (int): The rows written.
+        files (list[Path]): The files written, one per month with rows.
+        since (datetime | None): The previous cut-off, if any.
+        until (datetime): The new cut-off.
+    """
+
+    table: str
+    rows: int
+    files: list
+    since: datetime | None
+    until: datetime
+
+
+class _MonthWriters:
+    """Buffers rows per month and appends them to one file per month."""
+
+    def __init__(self, directory, schema, name):
+        self.directory = directory
+        self.schema = schema
+        self.name = name
+        self.buffers = {}
+        self.buffered = 0
+        self.writers = {}
+
+    def path(self, month):
+        """Returns the file of a month."""
+        return self.directory / f"month={month}" / f"{self.name}.parquet"
+
+    def temporary_path(self, month):
+        """Returns the file of a month while it is written.
+
+        Readers skip files whose names start with a dot.
+        """
+        path = self.path(month)
+        return path.with_name(f".{path.name}.tmp")
+
+    def add(self, month, row):
+        self.buffers.setdefault(month, []).append(row)
+        self.buffered += 1
+        if self.buffered >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        for month, rows in self.buffers.items():
+            table = pa.Table.from_arrays(
+                [
+                    pa.array(column, type=field.type)
+                    for column, field in zip(
+                        zip(*rows, strict=True), self.schema, strict=True
+                    )
+                ],
+                schema=self.schema,
+            )
+            if month not in self.writers:
+                path = self.temporary_path(month)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self.writers[month] = pq.ParquetWriter(path, self.schema)
+            self.writers[month].write_table(table)
+        self.buffers = {}
+        self.buffered = 0
+
+    def close(self):
+        """Closes the files and moves them into place."""
+        self.flush()
+        for writer in self.writers.values():
+            writer.close()
+        return [
+            self.temporary_path(month).replace(self.path(month))
+            for month in sorted(self.writers)
+        ]
+
+    def discard(self):
+        """Closes and deletes the files, leaving earlier exports as they were."""
+        for month, writer in self.writers.items():
+            writer.close()
+            self.temporary_path(month).unlink(missing_ok=True)
+
+
+def export_table(root, table, since, until):
+    """
+    Appends the rows of a table changed in a period to the export.
+
+    Args:
+        root (Path): The export directory.
+        table (str): A name in `TABLES`.
+        since (datetime | None): Rows changed after this are written; all
+            rows if None.
+        until (datetime): Rows changed after this wait for the next run.
+
+    Returns:
+        TableExport: The rows and files written.
+    """
+    schema = table_schema(table)
+    created = schema.get_field_index("created_at")
+    parent = TIMESTAMPS_FROM.get(table)
+    updated = f"{parent}__updated_at" if parent else "updated_at"
+    rows = TABLES[table].objects.filter(**{f"{updated}__lte": until})
+    if since is not None:
+        rows = rows.filter(**{f"{updated}__gt": since})
+    rows = rows.order_by().values_list(
+        *(lookup for _, lookup, _ in table_columns(table))
+    )
+
+    # Named after the cut-off, so every run adds new files
+    writers = _MonthWriters(root / table, schema, f"{until:%Y%m%dT%H%M%S%f}")
+    count = 0
+    try:
+        for row in rows.iterator(chunk_size=CHUNK_SIZE):
+            writers.add(f"{timezone.localtime(row[created]):%Y-%m}", row)
+            count += 1
+        files = writers.close()
+    except BaseException:
+        writers.discard()
+        raise
+    return TableExport(table, count, files, since, until)
+
+
+def export_parquet(root, tables=None, until=None, full=False):
+    """
+    Appends the rows created or changed since the last export.
+
+    Each table's watermark advances once its files are in place, so a
+    failed run leaves no partial files and is retried by the next run.
+
+    Args:
+        root (Path): The export directory, created if missing.
+        tables (Iterable[str] | None): Names in `TABLES`; every table if
+            None.
+        until (datetime | None): The cut-off of this export; now if None.
+        full (bool): Whether to delete the tables' earlier exports and
+            write every row again.
+
+    Returns:
+        list[TableExport]: The outcome of each table.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    until = until or timezone.now()
+    watermarks = read_watermarks(root)
+    exports = []
+    for table in tables or TABLES:
+        if full:
+            shutil.rmtree(root / table, ignore_errors=True)
+            watermarks.pop(table, None)
+        since = watermarks.get(table)
+        if since is not None and since >= until:
+            exports.append(TableExport(table, 0, [], since, since))
+            continue
+        exports.append(export_table(root, table, since, until))
+        watermarks[table] = until
+        _write_watermarks(root, watermarks)
+    return exports
@@ -0,0 +1,191 @@
+"""Tests for the Parquet export."""
+
+import io
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from catalog.models import TestCatalog
+from orders.models import Order, OrderStatus
+from patients.models import Patient
+from results.models import Result
+from samples.models import Sample, SampleStatus
+
+from . import parquet
+from .parquet import TABLES, export_parquet, read_watermarks, table_schema
+
+MARCH = timezone.make_aware(datetime(2024, 3, 5, 9, 30))
+APRIL = timezone.make_aware(datetime(2024, 4, 2, 8, 0))
+
+
+@pytest.mark.django_db
+class TestParquetExport:
+    """Test cases for the incremental Parquet export."""
+
+    def setup_method(self):
+        """Create a patient and a catalog test."""
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", dob=date(1990, 1, 1), sex="F", phone="03001234567"
+        )
+        self.glucose = TestCatalog.objects.create(
+            code="GLU",
+            name="Glucose",
+            category="Biochemistry",
+            sample_type="Blood",
+            price=300,
+            turnaround_time_hours=4,
+        )
+
+    def order(self, created_at):
+        """Creates an order with one test, placed and last changed at a moment."""
+        order = Order.objects.create(patient=self.patient)
+        item = order.items.create(test=self.glucose)
+        Result.objects.create(order_item=item, value="5.4", unit="mmol/L")
+        for rows in (Order.objects.filter(pk=order.pk), order.items.all()):
+            rows.update(created_at=created_at, updated_at=created_at)
+        Result.objects.filter(order_item=item).update(
+            created_at=created_at, updated_at=created_at
+        )
+        order.refresh_from_db()
+        return order
+
+    def test_partitions_by_month(self, tmp_path):
+        self.order(MARCH)
+        self.order(MARCH + timedelta(days=1))
+        self.order(APRIL)
+
+        exports = export_parquet(tmp_path, until=timezone.now())
+        assert [(export.table, export.rows) for export in exports] == [
+            ("orders", 3),
+            ("order_items", 3),
+            ("samples", 0),
+            ("sample_order_items", 0),
+            ("results", 3),
+        ]
+        months = sorted(path.name for path in (tmp_path / "orders").iterdir())
+        assert months == ["month=2024-03", "month=2024-04"]
+
+        orders = pd.read_parquet(tmp_path / "orders")
+        assert len(orders) == 3
+        assert sorted(orders["month"].astype(str)) == ["2024-03", "2024-03", "2024-04"]
+        results = pd.read_parquet(tmp_path / "results")
+        assert set(results["value"]) == {"5.4"}
+
+    def test_schema(self, tmp_path):
+        self.order(MARCH)
+        export_parquet(tmp_path, until=timezone.now())
+
+        [path] = (tmp_path / "results" / "month=2024-03").iterdir()
+        schema = pq.read_schema(path)
+        assert schema == table_schema("results")
+        assert schema.field("order_item_id").type == pa.int64()
+        assert schema.field("entered_at").type == pa.timestamp("us", tz="UTC")
+        assert schema.field("delta_flag").type == pa.bool_()
+
+    def test_appends_changed_rows(self, tmp_path):
+        first = self.order(MARCH)
+        self.order(MARCH)
+        until = timezone.now()
+        export_parquet(tmp_path, until=until)
+        assert read_watermarks(tmp_path)["orders"] == until
+
+        # Only the new order and the changed one are written again
+        first.status = OrderStatus.CANCELLED
+        first.save()
+        new = self.order(APRIL)
+        Order.objects.filter(pk=new.pk).update(updated_at=timezone.now())
+        exports = {
+            export.table: export
+            for export in export_parquet(tmp_path, until=timezone.now())
+        }
+        assert exports["orders"].rows == 2
+        assert exports["orders"].since == until
+        assert exports["results"].rows == 0
+        assert len(list((tmp_path / "orders" / "month=2024-03").iterdir())) == 2
+
+        # Keeping the last version of each row gives the current table
+        orders = pd.read_parquet(tmp_path / "orders")
+        current = orders.sort_values("updated_at").drop_duplicates("id", keep="last")
+        assert len(current) == 3
+        statuses = current.set_index("id")["status"]
+        assert statuses[first.pk] == OrderStatus.CANCELLED
+
+    def test_rows_after_cutoff_wait(self, tmp_path):
+        self.order(MARCH)
+        export_parquet(tmp_path, until=MARCH - timedelta(days=1))
+        assert not (tmp_path / "orders").exists()
+
+        [orders, *_] = export_parquet(tmp_path, until=timezone.now())
+        assert orders.rows == 1
+
+    def test_full_export(self, tmp_path):
+        self.order(MARCH)
+        export_parquet(tmp_path, until=timezone.now())
+        export_parquet(tmp_path, ["orders"], until=timezone.now(), full=True)
+
+        assert len(pd.read_parquet(tmp_path / "orders")) == 1
+        assert len(list((tmp_path / "orders").rglob("*.parquet"))) == 1
+
+    def test_failed_export_leaves_no_files(self, tmp_path, monkeypatch):
+        self.order(MARCH)
+        self.order(APRIL)
+        monkeypatch.setattr(parquet, "ROW_GROUP_SIZE", 1)
+        add = parquet._MonthWriters.add
+        calls = []
+
+        def failing_add(writers, month, row):
+            calls.append(row)
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            add(writers, month, row)
+
+        monkeypatch.setattr(parquet._MonthWriters, "add", failing_add)
+        with pytest.raises(RuntimeError):
+            export_parquet(tmp_path, until=timezone.now())
+
+        assert not list(tmp_path.rglob("*parquet*"))
+        assert read_watermarks(tmp_path) == {}
+
+    def test_command(self, tmp_path, settings):
+        settings.PARQUET_EXPORT_DIR = str(tmp_path)
+        settings.PARQUET_EXPORT_LAG = 0
+        self.order(MARCH)
+
+        out = io.StringIO()
+        call_command("export_parquet", tables="orders,results", stdout=out)
+        assert "orders: 1 rows changed since the start in 1 files" in out.getvalue()
+        assert set(read_watermarks(tmp_path)) == {"orders", "results"}
+
+        with pytest.raises(CommandError):
+            call_command("export_parquet", tables="patients")
+
+    def test_sample_order_items(self, tmp_path):
+        """Test that sample links are written again with their sample."""
+        order = self.order(MARCH)
+        sample = Sample.objects.create(order=order, sample_type="Blood")
+        sample.order_items.add(order.items.get())
+        Sample.objects.filter(pk=sample.pk).update(created_at=MARCH, updated_at=MARCH)
+        export_parquet(tmp_path, ["sample_order_items"], until=timezone.now())
+
+        links = pd.read_parquet(tmp_path / "sample_order_items")
+        assert list(links["sample_id"]) == [sample.pk]
+        assert list(links["orderitem_id"]) == [order.items.get().pk]
+        assert list(links["month"].astype(str)) == ["2024-03"]
+
+        # Unchanged samples are not written again, changed ones are
+        [links] = export_parquet(tmp_path, ["sample_order_items"], until=timezone.now())
+        assert links.rows == 0
+        sample.status = SampleStatus.COLLECTED
+        sample.save()
+        [links] = export_parquet(tmp_path, ["sample_order_items"], until=timezone.now())
+        assert links.rows == 1
+
+    def test_every_table_has_timestamps(self):
+        for table in TABLES:
+            names = table_schema(table).names
+            assert "created_at" in names and "updated_at" in names
@@ -0,0 +1,267 @@
+"""Tests for exports app."""
+
+import csv
+import io
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from catalog.models import Test, TestCatalog
+from orders.models import Order, OrderStatus
+from patients.models import Patient
+from results.models import Result
+from users.models import User, UserRole
+
+from .datasets import DATASETS, Period, PeriodError, parse_period
+from .writers import csv_chunks
+
+MARCH = timezone.make_aware(datetime(2024, 3, 5, 9, 30))
+
+
+class ExportFixtures:
+    """Shared set-up: an admin, a patient and two tests."""
+
+    def setup_method(self):
+        """Create an admin, a patient and catalog tests."""
+        self.client = APIClient()
+        self.admin = User.objects.create(username="admin", role=UserRole.ADMIN)
+        self.client.force_authenticate(user=self.admin)
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", dob=date(1990, 1, 1), sex="F", phone="03001234567"
+        )
+        self.glucose = TestCatalog.objects.create(
+            code="GLU",
+            name="Glucose",
+            category="Biochemistry",
+            sample_type="Blood",
+            price=300,
+            turnaround_time_hours=4,
+        )
+        self.cbc = TestCatalog.objects.create(
+            code="CBC",
+            name="Complete Blood Count",
+            category="Hematology",
+            sample_type="Blood",
+            price=500,
+            turnaround_time_hours=24,
+        )
+        Test.objects.create(code="GLU", name="Glucose", billing_code="B-100")
+
+    def order(self, created_at, *tests):
+        """Creates an order for some tests placed at a moment."""
+        order = Order.objects.create(patient=self.patient)
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        order.refresh_from_db()
+        for test in tests:
+            order.items.create(test=test)
+        return order
+
+    def rows(self, response):
+        """Returns the rows of a streamed CSV response."""
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.reader(io.StringIO(content)))
+
+
+class TestPeriods:
+    """Test cases for export periods."""
+
+    def test_month(self):
+        period = parse_period(month="2024-02")
+        assert period == Period(date(2024, 2, 1), date(2024, 2, 29))
+        assert period.label == "2024-02"
+
+    def test_date_range(self):
+        period = parse_period(start_date="2024-03-05", end_date="2024-03-09")
+        assert period == Period(date(2024, 3, 5), date(2024, 3, 9))
+        assert period.label == "2024-03-05_2024-03-09"
+        assert period.end - period.start == timedelta(days=5)
+
+    def test_previous_month_by_default(self):
+        period = parse_period()
+        assert period.last == timezone.localdate().replace(day=1) - timedelta(days=1)
+        assert period.first == period.last.replace(day=1)
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"month": "March"},
+            {"month": "2024-03", "start_date": "2024-03-01"},
+            {"start_date": "2024-03-01"},
+            {"start_date": "2024-03-09", "end_date": "2024-03-01"},
+            {"start_date": "2024-02-30", "end_date": "2024-03-01"},
+        ],
+    )
+    def test_invalid(self, params):
+        with pytest.raises(PeriodError):
+            parse_period(**params)
+
+
+@pytest.mark.django_db
+class TestExports(ExportFixtures):
+    """Test cases for the export endpoint."""
+
+    def test_orders_csv(self):
+        order = self.order(MARCH, self.glucose, self.cbc)
+        cancelled = order.items.create(test=self.cbc)
+        cancelled.status = OrderStatus.CANCELLED
+        cancelled.save()
+
+        response = self.client.get("/api/exports/orders.csv", {"month": "2024-03"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "text/csv; charset=utf-8"
+        assert 'filename="orders-2024-03.csv"' in response["Content-Disposition"]
+        header, row = self.rows(response)
+        assert header == DATASETS["orders"].headers
+        ordered_at = timezone.localtime(MARCH).replace(tzinfo=None)
+        assert row[:3] == [
+            order.order_no,
+            ordered_at.isoformat(sep=" "),
+            order.patient.mrn,
+        ]
+        assert row[-2] == "2"
+        assert Decimal(row[-1]) == 800
+
+    def test_period_filter(self):
+        self.order(MARCH, self.glucose)
+        self.order(MARCH - timedelta(days=10), self.glucose)
+
+        response = self.client.get("/api/exports/orders.csv", {"month": "2024-03"})
+        assert len(self.rows(response)) == 2
+        response = self.client.get(
+            "/api/exports/orders.csv",
+            {"start_date": "2024-02-20", "end_date": "2024-03-31"},
+        )
+        assert len(self.rows(response)) == 3
+
+    def test_results_csv(self):
+        order = self.order(MARCH, self.glucose)
+        Result.objects.create(
+            order_item=order.items.get(), value="5.4", unit="mmol/L", flags="N"
+        )
+
+        response = self.client.get("/api/exports/results.csv", {"month": "2024-03"})
+        _, row = self.rows(response)
+        assert row[0] == order.order_no
+        assert row[5:10] == ["GLU", "Glucose", "", "5.4", "mmol/L"]
+
+    def test_billing_xlsx(self):
+        order = self.order(MARCH, self.glucose, self.cbc)
+
+        response = self.client.get("/api/exports/billing.xlsx", {"month": "2024-03"})
+        assert response.status_code == status.HTTP_200_OK
+        assert 'filename="billing-2024-03.xlsx"' in response["Content-Disposition"]
+        workbook = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        rows = list(workbook["Billing"].values)
+        assert list(rows[0]) == DATASETS["billing"].headers
+        assert rows[1][0] == order.order_no
+        assert rows[1][1] == timezone.localtime(MARCH).replace(tzinfo=None)
+        assert [row[5:] for row in rows[1:]] == [
+            ("GLU", "Glucose", "Biochemistry", "B-100", 300),
+            ("CBC", "Complete Blood Count", "Hematology", None, 500),
+        ]
+
+    def test_empty_xlsx(self):
+        response = self.client.get("/api/exports/orders.xlsx", {"month": "2024-03"})
+        workbook = load_workbook(io.BytesIO(b"".join(response.streaming_content)))
+        assert len(list(workbook["Orders"].values)) == 1
+
+    def test_csv_asgi_with_jwt(self):
+        """Test streaming a CSV export through the ASGI handler."""
+        self.order(MARCH, self.glucose)
+        token = AccessToken.for_user(self.admin)
+
+        response = async_to_sync(AsyncClient().get)(
+            "/api/exports/orders.csv",
+            {"month": "2024-03"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        content = async_to_sync(self._read_streaming_content)(response)
+        assert len(list(csv.reader(io.StringIO(content.decode())))) == 2
+
+    @staticmethod
+    async def _read_streaming_content(response):
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    def test_invalid_period(self):
+        response = self.client.get("/api/exports/orders.csv", {"month": "March"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "error" in response.data
+
+    def test_unknown_export(self):
+        for path in ("patients.csv", "orders.pdf"):
+            response = self.client.get(f"/api/exports/{path}")
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_admin_only(self):
+        client = APIClient()
+        response = client.get("/api/exports/orders.csv")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        client.force_authenticate(
+            user=User.objects.create(username="reception", role=UserRole.RECEPTION)
+        )
+        response = client.get("/api/exports/orders.csv")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_constant_queries(self):
+        """Test that an export takes the same queries for any number of rows."""
+        period = Period(date(2024, 3, 1), date(2024, 3, 31))
+        self.order(MARCH, self.glucose)
+        with CaptureQueriesContext(connection) as one:
+            list(csv_chunks(DATASETS["billing"], period))
+        for _ in range(20):
+            self.order(MARCH, self.glucose, self.cbc)
+        with CaptureQueriesContext(connection) as many:
+            list(csv_chunks(DATASETS["billing"], period))
+        assert len(many) == len(one)
+
+
+@pytest.mark.django_db
+class TestExportCommand(ExportFixtures):
+    """Test cases for the export_data command."""
+
+    def test_csv(self, tmp_path):
+        self.order(MARCH, self.glucose)
+        path = tmp_path / "orders.csv"
+
+        call_command(
+            "export_data",
+            "orders",
+            month="2024-03",
+            output=str(path),
+            stdout=io.StringIO(),
+        )
+        rows = list(csv.reader(path.open(newline="")))
+        assert len(rows) == 2
+
+    def test_xlsx(self, tmp_path):
+        self.order(MARCH, self.glucose, self.cbc)
+        path = tmp_path / "billing.xlsx"
+
+        call_command(
+            "export_data",
+            "billing",
+            start_date="2024-03-01",
+            end_date="2024-03-31",
+            format="xlsx",
+            output=str(path),
+            stdout=io.StringIO(),
+        )
+        assert len(list(load_workbook(path)["Billing"].values)) == 3
+
+    def test_invalid_period(self):
+        with pytest.raises(CommandError):
+            call_command("export_data", "orders", month="March")
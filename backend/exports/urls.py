@@ -0,0 +1,9 @@
+"""URL configuration for exports app."""
+
+from django.urls import path
+
+from .views import export_dataset
+
+urlpatterns = [
+    path("<slug:dataset>.<slug:file_format>", export_dataset, name="export-dataset"),
+]
@@ -0,0 +1,90 @@
+"""Export views."""
+
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from core.permissions import IsAdminUser
+
+from .datasets import DATASETS, PeriodError, parse_period
+from .writers import FORMATS, csv_chunks, write_xlsx
+
+
+async def _aiter(iterator):
+    """Advances a sync iterator in a worker thread without blocking the loop."""
+    done = object()
+    while (chunk := await sync_to_async(next)(iterator, done)) is not done:
+        yield chunk
+
+
+async def _aiter_file(file, block_size):
+    """Reads `file` in blocks in a worker thread without blocking the loop."""
+    try:
+        while block := await sync_to_async(file.read)(block_size):
+            yield block
+    finally:
+        await sync_to_async(file.close)()
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def export_dataset(request, dataset, file_format):
+    """
+    Exports the orders, results or billing lines of a period.
+
+    CSV is streamed as rows are read from the database. XLSX is written to
+    a temporary file first, since a workbook is a zip archive, then
+    streamed from it. Either way memory use does not grow with the rows.
+
+    Args:
+        request: The request object. The period is the `month` (`YYYY-MM`),
+            or the days from `start_date` to `end_date` (`YYYY-MM-DD`);
+            by default the previous calendar month.
+        dataset (str): `orders`, `results` or `billing`.
+        file_format (str): `csv` or `xlsx`.
+
+    Returns:
+        StreamingHttpResponse | FileResponse: The file as an attachment, or
+            a 400/404 error.
+    """
+    if dataset not in DATASETS or file_format not in FORMATS:
+        return Response({"error": "Export not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        period = parse_period(
+            request.query_params.get("month"),
+            request.query_params.get("start_date"),
+            request.query_params.get("end_date"),
+        )
+    except PeriodError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    dataset = DATASETS[dataset]
+    filename = f"{dataset.name}-{period.label}.{file_format}"
+    if file_format == "csv":
+        chunks = csv_chunks(dataset, period)
+        response = StreamingHttpResponse(chunks, content_type=FORMATS["csv"])
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        if isinstance(request._request, ASGIRequest):
+            # Django would otherwise read a sync iterator to the end before
+            # sending it to an ASGI client
+            response.streaming_content = _aiter(chunks)
+        return response
+
+    file = tempfile.TemporaryFile()
+    write_xlsx(dataset, period, file)
+    file.seek(0)
+    response = FileResponse(
+        file,
+        as_attachment=True,
+        filename=filename,
+        content_type=FORMATS["xlsx"],
+    )
+    if isinstance(request._request, ASGIRequest):
+        response.streaming_content = _aiter_file(file, response.block_size)
+    return response
@@ -0,0 +1,95 @@
+"""CSV and XLSX writers that stream dataset rows.
+
+Both writers hold at most one chunk of rows in memory. CSV is produced as
+a generator of text chunks, for `StreamingHttpResponse` or a file. XLSX
+is written with openpyxl's write-only mode, which spools rows to disk, so
+workbooks are written to a temporary file and sent from there.
+"""
+
+import csv
+import io
+from datetime import datetime
+
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .datasets import CHUNK_SIZE
+
+# Rows on one worksheet, including the header; further rows go on a new sheet
+XLSX_MAX_ROWS = 1_048_576
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _local(value):
+    """Returns datetimes as naive local time, which spreadsheets expect."""
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def csv_chunks(dataset, period):
+    """
+    Renders a dataset as CSV.
+
+    Args:
+        dataset (Dataset): The dataset.
+        period (Period): The period.
+
+    Yields:
+        str: The header line, then the rows, `CHUNK_SIZE` at a time.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(dataset.headers)
+    count = 0
+    for row in dataset.rows(period):
+        writer.writerow(
+            [
+                value.isoformat(sep=" ") if isinstance(value, datetime) else value
+                for value in map(_local, row)
+            ]
+        )
+        count += 1
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_csv(dataset, period, file):
+    """Writes a dataset to a text file opened with `newline=""` as CSV."""
+    for chunk in csv_chunks(dataset, period):
+        file.write(chunk)
+
+
+def write_xlsx(dataset, period, file):
+    """
+    Writes a dataset to a binary file as an XLSX workbook.
+
+    Rows past the worksheet limit continue on further sheets, each with the
+    header.
+
+    Args:
+        dataset (Dataset): The dataset.
+        period (Period): The period.
+        file (BinaryIO): The file, which must be seekable.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = None
+    count = 0
+    for row in dataset.rows(period):
+        if count % (XLSX_MAX_ROWS - 1) == 0:
+            number = count // (XLSX_MAX_ROWS - 1) + 1
+            title = dataset.title if number == 1 else f"{dataset.title} {number}"
+            sheet = workbook.create_sheet(title)
+            sheet.append(dataset.headers)
+        sheet.append([_local(value) for value in row])
+        count += 1
+    if sheet is None:
+        workbook.create_sheet(dataset.title).append(dataset.headers)
+    workbook.save(file)
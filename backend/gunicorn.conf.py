@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration.
+
+`SERVER_MODE` selects how the application is served:
+
+- `wsgi` (default): synchronous workers running `core.wsgi`.
+- `asgi`: uvicorn workers running `core.asgi`. Async views (health check,
+  report download) then run on the event loop, so slow clients and
+  long-lived connections do not each occupy a worker. Settings read the
+  same variable: static files are left to nginx, and persistent database
+  connections are off unless `POSTGRES_POOL` is set.
+"""
+
+import multiprocessing
+import os
+
+SERVER_MODE = os.environ.get("SERVER_MODE", "wsgi").lower()
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WORKERS", 2 * multiprocessing.cpu_count() + 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+accesslog = "-"
+errorlog = "-"
+
+if SERVER_MODE == "asgi":
+    wsgi_app = "core.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+elif SERVER_MODE == "wsgi":
+    wsgi_app = "core.wsgi:application"
+else:
+    raise ValueError(f"SERVER_MODE must be 'wsgi' or 'asgi', got {SERVER_MODE!r}")
@@ -1,6 +1,6 @@
 from unittest.mock import patch
 
-from django.test import Client, TestCase
+from django.test import AsyncClient, Client, TestCase
 
 
 class HealthCheckTestCase(TestCase):
@@ -67,3 +67,77 @@ class HealthCheckTestCase(TestCase):
         data = response.json()
         self.assertEqual(data["status"], "degraded")
         self.assertIn("unhealthy", data["cache"])
+
+
+class MetricsEndpointTestCase(TestCase):
+    """Test cases for the request metrics middleware and endpoint."""
+
+    def setUp(self):
+        """Set up test client and clear previously recorded metrics."""
+        from core.metrics import reset_metrics
+
+        reset_metrics()
+        self.client = Client()
+
+    def test_metrics_exposes_prometheus_histograms(self):
+        """Test that handled requests show up in the metrics exposition."""
+        self.client.get("/api/health/")
+        response = self.client.get("/api/health/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn("# TYPE lims_http_request_duration_seconds histogram", body)
+        self.assertIn(
+            'lims_http_request_duration_seconds_count{view="health_check",'
+            'method="GET",status="200"} 1',
+            body,
+        )
+        self.assertIn('lims_http_db_queries_bucket{view="health_check"', body)
+
+    async def test_metrics_recorded_for_asgi_requests(self):
+        """Test that requests served through ASGI are recorded."""
+        from core.metrics import render_prometheus
+
+        with self.settings(METRICS_TIMING_HEADERS=True):
+            response = await AsyncClient().get("/api/health/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertIn(
+            'lims_http_request_duration_seconds_count{view="health_check",'
+            'method="GET",status="200"} 1',
+            render_prometheus(),
+        )
+
+    def test_metrics_trailing_slash(self):
+        """Test that the metrics endpoint also answers with a trailing slash."""
+        response = self.client.get("/api/health/metrics/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_timing_headers_disabled_by_default(self):
+        """Test that debug headers are not added unless enabled."""
+        response = self.client.get("/api/health/")
+        self.assertNotIn("X-Query-Count", response)
+        self.assertNotIn("Server-Timing", response)
+
+    def test_timing_headers_when_enabled(self):
+        """Test that debug headers report the query count and timings."""
+        from rest_framework.test import APIClient
+
+        from users.models import User
+
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username="metrics"))
+        with self.settings(METRICS_TIMING_HEADERS=True):
+            response = client.get("/api/catalog/")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreaterEqual(int(response["X-Query-Count"]), 1)
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("serialize;dur=", response["Server-Timing"])
+
+    def test_metrics_disabled(self):
+        """Test that nothing is recorded when metrics are disabled."""
+        with self.settings(METRICS_ENABLED=False, METRICS_TIMING_HEADERS=True):
+            response = self.client.get("/api/health/")
+        self.assertNotIn("X-Query-Count", response)
+        body = self.client.get("/api/health/metrics").content.decode()
+        self.assertNotIn('view="health_check"', body)
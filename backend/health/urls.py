@@ -1,7 +1,8 @@
-from django.urls import path
+from django.urls import path, re_path
 
 from . import views
 
 urlpatterns = [
     path("", views.health_check, name="health_check"),
+    re_path(r"^metrics/?$", views.metrics, name="health_metrics"),
 ]
@@ -1,13 +1,24 @@
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
 from django.db import connection
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 
+from core.metrics import render_prometheus
 
-def health_check(request):
+
+def _ensure_database_connection():
+    # Resolve the connection inside the worker thread: database connections
+    # are per thread, and the event loop thread's connection is never used
+    # for queries.
+    connection.ensure_connection()
+
+
+async def health_check(request):
     """
     Performs a health check on the application and its connected services.
 
     This endpoint verifies the status of the database and cache connections.
+    It is an async view, so under ASGI slow probes do not block a worker.
     It returns a JSON response with the status of each service.
 
     Args:
@@ -29,7 +40,7 @@ def health_check(request):
 
     # Check database connectivity
     try:
-        connection.ensure_connection()
+        await sync_to_async(_ensure_database_connection)()
         health_status["database"] = "healthy"
     except Exception as e:
         health_status["database"] = f"unhealthy: {str(e)}"
@@ -38,8 +49,8 @@ def health_check(request):
 
     # Check Redis/cache connectivity
     try:
-        cache.set("health_check", "ok", 10)
-        if cache.get("health_check") == "ok":
+        await cache.aset("health_check", "ok", 10)
+        if await cache.aget("health_check") == "ok":
             health_status["cache"] = "healthy"
         else:
             health_status["cache"] = "unhealthy: cache not working"
@@ -53,3 +64,21 @@ def health_check(request):
             status_code = 200
 
     return JsonResponse(health_status, status=status_code)
+
+
+def metrics(request):
+    """
+    Exposes aggregated request metrics in the Prometheus text format.
+
+    The histograms cover request latency, database query count, database time
+    and response serialization time, labelled by view, method and status.
+
+    Args:
+        request: The HttpRequest object.
+
+    Returns:
+        HttpResponse: The metrics exposition document.
+    """
+    return HttpResponse(
+        render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
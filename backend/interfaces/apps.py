@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class InterfacesConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "interfaces"
+
+    def ready(self):
+        """Connect cache invalidation signal handlers."""
+        from . import signals  # noqa: F401
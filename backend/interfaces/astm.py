@@ -0,0 +1,405 @@
+"""ASTM E1381/E1394 (CLSI LIS1-A/LIS2-A2) framing and record parsing.
+
+The low-level protocol (E1381) moves a message between an analyzer and the
+host as a sequence of frames:
+
+    ENQ → ACK, then STX FN text ETB|ETX C1 C2 CR LF → ACK for each frame,
+    then EOT
+
+`FN` is the frame number (1 to 7, then 0 again), ETB marks an intermediate
+frame and ETX the last frame of a record, and `C1 C2` is the checksum: the
+sum of the bytes from `FN` to ETB/ETX modulo 256, as two hex digits.
+
+The message (E1394) is a list of records separated by CR. The header record
+defines the delimiters (`H|\\^&`: field, repeat, component and escape).
+Results are read from the order (`O`) and result (`R`) records: the order
+carries the specimen id, the sample barcode, and each result the universal
+test id, value, units and abnormal flags.
+
+A bidirectional analyzer also sends request information (`Q`) records,
+asking which tests to run on a specimen. The host answers with a message of
+its own, one order record per specimen listing the tests, after taking the
+sender role on the same connection (ENQ, frames, EOT).
+"""
+
+import asyncio
+from dataclasses import dataclass
+
+ENQ = b"\x05"
+ACK = b"\x06"
+NAK = b"\x15"
+EOT = b"\x04"
+STX = b"\x02"
+ETX = b"\x03"
+ETB = b"\x17"
+CR = b"\r"
+LF = b"\n"
+
+# Characters of message text per frame
+MAX_FRAME_TEXT = 240
+
+# Times a frame is sent before the transfer is abandoned, as in E1381
+MAX_FRAME_ATTEMPTS = 6
+
+# Result statuses (R record, field 9) accepted as results
+RESULT_STATUSES = {"F", "C", ""}
+
+
+class ASTMError(ValueError):
+    """Raised for frames or messages that do not follow the protocol."""
+
+
+@dataclass(frozen=True)
+class Observation:
+    """
+    One result reported by an analyzer.
+
+    Attributes:
+        barcode (str): The specimen id of the order record.
+        test (str): The analyzer's test code.
+        value (str): The measured value.
+        unit (str): The units of the value.
+        flags (str): The abnormal flags, e.g. `H` or `N`.
+        status (str): The result status, e.g. `F` for final.
+        sender (str): The analyzer name from the header record.
+    """
+
+    barcode: str
+    test: str
+    value: str
+    unit: str = ""
+    flags: str = ""
+    status: str = "F"
+    sender: str = ""
+
+
+def checksum(data):
+    """
+    Computes the checksum of a frame.
+
+    Args:
+        data (bytes): The frame from the frame number to ETB/ETX.
+
+    Returns:
+        bytes: The sum of the bytes modulo 256, as two upper-case hex digits.
+    """
+    return f"{sum(data) % 256:02X}".encode()
+
+
+def encode_frames(records, encoding="latin-1"):
+    """
+    Splits the records of a message into frames.
+
+    Each record starts a new frame; records longer than `MAX_FRAME_TEXT`
+    continue in intermediate frames.
+
+    Args:
+        records (list[str]): The records, without terminators.
+        encoding (str): The character encoding of the link.
+
+    Returns:
+        list[bytes]: The frames, numbered from 1.
+    """
+    frames = []
+    for record in records:
+        text = record.encode(encoding) + CR
+        chunks = [
+            text[start : start + MAX_FRAME_TEXT]
+            for start in range(0, len(text), MAX_FRAME_TEXT)
+        ]
+        for index, chunk in enumerate(chunks):
+            number = str((len(frames) + 1) % 8).encode()
+            end = ETX if index == len(chunks) - 1 else ETB
+            body = number + chunk + end
+            frames.append(STX + body + checksum(body) + CR + LF)
+    return frames
+
+
+async def send_frames(reader, writer, frames, timeout):
+    """
+    Sends a message as prepared frames, taking the E1381 sender role.
+
+    Each frame is resent when answered with NAK, up to `MAX_FRAME_ATTEMPTS`
+    times. The transfer always ends with EOT.
+
+    Args:
+        reader (asyncio.StreamReader): The link's reader.
+        writer (asyncio.StreamWriter): The link's writer.
+        frames (list[bytes]): The frames, as built by `encode_frames`.
+        timeout (float): Seconds to wait for each acknowledgement.
+
+    Returns:
+        bool: Whether every frame was acknowledged.
+
+    Raises:
+        TimeoutError: If an acknowledgement does not arrive in time.
+    """
+
+    async def exchange(data):
+        writer.write(data)
+        await writer.drain()
+        return await asyncio.wait_for(reader.readexactly(1), timeout)
+
+    if await exchange(ENQ) != ACK:
+        return False
+    try:
+        for frame in frames:
+            for _ in range(MAX_FRAME_ATTEMPTS):
+                reply = await exchange(frame)
+                if reply != NAK:
+                    break
+            if reply != ACK:
+                return False
+        return True
+    finally:
+        writer.write(EOT)
+        await writer.drain()
+
+
+def decode_frame(frame):
+    """
+    Validates a frame and extracts its text.
+
+    Args:
+        frame (bytes): The frame, from STX to the final LF.
+
+    Returns:
+        tuple[int, bytes, bool]: The frame number, the text and whether it
+            is the last frame of a record.
+
+    Raises:
+        ASTMError: If the frame is malformed or its checksum is wrong.
+    """
+    if len(frame) < 7 or frame[:1] != STX or frame[-2:] != CR + LF:
+        raise ASTMError("Malformed frame")
+    body, received = frame[1:-4], frame[-4:-2]
+    end = body[-1:]
+    if end not in (ETX, ETB) or not body[:1].isdigit():
+        raise ASTMError("Malformed frame")
+    if checksum(body) != received.upper():
+        raise ASTMError("Checksum mismatch")
+    return int(body[:1]), body[1:-1], end == ETX
+
+
+def _unescape(value, delimiters):
+    field, repeat, component, escape = delimiters
+    if escape not in value:
+        return value
+    for code, char in (("F", field), ("R", repeat), ("S", component), ("E", escape)):
+        value = value.replace(f"{escape}{code}{escape}", char)
+    return value
+
+
+def parse_records(text):
+    """
+    Splits message text into records of fields.
+
+    Args:
+        text (str): The message, records separated by CR.
+
+    Returns:
+        tuple[list[list[str]], tuple[str, str, str, str]]: The records as
+            lists of raw fields, and the field, repeat, component and escape
+            delimiters.
+
+    Raises:
+        ASTMError: If the message does not start with a header record.
+    """
+    lines = [line for line in text.replace("\n", "").split("\r") if line]
+    if not lines or not lines[0].startswith("H") or len(lines[0]) < 5:
+        raise ASTMError("Message must start with a header record")
+    delimiters = tuple(lines[0][1:5])
+    return [line.split(delimiters[0]) for line in lines], delimiters
+
+
+def _component(value, delimiters, index):
+    components = value.split(delimiters[2])
+    return components[index] if index < len(components) else ""
+
+
+def parse_message(text):
+    """
+    Reads the results reported in a message.
+
+    Args:
+        text (str): The message, records separated by CR.
+
+    Returns:
+        list[Observation]: The results of every order record, in order.
+            Results with a status other than final or correction are
+            skipped.
+
+    Raises:
+        ASTMError: If the message is malformed.
+    """
+    records, delimiters = parse_records(text)
+
+    def field(record, index):
+        return record[index] if index < len(record) else ""
+
+    header = records[0]
+    sender = _unescape(_component(field(header, 4), delimiters, 0), delimiters)
+    observations = []
+    barcode = None
+    for record in records[1:]:
+        kind = record[0][:1].upper()
+        if kind == "O":
+            # Specimen id, optionally with components (id^rack^position)
+            barcode = _unescape(
+                _component(field(record, 2), delimiters, 0), delimiters
+            ).strip()
+        elif kind == "R":
+            if barcode is None:
+                raise ASTMError("Result record without an order record")
+            status = field(record, 8).strip().upper()
+            if status not in RESULT_STATUSES:
+                continue
+            # Universal test id: ^^^code, the manufacturer's code
+            test = _component(field(record, 2), delimiters, 3) or field(record, 2)
+            observations.append(
+                Observation(
+                    barcode=barcode,
+                    test=_unescape(test, delimiters).strip(),
+                    value=_unescape(field(record, 3), delimiters).strip(),
+                    unit=_unescape(field(record, 4), delimiters).strip(),
+                    flags=_unescape(field(record, 6), delimiters).strip(),
+                    status=status or "F",
+                    sender=sender,
+                )
+            )
+        elif kind == "L":
+            break
+    return observations
+
+
+def build_message(sender, specimens, timestamp=""):
+    """
+    Builds the records of a result message, as an analyzer sends them.
+
+    Args:
+        sender (str): The analyzer name.
+        specimens (dict[str, list[tuple]]): The results of each sample
+            barcode, as `(test, value, unit, flags)` tuples.
+        timestamp (str): The message time, `YYYYMMDDHHMMSS`.
+
+    Returns:
+        list[str]: The records, without terminators.
+    """
+    records = [f"H|\\^&|||{sender}|||||||P|1|{timestamp}"]
+    for number, (barcode, results) in enumerate(specimens.items(), start=1):
+        records.append(f"P|{number}")
+        tests = "\\".join(f"^^^{test}" for test, *_ in results)
+        records.append(f"O|1|{barcode}||{tests}|R||||||N||||||||||||||F")
+        for sequence, (test, value, unit, flags) in enumerate(results, start=1):
+            records.append(
+                f"R|{sequence}|^^^{test}|{value}|{unit}||{flags}||F||||{timestamp}"
+            )
+    records.append("L|1|N")
+    return records
+
+
+def parse_queries(text):
+    """
+    Reads the specimens a host query asks about.
+
+    Args:
+        text (str): The message, records separated by CR.
+
+    Returns:
+        tuple[str, list[str]]: The analyzer name from the header record and
+            the specimen ids of every request information record, in order.
+
+    Raises:
+        ASTMError: If the message is malformed.
+    """
+    records, delimiters = parse_records(text)
+    header = records[0]
+    sender = _unescape(
+        _component(header[4] if len(header) > 4 else "", delimiters, 0), delimiters
+    )
+    barcodes = []
+    for record in records[1:]:
+        if record[0][:1].upper() != "Q" or len(record) < 3:
+            continue
+        # Starting range id: patient id^specimen id, or a bare specimen id
+        for value in record[2].split(delimiters[1]):
+            barcode = _component(value, delimiters, 1) or _component(
+                value, delimiters, 0
+            )
+            barcode = _unescape(barcode, delimiters).strip()
+            if barcode:
+                barcodes.append(barcode)
+    return sender, barcodes
+
+
+def build_query(sender, barcodes, timestamp=""):
+    """
+    Builds the records of a host query, as an analyzer sends it.
+
+    Args:
+        sender (str): The analyzer name.
+        barcodes (list[str]): The specimens to ask about.
+        timestamp (str): The message time, `YYYYMMDDHHMMSS`.
+
+    Returns:
+        list[str]: The records, without terminators.
+    """
+    records = [f"H|\\^&|||{sender}|||||||P|1|{timestamp}"]
+    for number, barcode in enumerate(barcodes, start=1):
+        records.append(f"Q|{number}|^{barcode}||ALL||||||||O")
+    records.append("L|1|N")
+    return records
+
+
+def build_orders(specimens, timestamp="", sender="LIS"):
+    """
+    Builds the host's answer to a query: the tests of each specimen.
+
+    Args:
+        specimens (dict[str, list[str]]): The test codes of each barcode;
+            barcodes without tests are left out.
+        timestamp (str): The message time, `YYYYMMDDHHMMSS`.
+        sender (str): The host name.
+
+    Returns:
+        list[str]: The records, without terminators. The terminator code is
+            `I` (no information) when no specimen has tests.
+    """
+    records = [f"H|\\^&|||{sender}|||||||P|1|{timestamp}"]
+    number = 0
+    for barcode, tests in specimens.items():
+        if not tests:
+            continue
+        number += 1
+        records.append(f"P|{number}")
+        universal = "\\".join(f"^^^{test}" for test in tests)
+        records.append(f"O|1|{barcode}||{universal}|R||||||A||||||||||||||O")
+    records.append(f"L|1|{'N' if number else 'I'}")
+    return records
+
+
+def parse_orders(text):
+    """
+    Reads the tests the host ordered for each specimen.
+
+    Args:
+        text (str): The message, records separated by CR.
+
+    Returns:
+        dict[str, list[str]]: The test codes of each specimen id.
+
+    Raises:
+        ASTMError: If the message is malformed.
+    """
+    records, delimiters = parse_records(text)
+    orders = {}
+    for record in records[1:]:
+        if record[0][:1].upper() != "O" or len(record) < 5:
+            continue
+        barcode = _unescape(_component(record[2], delimiters, 0), delimiters)
+        orders[barcode.strip()] = [
+            _unescape(_component(test, delimiters, 3), delimiters).strip()
+            for test in record[4].split(delimiters[1])
+            if test
+        ]
+    return orders
@@ -0,0 +1,602 @@
+"""Asyncio HL7 v2 gateway between the laboratory and a hospital system.
+
+Inbound, `HL7Gateway` accepts MLLP connections and reads `ORM^O01` order
+messages. Parsed orders are queued for one `OrderWriter`, which creates
+everything queued so far in one transaction on a worker thread, and each
+message is acknowledged (`AA`, or `AE` with the error) only once its order
+is committed. While a batch is being written the next one queues up, so
+batches grow with the load without delaying a lone message.
+
+Outbound, `OutboundSender` delivers the result messages queued in
+`OutboundMessage` by the publish views: it claims due messages in batches,
+sends them over one persistent MLLP connection, waits for each
+acknowledgement and records the outcomes with one `bulk_update`. Messages
+are claimed with a conditional UPDATE stamped with the sender's id, so
+several gateway processes can share the queue without sending a message
+twice, and outcomes are saved only for messages the sender still holds.
+Messages that are not acknowledged are retried with exponential backoff and
+marked FAILED after `HL7_MAX_ATTEMPTS`. Delivery is at least once: messages
+claimed by a sender that stopped are sent again, with the same control id,
+after `HL7_STALE_AFTER` seconds.
+"""
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .hl7 import (
+    ACCEPT_CODES,
+    CR,
+    FS,
+    REJECT_CODES,
+    HL7Error,
+    build_ack,
+    frame,
+    parse,
+    parse_ack,
+    parse_header,
+    parse_orm,
+    unframe,
+)
+from .models import OutboundMessage, OutboundStatus
+from .services import accept_orders
+
+logger = logging.getLogger(__name__)
+
+# Longest accepted message, in bytes
+MAX_MESSAGE_BYTES = 1024 * 1024
+
+# Errors of a broken or unresponsive MLLP link
+LINK_ERRORS = (
+    OSError,
+    TimeoutError,
+    asyncio.IncompleteReadError,
+    asyncio.LimitOverrunError,
+    HL7Error,
+)
+
+# Timeouts sending a message can take: connecting, writing, acknowledgement
+LINK_TIMEOUTS = 3
+
+
+def _now():
+    return timezone.localtime().strftime("%Y%m%d%H%M%S")
+
+
+def _control_id():
+    return uuid.uuid4().hex[:20]
+
+
+@dataclass
+class GatewayStats:
+    """
+    Counters of the inbound gateway's activity.
+
+    Attributes:
+        connections (int): Connections accepted.
+        messages (int): Messages received.
+        accepted (int): Orders created, or recognized as already received.
+        rejected (int): Messages acknowledged with an error.
+        batches (int): Transactions performed.
+        failed_batches (int): Transactions that raised an error.
+    """
+
+    connections: int = 0
+    messages: int = 0
+    accepted: int = 0
+    rejected: int = 0
+    batches: int = 0
+    failed_batches: int = 0
+
+
+def _accept(messages):
+    # The writer thread lives as long as the gateway; drop connections the
+    # database closed or that outlived CONN_MAX_AGE, as a request would.
+    close_old_connections()
+    return accept_orders(messages)
+
+
+class OrderWriter:
+    """
+    Creates queued orders in batches.
+
+    Args:
+        stats (GatewayStats): The counters to update.
+        batch_size (int): The most orders created in one transaction.
+    """
+
+    def __init__(self, stats, batch_size):
+        self.stats = stats
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue()
+
+    async def submit(self, message):
+        """
+        Queues an order and waits until it is written.
+
+        Args:
+            message (OrderMessage): The order.
+
+        Returns:
+            tuple[int | None, str]: The order id and an empty string, or
+                None and the error.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((message, future))
+        return await future
+
+    async def run(self):
+        """Writes batches until cancelled."""
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def write(self, batch):
+        """Creates one batch of orders on the database thread."""
+        try:
+            outcomes = await sync_to_async(_accept)([message for message, _ in batch])
+        except Exception:
+            self.stats.failed_batches += 1
+            logger.exception("Could not create %d HL7 orders", len(batch))
+            outcomes = [(None, "Could not create the order")] * len(batch)
+        else:
+            self.stats.batches += 1
+        for (_, future), outcome in zip(batch, outcomes, strict=True):
+            if outcome[0] is None:
+                self.stats.rejected += 1
+            else:
+                self.stats.accepted += 1
+            if not future.done():
+                future.set_result(outcome)
+
+
+class HL7Gateway:
+    """
+    Accepts order messages from hospital systems over MLLP.
+
+    Args:
+        host (str): The address to listen on.
+        port (int): The TCP port; 0 picks a free port.
+        batch_size (int): The most orders created in one transaction.
+        timeout (float): Seconds to wait for the rest of a message before
+            dropping the connection.
+    """
+
+    def __init__(self, host=None, port=None, batch_size=None, timeout=None):
+        self.host = host or settings.HL7_HOST
+        self.port = settings.HL7_PORT if port is None else port
+        self.timeout = timeout or settings.HL7_TIMEOUT
+        self.stats = GatewayStats()
+        self.writer = OrderWriter(self.stats, batch_size or settings.HL7_BATCH_SIZE)
+        self.server = None
+        self.writer_task = None
+        self.connections = set()
+
+    async def start(self):
+        """
+        Starts listening.
+
+        Returns:
+            int: The bound port.
+        """
+        self.writer_task = asyncio.create_task(self.writer.run())
+        self.server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port, limit=MAX_MESSAGE_BYTES
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        """Listens until cancelled, then writes the queued orders."""
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def drain(self):
+        """
+        Waits until the connected systems have disconnected and every order
+        they sent has been written.
+        """
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.writer.queue.join()
+
+    async def close(self):
+        """
+        Stops listening, drops the open connections and writes the queued
+        orders.
+        """
+        if self.server is not None:
+            self.server.close()
+            for connection in self.connections:
+                connection.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+        if self.writer_task is not None:
+            await self.writer.queue.join()
+            self.writer_task.cancel()
+            try:
+                await self.writer_task
+            except asyncio.CancelledError:
+                pass
+
+    async def handle_connection(self, reader, writer):
+        """Receives and acknowledges the messages of one connection."""
+        peer = writer.get_extra_info("peername")
+        task = asyncio.current_task()
+        self.connections.add(task)
+        self.stats.connections += 1
+        logger.info("HL7 system connected from %s", peer)
+        try:
+            while True:
+                start = await reader.read(1)
+                if not start:
+                    break
+                try:
+                    block = start + await asyncio.wait_for(
+                        reader.readuntil(FS + CR), self.timeout
+                    )
+                except TimeoutError:
+                    logger.warning("Timed out receiving a message from %s", peer)
+                    break
+                except asyncio.LimitOverrunError:
+                    raise ConnectionError("Message too long") from None
+                reply = await self.process(block, peer)
+                writer.write(frame(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+            logger.info("HL7 system disconnected from %s", peer)
+
+    async def process(self, block, peer):
+        """
+        Handles one message.
+
+        Returns:
+            str: The acknowledgement to send back.
+        """
+        self.stats.messages += 1
+        header = None
+        try:
+            text = unframe(block)
+            header = parse_header(parse(text))
+            order = parse_orm(text)
+        except HL7Error as error:
+            self.stats.rejected += 1
+            logger.warning("Rejected HL7 message from %s: %s", peer, error)
+            return build_ack(header, "AR", str(error), _control_id(), _now())
+
+        order_id, error = await self.writer.submit(order)
+        if order_id is None:
+            logger.warning(
+                "Could not accept order %s from %s: %s",
+                order.placer_order_number,
+                peer,
+                error,
+            )
+            return build_ack(header, "AE", error, _control_id(), _now())
+        return build_ack(header, "AA", "", _control_id(), _now())
+
+
+class MLLPClient:
+    """
+    Sends messages over one MLLP connection and reads the acknowledgements.
+
+    Args:
+        host (str): The receiver's address.
+        port (int): The receiver's port.
+        timeout (float): Seconds to wait for each acknowledgement.
+    """
+
+    def __init__(self, host, port, timeout=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout or settings.HL7_TIMEOUT
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        """Opens the connection."""
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, limit=MAX_MESSAGE_BYTES),
+            self.timeout,
+        )
+
+    async def close(self):
+        """Closes the connection."""
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.reader = self.writer = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def send(self, message):
+        """
+        Sends a message and waits for the reply.
+
+        Args:
+            message (str): The message.
+
+        Returns:
+            str: The acknowledgement message.
+        """
+        self.writer.write(frame(message))
+        await asyncio.wait_for(self.writer.drain(), self.timeout)
+        block = await asyncio.wait_for(self.reader.readuntil(FS + CR), self.timeout)
+        return unframe(block)
+
+
+@dataclass
+class SenderStats:
+    """
+    Counters of the outbound sender's activity.
+
+    Attributes:
+        sent (int): Messages acknowledged as accepted.
+        retried (int): Failed attempts that will be retried.
+        failed (int): Messages given up on.
+        batches (int): Batches claimed.
+        connections (int): Connections opened.
+    """
+
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    batches: int = 0
+    connections: int = 0
+
+
+class OutboundSender:
+    """
+    Delivers queued result messages to the hospital system.
+
+    Args:
+        host (str): The hospital system's MLLP address.
+        port (int): Its port.
+        batch_size (int): The most messages claimed at once.
+        poll_interval (float): Seconds to wait when no message is due or
+            the connection failed.
+        timeout (float): Seconds to wait for each acknowledgement.
+        retry_delay (float): Seconds before the first retry; the delay
+            doubles with every further attempt.
+        max_attempts (int): The attempts before a message is marked FAILED.
+        stale_after (float): Seconds after which messages claimed by another
+            sender are claimed again; longer than sending a message can take.
+
+    Raises:
+        ValueError: If sending a message can outlast `stale_after`.
+    """
+
+    def __init__(
+        self,
+        host=None,
+        port=None,
+        batch_size=None,
+        poll_interval=None,
+        timeout=None,
+        retry_delay=None,
+        max_attempts=None,
+        stale_after=None,
+    ):
+        self.host = host or settings.HL7_OUTBOUND_HOST
+        self.port = port or settings.HL7_OUTBOUND_PORT
+        self.batch_size = batch_size or settings.HL7_OUTBOUND_BATCH_SIZE
+        self.poll_interval = (
+            settings.HL7_POLL_INTERVAL if poll_interval is None else poll_interval
+        )
+        self.timeout = timeout or settings.HL7_TIMEOUT
+        self.retry_delay = (
+            settings.HL7_RETRY_DELAY if retry_delay is None else retry_delay
+        )
+        self.max_attempts = max_attempts or settings.HL7_MAX_ATTEMPTS
+        self.stale_after = (
+            settings.HL7_STALE_AFTER if stale_after is None else stale_after
+        )
+        if self.stale_after <= LINK_TIMEOUTS * self.timeout:
+            raise ValueError(
+                f"stale_after ({self.stale_after}s) must be longer than "
+                f"{LINK_TIMEOUTS} timeouts ({self.timeout}s each)"
+            )
+        self.worker_id = uuid.uuid4().hex
+        self.stats = SenderStats()
+        self.client = None
+
+    def claim(self):
+        """
+        Claims the next batch of due messages.
+
+        Returns:
+            list[OutboundMessage]: The claimed messages, oldest first;
+                messages claimed meanwhile by another sender are left out.
+        """
+        close_old_connections()
+        now = timezone.now()
+        claimable = Q(status=OutboundStatus.PENDING, next_attempt_at__lte=now) | Q(
+            status=OutboundStatus.SENDING,
+            claimed_at__lt=now - timedelta(seconds=self.stale_after),
+        )
+        ids = list(
+            OutboundMessage.objects.filter(claimable)
+            .order_by("next_attempt_at", "id")
+            .values_list("id", flat=True)[: self.batch_size]
+        )
+        if not ids:
+            return []
+        OutboundMessage.objects.filter(claimable, pk__in=ids).update(
+            status=OutboundStatus.SENDING, worker=self.worker_id, claimed_at=now
+        )
+        return list(
+            OutboundMessage.objects.filter(
+                pk__in=ids,
+                status=OutboundStatus.SENDING,
+                worker=self.worker_id,
+                claimed_at=now,
+            ).order_by("next_attempt_at", "id")
+        )
+
+    def record(self, messages):
+        """
+        Saves the outcome of claimed messages with one query.
+
+        Only messages this sender still holds are saved: a message whose
+        claim went stale and was taken by another sender keeps that sender's
+        outcome.
+
+        Args:
+            messages (list[OutboundMessage]): The messages, with their
+                outcome set.
+
+        Returns:
+            int: The messages saved.
+        """
+        saved = OutboundMessage.objects.filter(
+            status=OutboundStatus.SENDING, worker=self.worker_id
+        ).bulk_update(
+            messages,
+            ["status", "attempts", "next_attempt_at", "last_error", "sent_at"],
+        )
+        if saved < len(messages):
+            logger.warning(
+                "%s result messages were claimed again by another sender",
+                len(messages) - saved,
+            )
+        return saved
+
+    def fail(self, message, error, permanent=False):
+        """
+        Records a failed attempt and schedules the retry.
+
+        Args:
+            message (OutboundMessage): The message.
+            error (str): The reason.
+            permanent (bool): Whether the message must not be sent again.
+        """
+        message.attempts += 1
+        message.last_error = error[:1000]
+        if permanent or message.attempts >= self.max_attempts:
+            message.status = OutboundStatus.FAILED
+            self.stats.failed += 1
+            logger.error(
+                "Giving up on %s %s: %s",
+                message.message_type,
+                message.control_id,
+                error,
+            )
+        else:
+            message.status = OutboundStatus.PENDING
+            delay = self.retry_delay * 2 ** (message.attempts - 1)
+            message.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+            self.stats.retried += 1
+
+    async def disconnect(self):
+        """Closes the connection, if open."""
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    async def send_batch(self, messages):
+        """
+        Sends claimed messages one by one, reconnecting as needed.
+
+        Sending stops at the first broken connection, and before a message
+        could outlast the batch's claim; the remaining messages are released
+        and claimed again.
+
+        Returns:
+            tuple[list[OutboundMessage], bool]: The attempted messages, and
+                whether the connection stayed up.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.stale_after - LINK_TIMEOUTS * self.timeout
+        attempted = []
+        for message in messages:
+            if loop.time() > deadline:
+                break
+            attempted.append(message)
+            try:
+                if self.client is None:
+                    client = MLLPClient(self.host, self.port, self.timeout)
+                    await client.connect()
+                    self.client = client
+                    self.stats.connections += 1
+                reply = await self.client.send(message.payload)
+                code, control_id, text = parse_ack(reply)
+            except LINK_ERRORS as error:
+                await self.disconnect()
+                self.fail(message, f"{type(error).__name__}: {error}")
+                return attempted, False
+
+            if control_id != message.control_id:
+                # The replies are out of step with the messages
+                await self.disconnect()
+                self.fail(message, f"Acknowledgement for another message: {control_id}")
+                return attempted, False
+            if code in ACCEPT_CODES:
+                message.status = OutboundStatus.SENT
+                message.attempts += 1
+                message.last_error = ""
+                message.sent_at = timezone.now()
+                self.stats.sent += 1
+            else:
+                self.fail(
+                    message,
+                    f"{code or 'No code'}: {text}",
+                    permanent=code in REJECT_CODES,
+                )
+        return attempted, True
+
+    async def run(self, stop_when_idle=False):
+        """
+        Sends due messages until cancelled.
+
+        Args:
+            stop_when_idle (bool): Return once no message is due instead of
+                waiting for more.
+        """
+        try:
+            while True:
+                messages = await sync_to_async(self.claim)()
+                if not messages:
+                    if stop_when_idle:
+                        return
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                self.stats.batches += 1
+                attempted, connected = await self.send_batch(messages)
+                for message in messages[len(attempted) :]:
+                    message.status = OutboundStatus.PENDING
+                await sync_to_async(self.record)(messages)
+                if not connected:
+                    logger.warning(
+                        "Cannot reach the HL7 receiver at %s:%s", self.host, self.port
+                    )
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            await self.disconnect()
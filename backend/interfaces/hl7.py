@@ -0,0 +1,625 @@
+"""HL7 v2 message parsing and building, and MLLP framing.
+
+Messages are exchanged with hospital information systems over MLLP, the
+minimal lower layer protocol, which wraps each message in a start and end
+block:
+
+    VT message FS CR
+
+and expects an acknowledgement (`ACK`) message back in the same framing.
+
+A message is a list of segments separated by CR. The `MSH` header defines
+the delimiters (`MSH|^~\\&`: field, component, repeat, escape and
+subcomponent), and fields are numbered from the segment name, so `PID-3`
+is the third field after `PID`. In `MSH` the field separator itself is
+`MSH-1`.
+
+The gateway reads orders from `ORM^O01` messages (the patient from `PID`,
+the placer order number from `ORC-2` or `OBR-2` and one test per `OBR-4`)
+and reports published results in `ORU^R01` messages, one `OBR`/`OBX` pair
+per result.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+
+VT = b"\x0b"
+FS = b"\x1c"
+CR = b"\r"
+
+ENCODING = "utf-8"
+
+DEFAULT_DELIMITERS = ("|", "^", "~", "\\", "&")
+
+# Order priorities (ORC-7/OBR-27, component 6) and the matching order priority
+PRIORITIES = {"S": "STAT", "A": "URGENT", "R": "ROUTINE"}
+
+# Acknowledgement codes (MSA-1) meaning the message was accepted
+ACCEPT_CODES = {"AA", "CA"}
+# Acknowledgement codes meaning the message must not be sent again
+REJECT_CODES = {"AR", "CR"}
+
+VERSION = "2.5"
+
+
+class HL7Error(ValueError):
+    """Raised for messages that do not follow the standard."""
+
+
+@dataclass(frozen=True)
+class Header:
+    """
+    The routing fields of a message header.
+
+    Attributes:
+        message_type (str): The message code and trigger event, e.g.
+            `ORM^O01`.
+        control_id (str): The sender's id of the message (`MSH-10`).
+        sending_application (str): `MSH-3`.
+        sending_facility (str): `MSH-4`.
+        receiving_application (str): `MSH-5`.
+        receiving_facility (str): `MSH-6`.
+        version (str): The HL7 version (`MSH-12`).
+    """
+
+    message_type: str
+    control_id: str
+    sending_application: str = ""
+    sending_facility: str = ""
+    receiving_application: str = ""
+    receiving_facility: str = ""
+    version: str = VERSION
+
+
+@dataclass(frozen=True)
+class PatientInfo:
+    """
+    The patient of an order, as identified by the sender.
+
+    Attributes:
+        identifier (str): The sender's patient id (`PID-3`).
+        full_name (str): The name, given names first.
+        dob (date | None): The date of birth.
+        sex (str): `M`, `F` or `O`.
+        phone (str): The home phone number.
+    """
+
+    identifier: str
+    full_name: str
+    dob: date | None = None
+    sex: str = "O"
+    phone: str = ""
+
+
+@dataclass(frozen=True)
+class OrderMessage:
+    """
+    A new order received in an `ORM^O01` message.
+
+    Attributes:
+        header (Header): The message header.
+        placer_order_number (str): The sender's order number.
+        patient (PatientInfo): The patient.
+        tests (tuple[str, ...]): The ordered test codes.
+        priority (str): The order priority.
+    """
+
+    header: Header
+    placer_order_number: str
+    patient: PatientInfo
+    tests: tuple = ()
+    priority: str = "ROUTINE"
+
+
+@dataclass(frozen=True)
+class ResultObservation:
+    """
+    One result reported in an `ORU^R01` message.
+
+    Attributes:
+        test (str): The test code.
+        test_name (str): The test name.
+        value (str): The result value.
+        unit (str): The units of the value.
+        reference_range (str): The reference range.
+        flags (str): The abnormal flags.
+        observed_at (str): The result time, `YYYYMMDDHHMMSS`.
+        value_type (str): `NM` for numeric values, `ST` for text.
+    """
+
+    test: str
+    test_name: str
+    value: str
+    unit: str = ""
+    reference_range: str = ""
+    flags: str = ""
+    observed_at: str = ""
+    value_type: str = "ST"
+
+
+def frame(message):
+    """
+    Wraps a message in an MLLP block.
+
+    Args:
+        message (str): The message, segments separated by CR.
+
+    Returns:
+        bytes: The encoded block.
+    """
+    return VT + message.encode(ENCODING) + FS + CR
+
+
+def unframe(block):
+    """
+    Extracts the message of an MLLP block.
+
+    Args:
+        block (bytes): The bytes up to and including the end block. Anything
+            before the start block is ignored.
+
+    Returns:
+        str: The message.
+
+    Raises:
+        HL7Error: If the block is malformed.
+    """
+    start = block.find(VT)
+    if start < 0 or not block.endswith(FS + CR):
+        raise HL7Error("Malformed MLLP block")
+    try:
+        return block[start + 1 : -2].decode(ENCODING)
+    except UnicodeDecodeError:
+        raise HL7Error("Message is not valid UTF-8") from None
+
+
+def escape(value, delimiters=DEFAULT_DELIMITERS):
+    """
+    Escapes the delimiters in a field value.
+
+    Args:
+        value (str): The value.
+        delimiters (tuple[str, ...]): The field, component, repeat, escape
+            and subcomponent delimiters.
+
+    Returns:
+        str: The value with escape sequences, on a single line.
+    """
+    field_sep, component, repeat, escape_char, subcomponent = delimiters
+    value = str(value).replace(escape_char, f"{escape_char}E{escape_char}")
+    for char, code in (
+        (field_sep, "F"),
+        (component, "S"),
+        (repeat, "R"),
+        (subcomponent, "T"),
+    ):
+        value = value.replace(char, f"{escape_char}{code}{escape_char}")
+    return " ".join(value.splitlines())
+
+
+def unescape(value, delimiters=DEFAULT_DELIMITERS):
+    """
+    Replaces the escape sequences in a field value.
+
+    Args:
+        value (str): The value.
+        delimiters (tuple[str, ...]): The field, component, repeat, escape
+            and subcomponent delimiters.
+
+    Returns:
+        str: The value.
+    """
+    field_sep, component, repeat, escape_char, subcomponent = delimiters
+    if escape_char not in value:
+        return value
+    for code, char in (
+        ("F", field_sep),
+        ("S", component),
+        ("R", repeat),
+        ("T", subcomponent),
+        ("E", escape_char),
+    ):
+        value = value.replace(f"{escape_char}{code}{escape_char}", char)
+    return value
+
+
+@dataclass
+class Message:
+    """
+    A parsed message.
+
+    Attributes:
+        segments (list[list[str]]): The segments as lists of raw fields,
+            indexed by field number (the segment name is field 0).
+        delimiters (tuple[str, ...]): The field, component, repeat, escape
+            and subcomponent delimiters.
+    """
+
+    segments: list = field(default_factory=list)
+    delimiters: tuple = DEFAULT_DELIMITERS
+
+    def all(self, name):
+        """Returns every segment with a name."""
+        return [segment for segment in self.segments if segment[0] == name]
+
+    def first(self, name):
+        """Returns the first segment with a name, or None."""
+        return next((s for s in self.segments if s[0] == name), None)
+
+    def get(self, segment, index, component=0, repeat=0):
+        """
+        Reads one component of a field.
+
+        Args:
+            segment (list[str] | None): The segment.
+            index (int): The field number.
+            component (int): The component, from 0.
+            repeat (int): The repetition, from 0.
+
+        Returns:
+            str: The unescaped value; empty if absent.
+        """
+        if segment is None or index >= len(segment):
+            return ""
+        _, component_sep, repeat_sep, _, _ = self.delimiters
+        repeats = segment[index].split(repeat_sep)
+        if repeat >= len(repeats):
+            return ""
+        components = repeats[repeat].split(component_sep)
+        if component >= len(components):
+            return ""
+        return unescape(components[component], self.delimiters).strip()
+
+
+def parse(text):
+    """
+    Splits a message into segments and fields.
+
+    Args:
+        text (str): The message, segments separated by CR.
+
+    Returns:
+        Message: The parsed message.
+
+    Raises:
+        HL7Error: If the message does not start with an `MSH` segment.
+    """
+    lines = [line for line in text.replace("\n", "\r").split("\r") if line.strip()]
+    if not lines or not lines[0].startswith("MSH") or len(lines[0]) < 8:
+        raise HL7Error("Message must start with an MSH segment")
+    field_sep = lines[0][3]
+    encoding = lines[0][4:8]
+    delimiters = (field_sep, *encoding)
+    if len(set(delimiters)) != 5:
+        raise HL7Error("Invalid MSH encoding characters")
+    segments = []
+    for line in lines:
+        fields = line.split(field_sep)
+        if fields[0] == "MSH":
+            # MSH-1 is the field separator itself
+            fields.insert(1, field_sep)
+        segments.append(fields)
+    return Message(segments, delimiters)
+
+
+def parse_header(message):
+    """
+    Reads the header of a parsed message.
+
+    Args:
+        message (Message): The message.
+
+    Returns:
+        Header: The routing fields.
+    """
+    msh = message.segments[0]
+    message_type = message.get(msh, 9, 0)
+    trigger = message.get(msh, 9, 1)
+    return Header(
+        message_type=f"{message_type}^{trigger}" if trigger else message_type,
+        control_id=message.get(msh, 10),
+        sending_application=message.get(msh, 3),
+        sending_facility=message.get(msh, 4),
+        receiving_application=message.get(msh, 5),
+        receiving_facility=message.get(msh, 6),
+        version=message.get(msh, 12) or VERSION,
+    )
+
+
+def _date(value):
+    if not value:
+        return None
+    try:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    except ValueError:
+        raise HL7Error(f"Invalid date {value}") from None
+
+
+def _patient(message):
+    pid = message.first("PID")
+    if pid is None:
+        raise HL7Error("Order without a PID segment")
+    identifier = message.get(pid, 3)
+    if not identifier:
+        raise HL7Error("PID-3 patient identifier is required")
+    family, given, middle = (message.get(pid, 5, n) for n in range(3))
+    full_name = " ".join(part for part in (given, middle, family) if part)
+    sex = message.get(pid, 8).upper()
+    return PatientInfo(
+        identifier=identifier,
+        full_name=full_name,
+        dob=_date(message.get(pid, 7)),
+        sex=sex if sex in ("M", "F") else "O",
+        phone=message.get(pid, 13),
+    )
+
+
+def parse_orm(text):
+    """
+    Reads a new order from an `ORM^O01` message.
+
+    All `OBR` segments of the message belong to one order; their
+    universal service ids (`OBR-4`) are the test codes.
+
+    Args:
+        text (str): The message.
+
+    Returns:
+        OrderMessage: The order.
+
+    Raises:
+        HL7Error: If the message is malformed, is not a new order or has no
+            placer order number or tests.
+    """
+    message = parse(text)
+    header = parse_header(message)
+    if header.message_type != "ORM^O01":
+        raise HL7Error(f"Unsupported message type {header.message_type or '(none)'}")
+    orc = message.first("ORC")
+    control = message.get(orc, 1).upper()
+    if orc is not None and control not in ("NW", ""):
+        raise HL7Error(f"Unsupported order control {control}")
+    obrs = message.all("OBR")
+    placer = message.get(orc, 2) or next(
+        (message.get(obr, 2) for obr in obrs if message.get(obr, 2)), ""
+    )
+    if not placer:
+        raise HL7Error("ORC-2 or OBR-2 placer order number is required")
+    tests = tuple(message.get(obr, 4) for obr in obrs if message.get(obr, 4))
+    if not tests:
+        raise HL7Error("Order without tests (OBR-4)")
+    priority = message.get(orc, 7, 5) or next(
+        (message.get(obr, 27, 5) for obr in obrs if message.get(obr, 27, 5)), "R"
+    )
+    return OrderMessage(
+        header=header,
+        placer_order_number=placer,
+        patient=_patient(message),
+        tests=tests,
+        priority=PRIORITIES.get(priority.upper(), "ROUTINE"),
+    )
+
+
+def _msh(application, facility, to_application, to_facility, kind, control, stamp):
+    return "|".join(
+        [
+            "MSH",
+            "^~\\&",
+            escape(application),
+            escape(facility),
+            escape(to_application),
+            escape(to_facility),
+            stamp,
+            "",
+            kind,
+            escape(control),
+            "P",
+            VERSION,
+        ]
+    )
+
+
+def build_ack(header, code, text="", control_id="", timestamp=""):
+    """
+    Builds the acknowledgement of a message.
+
+    Args:
+        header (Header | None): The header of the acknowledged message, or
+            None if it could not be read.
+        code (str): `AA` (accepted), `AE` (error) or `AR` (rejected).
+        text (str): The error message.
+        control_id (str): The id of the acknowledgement itself.
+        timestamp (str): The message time, `YYYYMMDDHHMMSS`.
+
+    Returns:
+        str: The `ACK` message.
+    """
+    header = header or Header(message_type="", control_id="")
+    trigger = header.message_type.partition("^")[2]
+    return "\r".join(
+        [
+            _msh(
+                header.receiving_application,
+                header.receiving_facility,
+                header.sending_application,
+                header.sending_facility,
+                f"ACK^{trigger}" if trigger else "ACK",
+                control_id or header.control_id,
+                timestamp,
+            ),
+            f"MSA|{code}|{escape(header.control_id)}|{escape(text)}",
+        ]
+    )
+
+
+def parse_ack(text):
+    """
+    Reads an acknowledgement.
+
+    Args:
+        text (str): The `ACK` message.
+
+    Returns:
+        tuple[str, str, str]: The acknowledgement code, the control id of
+            the acknowledged message and the error text.
+
+    Raises:
+        HL7Error: If the message has no `MSA` segment.
+    """
+    message = parse(text)
+    msa = message.first("MSA")
+    if msa is None:
+        raise HL7Error("Acknowledgement without an MSA segment")
+    return (
+        message.get(msa, 1).upper(),
+        message.get(msa, 2),
+        message.get(msa, 3),
+    )
+
+
+def _pid(patient, identifier=""):
+    given, _, family = patient.full_name.rpartition(" ")
+    return "|".join(
+        [
+            "PID",
+            "1",
+            escape(identifier),
+            escape(patient.identifier),
+            "",
+            f"{escape(family)}^{escape(given)}",
+            "",
+            patient.dob.strftime("%Y%m%d") if patient.dob else "",
+            patient.sex,
+            "",
+            "",
+            "",
+            "",
+            escape(patient.phone),
+        ]
+    )
+
+
+def build_orm(
+    control_id,
+    placer_order_number,
+    patient,
+    tests,
+    priority="R",
+    sending_application="HIS",
+    sending_facility="HOSPITAL",
+    timestamp="",
+):
+    """
+    Builds a new order message, as a hospital system sends it.
+
+    Args:
+        control_id (str): The message id.
+        placer_order_number (str): The order number.
+        patient (PatientInfo): The patient.
+        tests (Iterable[str]): The test codes.
+        priority (str): `S`, `A` or `R`.
+        sending_application (str): The sending system.
+        sending_facility (str): The sending facility.
+        timestamp (str): The message time, `YYYYMMDDHHMMSS`.
+
+    Returns:
+        str: The `ORM^O01` message.
+    """
+    segments = [
+        _msh(
+            sending_application,
+            sending_facility,
+            "",
+            "",
+            "ORM^O01",
+            control_id,
+            timestamp,
+        ),
+        _pid(patient),
+        f"ORC|NW|{escape(placer_order_number)}|||||^^^^^{priority}",
+    ]
+    for number, test in enumerate(tests, start=1):
+        segments.append(
+            f"OBR|{number}|{escape(placer_order_number)}||{escape(test)}"
+            + "|" * 23
+            + f"^^^^^{priority}"
+        )
+    return "\r".join(segments)
+
+
+def build_oru(
+    control_id,
+    placer_order_number,
+    filler_order_number,
+    patient,
+    patient_id,
+    observations,
+    application,
+    facility,
+    receiving_application="",
+    receiving_facility="",
+    timestamp="",
+):
+    """
+    Builds a result message for the published results of an order.
+
+    Args:
+        control_id (str): The message id.
+        placer_order_number (str): The sender's order number.
+        filler_order_number (str): The laboratory order number.
+        patient (PatientInfo): The patient, with the sender's identifier.
+        patient_id (str): The laboratory patient id (MRN), sent in `PID-2`.
+        observations (list[ResultObservation]): The results.
+        application (str): The laboratory system (`MSH-3`).
+        facility (str): The laboratory (`MSH-4`).
+        receiving_application (str): The system the order came from.
+        receiving_facility (str): The facility the order came from.
+        timestamp (str): The message time, `YYYYMMDDHHMMSS`.
+
+    Returns:
+        str: The `ORU^R01` message.
+    """
+    placer = escape(placer_order_number)
+    filler = escape(filler_order_number)
+    segments = [
+        _msh(
+            application,
+            facility,
+            receiving_application,
+            receiving_facility,
+            "ORU^R01",
+            control_id,
+            timestamp,
+        ),
+        _pid(patient, patient_id),
+        f"ORC|RE|{placer}|{filler}",
+    ]
+    for number, observation in enumerate(observations, start=1):
+        service = f"{escape(observation.test)}^{escape(observation.test_name)}"
+        segments.append(
+            f"OBR|{number}|{placer}|{filler}|{service}|||{observation.observed_at}"
+            + "|" * 15
+            + f"{observation.observed_at}|||F"
+        )
+        segments.append(
+            "|".join(
+                [
+                    "OBX",
+                    "1",
+                    observation.value_type,
+                    service,
+                    "",
+                    escape(observation.value),
+                    escape(observation.unit),
+                    escape(observation.reference_range),
+                    escape(observation.flags),
+                    "",
+                    "",
+                    "F",
+                    "",
+                    "",
+                    observation.observed_at,
+                ]
+            )
+        )
+    return "\r".join(segments)
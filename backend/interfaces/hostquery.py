@@ -0,0 +1,214 @@
+"""Host-query worklist index for bidirectional analyzers.
+
+A bidirectional analyzer reads a tube's barcode and asks the host which
+tests to run on it, and waits for the answer before it can go on. Rather
+than walking sample → order item → test and the instrument code mapping on
+every question, the tests of each barcode are kept in the shared cache:
+
+    hostquery:<barcode> → ["GLU", "K", ...]
+
+Entries are written when orders are created and rewritten, from one query
+per order batch, when orders are edited or cancelled or samples rejected.
+A missing entry (evicted or never written) is rebuilt from the database and
+added, never overwriting a fresher entry. Barcodes with no active tests
+are stored as an empty list so that a stale miss fill cannot bring their
+tests back.
+
+Catalog codes are translated to each analyzer's codes with the compiled
+`InstrumentTestCode` mapping, itself cached until a mapping or the catalog
+changes. A warm lookup runs no queries.
+"""
+
+import logging
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache import cache_aside
+from orders.models import OrderStatus
+from samples.models import Sample, SampleStatus
+
+from .models import InstrumentTestCode
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "hostquery:"
+
+
+@dataclass(frozen=True)
+class CodeMap:
+    """
+    Translates between catalog test codes and analyzer test codes.
+
+    Mappings for a specific analyzer take precedence over mappings for
+    every analyzer (`instrument` ""); unmapped codes are used as they are.
+
+    Attributes:
+        to_instrument (dict[tuple[str, str], str]): Analyzer codes keyed by
+            analyzer and catalog code.
+        to_catalog (dict[tuple[str, str], str]): Catalog codes keyed by
+            analyzer and analyzer code.
+    """
+
+    to_instrument: dict
+    to_catalog: dict
+
+    def instrument_code(self, instrument, test):
+        """Returns the analyzer's code for a catalog test code."""
+        return self.to_instrument.get(
+            (instrument, test), self.to_instrument.get(("", test), test)
+        )
+
+    def catalog_code(self, instrument, code):
+        """Returns the catalog test code for an analyzer's code."""
+        return self.to_catalog.get(
+            (instrument, code), self.to_catalog.get(("", code), code)
+        )
+
+
+def _load_code_map():
+    to_instrument, to_catalog = {}, {}
+    for instrument, test, code in InstrumentTestCode.objects.values_list(
+        "instrument", "test__code", "code"
+    ):
+        to_instrument[instrument, test] = code
+        to_catalog[instrument, code] = test
+    return CodeMap(to_instrument, to_catalog)
+
+
+def get_code_map():
+    """
+    Returns the compiled instrument code mapping.
+
+    Returns:
+        CodeMap: The mapping, cached until a mapping or the catalog changes.
+    """
+    return cache_aside(
+        "instrument-test-codes",
+        _load_code_map,
+        namespaces=["instrument-codes", "catalog"],
+    )
+
+
+def _key(barcode):
+    return f"{KEY_PREFIX}{barcode}"
+
+
+def _entries(samples):
+    entries = {}
+    for barcode, test, sample_status, item_status in samples.values_list(
+        "barcode", "order_items__test__code", "status", "order_items__status"
+    ).order_by("barcode", "order_items__id"):
+        tests = entries.setdefault(barcode, [])
+        if (
+            test is not None
+            and sample_status != SampleStatus.REJECTED
+            and item_status != OrderStatus.CANCELLED
+        ):
+            tests.append(test)
+    return entries
+
+
+def index_samples(entries):
+    """
+    Writes index entries.
+
+    Args:
+        entries (dict[str, list[str]]): The catalog test codes of each
+            barcode; an empty list for barcodes with no active tests.
+    """
+    try:
+        cache.set_many(
+            {_key(barcode): tests for barcode, tests in entries.items()},
+            settings.HOST_QUERY_TTL,
+        )
+    except Exception:
+        logger.exception("Could not index %d barcodes", len(entries))
+
+
+def index_samples_on_commit(entries):
+    """
+    Writes index entries once the transaction commits.
+
+    Args:
+        entries (dict[str, list[str]]): The catalog test codes of each
+            barcode.
+    """
+    transaction.on_commit(lambda: index_samples(entries))
+
+
+def refresh_orders(order_ids):
+    """
+    Rewrites the index entries of every sample of some orders.
+
+    Args:
+        order_ids (Iterable[int]): The orders.
+    """
+    index_samples(_entries(Sample.objects.filter(order_id__in=order_ids)))
+
+
+def refresh_orders_on_commit(order_ids):
+    """
+    Rewrites the index entries of some orders once the transaction commits.
+
+    Args:
+        order_ids (Iterable[int]): The orders.
+    """
+    order_ids = list(order_ids)
+    transaction.on_commit(lambda: refresh_orders(order_ids))
+
+
+def ordered_tests(barcodes):
+    """
+    Returns the active catalog tests of some barcodes.
+
+    Args:
+        barcodes (Iterable[str]): The sample barcodes.
+
+    Returns:
+        dict[str, list[str]]: The catalog test codes of each barcode; empty
+            for unknown barcodes and samples with no active tests.
+    """
+    barcodes = list(dict.fromkeys(barcodes))
+    try:
+        cached = cache.get_many([_key(barcode) for barcode in barcodes])
+    except Exception:
+        logger.exception("Host-query index read failed")
+        cached = {}
+    tests = {
+        barcode: cached[_key(barcode)]
+        for barcode in barcodes
+        if _key(barcode) in cached
+    }
+    missing = [barcode for barcode in barcodes if barcode not in tests]
+    if missing:
+        rebuilt = _entries(Sample.objects.filter(barcode__in=missing))
+        for barcode in missing:
+            tests[barcode] = rebuilt.get(barcode, [])
+            try:
+                cache.add(_key(barcode), tests[barcode], settings.HOST_QUERY_TTL)
+            except Exception:
+                logger.exception("Could not index barcode %s", barcode)
+    return tests
+
+
+def lookup(barcodes, instrument=""):
+    """
+    Answers a host query: the tests an analyzer should run on each sample.
+
+    Args:
+        barcodes (Iterable[str]): The sample barcodes.
+        instrument (str): The analyzer name, selecting its test codes.
+
+    Returns:
+        dict[str, list[str]]: The analyzer test codes of each barcode;
+            empty for unknown barcodes and samples with no active tests.
+    """
+    tests = ordered_tests(barcodes)
+    code_map = get_code_map()
+    return {
+        barcode: [code_map.instrument_code(instrument, test) for test in codes]
+        for barcode, codes in tests.items()
+    }
@@ -0,0 +1,352 @@
+"""Asyncio ASTM listener accepting results from many analyzers at once.
+
+Every analyzer connection runs the E1381 receiver state machine in its own
+coroutine, so a slow or stalled instrument never blocks the others. Frames
+are acknowledged as soon as they are validated; complete messages are parsed
+and their results queued for one `ResultWriter`, which enters them in
+batches on a worker thread through the worksheet entry path. Writes are
+bulk and serialized, whatever the number of connections.
+
+Host queries from bidirectional analyzers are answered on the same
+connection from the host-query index (`hostquery.lookup`), which a warm
+cache serves without touching the database.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .astm import (
+    ACK,
+    ENQ,
+    EOT,
+    LF,
+    NAK,
+    STX,
+    ASTMError,
+    build_orders,
+    decode_frame,
+    encode_frames,
+    parse_message,
+    parse_queries,
+    send_frames,
+)
+from .hostquery import lookup
+from .services import ingest_observations
+
+logger = logging.getLogger(__name__)
+
+# Longest accepted frame, from STX to LF: 240 characters of text plus framing
+MAX_FRAME_BYTES = 1024
+
+
+@dataclass
+class ListenerStats:
+    """
+    Counters of a listener's activity.
+
+    Attributes:
+        connections (int): Analyzer connections accepted.
+        messages (int): Complete messages received.
+        invalid_messages (int): Messages that could not be parsed.
+        rejected_frames (int): Frames answered with NAK.
+        entered (int): Results entered.
+        rejected (int): Results that matched no enterable result or had an
+            invalid value.
+        batches (int): Bulk writes performed.
+        failed_batches (int): Bulk writes that raised an error.
+        queries (int): Host queries answered.
+    """
+
+    connections: int = 0
+    messages: int = 0
+    invalid_messages: int = 0
+    rejected_frames: int = 0
+    entered: int = 0
+    rejected: int = 0
+    batches: int = 0
+    failed_batches: int = 0
+    queries: int = 0
+
+
+def _ingest(observations, user):
+    # The writer thread lives as long as the listener; drop connections the
+    # database closed or that outlived CONN_MAX_AGE, as a request would.
+    close_old_connections()
+    return ingest_observations(observations, user)
+
+
+def _lookup(barcodes, instrument):
+    close_old_connections()
+    return lookup(barcodes, instrument)
+
+
+class ResultWriter:
+    """
+    Enters queued analyzer results in batches.
+
+    A batch is written once `batch_size` results are queued or
+    `flush_interval` seconds after its first result arrived.
+
+    Args:
+        user (User): The user results are entered as.
+        stats (ListenerStats): The counters to update.
+        batch_size (int): The most results written at once.
+        flush_interval (float): The longest wait, in seconds, for a batch to
+            fill up.
+    """
+
+    def __init__(self, user, stats, batch_size, flush_interval):
+        self.user = user
+        self.stats = stats
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = asyncio.Queue()
+
+    def put(self, observations):
+        """Queues the results of a message."""
+        for observation in observations:
+            self.queue.put_nowait(observation)
+
+    async def run(self):
+        """Writes batches until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if self.queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(
+                            await asyncio.wait_for(self.queue.get(), remaining)
+                        )
+                    except TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+            try:
+                await self.write(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def write(self, batch):
+        """Enters one batch on the database thread."""
+        try:
+            results, rejected = await sync_to_async(_ingest)(batch, self.user)
+        except Exception:
+            self.stats.failed_batches += 1
+            logger.exception("Could not enter %d analyzer results", len(batch))
+            return
+        self.stats.batches += 1
+        self.stats.entered += len(results)
+        self.stats.rejected += len(rejected)
+
+
+class ASTMListener:
+    """
+    Accepts analyzer connections and enters the results they send.
+
+    Args:
+        user (User): The user results are entered as.
+        host (str): The address to listen on.
+        port (int): The TCP port; 0 picks a free port.
+        batch_size (int): The most results entered in one write.
+        flush_interval (float): The longest wait, in seconds, before queued
+            results are written.
+        timeout (float): Seconds to wait for the next frame of a message
+            before discarding it.
+    """
+
+    def __init__(
+        self,
+        user,
+        host=None,
+        port=None,
+        batch_size=None,
+        flush_interval=None,
+        timeout=None,
+    ):
+        self.host = host or settings.ASTM_HOST
+        self.port = settings.ASTM_PORT if port is None else port
+        self.timeout = timeout or settings.ASTM_TIMEOUT
+        self.stats = ListenerStats()
+        self.writer = ResultWriter(
+            user,
+            self.stats,
+            batch_size or settings.ASTM_BATCH_SIZE,
+            settings.ASTM_FLUSH_INTERVAL if flush_interval is None else flush_interval,
+        )
+        self.server = None
+        self.writer_task = None
+        self.connections = set()
+
+    async def start(self):
+        """
+        Starts listening.
+
+        Returns:
+            int: The bound port.
+        """
+        self.writer_task = asyncio.create_task(self.writer.run())
+        self.server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port, limit=MAX_FRAME_BYTES
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        """Listens until cancelled, then writes the queued results."""
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def drain(self):
+        """
+        Waits until the connected analyzers have disconnected and every
+        result they sent has been written.
+        """
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.writer.queue.join()
+
+    async def close(self):
+        """
+        Stops listening, drops the open connections and writes the queued
+        results.
+        """
+        if self.server is not None:
+            self.server.close()
+            for connection in self.connections:
+                connection.cancel()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+        if self.writer_task is not None:
+            await self.writer.queue.join()
+            self.writer_task.cancel()
+            try:
+                await self.writer_task
+            except asyncio.CancelledError:
+                pass
+
+    async def handle_connection(self, reader, writer):
+        """Runs the receiver state machine for one analyzer connection."""
+        peer = writer.get_extra_info("peername")
+        task = asyncio.current_task()
+        self.connections.add(task)
+        self.stats.connections += 1
+        logger.info("Analyzer connected from %s", peer)
+        try:
+            while True:
+                control = await reader.read(1)
+                if not control:
+                    break
+                if control == ENQ:
+                    writer.write(ACK)
+                    await writer.drain()
+                    query = await self.receive_message(reader, writer, peer)
+                    if query is not None:
+                        await self.answer_query(reader, writer, peer, *query)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(task)
+            writer.close()
+            logger.info("Analyzer disconnected from %s", peer)
+
+    async def receive_message(self, reader, writer, peer):
+        """
+        Receives the frames of one message, after its ENQ was acknowledged.
+
+        Frames with a bad checksum or an unexpected number are answered with
+        NAK so the analyzer resends them; a repeated frame whose ACK was lost
+        is acknowledged again and ignored. The message ends with EOT.
+
+        Returns:
+            tuple[str, list[str]] | None: The analyzer name and the queried
+                barcodes if the message is a host query; results are queued
+                for the writer instead.
+        """
+        expected = 1
+        text = []
+        while True:
+            try:
+                control = await asyncio.wait_for(reader.readexactly(1), self.timeout)
+                if control == STX:
+                    frame = STX + await asyncio.wait_for(
+                        reader.readuntil(LF), self.timeout
+                    )
+            except TimeoutError:
+                logger.warning("Timed out receiving a message from %s", peer)
+                return
+            except asyncio.LimitOverrunError:
+                raise ConnectionError("Frame too long") from None
+
+            if control == EOT:
+                break
+            if control == ENQ:
+                # The analyzer restarted the transfer
+                expected, text = 1, []
+                reply = ACK
+            elif control != STX:
+                continue
+            else:
+                try:
+                    number, chunk, _ = decode_frame(frame)
+                except ASTMError:
+                    number = None
+                if number == expected % 8:
+                    text.append(chunk)
+                    expected += 1
+                    reply = ACK
+                elif number is not None and number == (expected - 1) % 8 and text:
+                    reply = ACK
+                else:
+                    self.stats.rejected_frames += 1
+                    reply = NAK
+            writer.write(reply)
+            await writer.drain()
+
+        if not text:
+            return None
+        self.stats.messages += 1
+        message = b"".join(text).decode("latin-1")
+        try:
+            sender, barcodes = parse_queries(message)
+            if barcodes:
+                return sender, barcodes
+            observations = parse_message(message)
+        except ASTMError as error:
+            self.stats.invalid_messages += 1
+            logger.warning("Invalid message from %s: %s", peer, error)
+            return None
+        self.writer.put(observations)
+        return None
+
+    async def answer_query(self, reader, writer, peer, sender, barcodes):
+        """
+        Sends the tests ordered on the queried samples, as the sender.
+
+        Samples with no active tests are left out of the answer; the analyzer
+        reads their absence as nothing to run.
+        """
+        specimens = await sync_to_async(_lookup)(barcodes, sender)
+        timestamp = timezone.localtime().strftime("%Y%m%d%H%M%S")
+        frames = encode_frames(build_orders(specimens, timestamp))
+        try:
+            answered = await send_frames(reader, writer, frames, self.timeout)
+        except TimeoutError:
+            answered = False
+        if answered:
+            self.stats.queries += 1
+        else:
+            logger.warning("Host query answer to %s was not acknowledged", peer)
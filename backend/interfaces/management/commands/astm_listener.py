@@ -0,0 +1,68 @@
+"""Management command to run the ASTM analyzer listener."""
+
+import asyncio
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from interfaces.listener import ASTMListener
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Accept ASTM result messages from analyzers and enter the results."""
+
+    help = (
+        "Listen for ASTM E1381/E1394 (LIS1-A/LIS2-A2) connections from "
+        "analyzers and enter the results they send"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--host",
+            default=settings.ASTM_HOST,
+            help=f"Address to listen on (default: {settings.ASTM_HOST})",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=settings.ASTM_PORT,
+            help=f"TCP port (default: {settings.ASTM_PORT})",
+        )
+        parser.add_argument(
+            "--user",
+            default=settings.INTERFACE_USERNAME,
+            help=(
+                "Username results are entered as "
+                f"(default: {settings.INTERFACE_USERNAME})"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(
+                f"User {options['user']} does not exist; create it or pass --user"
+            ) from None
+        if options["verbosity"] > 1:
+            logging.getLogger("interfaces").setLevel(logging.INFO)
+
+        listener = ASTMListener(user, host=options["host"], port=options["port"])
+        self.stdout.write(
+            f"Listening for analyzers on {options['host']}:{options['port']}"
+        )
+        try:
+            asyncio.run(listener.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        stats = listener.stats
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stopped after {stats.messages} messages: {stats.entered} results "
+                f"entered, {stats.rejected} rejected"
+            )
+        )
@@ -0,0 +1,80 @@
+"""Management command to send simulated analyzer results to a listener."""
+
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from interfaces.simulator import AnalyzerSimulator, pending_specimens
+
+
+class Command(BaseCommand):
+    """Send ASTM messages for the draft results of received samples."""
+
+    help = (
+        "Simulate analyzers: send an ASTM result message for every sample with "
+        "draft results to a running astm_listener"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--host", default="127.0.0.1", help="Listener address (default: 127.0.0.1)"
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=settings.ASTM_PORT,
+            help=f"Listener port (default: {settings.ASTM_PORT})",
+        )
+        parser.add_argument(
+            "--analyzers",
+            type=int,
+            default=1,
+            help="Concurrent analyzer connections (default: 1)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=None,
+            help="Most samples to send results for (default: all)",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        if options["analyzers"] < 1:
+            raise CommandError("--analyzers must be >= 1")
+        specimens = list(pending_specimens(options["limit"]).items())
+        if not specimens:
+            raise CommandError("No samples with draft results to send")
+
+        try:
+            sent = asyncio.run(self.send(specimens, options))
+        except OSError as error:
+            raise CommandError(f"Could not reach the listener: {error}") from None
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {sent} of {len(specimens)} messages from "
+                f"{options['analyzers']} analyzers"
+            )
+        )
+
+    async def send(self, specimens, options):
+        """
+        Sends one message per sample, spread over the analyzers.
+
+        Returns:
+            int: The number of acknowledged messages.
+        """
+        analyzers = options["analyzers"]
+
+        async def analyzer(number):
+            sent = 0
+            async with AnalyzerSimulator(
+                options["host"], options["port"], name=f"SIM{number}"
+            ) as simulator:
+                for barcode, results in specimens[number::analyzers]:
+                    sent += await simulator.send({barcode: results})
+            return sent
+
+        return sum(await asyncio.gather(*(analyzer(n) for n in range(analyzers))))
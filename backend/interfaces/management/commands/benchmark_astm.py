@@ -0,0 +1,250 @@
+"""Management command to benchmark ASTM result ingestion."""
+
+import asyncio
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from catalog.models import TestCatalog, TestParameter
+from core.benchmarking import (
+    LatencyRecorder,
+    format_summary,
+    run_metadata,
+    write_results,
+)
+from interfaces.listener import ASTMListener
+from interfaces.simulator import AnalyzerSimulator, simulated_value
+from orders.models import Order, OrderItem, OrderStatus
+from patients.models import Patient
+from results.models import Result, ResultStatus
+from samples.models import Sample, SampleStatus
+from users.models import User, UserRole
+
+
+def seed_messages(count, tests):
+    """
+    Creates received orders with draft results and their analyzer messages.
+
+    Args:
+        count (int): The number of orders, one message each.
+        tests (list[TestCatalog]): The tests of every order.
+
+    Returns:
+        list[dict[str, list[tuple]]]: The results of each order's samples, as
+            `AnalyzerSimulator.send` takes them.
+    """
+    parameters = TestParameter.for_test_codes(test.code for test in tests)
+    now = timezone.now()
+    with transaction.atomic():
+        patient = Patient.objects.create(
+            full_name="ASTM Benchmark",
+            dob=date(1980, 1, 1),
+            sex="M",
+            phone="03000000000",
+        )
+        orders = [
+            Order.objects.create(patient=patient, status=OrderStatus.IN_PROCESS)
+            for _ in range(count)
+        ]
+        items = OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, test=test, status=OrderStatus.IN_PROCESS)
+                for order in orders
+                for test in tests
+            ]
+        )
+        barcodes = Sample.allocate_barcodes(len(items))
+        samples = Sample.objects.bulk_create(
+            [
+                Sample(
+                    order_id=item.order_id,
+                    sample_type=item.test.sample_type,
+                    barcode=barcode,
+                    status=SampleStatus.RECEIVED,
+                    collected_at=now,
+                    received_at=now,
+                )
+                for item, barcode in zip(items, barcodes, strict=True)
+            ]
+        )
+        Sample.link_order_items(zip(samples, items, strict=True))
+        Result.objects.bulk_create(
+            [
+                Result(
+                    order_item=item,
+                    patient=patient,
+                    parameter_id=(
+                        parameters[item.test.code].parameter_id
+                        if item.test.code in parameters
+                        else None
+                    ),
+                    value="",
+                    status=ResultStatus.DRAFT,
+                )
+                for item in items
+            ]
+        )
+
+    messages = []
+    specimens = iter(zip(items, barcodes, strict=True))
+    for _ in orders:
+        message = {}
+        for _ in tests:
+            item, barcode = next(specimens)
+            test_parameter = parameters.get(item.test.code)
+            parameter = test_parameter.parameter if test_parameter else None
+            message[barcode] = [
+                (
+                    item.test.code,
+                    simulated_value(parameter),
+                    parameter.unit if parameter else "",
+                    "N",
+                )
+            ]
+        messages.append(message)
+    return messages
+
+
+class Command(BaseCommand):
+    """Measure how many analyzer messages the ASTM listener sustains."""
+
+    help = (
+        "Benchmark the ASTM listener: simulated analyzers send result messages "
+        "concurrently to an in-process listener, which enters them in bulk"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--analyzers",
+            type=int,
+            default=10,
+            help="Concurrent analyzer connections (default: 10)",
+        )
+        parser.add_argument(
+            "--messages",
+            type=int,
+            default=50,
+            help="Messages sent by each analyzer (default: 50)",
+        )
+        parser.add_argument(
+            "--tests-per-message",
+            type=int,
+            default=5,
+            help="Results per message, one sample each (default: 5)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Results entered per bulk write (default: ASTM_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=None,
+            help="JSON results file (default: benchmark-results/astm-*.json)",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        analyzers = options["analyzers"]
+        if min(analyzers, options["messages"], options["tests_per_message"]) < 1:
+            raise CommandError(
+                "--analyzers, --messages and --tests-per-message must be >= 1"
+            )
+        if options["batch_size"] is not None and options["batch_size"] < 1:
+            raise CommandError("--batch-size must be >= 1")
+
+        tests = list(
+            TestCatalog.objects.filter(is_active=True).order_by("id")[
+                : options["tests_per_message"]
+            ]
+        )
+        if not tests:
+            raise CommandError("The test catalog is empty. Run seed_data first.")
+        user, _ = User.objects.get_or_create(
+            username="benchmark", defaults={"role": UserRole.ADMIN}
+        )
+
+        self.stdout.write("Creating orders...")
+        messages = seed_messages(analyzers * options["messages"], tests)
+        self.stdout.write(
+            f"Sending {len(messages)} messages from {analyzers} analyzers..."
+        )
+        recorder = LatencyRecorder()
+        listener = ASTMListener(
+            user, host="127.0.0.1", port=0, batch_size=options["batch_size"]
+        )
+        try:
+            drained = asyncio.run(self.run(listener, messages, analyzers, recorder))
+        finally:
+            connections.close_all()
+
+        summary = recorder.summary()
+        stats = listener.stats
+        results = sum(len(message) for message in messages)
+        payload = {
+            "meta": run_metadata(
+                analyzers=analyzers,
+                messages=options["messages"],
+                tests_per_message=len(tests),
+                batch_size=listener.writer.batch_size,
+            ),
+            "summary": summary,
+            "messages_per_second": summary["rps"],
+            "results_per_second": stats.entered / drained if drained else None,
+            "ingest_seconds": drained,
+            "listener": vars(stats),
+        }
+        path = write_results("astm", payload, options["output"])
+
+        for line in format_summary(summary):
+            self.stdout.write(line)
+        self.stdout.write(
+            f"{summary['rps']:.1f} messages/s acknowledged; {stats.entered} of "
+            f"{results} results entered in {drained:.2f}s "
+            f"({payload['results_per_second'] or 0:.1f} results/s, "
+            f"{stats.batches} bulk writes)"
+        )
+        if stats.rejected or stats.failed_batches:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{stats.rejected} results rejected, "
+                    f"{stats.failed_batches} writes failed"
+                )
+            )
+        self.stdout.write(self.style.SUCCESS(f"✓ Results saved to {path}"))
+
+    async def run(self, listener, messages, analyzers, recorder):
+        """
+        Sends the messages from concurrent analyzers and waits for the writes.
+
+        Returns:
+            float: Seconds from the first message until every result was
+                written.
+        """
+        port = await listener.start()
+        try:
+
+            async def analyzer(number):
+                async with AnalyzerSimulator(
+                    "127.0.0.1", port, name=f"BENCH{number}"
+                ) as simulator:
+                    for message in messages[number::analyzers]:
+                        start = time.perf_counter()
+                        sent = await simulator.send(message)
+                        recorder.record(
+                            "message", time.perf_counter() - start, 200 if sent else 500
+                        )
+
+            recorder.start()
+            await asyncio.gather(*(analyzer(n) for n in range(analyzers)))
+            recorder.stop()
+            await listener.drain()
+            return time.perf_counter() - recorder.started
+        finally:
+            await listener.close()
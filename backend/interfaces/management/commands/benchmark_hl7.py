@@ -0,0 +1,300 @@
+"""Management command to benchmark the HL7 gateway."""
+
+import asyncio
+import time
+import uuid
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from catalog.models import TestCatalog, TestParameter
+from core.benchmarking import (
+    LatencyRecorder,
+    format_summary,
+    run_metadata,
+    write_results,
+)
+from interfaces.gateway import HL7Gateway, MLLPClient, OutboundSender
+from interfaces.hl7 import ACCEPT_CODES, PatientInfo, build_orm, parse_ack
+from interfaces.models import HL7Order, OutboundMessage
+from interfaces.services import enqueue_result_messages
+from interfaces.simulator import simulated_value
+from interfaces.standin import MLLPStandIn
+from orders.models import OrderItem
+from results.models import Result, ResultStatus
+
+# Orders whose results are queued per call
+ENQUEUE_CHUNK_SIZE = 200
+
+
+def order_messages(count, tests, run_id):
+    """
+    Builds new order messages for distinct orders of a few patients.
+
+    Args:
+        count (int): The number of messages.
+        tests (list[TestCatalog]): The tests of every order.
+        run_id (str): Makes the order numbers unique to this run.
+
+    Returns:
+        list[str]: The `ORM^O01` messages.
+    """
+    codes = [test.code for test in tests]
+    timestamp = timezone.localtime().strftime("%Y%m%d%H%M%S")
+    return [
+        build_orm(
+            control_id=f"{run_id}-{number}",
+            placer_order_number=f"{run_id}-{number}",
+            patient=PatientInfo(
+                identifier=f"{run_id}-P{number % 50}",
+                full_name=f"HL7 Benchmark {number % 50}",
+                dob=date(1980, 1, 1),
+                sex="F",
+                phone="03000000000",
+            ),
+            tests=codes,
+            sending_facility="BENCHMARK",
+            timestamp=timestamp,
+        )
+        for number in range(count)
+    ]
+
+
+def publish_orders(order_ids):
+    """
+    Publishes simulated results for every item of the orders.
+
+    Returns:
+        list[int]: The published results.
+    """
+    items = list(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .select_related("test", "order")
+        .prefetch_related("results")
+    )
+    parameters = TestParameter.for_test_codes({item.test.code for item in items})
+    now = timezone.now()
+    with transaction.atomic():
+        Result.objects.bulk_create(
+            [
+                Result(
+                    order_item=item,
+                    patient_id=item.order.patient_id,
+                    value="",
+                )
+                for item in items
+                if not item.results.all()
+            ]
+        )
+        results = list(
+            Result.objects.filter(order_item__order_id__in=order_ids).select_related(
+                "order_item__test"
+            )
+        )
+        for result in results:
+            test_parameter = parameters.get(result.order_item.test.code)
+            parameter = test_parameter.parameter if test_parameter else None
+            result.value = simulated_value(parameter)
+            result.unit = parameter.unit if parameter else ""
+            result.status = ResultStatus.PUBLISHED
+            result.published_at = now
+        Result.objects.bulk_update(
+            results, ["value", "unit", "status", "published_at"], batch_size=500
+        )
+    return [result.pk for result in results]
+
+
+class Command(BaseCommand):
+    """Measure how many HL7 messages the gateway sustains each way."""
+
+    help = (
+        "Benchmark the HL7 gateway: concurrent senders submit ORM^O01 orders "
+        "to an in-process gateway, then the ORU^R01 messages of their "
+        "published results are delivered to a local MLLP stand-in"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--senders",
+            type=int,
+            default=10,
+            help="Concurrent order connections (default: 10)",
+        )
+        parser.add_argument(
+            "--messages",
+            type=int,
+            default=50,
+            help="Order messages sent by each connection (default: 50)",
+        )
+        parser.add_argument(
+            "--tests-per-order",
+            type=int,
+            default=3,
+            help="Tests per order (default: 3)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Orders created per transaction (default: HL7_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            "--outbound-batch-size",
+            type=int,
+            default=None,
+            help="Result messages claimed per batch "
+            "(default: HL7_OUTBOUND_BATCH_SIZE)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=None,
+            help="JSON results file (default: benchmark-results/hl7-*.json)",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        senders = options["senders"]
+        if min(senders, options["messages"], options["tests_per_order"]) < 1:
+            raise CommandError(
+                "--senders, --messages and --tests-per-order must be >= 1"
+            )
+        for option in ("batch_size", "outbound_batch_size"):
+            if options[option] is not None and options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be >= 1")
+
+        tests = list(
+            TestCatalog.objects.filter(is_active=True).order_by("id")[
+                : options["tests_per_order"]
+            ]
+        )
+        if not tests:
+            raise CommandError("The test catalog is empty. Run seed_data first.")
+
+        run_id = uuid.uuid4().hex[:8].upper()
+        messages = order_messages(senders * options["messages"], tests, run_id)
+        self.stdout.write(
+            f"Sending {len(messages)} orders from {senders} connections..."
+        )
+        recorder = LatencyRecorder()
+        gateway = HL7Gateway(host="127.0.0.1", port=0, batch_size=options["batch_size"])
+        try:
+            asyncio.run(self.send_orders(gateway, messages, senders, recorder))
+        finally:
+            connections.close_all()
+        summary = recorder.summary()
+
+        order_ids = list(
+            HL7Order.objects.filter(
+                sending_facility="BENCHMARK", placer_order_number__startswith=run_id
+            ).values_list("order_id", flat=True)
+        )
+        self.stdout.write(f"Publishing the results of {len(order_ids)} orders...")
+        result_ids = publish_orders(order_ids)
+        started = time.perf_counter()
+        for start in range(0, len(order_ids), ENQUEUE_CHUNK_SIZE):
+            chunk = set(order_ids[start : start + ENQUEUE_CHUNK_SIZE])
+            with transaction.atomic():
+                enqueue_result_messages(
+                    Result.objects.filter(
+                        pk__in=result_ids, order_item__order_id__in=chunk
+                    ).values_list("pk", flat=True)
+                )
+        enqueue_seconds = time.perf_counter() - started
+        queued = OutboundMessage.objects.filter(order_id__in=order_ids).count()
+
+        self.stdout.write(f"Delivering {queued} result messages...")
+        sender = OutboundSender(
+            host="127.0.0.1",
+            port=0,
+            batch_size=options["outbound_batch_size"],
+            poll_interval=0,
+            retry_delay=0,
+        )
+        try:
+            deliver_seconds, standin = asyncio.run(self.deliver(sender))
+        finally:
+            connections.close_all()
+
+        stats = gateway.stats
+        payload = {
+            "meta": run_metadata(
+                senders=senders,
+                messages=options["messages"],
+                tests_per_order=len(tests),
+                batch_size=gateway.writer.batch_size,
+                outbound_batch_size=sender.batch_size,
+            ),
+            "inbound": {
+                "summary": summary,
+                "messages_per_second": summary["rps"],
+                "gateway": vars(stats),
+            },
+            "outbound": {
+                "messages": queued,
+                "enqueue_seconds": enqueue_seconds,
+                "deliver_seconds": deliver_seconds,
+                "messages_per_second": (
+                    sender.stats.sent / deliver_seconds if deliver_seconds else None
+                ),
+                "received": len(standin.received),
+                "sender": vars(sender.stats),
+            },
+        }
+        path = write_results("hl7", payload, options["output"])
+
+        for line in format_summary(summary):
+            self.stdout.write(line)
+        self.stdout.write(
+            f"Inbound: {summary['rps']:.1f} orders/s acknowledged; "
+            f"{stats.accepted} accepted, {stats.rejected} rejected in "
+            f"{stats.batches} transactions"
+        )
+        self.stdout.write(
+            f"Outbound: {sender.stats.sent} of {queued} result messages in "
+            f"{deliver_seconds:.2f}s "
+            f"({payload['outbound']['messages_per_second'] or 0:.1f} messages/s)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"✓ Results saved to {path}"))
+
+    async def send_orders(self, gateway, messages, senders, recorder):
+        """Sends the order messages from concurrent connections."""
+        port = await gateway.start()
+        try:
+
+            async def connection(number):
+                async with MLLPClient("127.0.0.1", port) as client:
+                    for message in messages[number::senders]:
+                        start = time.perf_counter()
+                        code, _, _ = parse_ack(await client.send(message))
+                        recorder.record(
+                            "order",
+                            time.perf_counter() - start,
+                            200 if code in ACCEPT_CODES else 500,
+                        )
+
+            recorder.start()
+            await asyncio.gather(*(connection(n) for n in range(senders)))
+            recorder.stop()
+            await gateway.drain()
+        finally:
+            await gateway.close()
+
+    async def deliver(self, sender):
+        """
+        Delivers the queued messages to a stand-in receiver.
+
+        Returns:
+            tuple[float, MLLPStandIn]: The seconds taken and the receiver.
+        """
+        standin = MLLPStandIn()
+        sender.port = await standin.start()
+        try:
+            started = time.perf_counter()
+            await sender.run(stop_when_idle=True)
+            return time.perf_counter() - started, standin
+        finally:
+            await standin.close()
@@ -0,0 +1,90 @@
+"""Management command to run the HL7 v2 gateway."""
+
+import asyncio
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from interfaces.gateway import HL7Gateway, OutboundSender
+
+
+class Command(BaseCommand):
+    """Receive HL7 orders and send the results of published orders."""
+
+    help = (
+        "Accept ORM^O01 order messages from hospital systems over MLLP and "
+        "deliver the queued ORU^R01 result messages"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--host",
+            default=settings.HL7_HOST,
+            help=f"Address to listen on (default: {settings.HL7_HOST})",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=settings.HL7_PORT,
+            help=f"TCP port (default: {settings.HL7_PORT})",
+        )
+        parser.add_argument(
+            "--outbound-host",
+            default=settings.HL7_OUTBOUND_HOST,
+            help="Hospital system address results are sent to "
+            "(default: HL7_OUTBOUND_HOST; results are not sent when empty)",
+        )
+        parser.add_argument(
+            "--outbound-port",
+            type=int,
+            default=settings.HL7_OUTBOUND_PORT,
+            help=f"Hospital system port (default: {settings.HL7_OUTBOUND_PORT})",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        if options["verbosity"] > 1:
+            logging.getLogger("interfaces").setLevel(logging.INFO)
+
+        gateway = HL7Gateway(host=options["host"], port=options["port"])
+        sender = None
+        self.stdout.write(
+            f"Listening for orders on {options['host']}:{options['port']}"
+        )
+        if options["outbound_host"]:
+            sender = OutboundSender(
+                host=options["outbound_host"], port=options["outbound_port"]
+            )
+            self.stdout.write(
+                f"Sending results to {options['outbound_host']}:"
+                f"{options['outbound_port']}"
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING("No outbound host; result messages stay queued")
+            )
+
+        try:
+            asyncio.run(self.run(gateway, sender))
+        except KeyboardInterrupt:
+            pass
+        stats = gateway.stats
+        summary = (
+            f"Stopped after {stats.messages} messages: {stats.accepted} orders "
+            f"accepted, {stats.rejected} rejected"
+        )
+        if sender is not None:
+            summary += (
+                f"; {sender.stats.sent} result messages sent, "
+                f"{sender.stats.failed} failed"
+            )
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    async def run(self, gateway, sender):
+        """Runs the gateway and the sender until interrupted."""
+        tasks = [gateway.serve_forever()]
+        if sender is not None:
+            tasks.append(sender.run())
+        await asyncio.gather(*tasks)
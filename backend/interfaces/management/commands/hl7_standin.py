@@ -0,0 +1,58 @@
+"""Management command to run a local stand-in for a hospital HL7 receiver."""
+
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from interfaces.standin import MLLPStandIn
+
+
+class Command(BaseCommand):
+    """Acknowledge the HL7 messages sent by the gateway."""
+
+    help = (
+        "Run an MLLP receiver standing in for the hospital system: it "
+        "acknowledges every result message the gateway sends"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--host",
+            default="127.0.0.1",
+            help="Address to listen on (default: 127.0.0.1)",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=settings.HL7_OUTBOUND_PORT,
+            help=f"TCP port (default: {settings.HL7_OUTBOUND_PORT})",
+        )
+        parser.add_argument(
+            "--fail-every",
+            type=int,
+            default=0,
+            help="Answer every n-th message with an error (default: never)",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        if options["fail_every"] < 0:
+            raise CommandError("--fail-every must be >= 0")
+        standin = MLLPStandIn(
+            host=options["host"], port=options["port"], fail_every=options["fail_every"]
+        )
+        self.stdout.write(
+            f"Acknowledging HL7 messages on {options['host']}:{options['port']}"
+        )
+        try:
+            asyncio.run(standin.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Received {len(standin.received)} messages, "
+                f"{standin.errors} answered with an error"
+            )
+        )
@@ -0,0 +1,125 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("orders", "0002_alter_order_status_alter_orderitem_status"),
+        ("patients", "0003_patient_age_days_patient_age_months_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HL7Order",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("placer_order_number", models.CharField(max_length=50)),
+                ("patient_identifier", models.CharField(max_length=50)),
+                ("sending_application", models.CharField(blank=True, max_length=100)),
+                ("sending_facility", models.CharField(blank=True, max_length=100)),
+                ("control_id", models.CharField(blank=True, max_length=50)),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "order",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hl7",
+                        to="orders.order",
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hl7_orders",
+                        to="patients.patient",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "hl7_orders",
+                "ordering": ["-received_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["sending_facility", "patient_identifier"],
+                        name="hl7_orders_sending_1816a1_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("sending_facility", "placer_order_number"),
+                        name="unique_hl7_placer_order",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="OutboundMessage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("message_type", models.CharField(max_length=20)),
+                ("control_id", models.CharField(max_length=50, unique=True)),
+                ("payload", models.TextField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("SENT", "Sent"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="PENDING",
+                        max_length=20,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                (
+                    "next_attempt_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="outbound_messages",
+                        to="orders.order",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "hl7_outbound_messages",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="hl7_outboun_status_6124da_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_testparameter_delta_thresholds"),
+        ("interfaces", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InstrumentTestCode",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("instrument", models.CharField(blank=True, max_length=100)),
+                ("code", models.CharField(max_length=50)),
+                (
+                    "test",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="instrument_codes",
+                        to="catalog.testcatalog",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "instrument_test_codes",
+                "ordering": ["instrument", "code"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("instrument", "test"), name="unique_instrument_test"
+                    ),
+                    models.UniqueConstraint(
+                        fields=("instrument", "code"), name="unique_instrument_code"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,150 @@
+"""Interface models."""
+
+from django.db import models
+from django.utils import timezone
+
+from catalog.models import TestCatalog
+from orders.models import Order
+from patients.models import Patient
+
+
+class InstrumentTestCode(models.Model):
+    """
+    Maps a catalog test to the code an analyzer uses for it.
+
+    Tests without a mapping use their catalog code.
+
+    Attributes:
+        instrument (CharField): The analyzer name from its ASTM header;
+            empty to apply to every analyzer without its own mapping.
+        test (ForeignKey): The catalog test.
+        code (CharField): The analyzer's test code.
+    """
+
+    instrument = models.CharField(max_length=100, blank=True)
+    test = models.ForeignKey(
+        TestCatalog, on_delete=models.CASCADE, related_name="instrument_codes"
+    )
+    code = models.CharField(max_length=50)
+
+    class Meta:
+        db_table = "instrument_test_codes"
+        ordering = ["instrument", "code"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["instrument", "test"], name="unique_instrument_test"
+            ),
+            models.UniqueConstraint(
+                fields=["instrument", "code"], name="unique_instrument_code"
+            ),
+        ]
+
+    def __str__(self):
+        """Returns a string representation of the mapping."""
+        return f"{self.instrument or '*'}: {self.code} → {self.test_id}"
+
+
+class HL7Order(models.Model):
+    """
+    Links an order to the HL7 order message it was created from.
+
+    Attributes:
+        order (OneToOneField): The created order.
+        patient (ForeignKey): The matched or registered patient.
+        placer_order_number (CharField): The sender's order number.
+        patient_identifier (CharField): The sender's patient id.
+        sending_application (CharField): The system the order came from.
+        sending_facility (CharField): The facility the order came from.
+        control_id (CharField): The id of the order message.
+        received_at (DateTimeField): The timestamp the order was received.
+    """
+
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, related_name="hl7")
+    patient = models.ForeignKey(
+        Patient, on_delete=models.CASCADE, related_name="hl7_orders"
+    )
+    placer_order_number = models.CharField(max_length=50)
+    patient_identifier = models.CharField(max_length=50)
+    sending_application = models.CharField(max_length=100, blank=True)
+    sending_facility = models.CharField(max_length=100, blank=True)
+    control_id = models.CharField(max_length=50, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "hl7_orders"
+        ordering = ["-received_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sending_facility", "placer_order_number"],
+                name="unique_hl7_placer_order",
+            )
+        ]
+        indexes = [models.Index(fields=["sending_facility", "patient_identifier"])]
+
+    def __str__(self):
+        """Returns a string representation of the link."""
+        return f"{self.placer_order_number} → {self.order_id}"
+
+
+class OutboundStatus(models.TextChoices):
+    """
+    Enumeration for the delivery status of an outbound message.
+    """
+
+    PENDING = "PENDING", "Pending"
+    SENDING = "SENDING", "Sending"
+    SENT = "SENT", "Sent"
+    FAILED = "FAILED", "Failed"
+
+
+class OutboundMessage(models.Model):
+    """
+    An HL7 message queued for delivery to the hospital system.
+
+    Messages are written in the transaction that publishes the results they
+    report, so none is lost if the gateway is down, and are sent by the
+    gateway's outbound sender, which claims them by setting `worker` and
+    `claimed_at`.
+
+    Attributes:
+        order (ForeignKey): The order the message reports on.
+        message_type (CharField): The message type, e.g. `ORU^R01`.
+        control_id (CharField): The message id the acknowledgement refers to.
+        payload (TextField): The message.
+        status (CharField): The delivery status.
+        attempts (PositiveIntegerField): The delivery attempts made.
+        next_attempt_at (DateTimeField): When the message is next due.
+        last_error (TextField): The error of the last failed attempt.
+        created_at (DateTimeField): The timestamp the message was queued.
+        sent_at (DateTimeField): The timestamp the message was acknowledged.
+        worker (CharField): The sender that claimed the message.
+        claimed_at (DateTimeField): The timestamp the message was last claimed.
+    """
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="outbound_messages"
+    )
+    message_type = models.CharField(max_length=20)
+    control_id = models.CharField(max_length=50, unique=True)
+    payload = models.TextField()
+    status = models.CharField(
+        max_length=20,
+        choices=OutboundStatus.choices,
+        default=OutboundStatus.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "hl7_outbound_messages"
+        ordering = ["id"]
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+    def __str__(self):
+        """Returns a string representation of the message."""
+        return f"{self.message_type} {self.control_id} ({self.status})"
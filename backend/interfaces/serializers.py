@@ -0,0 +1,20 @@
+"""Interface serializers."""
+
+from rest_framework import serializers
+
+from .models import InstrumentTestCode
+
+
+class InstrumentTestCodeSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the InstrumentTestCode model.
+
+    Exposes the catalog code of the mapped test alongside its id.
+    """
+
+    test_code = serializers.CharField(source="test.code", read_only=True)
+
+    class Meta:
+        model = InstrumentTestCode
+        fields = ["id", "instrument", "test", "test_code", "code"]
+        read_only_fields = ["id"]
@@ -0,0 +1,304 @@
+"""Services of the analyzer and hospital system interfaces."""
+
+import logging
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from catalog.models import TestCatalog
+from events.broker import publish_events
+from orders.services import create_order
+from patients.models import Patient
+from results.models import Result, ResultStatus
+from results.services import prepare_entries, save_worksheet
+
+from .hl7 import HL7Error, PatientInfo, ResultObservation, build_oru
+from .hostquery import get_code_map
+from .models import HL7Order, OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+
+def _entry(observation, code_map):
+    entry = {
+        "barcode": observation.barcode,
+        "test": code_map.catalog_code(observation.sender, observation.test),
+        "value": observation.value,
+    }
+    if observation.unit:
+        entry["unit"] = observation.unit
+    if observation.flags:
+        entry["flags"] = observation.flags
+    return entry
+
+
+def _length_error(observation):
+    for field in ("value", "unit", "flags"):
+        limit = Result._meta.get_field(field).max_length
+        if len(getattr(observation, field)) > limit:
+            return {field: [f"Ensure this field has no more than {limit} characters"]}
+    if not observation.value:
+        return {"value": ["This field may not be blank"]}
+    return {}
+
+
+def ingest_observations(observations, user):
+    """
+    Enters analyzer results through the worksheet entry path.
+
+    The observations are matched to draft results by sample barcode and
+    test code, translated from the analyzer's code with the instrument code
+    mapping, validated like worksheet rows and saved with one
+    `bulk_update`, so they get the same delta checks, autoverification and
+    critical-value alerts as manually entered results. Unlike a worksheet,
+    invalid observations are rejected one by one and the valid ones are
+    still saved.
+
+    Args:
+        observations (list[Observation]): The results reported by analyzers.
+        user (User): The user the results are entered as.
+
+    Returns:
+        tuple[list[Result], list[tuple[Observation, dict]]]: The entered
+            results, and the rejected observations with their errors.
+    """
+    errors = [_length_error(observation) for observation in observations]
+    valid = [
+        observation
+        for observation, error in zip(observations, errors, strict=True)
+        if not error
+    ]
+    code_map = get_code_map()
+    with transaction.atomic():
+        cleaned, entry_errors = prepare_entries(
+            [_entry(item, code_map) for item in valid]
+        )
+        results = save_worksheet(cleaned, user) if cleaned else []
+        publish_events("result.entered", results)
+        publish_events(
+            "result.verified",
+            [result for result in results if result.status == ResultStatus.VERIFIED],
+        )
+
+    entry_errors = iter(entry_errors)
+    rejected = []
+    for observation, error in zip(observations, errors, strict=True):
+        error = error or next(entry_errors)
+        if error:
+            rejected.append((observation, error))
+            logger.warning(
+                "Rejected %s result for sample %s from %s: %s",
+                observation.test,
+                observation.barcode,
+                observation.sender or "analyzer",
+                error,
+            )
+    return results, rejected
+
+
+def _register_patient(info):
+    if not info.full_name:
+        raise HL7Error("PID-5 patient name is required")
+    try:
+        Patient.phone_validator(info.phone)
+    except ValidationError:
+        raise HL7Error("PID-13 phone must be a valid Pakistani mobile number") from None
+    return Patient.objects.create(
+        full_name=info.full_name[:255], dob=info.dob, sex=info.sex, phone=info.phone
+    )
+
+
+def accept_orders(messages):
+    """
+    Creates the orders of a batch of HL7 order messages.
+
+    Tests, known patients and already received orders are looked up once
+    for the whole batch, and every order is created through `create_order`
+    in one transaction, each under its own savepoint so an invalid message
+    does not undo the others. The patient is matched by the sender's
+    patient id from an earlier order, or by MRN, and registered otherwise.
+    A message whose placer order number was already received (a resend
+    after a lost acknowledgement) returns the existing order.
+
+    Args:
+        messages (list[OrderMessage]): The parsed order messages.
+
+    Returns:
+        list[tuple[int | None, str]]: For each message, the id of its order
+            and an empty string, or None and the error.
+    """
+    tests = dict(
+        TestCatalog.objects.filter(
+            code__in={code for message in messages for code in message.tests},
+            is_active=True,
+        ).values_list("code", "id")
+    )
+    placers = {
+        (message.header.sending_facility, message.placer_order_number)
+        for message in messages
+    }
+    received = {
+        (facility, placer): order_id
+        for facility, placer, order_id in HL7Order.objects.filter(
+            placer_order_number__in={placer for _, placer in placers}
+        ).values_list("sending_facility", "placer_order_number", "order_id")
+        if (facility, placer) in placers
+    }
+    identifiers = {message.patient.identifier for message in messages}
+    patients = dict(
+        Patient.objects.filter(mrn__in=identifiers).values_list("mrn", "id")
+    )
+    patients.update(
+        ((facility, identifier), patient_id)
+        for facility, identifier, patient_id in HL7Order.objects.filter(
+            patient_identifier__in=identifiers
+        ).values_list("sending_facility", "patient_identifier", "patient_id")
+    )
+
+    outcomes = []
+    with transaction.atomic():
+        for message in messages:
+            header = message.header
+            key = (header.sending_facility, message.placer_order_number)
+            patient_key = (header.sending_facility, message.patient.identifier)
+            if key in received:
+                outcomes.append((received[key], ""))
+                continue
+            test_codes = list(dict.fromkeys(message.tests))
+            unknown = [code for code in test_codes if code not in tests]
+            if unknown:
+                outcomes.append((None, f"Unknown test codes: {', '.join(unknown)}"))
+                continue
+            try:
+                with transaction.atomic():
+                    patient_id = patients.get(patient_key) or patients.get(
+                        message.patient.identifier
+                    )
+                    if patient_id is None:
+                        patient_id = _register_patient(message.patient).pk
+                    order = create_order(
+                        test_ids=[tests[code] for code in test_codes],
+                        patient_id=patient_id,
+                        priority=message.priority,
+                        notes=f"HL7 order {message.placer_order_number}",
+                    )
+                    HL7Order.objects.create(
+                        order=order,
+                        patient_id=patient_id,
+                        placer_order_number=message.placer_order_number[:50],
+                        patient_identifier=message.patient.identifier[:50],
+                        sending_application=header.sending_application[:100],
+                        sending_facility=header.sending_facility[:100],
+                        control_id=header.control_id[:50],
+                    )
+            except HL7Error as error:
+                outcomes.append((None, str(error)))
+                continue
+            except DatabaseError:
+                logger.exception(
+                    "Could not create HL7 order %s", message.placer_order_number
+                )
+                outcomes.append((None, "Could not create the order"))
+                continue
+            received[key] = order.pk
+            patients[patient_key] = patient_id
+            outcomes.append((order.pk, ""))
+    return outcomes
+
+
+def _value_type(value):
+    try:
+        Decimal(value)
+    except InvalidOperation:
+        return "ST"
+    return "NM"
+
+
+def _timestamp(moment):
+    return timezone.localtime(moment).strftime("%Y%m%d%H%M%S") if moment else ""
+
+
+def enqueue_result_messages(result_ids):
+    """
+    Queues `ORU^R01` messages for published results of HL7 orders.
+
+    Results of orders that did not come from a hospital system are ignored.
+    One message is written per order, in the caller's transaction, so the
+    messages are queued exactly when the results are published. The number
+    of queries does not depend on the number of results.
+
+    Args:
+        result_ids (Iterable[int]): The published results.
+
+    Returns:
+        list[OutboundMessage]: The queued messages.
+    """
+    result_ids = list(result_ids)
+    links = {
+        link.order_id: link
+        for link in HL7Order.objects.filter(
+            order__items__results__in=result_ids
+        ).distinct()
+    }
+    if not links:
+        return []
+    results = (
+        Result.objects.filter(pk__in=result_ids, order_item__order_id__in=links)
+        .select_related("order_item__order__patient", "order_item__test")
+        .order_by("order_item_id", "id")
+    )
+    by_order = {}
+    for result in results:
+        by_order.setdefault(result.order_item.order_id, []).append(result)
+
+    timestamp = _timestamp(timezone.now())
+    messages = []
+    for order_id, order_results in by_order.items():
+        link = links[order_id]
+        order = order_results[0].order_item.order
+        patient = order.patient
+        control_id = uuid.uuid4().hex[:20]
+        payload = build_oru(
+            control_id=control_id,
+            placer_order_number=link.placer_order_number,
+            filler_order_number=order.order_no,
+            patient=PatientInfo(
+                identifier=link.patient_identifier,
+                full_name=patient.full_name,
+                dob=patient.dob,
+                sex=patient.sex,
+                phone=patient.phone,
+            ),
+            patient_id=patient.mrn,
+            observations=[
+                ResultObservation(
+                    test=result.order_item.test.code,
+                    test_name=result.order_item.test.name,
+                    value=result.value,
+                    unit=result.unit,
+                    reference_range=result.reference_range,
+                    flags=result.flags,
+                    observed_at=_timestamp(result.published_at),
+                    value_type=_value_type(result.value),
+                )
+                for result in order_results
+            ],
+            application=settings.HL7_APPLICATION,
+            facility=settings.HL7_FACILITY,
+            receiving_application=link.sending_application,
+            receiving_facility=link.sending_facility,
+            timestamp=timestamp,
+        )
+        messages.append(
+            OutboundMessage(
+                order_id=order_id,
+                message_type="ORU^R01",
+                control_id=control_id,
+                payload=payload,
+            )
+        )
+    return OutboundMessage.objects.bulk_create(messages)
@@ -0,0 +1,14 @@
+"""Cache invalidation for instrument test codes."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate_on_commit
+
+from .models import InstrumentTestCode
+
+
+@receiver([post_save, post_delete], sender=InstrumentTestCode)
+def invalidate_instrument_codes(sender, **kwargs):
+    """Invalidates the compiled code mapping when a mapping changes."""
+    invalidate_on_commit("instrument-codes")
@@ -0,0 +1,229 @@
+"""Analyzer simulator sending ASTM result messages to a listener.
+
+Lets the interface be exercised and benchmarked without instruments: each
+`AnalyzerSimulator` is one analyzer connection running the E1381 sender
+side, and `pending_specimens` builds messages for the draft results of
+received samples. `AnalyzerSimulator.query` asks for the tests of some
+samples, as a bidirectional analyzer does, and receives the host's answer.
+"""
+
+import asyncio
+import random
+from decimal import Decimal
+
+from django.utils import timezone
+
+from catalog.models import TestParameter
+from results.models import Result, ResultStatus
+
+from .astm import (
+    ACK,
+    ENQ,
+    EOT,
+    LF,
+    NAK,
+    STX,
+    ASTMError,
+    build_message,
+    build_query,
+    decode_frame,
+    encode_frames,
+    parse_orders,
+    send_frames,
+)
+
+
+class AnalyzerSimulator:
+    """
+    Sends result messages over one connection, as an analyzer does.
+
+    Args:
+        host (str): The listener address.
+        port (int): The listener port.
+        name (str): The analyzer name sent in the header record.
+        timeout (float): Seconds to wait for each acknowledgement.
+    """
+
+    def __init__(self, host, port, name="SIMULATOR", timeout=15):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        """Opens the connection."""
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        """Closes the connection."""
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def exchange(self, data):
+        """Sends bytes and returns the listener's one-byte reply."""
+        self.writer.write(data)
+        await self.writer.drain()
+        return await asyncio.wait_for(self.reader.readexactly(1), self.timeout)
+
+    async def send(self, specimens):
+        """
+        Sends one message with the results of some samples.
+
+        Args:
+            specimens (dict[str, list[tuple]]): The results of each sample
+                barcode, as `(test, value, unit, flags)` tuples.
+
+        Returns:
+            bool: Whether every frame was acknowledged.
+        """
+        timestamp = timezone.localtime().strftime("%Y%m%d%H%M%S")
+        frames = encode_frames(build_message(self.name, specimens, timestamp))
+        return await self.send_frames(frames)
+
+    async def send_frames(self, frames):
+        """
+        Sends a message as prepared frames.
+
+        Args:
+            frames (list[bytes]): The frames, as built by `encode_frames`.
+
+        Returns:
+            bool: Whether every frame was acknowledged.
+        """
+        return await send_frames(self.reader, self.writer, frames, self.timeout)
+
+    async def query(self, barcodes):
+        """
+        Asks the host which tests to run on some samples.
+
+        Sends a request information message, then takes the receiver role
+        for the host's answer.
+
+        Args:
+            barcodes (list[str]): The sample barcodes.
+
+        Returns:
+            dict[str, list[str]] | None: The test codes of each barcode the
+                host has tests for, or None if the query was not accepted.
+
+        Raises:
+            TimeoutError: If the host does not answer in time.
+        """
+        timestamp = timezone.localtime().strftime("%Y%m%d%H%M%S")
+        frames = encode_frames(build_query(self.name, barcodes, timestamp))
+        if not await self.send_frames(frames):
+            return None
+        return parse_orders(await self.receive())
+
+    async def receive(self):
+        """
+        Receives one message from the host, acknowledging every frame.
+
+        Returns:
+            str: The message text.
+
+        Raises:
+            TimeoutError: If the host does not send in time.
+            ASTMError: If a frame is malformed.
+        """
+        control = await asyncio.wait_for(self.reader.readexactly(1), self.timeout)
+        if control != ENQ:
+            raise ASTMError("Expected ENQ from the host")
+        self.writer.write(ACK)
+        await self.writer.drain()
+        text = []
+        while True:
+            control = await asyncio.wait_for(self.reader.readexactly(1), self.timeout)
+            if control == EOT:
+                return b"".join(text).decode("latin-1")
+            if control != STX:
+                continue
+            frame = STX + await asyncio.wait_for(
+                self.reader.readuntil(LF), self.timeout
+            )
+            try:
+                _, chunk, _ = decode_frame(frame)
+            except ASTMError:
+                reply = NAK
+            else:
+                text.append(chunk)
+                reply = ACK
+            self.writer.write(reply)
+            await self.writer.drain()
+
+
+def simulated_value(parameter):
+    """
+    Picks a plausible value for a parameter.
+
+    Args:
+        parameter (Parameter | None): The measured parameter.
+
+    Returns:
+        str: One of its allowed values, or a number with its decimal places.
+    """
+    if parameter is None:
+        return "5.0"
+    options = [
+        option.strip()
+        for option in parameter.allowed_values.split(",")
+        if option.strip()
+    ]
+    if options:
+        return random.choice(options)
+    places = parameter.decimal_places if parameter.decimal_places is not None else 1
+    value = Decimal(random.uniform(1, 10)).quantize(Decimal(1).scaleb(-places))
+    return str(value)
+
+
+def pending_specimens(limit=None):
+    """
+    Builds simulated results for the draft results of received samples.
+
+    Args:
+        limit (int | None): The most samples to include.
+
+    Returns:
+        dict[str, list[tuple]]: `(test, value, unit, flags)` tuples keyed by
+            sample barcode, as `AnalyzerSimulator.send` takes them.
+    """
+    results = (
+        Result.objects.filter(status=ResultStatus.DRAFT)
+        .exclude(order_item__samples__barcode__isnull=True)
+        .values_list("order_item__samples__barcode", "order_item__test__code")
+        .order_by("order_item__samples__barcode")
+    )
+    specimens = {}
+    for barcode, test in results.iterator():
+        if barcode not in specimens and limit is not None and len(specimens) >= limit:
+            break
+        specimens.setdefault(barcode, []).append(test)
+
+    test_parameters = TestParameter.for_test_codes(
+        {test for tests in specimens.values() for test in tests}
+    )
+    messages = {}
+    for barcode, tests in specimens.items():
+        messages[barcode] = []
+        for test in tests:
+            test_parameter = test_parameters.get(test)
+            parameter = test_parameter.parameter if test_parameter else None
+            messages[barcode].append(
+                (
+                    test,
+                    simulated_value(parameter),
+                    parameter.unit if parameter else "",
+                    "N",
+                )
+            )
+    return messages
@@ -0,0 +1,88 @@
+"""Local MLLP receiver standing in for a hospital system.
+
+Lets the outbound side of the HL7 gateway be exercised and benchmarked
+without a hospital system: `MLLPStandIn` accepts connections, records every
+message it receives and acknowledges it, optionally answering some messages
+with an error to exercise the retries.
+"""
+
+import asyncio
+import logging
+
+from .gateway import MAX_MESSAGE_BYTES
+from .hl7 import CR, FS, HL7Error, build_ack, frame, parse, parse_header, unframe
+
+logger = logging.getLogger(__name__)
+
+
+class MLLPStandIn:
+    """
+    Acknowledges HL7 messages as a hospital system does.
+
+    Args:
+        host (str): The address to listen on.
+        port (int): The TCP port; 0 picks a free port.
+        fail_every (int): Answer every n-th message with `AE`; 0 never does.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, fail_every=0):
+        self.host = host
+        self.port = port
+        self.fail_every = fail_every
+        self.received = []
+        self.errors = 0
+        self.server = None
+
+    async def start(self):
+        """
+        Starts listening.
+
+        Returns:
+            int: The bound port.
+        """
+        self.server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port, limit=MAX_MESSAGE_BYTES
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        """Listens until cancelled."""
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stops listening."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        """Acknowledges the messages of one connection."""
+        try:
+            while True:
+                block = await reader.readuntil(FS + CR)
+                try:
+                    text = unframe(block)
+                    header = parse_header(parse(text))
+                except HL7Error as error:
+                    writer.write(frame(build_ack(None, "AR", str(error))))
+                    await writer.drain()
+                    continue
+                self.received.append(text)
+                if self.fail_every and len(self.received) % self.fail_every == 0:
+                    self.errors += 1
+                    reply = build_ack(header, "AE", "Simulated application error")
+                else:
+                    reply = build_ack(header, "AA")
+                writer.write(frame(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.LimitOverrunError:
+            logger.warning("Message too long; dropping the connection")
+        finally:
+            writer.close()
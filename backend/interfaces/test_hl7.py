@@ -0,0 +1,489 @@
+"""Tests for the HL7 v2 gateway."""
+
+import asyncio
+import json
+import socket
+from datetime import date, timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from catalog.models import TestCatalog
+from orders.models import Order, OrderItem, OrderPriority
+from patients.models import Patient
+from results.models import Result, ResultStatus
+from users.models import User, UserRole
+
+from .gateway import HL7Gateway, MLLPClient, OutboundSender
+from .hl7 import (
+    HL7Error,
+    PatientInfo,
+    ResultObservation,
+    build_ack,
+    build_orm,
+    build_oru,
+    frame,
+    parse,
+    parse_ack,
+    parse_orm,
+    unframe,
+)
+from .models import HL7Order, OutboundMessage, OutboundStatus
+from .services import accept_orders, enqueue_result_messages
+from .standin import MLLPStandIn
+
+PATIENT = PatientInfo(
+    identifier="H-100",
+    full_name="Ayesha Noor Khan",
+    dob=date(1990, 5, 1),
+    sex="F",
+    phone="03001234567",
+)
+
+
+def orm(placer, tests=("GLU", "K"), patient=PATIENT, priority="R"):
+    """Builds an order message from the test hospital."""
+    return build_orm(f"C-{placer}", placer, patient, tests, priority=priority)
+
+
+class TestHL7Protocol:
+    """Test HL7 parsing, building and MLLP framing."""
+
+    def test_order_round_trip(self):
+        """Test that an order message is read back as it was built."""
+        order = parse_orm(orm("PL-1", priority="S"))
+
+        assert order.header.message_type == "ORM^O01"
+        assert order.header.control_id == "C-PL-1"
+        assert order.header.sending_facility == "HOSPITAL"
+        assert order.placer_order_number == "PL-1"
+        assert order.patient == PATIENT
+        assert order.tests == ("GLU", "K")
+        assert order.priority == "STAT"
+
+    def test_escapes_delimiters(self):
+        """Test that delimiters in values survive a round trip."""
+        ack = build_ack(parse_orm(orm("PL-1")).header, "AE", "a|b^c~d\\e&f")
+        assert parse_ack(ack) == ("AE", "C-PL-1", "a|b^c~d\\e&f")
+
+    def test_acknowledgement_routing(self):
+        """Test that an acknowledgement goes back to the sender."""
+        header = parse_orm(orm("PL-1")).header
+        msh = parse(build_ack(header, "AA", control_id="A-1")).segments[0]
+        assert msh[5:7] == ["HIS", "HOSPITAL"]
+        assert msh[9:11] == ["ACK^O01", "A-1"]
+
+    def test_result_message(self):
+        """Test that each result is reported in its own OBR/OBX pair."""
+        message = parse(
+            build_oru(
+                control_id="X-1",
+                placer_order_number="PL-1",
+                filler_order_number="ORD-1",
+                patient=PATIENT,
+                patient_id="PAT-1",
+                observations=[
+                    ResultObservation("GLU", "Glucose", "5.4", "mmol/L", "", "N"),
+                    ResultObservation("K", "Potassium", "7.1", "mmol/L", "", "H"),
+                ],
+                application="LIMS",
+                facility="LAB",
+            )
+        )
+
+        assert message.get(message.first("PID"), 2) == "PAT-1"
+        assert message.get(message.first("PID"), 3) == "H-100"
+        assert message.get(message.first("ORC"), 3) == "ORD-1"
+        assert [message.get(obx, 3) for obx in message.all("OBX")] == ["GLU", "K"]
+        assert [message.get(obx, 5) for obx in message.all("OBX")] == ["5.4", "7.1"]
+        assert [message.get(obx, 8) for obx in message.all("OBX")] == ["N", "H"]
+        assert [message.get(obr, 25) for obr in message.all("OBR")] == ["F", "F"]
+
+    def test_mllp_framing(self):
+        """Test that blocks are wrapped and unwrapped."""
+        assert unframe(b"\r\n" + frame("MSH|^~\\&|é")) == "MSH|^~\\&|é"
+        with pytest.raises(HL7Error, match="Malformed"):
+            unframe(b"MSH|^~\\&\x1c\r")
+
+    @pytest.mark.parametrize(
+        "text, error",
+        [
+            ("PID|1", "must start with an MSH"),
+            (orm("PL-1").replace("ORM^O01", "ADT^A01"), "Unsupported message type"),
+            (orm("PL-1").replace("ORC|NW", "ORC|CA"), "Unsupported order control"),
+            (orm(""), "placer order number"),
+            (orm("PL-1", tests=()), "without tests"),
+            (orm("PL-1").replace("H-100", ""), "PID-3"),
+            (orm("PL-1").replace("19900501", "19901301"), "Invalid date"),
+        ],
+    )
+    def test_invalid_orders(self, text, error):
+        """Test that unusable order messages are refused."""
+        with pytest.raises(HL7Error, match=error):
+            parse_orm(text)
+
+
+class HL7Fixtures:
+    """Shared set-up: glucose and potassium tests."""
+
+    def setup_method(self):
+        """Create the tests."""
+        self.tests = {
+            code: TestCatalog.objects.create(
+                code=code,
+                name=name,
+                category="Biochemistry",
+                sample_type="Blood",
+                price=300,
+                turnaround_time_hours=4,
+            )
+            for code, name in (("GLU", "Glucose"), ("K", "Potassium"))
+        }
+
+
+@pytest.mark.django_db
+class TestAcceptOrders(HL7Fixtures):
+    """Test that HL7 orders are created through the order path."""
+
+    def test_creates_orders_and_registers_patient(self):
+        """Test that the patient is registered once and then matched."""
+        outcomes = accept_orders(
+            [parse_orm(orm("PL-1", priority="S")), parse_orm(orm("PL-2", ("K",)))]
+        )
+
+        assert [error for _, error in outcomes] == ["", ""]
+        first, second = (Order.objects.get(pk=pk) for pk, _ in outcomes)
+        assert first.patient_id == second.patient_id
+        assert first.priority == OrderPriority.STAT
+        assert [item.test.code for item in first.items.all()] == ["GLU", "K"]
+        assert first.items.first().samples.count() == 1
+        patient = Patient.objects.get()
+        assert (patient.full_name, patient.sex) == ("Ayesha Noor Khan", "F")
+        link = HL7Order.objects.get(order=first)
+        assert (link.placer_order_number, link.patient_identifier) == (
+            "PL-1",
+            "H-100",
+        )
+
+        # A later batch finds the patient through the earlier orders
+        accept_orders([parse_orm(orm("PL-3"))])
+        assert Patient.objects.count() == 1
+
+    def test_matches_patient_by_mrn(self):
+        """Test that an identifier equal to an MRN selects that patient."""
+        patient = Patient.objects.create(
+            full_name="Existing", sex="M", phone="03001234567"
+        )
+        info = PatientInfo(patient.mrn, "Other Name", sex="M")
+
+        [(order_id, _)] = accept_orders([parse_orm(orm("PL-1", patient=info))])
+
+        assert Order.objects.get(pk=order_id).patient == patient
+
+    def test_resent_order_is_not_duplicated(self):
+        """Test that a message resent after a lost ACK returns the same order."""
+        [(order_id, _)] = accept_orders([parse_orm(orm("PL-1"))])
+        outcomes = accept_orders([parse_orm(orm("PL-1")), parse_orm(orm("PL-1"))])
+
+        assert outcomes == [(order_id, ""), (order_id, "")]
+        assert Order.objects.count() == 1
+
+    def test_invalid_orders_do_not_block_the_batch(self):
+        """Test that errors are reported per message."""
+        no_phone = PatientInfo("H-200", "No Phone", sex="M")
+
+        outcomes = accept_orders(
+            [
+                parse_orm(orm("PL-1", tests=("GLU", "XYZ"))),
+                parse_orm(orm("PL-2", patient=no_phone)),
+                parse_orm(orm("PL-3")),
+            ]
+        )
+
+        assert outcomes[0] == (None, "Unknown test codes: XYZ")
+        assert outcomes[1][0] is None
+        assert "PID-13" in outcomes[1][1]
+        assert outcomes[2][0] == Order.objects.get().pk
+        assert not Patient.objects.filter(full_name="No Phone").exists()
+
+
+@pytest.mark.django_db
+class TestResultMessages(HL7Fixtures):
+    """Test that publishing queues result messages for HL7 orders."""
+
+    def setup_method(self):
+        """Create an HL7 order with verified results and a pathologist."""
+        super().setup_method()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            user=User.objects.create(username="path", role=UserRole.PATHOLOGIST)
+        )
+        [(order_id, _)] = accept_orders([parse_orm(orm("PL-1"))])
+        self.order = Order.objects.get(pk=order_id)
+        self.results = [
+            Result.objects.create(
+                order_item=item,
+                patient=self.order.patient,
+                value=value,
+                unit="mmol/L",
+                flags="N",
+                status=ResultStatus.VERIFIED,
+            )
+            for item, value in zip(self.order.items.all(), ("5.4", "4.1"), strict=True)
+        ]
+
+    def test_publish_queues_result_message(self):
+        """Test that one published result is reported for its order."""
+        response = self.client.post(f"/api/results/{self.results[0].pk}/publish/")
+        assert response.status_code == 200
+
+        message = OutboundMessage.objects.get()
+        assert message.order == self.order
+        assert message.message_type == "ORU^R01"
+        assert message.status == OutboundStatus.PENDING
+        oru = parse(message.payload)
+        assert oru.get(oru.segments[0], 10) == message.control_id
+        assert oru.get(oru.segments[0], 5) == "HIS"
+        assert oru.get(oru.first("ORC"), 2) == "PL-1"
+        assert oru.get(oru.first("ORC"), 3) == self.order.order_no
+        assert [oru.get(obx, 5) for obx in oru.all("OBX")] == ["5.4"]
+        assert oru.get(oru.first("OBX"), 2) == "NM"
+
+    def test_publish_batch_queues_one_message_per_order(self):
+        """Test that the results of an order are reported together."""
+        response = self.client.post(
+            "/api/results/publish-batch/", {"order_ids": [self.order.pk]}, format="json"
+        )
+        assert response.status_code == 200
+
+        oru = parse(OutboundMessage.objects.get().payload)
+        assert [oru.get(obx, 3) for obx in oru.all("OBX")] == ["GLU", "K"]
+
+    def test_orders_without_hl7_origin_are_ignored(self):
+        """Test that results of other orders queue nothing."""
+        order = Order.objects.create(patient=self.order.patient)
+        item = OrderItem.objects.create(order=order, test=self.tests["K"])
+        result = Result.objects.create(
+            order_item=item, value="4.0", status=ResultStatus.PUBLISHED
+        )
+
+        assert enqueue_result_messages([result.pk]) == []
+        assert not OutboundMessage.objects.exists()
+
+
+def run(coroutine):
+    """Runs a coroutine to completion."""
+    return asyncio.run(coroutine)
+
+
+def closed_port():
+    """Returns a local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestHL7Gateway(HL7Fixtures):
+    """Test the inbound gateway end to end over MLLP."""
+
+    def exchange(self, messages, connections=1, **options):
+        async def main():
+            gateway = HL7Gateway(host="127.0.0.1", port=0, **options)
+            port = await gateway.start()
+            try:
+
+                async def connection(number):
+                    async with MLLPClient("127.0.0.1", port, timeout=5) as client:
+                        return [
+                            parse_ack(await client.send(message))
+                            for message in messages[number::connections]
+                        ]
+
+                replies = await asyncio.gather(
+                    *(connection(n) for n in range(connections))
+                )
+                await gateway.drain()
+                return gateway, [reply for replies_ in replies for reply in replies_]
+            finally:
+                await gateway.close()
+
+        return run(main())
+
+    def test_accepts_orders_from_concurrent_connections(self):
+        """Test that orders are acknowledged after they are created in bulk."""
+        messages = [orm(f"PL-{n}") for n in range(12)]
+
+        gateway, replies = self.exchange(messages, connections=4, batch_size=5)
+
+        assert sorted(replies) == sorted(("AA", f"C-PL-{n}", "") for n in range(12))
+        assert HL7Order.objects.count() == 12
+        assert gateway.stats.accepted == 12
+        assert gateway.stats.batches < 12
+
+    def test_acknowledges_errors(self):
+        """Test that unusable messages get AR and invalid orders AE."""
+        messages = [
+            orm("PL-1").replace("ORM^O01", "ADT^A08"),
+            orm("PL-2", tests=("XYZ",)),
+            "garbage",
+        ]
+
+        gateway, replies = self.exchange(messages)
+
+        assert replies[0][:2] == ("AR", "C-PL-1")
+        assert replies[1] == ("AE", "C-PL-2", "Unknown test codes: XYZ")
+        assert replies[2][0] == "AR"
+        assert gateway.stats.rejected == 3
+        assert not Order.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestOutboundSender(HL7Fixtures):
+    """Test delivery of queued messages to a stand-in receiver."""
+
+    def setup_method(self):
+        """Queue three result messages."""
+        super().setup_method()
+        outcomes = accept_orders([parse_orm(orm(f"PL-{n}")) for n in range(3)])
+        for order_id, _ in outcomes:
+            item = OrderItem.objects.filter(order_id=order_id).first()
+            Result.objects.create(
+                order_item=item, value="5.0", status=ResultStatus.PUBLISHED
+            )
+        enqueue_result_messages(Result.objects.values_list("pk", flat=True))
+
+    def deliver(self, standin=None, **options):
+        async def main():
+            port = await standin.start() if standin else closed_port()
+            sender = OutboundSender(
+                host="127.0.0.1",
+                port=port,
+                poll_interval=0,
+                timeout=5,
+                **options,
+            )
+            try:
+                await sender.run(stop_when_idle=True)
+            finally:
+                if standin:
+                    await standin.close()
+            return sender
+
+        return run(main())
+
+    def test_sends_queued_messages(self):
+        """Test that every message is sent once and marked SENT."""
+        standin = MLLPStandIn()
+
+        sender = self.deliver(standin, batch_size=2)
+
+        assert sender.stats.sent == 3
+        assert sender.stats.batches == 2
+        assert sender.stats.connections == 1
+        assert len(standin.received) == 3
+        messages = OutboundMessage.objects.all()
+        assert {message.status for message in messages} == {OutboundStatus.SENT}
+        assert all(message.attempts == 1 for message in messages)
+        assert [
+            parse(text).get(parse(text).segments[0], 10) for text in standin.received
+        ] == [message.control_id for message in messages]
+
+    def test_retries_errors(self):
+        """Test that a message answered with AE is sent again."""
+        standin = MLLPStandIn(fail_every=3)
+
+        sender = self.deliver(standin, retry_delay=0)
+
+        assert sender.stats.sent == 3
+        assert sender.stats.retried == 1
+        assert len(standin.received) == 4
+        retried = OutboundMessage.objects.get(attempts=2)
+        assert retried.status == OutboundStatus.SENT
+        assert retried.last_error == ""
+
+    def test_backs_off_when_receiver_is_down(self):
+        """Test that failed deliveries are postponed, not dropped."""
+        sender = self.deliver(retry_delay=60, batch_size=3)
+
+        assert sender.stats.sent == 0
+        # Each batch stops at the broken connection
+        assert sender.stats.batches == 3
+        for message in OutboundMessage.objects.all():
+            assert message.status == OutboundStatus.PENDING
+            assert message.attempts == 1
+            assert message.last_error.startswith("ConnectionRefusedError")
+            assert message.next_attempt_at > timezone.now() + timedelta(seconds=50)
+
+    def test_claimed_messages_are_not_claimed_again(self):
+        """Test that two senders never claim the same message."""
+        first, second = OutboundSender(batch_size=2), OutboundSender(batch_size=2)
+
+        claimed = first.claim() + second.claim()
+
+        assert len(claimed) == 3
+        assert len({message.pk for message in claimed}) == 3
+        assert second.claim() == []
+
+    def test_stale_claims_keep_the_new_outcome(self):
+        """Test that a sender whose claim went stale saves no outcome."""
+        first = OutboundSender()
+        messages = first.claim()
+        OutboundMessage.objects.update(
+            claimed_at=timezone.now() - timedelta(minutes=10)
+        )
+        second = OutboundSender(stale_after=300)
+        reclaimed = second.claim()
+        assert len(reclaimed) == 3
+        for message in reclaimed:
+            message.status = OutboundStatus.SENT
+            message.attempts = 1
+        assert second.record(reclaimed) == 3
+
+        for message in messages:
+            first.fail(message, "TimeoutError: no acknowledgement")
+        assert first.record(messages) == 0
+
+        assert set(OutboundMessage.objects.values_list("status", "attempts")) == {
+            (OutboundStatus.SENT, 1)
+        }
+        with pytest.raises(ValueError):
+            OutboundSender(timeout=30, stale_after=90)
+
+    def test_gives_up_after_max_attempts(self):
+        """Test that messages are marked FAILED after the last attempt."""
+        sender = self.deliver(retry_delay=0, max_attempts=2)
+
+        assert sender.stats.failed == 3
+        assert set(OutboundMessage.objects.values_list("status", "attempts")) == {
+            (OutboundStatus.FAILED, 2)
+        }
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBenchmarkHl7Command(HL7Fixtures):
+    """Test the benchmark_hl7 command."""
+
+    def test_reports_throughput(self, tmp_path):
+        """Test that every order is accepted and every result delivered."""
+        output = tmp_path / "hl7.json"
+
+        call_command(
+            "benchmark_hl7",
+            senders=2,
+            messages=3,
+            tests_per_order=2,
+            output=str(output),
+            stdout=StringIO(),
+        )
+
+        results = json.loads(output.read_text())
+        assert results["inbound"]["summary"]["requests"] == 6
+        assert results["inbound"]["summary"]["errors"] == 0
+        assert results["inbound"]["gateway"]["accepted"] == 6
+        assert results["outbound"]["messages"] == 6
+        assert results["outbound"]["sender"]["sent"] == 6
+        assert results["outbound"]["messages_per_second"] > 0
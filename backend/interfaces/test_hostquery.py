@@ -0,0 +1,316 @@
+"""Tests for the host-query worklist index."""
+
+import asyncio
+import time
+from datetime import date
+
+import pytest
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import TestCatalog
+from core.benchmarking import percentile
+from orders.services import create_order
+from patients.models import Patient
+from results.models import ResultStatus
+from samples.models import Sample
+from users.models import User, UserRole
+
+from .astm import Observation, build_orders, build_query, parse_orders, parse_queries
+from .hostquery import KEY_PREFIX, get_code_map, lookup, refresh_orders
+from .listener import ASTMListener
+from .models import InstrumentTestCode
+from .services import ingest_observations
+from .simulator import AnalyzerSimulator
+from .tests import AnalyzerFixtures
+
+# Latency objective for a warm host-query lookup
+LOOKUP_P99_MS = 5
+
+
+class HostQueryFixtures:
+    """Shared set-up: a patient, two catalog tests and lab users."""
+
+    def setup_method(self):
+        """Create users, a patient and tests."""
+        self.client = APIClient()
+        self.reception = User.objects.create(
+            username="reception", role=UserRole.RECEPTION
+        )
+        self.technologist = User.objects.create(
+            username="tech", role=UserRole.TECHNOLOGIST
+        )
+        self.admin = User.objects.create(username="admin", role=UserRole.ADMIN)
+        self.patient = Patient.objects.create(
+            full_name="John Doe", dob=date(1990, 1, 1), sex="M", phone="03001234567"
+        )
+        self.tests = {
+            code: TestCatalog.objects.create(
+                code=code,
+                name=code,
+                category="Biochemistry",
+                sample_type="Blood",
+                price=300,
+                turnaround_time_hours=4,
+            )
+            for code in ("GLU", "K")
+        }
+
+    def create_order(self, *codes):
+        order = create_order(
+            test_ids=[self.tests[code].pk for code in codes], patient=self.patient
+        )
+        barcodes = dict(
+            Sample.objects.filter(order=order).values_list(
+                "order_items__test__code", "barcode"
+            )
+        )
+        return order, barcodes
+
+
+@pytest.mark.django_db
+class TestHostQueryIndex(HostQueryFixtures):
+    """Test that the index follows orders and samples."""
+
+    def test_indexed_when_order_is_created(
+        self, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        """Test that new barcodes are indexed and answered without queries."""
+        with django_capture_on_commit_callbacks(execute=True):
+            order, barcodes = self.create_order("GLU", "K")
+
+        assert cache.get(f"{KEY_PREFIX}{barcodes['K']}") == ["K"]
+        get_code_map()
+        with django_assert_num_queries(0):
+            tests = lookup([barcodes["GLU"], barcodes["K"]])
+        assert tests == {barcodes["GLU"]: ["GLU"], barcodes["K"]: ["K"]}
+
+    def test_cancelled_order_is_cleared(self, django_capture_on_commit_callbacks):
+        """Test that cancelling an order empties its barcodes' entries."""
+        with django_capture_on_commit_callbacks(execute=True):
+            order, barcodes = self.create_order("K")
+        self.client.force_authenticate(user=self.reception)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self.client.post(f"/api/orders/{order.pk}/cancel/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert lookup([barcodes["K"]]) == {barcodes["K"]: []}
+
+    def test_rejected_sample_is_cleared(self, django_capture_on_commit_callbacks):
+        """Test that rejecting a sample empties its entry only."""
+        with django_capture_on_commit_callbacks(execute=True):
+            order, barcodes = self.create_order("GLU", "K")
+        sample = Sample.objects.get(barcode=barcodes["K"])
+        self.client.force_authenticate(user=self.technologist)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self.client.post(
+                f"/api/samples/{sample.pk}/reject/",
+                {"rejection_reason": "Hemolyzed"},
+                format="json",
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert lookup(barcodes.values()) == {
+            barcodes["GLU"]: ["GLU"],
+            barcodes["K"]: [],
+        }
+
+    def test_missing_entries_are_rebuilt(self):
+        """Test that an evicted entry is rebuilt from the database once."""
+        order, barcodes = self.create_order("K")
+        assert cache.get(f"{KEY_PREFIX}{barcodes['K']}") is None
+
+        assert lookup([barcodes["K"], "SAM-404"]) == {
+            barcodes["K"]: ["K"],
+            "SAM-404": [],
+        }
+        assert cache.get(f"{KEY_PREFIX}{barcodes['K']}") == ["K"]
+
+    def test_refresh_overwrites_stale_entries(self):
+        """Test that refreshing an order rewrites entries of changed items."""
+        order, barcodes = self.create_order("GLU", "K")
+        refresh_orders([order.pk])
+        order.items.update(status="CANCELLED")
+
+        refresh_orders([order.pk])
+
+        assert lookup(barcodes.values()) == {
+            barcode: [] for barcode in barcodes.values()
+        }
+
+    def test_translates_to_instrument_codes(self):
+        """Test that analyzer mappings beat default mappings and catalog codes."""
+        InstrumentTestCode.objects.create(test=self.tests["K"], code="K+")
+        InstrumentTestCode.objects.create(
+            instrument="AU680", test=self.tests["K"], code="POT"
+        )
+        order, barcodes = self.create_order("GLU", "K")
+
+        assert lookup([barcodes["K"]], "AU680") == {barcodes["K"]: ["POT"]}
+        assert lookup([barcodes["K"]], "COBAS") == {barcodes["K"]: ["K+"]}
+        assert lookup([barcodes["GLU"]], "AU680") == {barcodes["GLU"]: ["GLU"]}
+
+    def test_mapping_changes_invalidate_code_map(
+        self, django_capture_on_commit_callbacks
+    ):
+        """Test that a new mapping is used on the next lookup."""
+        order, barcodes = self.create_order("K")
+        assert lookup([barcodes["K"]], "AU680") == {barcodes["K"]: ["K"]}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            InstrumentTestCode.objects.create(
+                instrument="AU680", test=self.tests["K"], code="POT"
+            )
+
+        assert lookup([barcodes["K"]], "AU680") == {barcodes["K"]: ["POT"]}
+
+    def test_warm_lookup_meets_latency_objective(self, django_assert_num_queries):
+        """Test that warm lookups run no queries and stay within the SLO."""
+        barcodes = []
+        for _ in range(50):
+            order, order_barcodes = self.create_order("GLU", "K")
+            barcodes.extend(order_barcodes.values())
+        lookup(barcodes)
+
+        timings = []
+        with django_assert_num_queries(0):
+            for number in range(1000):
+                started = time.perf_counter()
+                lookup([barcodes[number % len(barcodes)]], "AU680")
+                timings.append((time.perf_counter() - started) * 1000)
+
+        assert percentile(timings, 99) < LOOKUP_P99_MS
+
+
+@pytest.mark.django_db
+class TestInstrumentCodeIngest(AnalyzerFixtures):
+    """Test that analyzer results are read back to catalog tests."""
+
+    def test_translates_analyzer_codes(self):
+        """Test that a mapped analyzer code enters the catalog test's result."""
+        InstrumentTestCode.objects.create(
+            instrument="AU680", test=self.tests["K"], code="POT"
+        )
+        barcode, result = self.create_result("K")
+
+        results, rejected = ingest_observations(
+            [Observation(barcode, "POT", "4.2", sender="AU680")], self.user
+        )
+
+        assert rejected == []
+        result.refresh_from_db()
+        assert result.status == ResultStatus.ENTERED
+
+
+@pytest.mark.django_db
+class TestHostQueryAPI(HostQueryFixtures):
+    """Test the host-query and instrument code endpoints."""
+
+    def test_host_query(self):
+        """Test that the tests of a sample are returned in analyzer codes."""
+        InstrumentTestCode.objects.create(
+            instrument="AU680", test=self.tests["K"], code="POT"
+        )
+        order, barcodes = self.create_order("K")
+        self.client.force_authenticate(user=self.technologist)
+
+        response = self.client.get(
+            f"/api/interfaces/host-query/{barcodes['K']}/", {"instrument": "AU680"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            "barcode": barcodes["K"],
+            "instrument": "AU680",
+            "tests": ["POT"],
+        }
+
+    def test_host_query_unknown_barcode(self):
+        """Test that a sample without tests is not found."""
+        self.client.force_authenticate(user=self.technologist)
+        response = self.client.get("/api/interfaces/host-query/SAM-404/")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert "error" in response.data
+
+    def test_host_query_requires_authentication(self):
+        """Test that anonymous requests are refused."""
+        response = self.client.get("/api/interfaces/host-query/SAM-404/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_instrument_codes_are_admin_only(self):
+        """Test that only admins create mappings and everyone can list them."""
+        data = {"instrument": "AU680", "test": self.tests["K"].pk, "code": "POT"}
+        self.client.force_authenticate(user=self.technologist)
+        response = self.client.post(
+            "/api/interfaces/instrument-codes/", data, format="json"
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(
+            "/api/interfaces/instrument-codes/", data, format="json"
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["test_code"] == "K"
+
+        self.client.force_authenticate(user=self.technologist)
+        response = self.client.get(
+            "/api/interfaces/instrument-codes/", {"instrument": "AU680"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert [mapping["code"] for mapping in response.data["results"]] == ["POT"]
+
+
+class TestHostQueryRecords:
+    """Test the ASTM records of host queries and their answers."""
+
+    def test_query_round_trip(self):
+        """Test that a query built for an analyzer is read back."""
+        text = "\r".join(build_query("AU680", ["SAM-1", "SAM-2"])) + "\r"
+        assert parse_queries(text) == ("AU680", ["SAM-1", "SAM-2"])
+
+    def test_query_with_repeated_ids(self):
+        """Test that bare and repeated specimen ids are all read."""
+        text = "H|\\^&|||AU680\rQ|1|SAM-1\\^SAM-2||ALL\rL|1|N\r"
+        assert parse_queries(text) == ("AU680", ["SAM-1", "SAM-2"])
+
+    def test_orders_round_trip(self):
+        """Test that samples without tests are left out of the answer."""
+        records = build_orders({"SAM-1": ["GLU", "K"], "SAM-2": []})
+        assert records[-1] == "L|1|N"
+        assert parse_orders("\r".join(records)) == {"SAM-1": ["GLU", "K"]}
+        assert build_orders({"SAM-2": []})[-1] == "L|1|I"
+
+
+@pytest.mark.django_db(transaction=True)
+class TestListenerHostQuery(HostQueryFixtures):
+    """Test host queries end to end with a simulated analyzer."""
+
+    def test_answers_queries(self):
+        """Test that the listener answers with each sample's analyzer codes."""
+        InstrumentTestCode.objects.create(
+            instrument="SIMULATOR", test=self.tests["K"], code="POT"
+        )
+        order, barcodes = self.create_order("GLU", "K")
+
+        async def main():
+            listener = ASTMListener(self.reception, host="127.0.0.1", port=0)
+            port = await listener.start()
+            try:
+                async with AnalyzerSimulator("127.0.0.1", port, timeout=5) as analyzer:
+                    first = await analyzer.query([barcodes["GLU"], "SAM-404"])
+                    second = await analyzer.query([barcodes["K"]])
+                await listener.drain()
+                return listener, first, second
+            finally:
+                await listener.close()
+
+        listener, first, second = asyncio.run(main())
+
+        assert first == {barcodes["GLU"]: ["GLU"]}
+        assert second == {barcodes["K"]: ["POT"]}
+        assert listener.stats.queries == 2
+        assert listener.stats.entered == 0
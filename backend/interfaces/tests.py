@@ -0,0 +1,361 @@
+"""Tests for the ASTM analyzer interface."""
+
+import asyncio
+import json
+from datetime import date
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from catalog.models import Parameter, Test, TestCatalog, TestParameter
+from orders.models import Order, OrderItem
+from patients.models import Patient
+from results.models import Result, ResultStatus
+from samples.models import Sample
+from users.models import User, UserRole
+
+from .astm import (
+    ACK,
+    ENQ,
+    EOT,
+    MAX_FRAME_TEXT,
+    NAK,
+    ASTMError,
+    Observation,
+    build_message,
+    checksum,
+    decode_frame,
+    encode_frames,
+    parse_message,
+)
+from .listener import ASTMListener
+from .services import ingest_observations
+from .simulator import AnalyzerSimulator, pending_specimens
+
+
+class TestASTMProtocol:
+    """Test ASTM framing and record parsing."""
+
+    def test_checksum(self):
+        """Test that the checksum is the byte sum modulo 256 in hex."""
+        assert checksum(b"1H|\\^&\r\x03") == b"E5"
+        assert checksum(bytes([255, 2])) == b"01"
+
+    def test_frames_round_trip(self):
+        """Test that records are framed, numbered and checksummed."""
+        records = ["H|\\^&", "R|1|^^^K|" + "9" * 300, "L|1|N"]
+        frames = encode_frames(records)
+
+        decoded = [decode_frame(frame) for frame in frames]
+        assert [number for number, _, _ in decoded] == [1, 2, 3, 4]
+        # The long record continues in an intermediate frame
+        assert [last for _, _, last in decoded] == [True, False, True, True]
+        assert len(decoded[1][1]) == MAX_FRAME_TEXT
+        assert b"".join(text for _, text, _ in decoded).decode() == (
+            "\r".join(records) + "\r"
+        )
+
+    def test_frame_numbers_wrap(self):
+        """Test that frame numbers run from 1 to 7 and then restart at 0."""
+        frames = encode_frames([f"C|{n}" for n in range(9)])
+        assert [decode_frame(frame)[0] for frame in frames] == [
+            1,
+            2,
+            3,
+            4,
+            5,
+            6,
+            7,
+            0,
+            1,
+        ]
+
+    @pytest.mark.parametrize(
+        "frame, error",
+        [
+            (b"\x021H|\\^&\r\x0300\r\n", "Checksum mismatch"),
+            (b"\x02XH\r\x03FF\r\n", "Malformed frame"),
+            (b"1H\r\x0300\r\n", "Malformed frame"),
+        ],
+    )
+    def test_invalid_frames(self, frame, error):
+        """Test that corrupted frames are refused."""
+        with pytest.raises(ASTMError, match=error):
+            decode_frame(frame)
+
+    def test_parse_message(self):
+        """Test that results are read with the specimen of their order."""
+        records = build_message(
+            "AU480",
+            {
+                "SAM-1": [("GLU", "5.4", "mmol/L", "N"), ("K", "7.1", "mmol/L", "H")],
+                "SAM-2": [("NA", "140", "mmol/L", "")],
+            },
+        )
+        assert parse_message("\r".join(records)) == [
+            Observation("SAM-1", "GLU", "5.4", "mmol/L", "N", "F", "AU480"),
+            Observation("SAM-1", "K", "7.1", "mmol/L", "H", "F", "AU480"),
+            Observation("SAM-2", "NA", "140", "mmol/L", "", "F", "AU480"),
+        ]
+
+    def test_parse_custom_delimiters_and_escapes(self):
+        """Test that the header's delimiters and escape sequences apply."""
+        text = "\r".join(
+            [
+                "H!@#$!!!XN-1000",
+                "O!1!SAM-1#R3#5",
+                "R!1!###WBC!7$F$5!10^3/uL!!N!!F",
+                "R!2!###RBC!!!!!!X",
+                "L!1",
+            ]
+        )
+        assert parse_message(text) == [
+            Observation("SAM-1", "WBC", "7!5", "10^3/uL", "N", "F", "XN-1000")
+        ]
+
+    @pytest.mark.parametrize(
+        "text, error",
+        [
+            ("P|1\rL|1", "header"),
+            ("H|\\^&\rR|1|^^^K|4.0", "without an order record"),
+        ],
+    )
+    def test_invalid_messages(self, text, error):
+        """Test that messages out of order are refused."""
+        with pytest.raises(ASTMError, match=error):
+            parse_message(text)
+
+
+class AnalyzerFixtures:
+    """Shared set-up: received samples with draft potassium and sodium results."""
+
+    def setup_method(self):
+        """Create a user, tests and draft results."""
+        self.user = User.objects.create(username="analyzer", role=UserRole.TECHNOLOGIST)
+        self.patient = Patient.objects.create(
+            full_name="John Doe", dob=date(1990, 1, 1), sex="M", phone="03001234567"
+        )
+        self.tests = {}
+        for code, decimal_places in (("K", 1), ("NA", 0)):
+            parameter = Parameter.objects.create(
+                code=code, name=code, unit="mmol/L", decimal_places=decimal_places
+            )
+            TestParameter.objects.create(
+                test=Test.objects.create(code=code, name=code), parameter=parameter
+            )
+            self.tests[code] = TestCatalog.objects.create(
+                code=code,
+                name=code,
+                category="Biochemistry",
+                sample_type="Blood",
+                price=300,
+                turnaround_time_hours=4,
+            )
+
+    def create_result(self, code="K"):
+        order = Order.objects.create(patient=self.patient)
+        item = OrderItem.objects.create(order=order, test=self.tests[code])
+        sample = Sample.objects.create(order=order, sample_type="Blood")
+        sample.order_items.add(item)
+        result = Result.objects.create(order_item=item, value="")
+        return sample.barcode, result
+
+
+@pytest.mark.django_db
+class TestIngestObservations(AnalyzerFixtures):
+    """Test that analyzer results are entered through the entry path."""
+
+    def test_enters_matching_results(self):
+        """Test that results are matched by barcode and test code."""
+        k_barcode, k_result = self.create_result("K")
+        na_barcode, na_result = self.create_result("NA")
+
+        results, rejected = ingest_observations(
+            [
+                Observation(k_barcode, "K", "4.2", "mmol/L", "N"),
+                Observation(na_barcode, "NA", "139"),
+            ],
+            self.user,
+        )
+
+        assert rejected == []
+        assert {result.pk for result in results} == {k_result.pk, na_result.pk}
+        k_result.refresh_from_db()
+        assert k_result.status == ResultStatus.ENTERED
+        assert k_result.value == "4.2"
+        assert k_result.flags == "N"
+        assert k_result.entered_by == self.user
+        na_result.refresh_from_db()
+        assert na_result.unit == "mmol/L"
+
+    def test_rejects_invalid_observations_only(self):
+        """Test that one bad result does not block the rest of the batch."""
+        barcode, result = self.create_result("K")
+        unknown = Observation("SAM-404", "K", "4.2")
+        invalid = Observation(barcode, "K", "4.25")
+        too_long = Observation(barcode, "K", "4.2", flags="H" * 51)
+        valid = Observation(barcode, "K", "4.2")
+
+        results, rejected = ingest_observations(
+            [unknown, invalid, too_long, valid], self.user
+        )
+
+        assert [result.pk for result in results] == [result.pk]
+        assert [observation for observation, _ in rejected] == [
+            unknown,
+            invalid,
+            too_long,
+        ]
+        assert rejected[0][1] == {
+            "non_field_errors": ["No result for test K on sample SAM-404"]
+        }
+        assert rejected[1][1] == {"value": ["Value must have at most 1 decimal places"]}
+        assert "flags" in rejected[2][1]
+
+    def test_rejects_results_already_entered(self):
+        """Test that repeated results do not overwrite entered values."""
+        barcode, result = self.create_result("K")
+        ingest_observations([Observation(barcode, "K", "4.2")], self.user)
+
+        results, rejected = ingest_observations(
+            [Observation(barcode, "K", "5.0")], self.user
+        )
+        assert results == []
+        assert rejected[0][1] == {
+            "non_field_errors": ["Cannot enter result with status ENTERED"]
+        }
+        result.refresh_from_db()
+        assert result.value == "4.2"
+
+
+@pytest.mark.django_db(transaction=True)
+class TestASTMListener(AnalyzerFixtures):
+    """Test the listener end to end with simulated analyzers."""
+
+    def run_listener(self, session, **options):
+        async def main():
+            listener = ASTMListener(
+                self.user, host="127.0.0.1", port=0, flush_interval=0.01, **options
+            )
+            port = await listener.start()
+            try:
+                value = await session(port)
+                await listener.drain()
+                return listener, value
+            finally:
+                await listener.close()
+
+        return asyncio.run(main())
+
+    def test_enters_results_from_concurrent_analyzers(self):
+        """Test that many connections are received and written in bulk."""
+        for _ in range(6):
+            self.create_result("K")
+            self.create_result("NA")
+        specimens = list(pending_specimens().items())
+
+        async def session(port):
+            async def analyzer(number):
+                async with AnalyzerSimulator("127.0.0.1", port) as simulator:
+                    return [
+                        await simulator.send({barcode: results})
+                        for barcode, results in specimens[number::3]
+                    ]
+
+            return await asyncio.gather(*(analyzer(n) for n in range(3)))
+
+        listener, sent = self.run_listener(session, batch_size=5)
+
+        assert all(all(acknowledged) for acknowledged in sent)
+        assert listener.stats.connections == 3
+        assert listener.stats.messages == 12
+        assert listener.stats.entered == 12
+        assert listener.stats.batches < 12
+        assert not Result.objects.exclude(status=ResultStatus.ENTERED).exists()
+
+    def test_naks_corrupted_frames(self):
+        """Test that a frame with a bad checksum is refused and resent."""
+        barcode, result = self.create_result("K")
+        frames = encode_frames(build_message("SIM", {barcode: [("K", "4.2", "", "")]}))
+
+        async def session(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+            async def exchange(data):
+                writer.write(data)
+                await writer.drain()
+                return await reader.readexactly(1)
+
+            replies = [await exchange(ENQ)]
+            corrupted = frames[0][:-4] + b"00\r\n"
+            replies.append(await exchange(corrupted))
+            for frame in frames:
+                replies.append(await exchange(frame))
+            # A frame whose ACK was lost is acknowledged again
+            replies.append(await exchange(frames[-1]))
+            writer.write(EOT)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+            return replies
+
+        listener, replies = self.run_listener(session)
+
+        assert replies == [ACK, NAK] + [ACK] * (len(frames) + 1)
+        assert listener.stats.rejected_frames == 1
+        result.refresh_from_db()
+        assert result.value == "4.2"
+
+    def test_discards_message_on_timeout(self):
+        """Test that a stalled transfer is dropped without entering anything."""
+        barcode, result = self.create_result("K")
+        frames = encode_frames(build_message("SIM", {barcode: [("K", "4.2", "", "")]}))
+
+        async def session(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(ENQ + frames[0])
+            await writer.drain()
+            await reader.readexactly(2)
+            await asyncio.sleep(0.2)
+            writer.close()
+            await writer.wait_closed()
+
+        listener, _ = self.run_listener(session, timeout=0.05)
+
+        assert listener.stats.messages == 0
+        result.refresh_from_db()
+        assert result.status == ResultStatus.DRAFT
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBenchmarkAstmCommand:
+    """Test the benchmark_astm command."""
+
+    def test_reports_throughput(self, tmp_path):
+        """Test that every simulated message is entered and measured."""
+        TestCatalog.objects.create(
+            code="GLU",
+            name="Glucose",
+            category="Biochemistry",
+            sample_type="Blood",
+            price=200,
+            turnaround_time_hours=4,
+        )
+        output = tmp_path / "astm.json"
+
+        call_command(
+            "benchmark_astm",
+            analyzers=3,
+            messages=4,
+            tests_per_message=1,
+            output=str(output),
+            stdout=StringIO(),
+        )
+
+        results = json.loads(output.read_text())
+        assert results["summary"]["requests"] == 12
+        assert results["summary"]["errors"] == 0
+        assert results["listener"]["entered"] == 12
+        assert results["messages_per_second"] > 0
+        assert results["results_per_second"] > 0
@@ -0,0 +1,23 @@
+"""URL configuration for interfaces app."""
+
+from django.urls import path
+
+from .views import (
+    InstrumentTestCodeDetailView,
+    InstrumentTestCodeListCreateView,
+    host_query,
+)
+
+urlpatterns = [
+    path("host-query/<str:barcode>/", host_query, name="host-query"),
+    path(
+        "instrument-codes/",
+        InstrumentTestCodeListCreateView.as_view(),
+        name="instrument-code-list",
+    ),
+    path(
+        "instrument-codes/<int:pk>/",
+        InstrumentTestCodeDetailView.as_view(),
+        name="instrument-code-detail",
+    ),
+]
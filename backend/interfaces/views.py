@@ -0,0 +1,80 @@
+"""Interface views."""
+
+from rest_framework import generics, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.permissions import IsAdminOrReadOnly
+
+from .hostquery import lookup
+from .models import InstrumentTestCode
+from .serializers import InstrumentTestCodeSerializer
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def host_query(request, barcode):
+    """
+    Returns the tests an analyzer should run on a sample.
+
+    Answers from the host-query index, as the analyzer listener does.
+
+    Args:
+        request: The request object. The `instrument` query parameter
+            selects the analyzer whose test codes are returned.
+        barcode (str): The sample barcode.
+
+    Returns:
+        Response: A response object with the barcode, the analyzer and its
+            test codes, or an error message if the sample has no active
+            tests.
+    """
+    instrument = request.query_params.get("instrument", "")
+    tests = lookup([barcode], instrument)[barcode]
+    if not tests:
+        return Response(
+            {"error": f"No tests ordered on sample {barcode}"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    return Response({"barcode": barcode, "instrument": instrument, "tests": tests})
+
+
+class InstrumentTestCodeListCreateView(generics.ListCreateAPIView):
+    """
+    List all instrument test code mappings or create a new one.
+
+    Creation is restricted to admin users.
+
+    Filtering:
+    - `instrument` (string): Filters mappings by analyzer name.
+    """
+
+    queryset = InstrumentTestCode.objects.select_related("test")
+    serializer_class = InstrumentTestCodeSerializer
+    permission_classes = [IsAdminOrReadOnly]
+
+    def get_queryset(self):
+        """
+        Optionally filters the queryset by analyzer.
+
+        Returns:
+            QuerySet: The filtered queryset of `InstrumentTestCode` objects.
+        """
+        queryset = super().get_queryset()
+        instrument = self.request.query_params.get("instrument")
+        if instrument is not None:
+            queryset = queryset.filter(instrument=instrument)
+        return queryset
+
+
+class InstrumentTestCodeDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Retrieve, update, or delete an instrument test code mapping.
+
+    Update and delete operations are restricted to admin users.
+    """
+
+    queryset = InstrumentTestCode.objects.select_related("test")
+    serializer_class = InstrumentTestCodeSerializer
+    permission_classes = [IsAdminOrReadOnly]
@@ -0,0 +1,76 @@
+"""Management command to flag order items approaching or past their TAT."""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from orders.tat import flag_items, next_check
+
+# Fewest seconds between checks, so a burst of due times cannot spin the loop
+MIN_CHECK_INTERVAL = 1.0
+
+
+class Command(BaseCommand):
+    """Flag open order items that are due soon or overdue."""
+
+    help = (
+        "Flag open order items as due soon or overdue against their TAT, "
+        "waking when the next item crosses a threshold"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Check once and exit instead of running continuously",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=None,
+            help="The most seconds between checks (default: TAT_CHECK_INTERVAL); "
+            "new orders due sooner are seen at the next check",
+        )
+
+    def check(self):
+        """
+        Flags items and reports them.
+
+        Returns:
+            datetime | None: When the next item crosses a threshold.
+        """
+        close_old_connections()
+        now = timezone.now()
+        due_soon, overdue = flag_items(now)
+        if due_soon or overdue:
+            self.stdout.write(
+                f"{now:%Y-%m-%d %H:%M:%S}: {len(overdue)} overdue, "
+                f"{len(due_soon)} due soon"
+            )
+        return next_check(now)
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        if options["verbosity"] > 1:
+            logging.getLogger("orders").setLevel(logging.INFO)
+
+        if options["once"]:
+            self.check()
+            return
+
+        interval = options["interval"] or settings.TAT_CHECK_INTERVAL
+        self.stdout.write(f"Monitoring TAT, checking at least every {interval:g}s")
+        try:
+            while True:
+                wake = self.check()
+                delay = interval
+                if wake is not None:
+                    delay = min(delay, (wake - timezone.now()).total_seconds())
+                time.sleep(max(delay, MIN_CHECK_INTERVAL))
+        except KeyboardInterrupt:
+            pass
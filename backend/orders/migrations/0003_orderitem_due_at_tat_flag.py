@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:13
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def set_due_at(apps, schema_editor):
+    """Set the due time of existing order items from their tests' TAT."""
+    OrderItem = apps.get_model("orders", "OrderItem")
+    Test = apps.get_model("catalog", "Test")
+
+    master = dict(
+        Test.objects.filter(default_tat_minutes__gt=0).values_list(
+            "code", "default_tat_minutes"
+        )
+    )
+    items = []
+    for item in (
+        OrderItem.objects.select_related("order", "test")
+        .only("order__created_at", "test__code", "test__turnaround_time_hours")
+        .iterator(chunk_size=1000)
+    ):
+        minutes = master.get(item.test.code) or item.test.turnaround_time_hours * 60
+        item.due_at = item.order.created_at + timedelta(minutes=minutes)
+        items.append(item)
+        if len(items) == 1000:
+            OrderItem.objects.bulk_update(items, ["due_at"])
+            items = []
+    OrderItem.objects.bulk_update(items, ["due_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_testparameter_delta_thresholds"),
+        ("orders", "0002_alter_order_status_alter_orderitem_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderitem",
+            name="due_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="tat_flag",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "On time"),
+                    ("DUE_SOON", "Due soon"),
+                    ("OVERDUE", "Overdue"),
+                ],
+                default="",
+                max_length=20,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["status", "due_at"], name="order_items_status_d0930b_idx"
+            ),
+        ),
+        migrations.RunPython(set_due_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_orderitem_due_at_tat_flag"),
+        ("patients", "0003_patient_age_days_patient_age_months_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["created_at"], name="orders_created_77e2b9_idx"),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_order_created_at_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["updated_at"], name="orders_updated_1bd457_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["updated_at"], name="order_items_updated_8cff18_idx"
+            ),
+        ),
+    ]
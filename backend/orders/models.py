@@ -29,6 +29,25 @@ class OrderPriority(models.TextChoices):
     STAT = "STAT", "STAT"
 
 
+class TatFlag(models.TextChoices):
+    """
+    Enumeration for how an open order item stands against its TAT.
+    """
+
+    ON_TIME = "", "On time"
+    DUE_SOON = "DUE_SOON", "Due soon"
+    OVERDUE = "OVERDUE", "Overdue"
+
+
+# Statuses of order items whose turnaround time is still running
+OPEN_STATUSES = [
+    OrderStatus.NEW,
+    OrderStatus.COLLECTED,
+    OrderStatus.IN_PROCESS,
+    OrderStatus.VERIFIED,
+]
+
+
 class Order(models.Model):
     """
     Represents a patient's order for one or more lab tests.
@@ -68,6 +87,10 @@ class Order(models.Model):
             models.Index(fields=["order_no"]),
             models.Index(fields=["patient"]),
             models.Index(fields=["status"]),
+            # Analytics select orders by the period they were placed in
+            models.Index(fields=["created_at"]),
+            # Incremental Parquet exports select rows changed since the last
+            models.Index(fields=["updated_at"]),
         ]
 
     def __str__(self):
@@ -107,6 +130,10 @@ class OrderItem(models.Model):
         order (ForeignKey): The order this item belongs to.
         test (ForeignKey): The test from the catalog for this item.
         status (CharField): The current status of this specific test.
+        due_at (DateTimeField): When the result is due: the order time plus
+            the test's turnaround time.
+        tat_flag (CharField): Whether the TAT monitor found the item due
+            soon or overdue.
         created_at (DateTimeField): The timestamp when the item was created.
         updated_at (DateTimeField): The timestamp when the item was last updated.
     """
@@ -118,12 +145,21 @@ class OrderItem(models.Model):
         choices=OrderStatus.choices,
         default=OrderStatus.NEW,
     )
+    due_at = models.DateTimeField(null=True, blank=True)
+    tat_flag = models.CharField(
+        max_length=20, choices=TatFlag.choices, default=TatFlag.ON_TIME, blank=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "order_items"
         ordering = ["id"]
+        indexes = [
+            # "What is overdue now" is a range scan per open status
+            models.Index(fields=["status", "due_at"]),
+            models.Index(fields=["updated_at"]),
+        ]
 
     def __str__(self):
         """Returns a string representation of the order item."""
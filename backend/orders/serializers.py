@@ -1,15 +1,13 @@
 """Order serializers."""
 
-from django.utils import timezone
 from rest_framework import serializers
 
+from catalog.models import TestCatalog
 from catalog.serializers import TestCatalogSerializer
 from patients.serializers import PatientSerializer
-from results.models import Result, ResultStatus
-from samples.models import Sample, SampleStatus
-from settings.utils import should_skip_sample_collection, should_skip_sample_receive
 
-from .models import Order, OrderItem, OrderStatus
+from .models import Order, OrderItem
+from .services import create_order
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -21,8 +19,66 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderItem
-        fields = ["id", "test", "test_detail", "status", "created_at", "updated_at"]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        fields = [
+            "id",
+            "test",
+            "test_detail",
+            "status",
+            "due_at",
+            "tat_flag",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["id", "due_at", "tat_flag", "created_at", "updated_at"]
+
+
+class OverdueItemSerializer(serializers.ModelSerializer):
+    """
+    Serializer for an order item on the overdue worklist.
+
+    `minutes_overdue` is negative for items not yet due.
+    """
+
+    order_no = serializers.CharField(source="order.order_no", read_only=True)
+    priority = serializers.CharField(source="order.priority", read_only=True)
+    patient_name = serializers.CharField(
+        source="order.patient.full_name", read_only=True
+    )
+    mrn = serializers.CharField(source="order.patient.mrn", read_only=True)
+    test_code = serializers.CharField(source="test.code", read_only=True)
+    test_name = serializers.CharField(source="test.name", read_only=True)
+    minutes_overdue = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderItem
+        fields = [
+            "id",
+            "order",
+            "order_no",
+            "priority",
+            "patient_name",
+            "mrn",
+            "test",
+            "test_code",
+            "test_name",
+            "status",
+            "due_at",
+            "tat_flag",
+            "minutes_overdue",
+        ]
+        read_only_fields = fields
+
+    def get_minutes_overdue(self, obj):
+        """
+        Returns the minutes since the item was due.
+
+        Args:
+            obj (OrderItem): The order item.
+
+        Returns:
+            int: Whole minutes past the due time; negative before it.
+        """
+        return int((self.context["now"] - obj.due_at).total_seconds() // 60)
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -58,14 +114,33 @@ class OrderSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "order_no", "status", "created_at", "updated_at"]
 
+    def validate_test_ids(self, value):
+        """
+        Validate that every requested test exists in the catalog.
+
+        Args:
+            value (list[int]): The requested test IDs.
+
+        Returns:
+            list[int]: The validated test IDs.
+
+        Raises:
+            serializers.ValidationError: If any test ID is unknown.
+        """
+        existing = set(
+            TestCatalog.objects.filter(pk__in=value).values_list("pk", flat=True)
+        )
+        missing = [test_id for test_id in value if test_id not in existing]
+        if missing:
+            raise serializers.ValidationError(f"Unknown test IDs: {missing}")
+        return value
+
     def create(self, validated_data):
         """
         Creates an order with its associated order items and samples.
 
-        This method also handles the automatic creation of samples and sets their
-        status based on the current workflow settings (e.g., skipping sample
-        collection or reception). When both collection and reception are skipped,
-        Result objects are also created to enable immediate result entry.
+        Delegates to `orders.services.create_order`, which sets the status of
+        the order, its items and samples based on the current workflow settings.
 
         Args:
             validated_data (dict): The validated data for the order.
@@ -73,66 +148,4 @@ class OrderSerializer(serializers.ModelSerializer):
         Returns:
             Order: The newly created order instance.
         """
-        test_ids = validated_data.pop("test_ids")
-
-        # Get workflow settings
-        skip_collection = should_skip_sample_collection()
-        skip_receive = should_skip_sample_receive()
-
-        # Determine initial order status based on workflow settings
-        initial_order_status = OrderStatus.NEW
-        if skip_collection and skip_receive:
-            # If both are skipped, order is ready for result entry
-            initial_order_status = OrderStatus.IN_PROCESS
-        elif skip_collection:
-            # If only collection is skipped, order is in collected state
-            initial_order_status = OrderStatus.COLLECTED
-
-        order = Order.objects.create(**validated_data, status=initial_order_status)
-
-        # Create order items and samples
-        for test_id in test_ids:
-            # Determine order item status
-            item_status = OrderStatus.NEW
-            if skip_collection and skip_receive:
-                item_status = OrderStatus.IN_PROCESS
-            elif skip_collection:
-                item_status = OrderStatus.COLLECTED
-
-            order_item = OrderItem.objects.create(
-                order=order, test_id=test_id, status=item_status
-            )
-
-            # Auto-create sample for this order item
-            sample_status = SampleStatus.PENDING
-            collected_at = None
-            received_at = None
-
-            # If collection is disabled, mark as collected automatically
-            if skip_collection:
-                sample_status = SampleStatus.COLLECTED
-                collected_at = timezone.now()
-
-            # If both collection and receive are disabled, mark as received
-            if skip_collection and skip_receive:
-                sample_status = SampleStatus.RECEIVED
-                received_at = timezone.now()
-
-            Sample.objects.create(
-                order_item=order_item,
-                sample_type=order_item.test.sample_type,
-                status=sample_status,
-                collected_at=collected_at,
-                received_at=received_at,
-            )
-
-            # If sample is marked as received (both steps skipped),
-            # create a Result object for immediate result entry
-            if skip_collection and skip_receive:
-                Result.objects.create(
-                    order_item=order_item,
-                    value="",
-                    status=ResultStatus.DRAFT,
-                )
-
-        return order
+        return create_order(**validated_data)
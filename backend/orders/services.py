@@ -0,0 +1,208 @@
+"""Services for order creation."""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+from catalog.models import Test, TestCatalog, TestParameter
+from interfaces.hostquery import index_samples_on_commit
+from results.models import Result, ResultStatus
+from samples.models import Sample, SampleStatus
+from settings.utils import should_skip_sample_collection, should_skip_sample_receive
+
+from .models import Order, OrderItem, OrderStatus
+from .tat import tat_minutes
+
+
+def master_tests(codes):
+    """
+    Loads the LIMS master data of catalog tests in one query.
+
+    Args:
+        codes (Iterable[str]): The catalog test codes.
+
+    Returns:
+        dict[str, tuple[str, str, int]]: The specimen type, container type
+            and default TAT in minutes of each code with master data.
+    """
+    return {
+        code: (specimen_type, container_type, default_tat_minutes)
+        for code, specimen_type, container_type, default_tat_minutes in (
+            Test.objects.filter(code__in=set(codes)).values_list(
+                "code", "specimen_type", "container_type", "default_tat_minutes"
+            )
+        )
+    }
+
+
+def due_times(start, tests, master=None):
+    """
+    Computes when the results of some tests are due.
+
+    Args:
+        start (datetime): When the clock started: the order time.
+        tests (Iterable[TestCatalog]): The catalog tests.
+        master (dict | None): The output of `master_tests` for the tests;
+            loaded when not given.
+
+    Returns:
+        dict[int, datetime]: The due time of each test id.
+    """
+    tests = list(tests)
+    if master is None:
+        master = master_tests(test.code for test in tests)
+    return {
+        test.pk: start
+        + timedelta(minutes=tat_minutes(test, master.get(test.code, ("", "", 0))[2]))
+        for test in tests
+    }
+
+
+def specimen_groups(items, master=None):
+    """
+    Groups order items by the sample they can share.
+
+    Tests taking the same specimen in the same container, as recorded in the
+    LIMS master data, share one sample. Tests without a container keep a
+    sample of their own, since nothing says which tube they can go in.
+
+    Args:
+        items (list[OrderItem]): The order items, with their tests loaded.
+        master (dict | None): The output of `master_tests` for the items'
+            tests; loaded when not given.
+
+    Returns:
+        list[tuple[str, str, list[OrderItem]]]: The sample type, container
+            type and order items of each sample, in the order of the items.
+    """
+    if master is None:
+        master = master_tests(item.test.code for item in items)
+    groups = {}
+    for index, item in enumerate(items):
+        specimen_type, container_type, _ = master.get(item.test.code, ("", "", 0))
+        sample_type = (specimen_type or item.test.sample_type)[:50]
+        key = (sample_type, container_type) if container_type else index
+        groups.setdefault(key, (sample_type, container_type, []))[2].append(item)
+    return list(groups.values())
+
+
+@transaction.atomic
+def create_order(*, test_ids, **order_fields) -> Order:
+    """
+    Creates an order with its order items, samples and (optionally) results.
+
+    Sample and result statuses are derived from the current workflow settings
+    (e.g., skipping sample collection or reception). When both collection and
+    reception are skipped, Result objects are also created to enable immediate
+    result entry.
+
+    Order items are grouped into samples by `specimen_groups`, so tests
+    sharing a tube share one sample, barcode and label. Each item is due at
+    the order time plus its test's TAT (`due_times`). All rows for the
+    order are written with `bulk_create`, so the number of queries does not
+    grow with the number of tests ordered.
+
+    Args:
+        test_ids: IDs of the `TestCatalog` entries to order.
+        **order_fields: Field values for the `Order` (patient, priority, notes).
+
+    Returns:
+        Order: The new order, with `items__test` prefetched.
+    """
+    skip_collection = should_skip_sample_collection()
+    skip_receive = should_skip_sample_receive()
+
+    # Determine initial status based on workflow settings
+    status = OrderStatus.NEW
+    if skip_collection and skip_receive:
+        # If both are skipped, order is ready for result entry
+        status = OrderStatus.IN_PROCESS
+    elif skip_collection:
+        # If only collection is skipped, order is in collected state
+        status = OrderStatus.COLLECTED
+
+    order = Order.objects.create(**order_fields, status=status)
+
+    tests = TestCatalog.objects.in_bulk(test_ids)
+    master = master_tests(test.code for test in tests.values())
+    due_at = due_times(order.created_at, tests.values(), master)
+    items = OrderItem.objects.bulk_create(
+        [
+            OrderItem(
+                order=order,
+                test=tests[test_id],
+                status=status,
+                due_at=due_at[test_id],
+            )
+            for test_id in test_ids
+        ]
+    )
+
+    # Auto-create one sample per specimen and container
+    sample_status = SampleStatus.PENDING
+    collected_at = None
+    received_at = None
+    if skip_collection:
+        sample_status = SampleStatus.COLLECTED
+        collected_at = timezone.now()
+    if skip_collection and skip_receive:
+        sample_status = SampleStatus.RECEIVED
+        received_at = timezone.now()
+
+    groups = specimen_groups(items, master)
+    barcodes = Sample.allocate_barcodes(len(groups))
+    samples = Sample.objects.bulk_create(
+        [
+            Sample(
+                order=order,
+                sample_type=sample_type,
+                container_type=container_type,
+                barcode=barcode,
+                status=sample_status,
+                collected_at=collected_at,
+                received_at=received_at,
+            )
+            for (sample_type, container_type, _), barcode in zip(
+                groups, barcodes, strict=True
+            )
+        ]
+    )
+    Sample.link_order_items(
+        (sample, item)
+        for sample, (_, _, group) in zip(samples, groups, strict=True)
+        for item in group
+    )
+    # Analyzers can ask for the tests of the new barcodes right away
+    index_samples_on_commit(
+        {
+            sample.barcode: [item.test.code for item in group]
+            for sample, (_, _, group) in zip(samples, groups, strict=True)
+        }
+    )
+
+    # If samples are marked as received (both steps skipped),
+    # create Result objects for immediate result entry
+    if skip_collection and skip_receive:
+        parameter_ids = {
+            code: test_parameter.parameter_id
+            for code, test_parameter in TestParameter.for_test_codes(
+                item.test.code for item in items
+            ).items()
+        }
+        Result.objects.bulk_create(
+            [
+                Result(
+                    order_item=item,
+                    patient_id=order.patient_id,
+                    parameter_id=parameter_ids.get(item.test.code),
+                    value="",
+                    status=ResultStatus.DRAFT,
+                )
+                for item in items
+            ]
+        )
+
+    prefetch_related_objects([order], "items__test")
+    return order
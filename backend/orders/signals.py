@@ -0,0 +1,30 @@
+"""Cache invalidation for order data."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate_on_commit
+from patients.models import Patient
+
+from .models import Order, OrderItem
+
+
+@receiver([post_save, post_delete], sender=Order)
+def invalidate_order(sender, instance, **kwargs):
+    """Invalidates the cached order detail."""
+    invalidate_on_commit(f"order:{instance.pk}")
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def invalidate_order_of_item(sender, instance, **kwargs):
+    """Invalidates the cached detail of the item's order."""
+    invalidate_on_commit(f"order:{instance.order_id}")
+
+
+@receiver(post_save, sender=Patient)
+def invalidate_orders_of_patient(sender, instance, created, **kwargs):
+    """Invalidates cached orders embedding the updated patient's details."""
+    if created:
+        return
+    order_ids = Order.objects.filter(patient=instance).values_list("pk", flat=True)
+    invalidate_on_commit(*(f"order:{order_id}" for order_id in order_ids))
@@ -0,0 +1,155 @@
+"""Turnaround-time (TAT) monitoring for order items.
+
+Each order item gets a due time when it is created: the order time plus
+the test's TAT, taken from `Test.default_tat_minutes` in the LIMS master
+data (matched by code) or else `TestCatalog.turnaround_time_hours`.
+
+`due_at` is indexed together with `status`, so the open items due before
+a moment are found with one index range scan per open status instead of
+computing every item's deadline:
+
+    SELECT ... FROM order_items
+     WHERE status IN ('NEW', ..., 'VERIFIED') AND due_at <= now
+
+`flag_items` marks open items as due soon (within `TAT_WARNING_MINUTES`)
+or overdue and publishes an event for each newly flagged item. The
+`tat_monitor` command runs it, sleeping until the next item crosses a
+threshold, as read from the same index, rather than polling blindly.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.cache import invalidate_on_commit
+from events.broker import publish_events
+
+from .models import OPEN_STATUSES, OrderItem, TatFlag
+
+logger = logging.getLogger(__name__)
+
+
+def tat_minutes(test, default_tat_minutes=0):
+    """
+    Returns the turnaround time of a test.
+
+    Args:
+        test (TestCatalog): The catalog test.
+        default_tat_minutes (int): The `default_tat_minutes` of the test's
+            master data, if any.
+
+    Returns:
+        int: The TAT in minutes: the master data's when set, else the
+            catalog's.
+    """
+    if default_tat_minutes and default_tat_minutes > 0:
+        return default_tat_minutes
+    return test.turnaround_time_hours * 60
+
+
+def warning_window(minutes=None):
+    """Returns how long before its due time an item counts as due soon."""
+    return timedelta(
+        minutes=settings.TAT_WARNING_MINUTES if minutes is None else minutes
+    )
+
+
+def open_items_due(before):
+    """
+    Returns the open order items due before a moment.
+
+    Args:
+        before (datetime): The moment.
+
+    Returns:
+        QuerySet[OrderItem]: The items, earliest due first.
+    """
+    return OrderItem.objects.filter(
+        status__in=OPEN_STATUSES, due_at__lte=before
+    ).order_by("due_at", "id")
+
+
+def _flag(items, flag, event_type):
+    if not items:
+        return
+    OrderItem.objects.filter(pk__in=[item.pk for item in items]).update(
+        tat_flag=flag, updated_at=timezone.now()
+    )
+    for item in items:
+        item.tat_flag = flag
+    # update() sends no post_save; order details embed their items
+    invalidate_on_commit(*{f"order:{item.order_id}" for item in items})
+    publish_events(event_type, items)
+
+
+def flag_items(now=None, warning=None):
+    """
+    Flags open order items that are due soon or overdue.
+
+    Only items whose flag changes are written and announced, with the
+    `order_item.due_soon` and `order_item.overdue` events.
+
+    Args:
+        now (datetime | None): The current time.
+        warning (timedelta | None): How long before its due time an item
+            counts as due soon. Defaults to `TAT_WARNING_MINUTES`.
+
+    Returns:
+        tuple[list[OrderItem], list[OrderItem]]: The items newly flagged
+            due soon, and newly flagged overdue.
+    """
+    now = now or timezone.now()
+    warning = warning_window() if warning is None else warning
+    fields = ("id", "order_id", "status", "due_at", "tat_flag")
+
+    overdue = list(open_items_due(now).exclude(tat_flag=TatFlag.OVERDUE).only(*fields))
+    due_soon = list(
+        open_items_due(now + warning)
+        .filter(due_at__gt=now, tat_flag=TatFlag.ON_TIME)
+        .only(*fields)
+    )
+    _flag(overdue, TatFlag.OVERDUE, "order_item.overdue")
+    _flag(due_soon, TatFlag.DUE_SOON, "order_item.due_soon")
+    if overdue or due_soon:
+        logger.info(
+            "Flagged %d order items overdue and %d due soon",
+            len(overdue),
+            len(due_soon),
+        )
+    return due_soon, overdue
+
+
+def next_check(now=None, warning=None):
+    """
+    Returns when the next open item crosses a TAT threshold.
+
+    Args:
+        now (datetime | None): The current time.
+        warning (timedelta | None): The due-soon window.
+
+    Returns:
+        datetime | None: The earliest moment an item becomes due soon or
+            overdue, or None if no open item has a due time ahead.
+    """
+    now = now or timezone.now()
+    warning = warning_window() if warning is None else warning
+    upcoming = OrderItem.objects.filter(status__in=OPEN_STATUSES).order_by("due_at")
+    next_due_soon = (
+        upcoming.filter(due_at__gt=now + warning, tat_flag=TatFlag.ON_TIME)
+        .values_list("due_at", flat=True)
+        .first()
+    )
+    next_overdue = (
+        upcoming.filter(due_at__gt=now)
+        .exclude(tat_flag=TatFlag.OVERDUE)
+        .values_list("due_at", flat=True)
+        .first()
+    )
+    moments = []
+    if next_due_soon is not None:
+        moments.append(next_due_soon - warning)
+    if next_overdue is not None:
+        moments.append(next_overdue)
+    return min(moments, default=None)
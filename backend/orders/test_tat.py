@@ -0,0 +1,236 @@
+"""Tests for turnaround-time monitoring."""
+
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import Test, TestCatalog
+from patients.models import Patient
+from users.models import User, UserRole
+
+from .models import Order, OrderItem, OrderStatus, TatFlag
+from .tat import flag_items, next_check, tat_minutes
+
+
+class TatFixtures:
+    """Shared set-up: a patient and two catalog tests."""
+
+    def setup_method(self):
+        """Set up test data."""
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="reception", password="testpass123", role=UserRole.RECEPTION
+        )
+        self.client.force_authenticate(user=self.user)
+        self.patient = Patient.objects.create(
+            full_name="John Doe",
+            father_name="James Doe",
+            dob=date(1990, 1, 1),
+            sex="M",
+            phone="03001234567",
+        )
+        self.cbc = TestCatalog.objects.create(
+            code="CBC",
+            name="Complete Blood Count",
+            category="Hematology",
+            sample_type="Blood",
+            price=500,
+            turnaround_time_hours=24,
+        )
+        self.lft = TestCatalog.objects.create(
+            code="LFT",
+            name="Liver Function Test",
+            category="Biochemistry",
+            sample_type="Blood",
+            price=800,
+            turnaround_time_hours=48,
+        )
+
+    def item(self, due_in, test=None, **fields):
+        """Creates an order item due `due_in` from now."""
+        order = Order.objects.create(patient=self.patient)
+        return OrderItem.objects.create(
+            order=order,
+            test=test or self.cbc,
+            due_at=timezone.now() + due_in,
+            **fields,
+        )
+
+
+@pytest.mark.django_db
+class TestDueTimes(TatFixtures):
+    """Test that order items get a due time when they are created."""
+
+    def test_catalog_tat(self):
+        """Test that the catalog TAT applies without master data."""
+        response = self.client.post(
+            "/api/orders/",
+            {"patient": self.patient.id, "test_ids": [self.cbc.id, self.lft.id]},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        order = Order.objects.get(pk=response.data["id"])
+        due = {item.test_id: item.due_at for item in order.items.all()}
+        assert due[self.cbc.id] == order.created_at + timedelta(hours=24)
+        assert due[self.lft.id] == order.created_at + timedelta(hours=48)
+        assert all(item["due_at"] for item in response.data["items"])
+
+    def test_master_tat(self):
+        """Test that `default_tat_minutes` of the master data wins."""
+        Test.objects.create(
+            code="CBC", name="Complete Blood Count", default_tat_minutes=90
+        )
+        response = self.client.post(
+            "/api/orders/",
+            {"patient": self.patient.id, "test_ids": [self.cbc.id]},
+            format="json",
+        )
+        order = Order.objects.get(pk=response.data["id"])
+        item = order.items.get()
+        assert item.due_at == order.created_at + timedelta(minutes=90)
+
+    def test_tat_minutes(self):
+        """Test that an unset master TAT falls back to the catalog."""
+        assert tat_minutes(self.cbc) == 24 * 60
+        assert tat_minutes(self.cbc, 0) == 24 * 60
+        assert tat_minutes(self.cbc, 45) == 45
+
+    def test_added_tests(self):
+        """Test that tests added to an order are due from the order time."""
+        order = Order.objects.create(patient=self.patient)
+        OrderItem.objects.create(order=order, test=self.cbc)
+
+        response = self.client.patch(
+            f"/api/orders/{order.id}/edit-tests/",
+            {"tests_to_add": [self.lft.id]},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        item = order.items.get(test=self.lft)
+        assert item.due_at == order.created_at + timedelta(hours=48)
+
+
+@pytest.mark.django_db
+class TestFlagItems(TatFixtures):
+    """Test flagging items that are due soon or overdue."""
+
+    def test_flags_once(self):
+        """Test that items are flagged, and announced, only once."""
+        overdue = self.item(-timedelta(minutes=5))
+        due_soon = self.item(timedelta(minutes=10))
+        on_time = self.item(timedelta(hours=5))
+        done = self.item(-timedelta(hours=1), status=OrderStatus.PUBLISHED)
+
+        with patch("orders.tat.publish_events") as publish:
+            flagged = flag_items(warning=timedelta(minutes=30))
+            again = flag_items(warning=timedelta(minutes=30))
+
+        assert [item.pk for item in flagged[0]] == [due_soon.pk]
+        assert [item.pk for item in flagged[1]] == [overdue.pk]
+        assert again == ([], [])
+        assert [call.args[0] for call in publish.call_args_list] == [
+            "order_item.overdue",
+            "order_item.due_soon",
+        ]
+        flags = dict(OrderItem.objects.values_list("pk", "tat_flag"))
+        assert flags == {
+            overdue.pk: TatFlag.OVERDUE,
+            due_soon.pk: TatFlag.DUE_SOON,
+            on_time.pk: TatFlag.ON_TIME,
+            done.pk: TatFlag.ON_TIME,
+        }
+
+    def test_due_soon_becomes_overdue(self):
+        """Test that a due-soon item is flagged again once overdue."""
+        item = self.item(timedelta(minutes=10))
+        flag_items(warning=timedelta(minutes=30))
+
+        due_soon, overdue = flag_items(
+            now=timezone.now() + timedelta(minutes=11), warning=timedelta(minutes=30)
+        )
+        assert due_soon == []
+        assert [flagged.pk for flagged in overdue] == [item.pk]
+
+    def test_next_check(self):
+        """Test that the next check is the earliest threshold crossing."""
+        now = timezone.now()
+        warning = timedelta(minutes=30)
+        assert next_check(now, warning) is None
+
+        later = self.item(timedelta(hours=5))
+        assert next_check(now, warning) == later.due_at - warning
+
+        soon = self.item(timedelta(minutes=10))
+        flag_items(now, warning)
+        assert next_check(now, warning) == soon.due_at
+
+    def test_command(self):
+        """Test that the monitor flags items when run once."""
+        item = self.item(-timedelta(minutes=1))
+
+        call_command("tat_monitor", "--once", stdout=StringIO())
+        item.refresh_from_db()
+        assert item.tat_flag == TatFlag.OVERDUE
+
+
+@pytest.mark.django_db
+class TestOverdueWorklist(TatFixtures):
+    """Test the overdue worklist endpoint."""
+
+    def test_lists_overdue_items(self):
+        """Test that open overdue items are listed, most overdue first."""
+        late = self.item(-timedelta(minutes=10))
+        later = self.item(-timedelta(hours=2), test=self.lft)
+        self.item(timedelta(minutes=10))
+        verified = self.item(-timedelta(hours=1), status=OrderStatus.VERIFIED)
+        self.item(-timedelta(hours=1), status=OrderStatus.CANCELLED)
+
+        response = self.client.get("/api/orders/overdue/")
+        assert response.status_code == status.HTTP_200_OK
+        results = response.data["results"]
+        assert [row["id"] for row in results] == [later.id, verified.id, late.id]
+        first = results[0]
+        assert first["test_code"] == "LFT"
+        assert first["mrn"] == self.patient.mrn
+        assert first["minutes_overdue"] in (119, 120)
+
+    def test_within(self):
+        """Test that `within` adds items due in the next minutes."""
+        self.item(-timedelta(minutes=10))
+        self.item(timedelta(minutes=10))
+        self.item(timedelta(hours=2))
+
+        response = self.client.get("/api/orders/overdue/?within=30")
+        assert response.data["count"] == 2
+        assert response.data["results"][1]["minutes_overdue"] < 0
+
+    def test_invalid_within(self):
+        """Test that `within` must be a number of minutes."""
+        response = self.client.get("/api/orders/overdue/?within=soon")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.get("/api/orders/overdue/?within=-5")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_constant_queries(self):
+        """Test that the worklist takes the same queries for any length."""
+        self.item(-timedelta(minutes=10))
+        with CaptureQueriesContext(connection) as one:
+            self.client.get("/api/orders/overdue/")
+        for _ in range(5):
+            self.item(-timedelta(minutes=10), test=self.lft)
+        with CaptureQueriesContext(connection) as six:
+            self.client.get("/api/orders/overdue/")
+        assert len(six) == len(one)
+
+    def test_requires_authentication(self):
+        """Test that the worklist requires a signed-in user."""
+        response = APIClient().get("/api/orders/overdue/")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
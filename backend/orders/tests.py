@@ -131,9 +131,10 @@ class TestOrderAPI:
         self.client.force_authenticate(user=self.user)
         order = Order.objects.create(patient=self.patient, priority="ROUTINE")
         order_item = OrderItem.objects.create(order=order, test=self.test1)
-        Sample.objects.create(
-            order_item=order_item, sample_type="Blood", status="COLLECTED"
+        sample = Sample.objects.create(
+            order=order, sample_type="Blood", status="COLLECTED"
         )
+        sample.order_items.add(order_item)
 
         response = self.client.post(f"/api/orders/{order.id}/cancel/")
         assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -247,9 +248,10 @@ class TestOrderAPI:
         self.client.force_authenticate(user=self.user)
         order = Order.objects.create(patient=self.patient, priority="ROUTINE")
         order_item = OrderItem.objects.create(order=order, test=self.test1)
-        Sample.objects.create(
-            order_item=order_item, sample_type="Blood", status="PENDING"
+        sample = Sample.objects.create(
+            order=order, sample_type="Blood", status="PENDING"
         )
+        sample.order_items.add(order_item)
 
         data = {"tests_to_add": [self.test2.id]}
         response = self.client.patch(
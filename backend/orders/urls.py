@@ -2,10 +2,17 @@
 
 from django.urls import path
 
-from .views import OrderDetailView, OrderListCreateView, cancel_order, edit_order_tests
+from .views import (
+    OrderDetailView,
+    OrderListCreateView,
+    OverdueItemListView,
+    cancel_order,
+    edit_order_tests,
+)
 
 urlpatterns = [
     path("", OrderListCreateView.as_view(), name="order-list-create"),
+    path("overdue/", OverdueItemListView.as_view(), name="order-overdue"),
     path("<int:pk>/", OrderDetailView.as_view(), name="order-detail"),
     path("<int:pk>/cancel/", cancel_order, name="order-cancel"),
     path("<int:pk>/edit-tests/", edit_order_tests, name="order-edit-tests"),
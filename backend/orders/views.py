@@ -1,13 +1,26 @@
 """Order views."""
 
+from datetime import timedelta
+
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from catalog.models import TestCatalog
+from core.cache import CachedRetrieveMixin, invalidate_on_commit
+from interfaces.hostquery import refresh_orders_on_commit
 from patients.permissions import IsAdminOrReception
+from results.models import Result
+from samples.models import Sample, SampleStatus
 
-from .models import Order, OrderStatus
-from .serializers import OrderSerializer
+from .models import Order, OrderItem, OrderStatus
+from .serializers import OrderSerializer, OverdueItemSerializer
+from .services import due_times
+from .tat import open_items_due
 
 
 class OrderListCreateView(generics.ListCreateAPIView):
@@ -62,9 +75,12 @@ class OrderListCreateView(generics.ListCreateAPIView):
         )
 
 
-class OrderDetailView(generics.RetrieveAPIView):
+class OrderDetailView(CachedRetrieveMixin, generics.RetrieveAPIView):
     """
     Retrieves the details of a specific order.
+
+    Responses are cached until the order, its items, its patient or the
+    catalog change.
     """
 
     queryset = (
@@ -72,6 +88,7 @@ class OrderDetailView(generics.RetrieveAPIView):
     )
     serializer_class = OrderSerializer
     permission_classes = [IsAdminOrReception]
+    cache_namespaces = ["order:{pk}", "catalog"]
 
 
 @api_view(["POST"])
@@ -88,7 +105,7 @@ def cancel_order(request, pk):
         Response: A response object with a success or error message.
     """
     try:
-        order = Order.objects.prefetch_related("items__samples").get(pk=pk)
+        order = Order.objects.select_related("patient").get(pk=pk)
     except Order.DoesNotExist:
         return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -99,11 +116,10 @@ def cancel_order(request, pk):
         )
 
     # Check if any samples have been collected
-    has_collected_samples = False
-    for item in order.items.all():
-        if item.samples.filter(status__in=["COLLECTED", "RECEIVED"]).exists():
-            has_collected_samples = True
-            break
+    has_collected_samples = Sample.objects.filter(
+        order=order,
+        status__in=[SampleStatus.COLLECTED, SampleStatus.RECEIVED],
+    ).exists()
 
     if has_collected_samples:
         return Response(
@@ -113,11 +129,15 @@ def cancel_order(request, pk):
 
     # Cancel the order
     order.status = OrderStatus.CANCELLED
-    order.save()
+    order.save(update_fields=["status", "updated_at"])
 
     # Cancel all order items
-    order.items.update(status=OrderStatus.CANCELLED)
+    order.items.update(status=OrderStatus.CANCELLED, updated_at=timezone.now())
+    # update() does not send post_save
+    invalidate_on_commit(f"order:{order.pk}")
+    refresh_orders_on_commit([order.pk])
 
+    prefetch_related_objects([order], "items__test")
     serializer = OrderSerializer(order)
     return Response(serializer.data)
 
@@ -138,9 +158,7 @@ def edit_order_tests(request, pk):
         Response: A response object with the updated order data or an error message.
     """
     try:
-        order = Order.objects.prefetch_related("items__samples", "items__results").get(
-            pk=pk
-        )
+        order = Order.objects.select_related("patient").get(pk=pk)
     except Order.DoesNotExist:
         return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -152,26 +170,14 @@ def edit_order_tests(request, pk):
         )
 
     # Check if any samples exist
-    has_samples = False
-    for item in order.items.all():
-        if item.samples.exists():
-            has_samples = True
-            break
-
-    if has_samples:
+    if Sample.objects.filter(order=order).exists():
         return Response(
             {"error": "Cannot edit tests after samples have been created"},
             status=status.HTTP_400_BAD_REQUEST,
         )
 
     # Check if any results exist
-    has_results = False
-    for item in order.items.all():
-        if item.results.exists():
-            has_results = True
-            break
-
-    if has_results:
+    if Result.objects.filter(order_item__order=order).exists():
         return Response(
             {"error": "Cannot edit tests after results have been created"},
             status=status.HTTP_400_BAD_REQUEST,
@@ -198,20 +204,67 @@ def edit_order_tests(request, pk):
 
     # Remove tests
     if tests_to_remove:
-        from .models import OrderItem
-
         OrderItem.objects.filter(order=order, test_id__in=tests_to_remove).delete()
 
-    # Add tests
-    if tests_to_add:
-        from .models import OrderItem
-
-        for test_id in tests_to_add:
-            # Check if test already exists in order
-            if not OrderItem.objects.filter(order=order, test_id=test_id).exists():
-                OrderItem.objects.create(order=order, test_id=test_id)
+    # Add tests that are not already part of the order
+    new_test_ids = [
+        test_id
+        for test_id in dict.fromkeys(tests_to_add)
+        if test_id not in remaining_tests
+    ]
+    if new_test_ids:
+        due_at = due_times(
+            order.created_at, TestCatalog.objects.filter(pk__in=new_test_ids)
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, test_id=test_id, due_at=due_at.get(test_id))
+                for test_id in new_test_ids
+            ]
+        )
+        # bulk_create does not send post_save
+        invalidate_on_commit(f"order:{order.pk}")
+    refresh_orders_on_commit([order.pk])
 
     # Refresh order and return
     order.refresh_from_db()
+    prefetch_related_objects([order], "items__test")
     serializer = OrderSerializer(order)
     return Response(serializer.data)
+
+
+class OverdueItemListView(generics.ListAPIView):
+    """
+    Lists open order items past their due time, the most overdue first.
+
+    Filtering:
+    - `within` (integer): Also lists items due in the next `within`
+      minutes.
+    """
+
+    serializer_class = OverdueItemSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """
+        Returns the open items due by now plus `within` minutes.
+
+        Returns:
+            QuerySet: The `OrderItem` objects, earliest due first.
+        """
+        try:
+            within = int(self.request.query_params.get("within", 0))
+        except ValueError:
+            raise ValidationError({"within": "Must be a number of minutes"}) from None
+        if within < 0:
+            raise ValidationError({"within": "Must not be negative"})
+        self.now = timezone.now()
+        return open_items_due(self.now + timedelta(minutes=within)).select_related(
+            "order__patient", "test"
+        )
+
+    def get_serializer_context(self):
+        """Adds the time the worklist was computed at."""
+        context = super().get_serializer_context()
+        context["now"] = getattr(self, "now", None) or timezone.now()
+        return context
@@ -0,0 +1,26 @@
+"""factory_boy factories for patient data."""
+
+import factory
+from factory import fuzzy
+
+from .models import Patient
+
+
+class PatientFactory(factory.django.DjangoModelFactory):
+    """
+    Builds realistic-looking patients with Faker.
+
+    The MRN is left to the caller (or `Patient.save`) so that factories can be
+    used both for saved instances and for unsaved instances written with
+    `bulk_create`.
+    """
+
+    class Meta:
+        model = Patient
+
+    full_name = factory.Faker("name", locale="en_PK")
+    father_name = factory.Faker("name_male", locale="en_PK")
+    dob = factory.Faker("date_of_birth", minimum_age=0, maximum_age=90)
+    sex = fuzzy.FuzzyChoice(["M", "F"])
+    phone = factory.Sequence(lambda n: f"03{n % 10**9:09d}")
+    address = factory.Faker("address", locale="en_PK")
@@ -0,0 +1,14 @@
+"""Cache invalidation for patient data."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate_on_commit
+
+from .models import Patient
+
+
+@receiver([post_save, post_delete], sender=Patient)
+def invalidate_patient(sender, instance, **kwargs):
+    """Invalidates the cached patient detail."""
+    invalidate_on_commit(f"patient:{instance.pk}")
@@ -4,6 +4,8 @@ from django.db.models import Q
 from rest_framework import generics, status
 from rest_framework.response import Response
 
+from core.cache import CachedRetrieveMixin
+
 from .models import Patient
 from .permissions import IsAdminOrReception
 from .serializers import PatientSerializer
@@ -65,11 +67,14 @@ class PatientListCreateView(generics.ListCreateAPIView):
         )
 
 
-class PatientDetailView(generics.RetrieveAPIView):
+class PatientDetailView(CachedRetrieveMixin, generics.RetrieveAPIView):
     """
     Retrieves the details of a specific patient.
+
+    Responses are cached until the patient changes.
     """
 
     queryset = Patient.objects.all()
     serializer_class = PatientSerializer
     permission_classes = [IsAdminOrReception]
+    cache_namespaces = ["patient:{pk}"]
@@ -0,0 +1,54 @@
+"""Management command to run the print spooler."""
+
+import asyncio
+import logging
+
+from django.core.management.base import BaseCommand
+
+from printing.spooler import PrintSpooler
+
+
+class Command(BaseCommand):
+    """Send queued print jobs to their printers."""
+
+    help = (
+        "Send queued label and report print jobs to their printers, one "
+        "first-in first-out queue per printer"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--printers",
+            default="",
+            help="Comma-separated printer codes to serve (default: every "
+            "active printer); run several spoolers to split printers",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once every queue is empty instead of waiting for jobs",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        if options["verbosity"] > 1:
+            logging.getLogger("printing").setLevel(logging.INFO)
+
+        codes = [code.strip() for code in options["printers"].split(",")]
+        codes = [code for code in codes if code]
+        spooler = PrintSpooler(printers=codes or None)
+        self.stdout.write(
+            f"Spooling for {', '.join(codes) if codes else 'every active printer'}"
+        )
+        try:
+            asyncio.run(spooler.run(stop_when_idle=options["once"]))
+        except KeyboardInterrupt:
+            pass
+        stats = spooler.stats
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stopped after {stats.printed} jobs printed, {stats.retried} "
+                f"retried and {stats.failed} failed"
+            )
+        )
@@ -0,0 +1,53 @@
+"""Management command to run a local stand-in for a network printer."""
+
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from printing.spooler import DEFAULT_PRINTER_PORT
+from printing.standin import PrinterStandIn
+
+
+class Command(BaseCommand):
+    """Receive raw print data as a network printer does."""
+
+    help = (
+        "Run a raw (port 9100) printer stand-in: it accepts the jobs the "
+        "print spooler sends and can save them to a file"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--host",
+            default="127.0.0.1",
+            help="Address to listen on (default: 127.0.0.1)",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=DEFAULT_PRINTER_PORT,
+            help=f"TCP port (default: {DEFAULT_PRINTER_PORT})",
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="File the received data is appended to",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        standin = PrinterStandIn(
+            host=options["host"], port=options["port"], output=options["output"]
+        )
+        self.stdout.write(f"Printing on {options['host']}:{options['port']}")
+        try:
+            asyncio.run(standin.serve_forever())
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Received {len(standin.received)} prints "
+                f"({standin.labels} ZPL labels)"
+            )
+        )
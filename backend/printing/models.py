@@ -0,0 +1,124 @@
+"""Printing models."""
+
+from django.db import models
+
+
+class PrinterLanguage(models.TextChoices):
+    """
+    Enumeration for the data a printer accepts.
+    """
+
+    ZPL = "ZPL", "ZPL (thermal labels)"
+    PDF = "PDF", "PDF"
+
+
+class Printer(models.Model):
+    """
+    A printer the spooler sends jobs to.
+
+    Attributes:
+        code (CharField): A unique code, as used by `default_printer_code`
+            in the LIMS master data.
+        name (CharField): A descriptive name, e.g. the desk it stands at.
+        target (CharField): Where raw output is sent: `tcp://host:port`
+            for network printers (port 9100 by default) or `file:///path`
+            to append to a file or device.
+        language (CharField): The data the printer accepts.
+        print_group (CharField): Reports of tests in this
+            `default_print_group` go to this printer when their tests name
+            no printer.
+        is_active (BooleanField): Whether jobs are sent to the printer.
+        created_at (DateTimeField): The timestamp when the printer was added.
+    """
+
+    code = models.CharField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+    target = models.CharField(max_length=255)
+    language = models.CharField(
+        max_length=10, choices=PrinterLanguage.choices, default=PrinterLanguage.PDF
+    )
+    print_group = models.CharField(max_length=100, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "printers"
+        ordering = ["code"]
+
+    def __str__(self):
+        """Returns a string representation of the printer."""
+        return f"{self.code} - {self.name}"
+
+
+class PrintJobKind(models.TextChoices):
+    """
+    Enumeration for what a print job prints.
+    """
+
+    LABELS = "LABELS", "Labels"
+    REPORT = "REPORT", "Report"
+
+
+class PrintJobStatus(models.TextChoices):
+    """
+    Enumeration for the status of a print job.
+    """
+
+    QUEUED = "QUEUED", "Queued"
+    PRINTING = "PRINTING", "Printing"
+    PRINTED = "PRINTED", "Printed"
+    FAILED = "FAILED", "Failed"
+
+
+class PrintJob(models.Model):
+    """
+    A document queued for a printer.
+
+    Each printer's jobs are printed first in, first out by the print
+    spooler, which claims them by setting `worker` and `claimed_at`.
+
+    Attributes:
+        printer (ForeignKey): The printer the job is sent to.
+        kind (CharField): What the job prints.
+        description (CharField): What the job is for, e.g. the order number.
+        content_type (CharField): The media type of the document.
+        document (BinaryField): The raw output sent to the printer.
+        status (CharField): The status of the job.
+        attempts (PositiveIntegerField): The attempts made to print it.
+        last_error (TextField): The error of the last failed attempt.
+        worker (CharField): The spooler worker that claimed the job.
+        claimed_at (DateTimeField): The timestamp the job was last claimed.
+        created_by (ForeignKey): The user who queued the job.
+        created_at (DateTimeField): The timestamp the job was queued.
+        printed_at (DateTimeField): The timestamp the job was sent.
+    """
+
+    printer = models.ForeignKey(Printer, on_delete=models.PROTECT, related_name="jobs")
+    kind = models.CharField(max_length=20, choices=PrintJobKind.choices)
+    description = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=50)
+    document = models.BinaryField()
+    status = models.CharField(
+        max_length=20, choices=PrintJobStatus.choices, default=PrintJobStatus.QUEUED
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    worker = models.CharField(max_length=64, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(
+        "users.User",
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="print_jobs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    printed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "print_jobs"
+        ordering = ["id"]
+        indexes = [models.Index(fields=["printer", "status", "id"])]
+
+    def __str__(self):
+        """Returns a string representation of the job."""
+        return f"{self.kind} #{self.pk} → {self.printer_id} ({self.status})"
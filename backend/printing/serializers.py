@@ -0,0 +1,68 @@
+"""Printing serializers."""
+
+from rest_framework import serializers
+
+from .models import Printer, PrintJob
+from .spooler import parse_target
+
+
+class PrinterSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Printer model.
+    """
+
+    class Meta:
+        model = Printer
+        fields = [
+            "id",
+            "code",
+            "name",
+            "target",
+            "language",
+            "print_group",
+            "is_active",
+            "created_at",
+        ]
+        read_only_fields = ["id", "created_at"]
+
+    def validate_target(self, value):
+        """
+        Validates that the target is a supported printer URL.
+
+        Args:
+            value (str): The target.
+
+        Returns:
+            str: The validated target.
+        """
+        try:
+            parse_target(value)
+        except ValueError as error:
+            raise serializers.ValidationError(str(error)) from None
+        return value
+
+
+class PrintJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the PrintJob model, without the document itself.
+    """
+
+    printer_code = serializers.CharField(source="printer.code", read_only=True)
+
+    class Meta:
+        model = PrintJob
+        fields = [
+            "id",
+            "printer",
+            "printer_code",
+            "kind",
+            "description",
+            "content_type",
+            "status",
+            "attempts",
+            "last_error",
+            "created_by",
+            "created_at",
+            "printed_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,156 @@
+"""Printing services: choosing printers and queueing jobs."""
+
+from collections import Counter
+
+from django.conf import settings
+
+from catalog.models import Test
+from samples.labels import render_labels
+
+from .models import Printer, PrinterLanguage, PrintJob, PrintJobKind
+
+
+class PrintingError(Exception):
+    """Raised when a job cannot be queued, e.g. for want of a printer."""
+
+
+def get_printer(code):
+    """
+    Returns an active printer.
+
+    Args:
+        code (str): The printer code.
+
+    Returns:
+        Printer: The printer.
+
+    Raises:
+        PrintingError: If there is no active printer with the code.
+    """
+    try:
+        return Printer.objects.get(code=code, is_active=True)
+    except Printer.DoesNotExist:
+        raise PrintingError(f"No active printer {code}") from None
+
+
+def label_printer(code=None):
+    """
+    Chooses the printer for labels.
+
+    Args:
+        code (str | None): The requested printer code.
+
+    Returns:
+        Printer: The requested printer, or `PRINT_LABEL_PRINTER`.
+
+    Raises:
+        PrintingError: If no printer is requested or configured.
+    """
+    code = code or settings.PRINT_LABEL_PRINTER
+    if not code:
+        raise PrintingError("No printer given and no default label printer set")
+    return get_printer(code)
+
+
+def report_printer(order, code=None):
+    """
+    Chooses the printer for an order's report.
+
+    Without a requested printer, the LIMS master data of the order's tests
+    (matched by code) decides: the `default_printer_code` most of them
+    name, else the printer serving the `default_print_group` most of them
+    are in, else `PRINT_REPORT_PRINTER`.
+
+    Args:
+        order (Order): The order.
+        code (str | None): The requested printer code.
+
+    Returns:
+        Printer: The chosen printer.
+
+    Raises:
+        PrintingError: If no active printer is found.
+    """
+    if code:
+        return get_printer(code)
+
+    printer_codes, print_groups = Counter(), Counter()
+    for printer_code, print_group in Test.objects.filter(
+        code__in=order.items.values("test__code")
+    ).values_list("default_printer_code", "default_print_group"):
+        if printer_code:
+            printer_codes[printer_code] += 1
+        if print_group:
+            print_groups[print_group] += 1
+
+    printers = {
+        printer.code: printer
+        for printer in Printer.objects.filter(is_active=True, code__in=printer_codes)
+    }
+    for printer_code, _ in printer_codes.most_common():
+        if printer_code in printers:
+            return printers[printer_code]
+    by_group = {}
+    for printer in Printer.objects.filter(
+        is_active=True, print_group__in=print_groups
+    ).order_by("code"):
+        by_group.setdefault(printer.print_group, printer)
+    for print_group, _ in print_groups.most_common():
+        if print_group in by_group:
+            return by_group[print_group]
+    if settings.PRINT_REPORT_PRINTER:
+        return get_printer(settings.PRINT_REPORT_PRINTER)
+    raise PrintingError(f"No printer found for the report of {order.order_no}")
+
+
+def enqueue_labels(labels, printer, user=None):
+    """
+    Queues labels in the printer's language.
+
+    Args:
+        labels (list[Label]): The labels.
+        printer (Printer): The printer.
+        user (User | None): The user printing them.
+
+    Returns:
+        PrintJob: The queued job.
+    """
+    document, content_type = render_labels(labels, printer.language.lower())
+    orders = sorted({label.order_no for label in labels})
+    return PrintJob.objects.create(
+        printer=printer,
+        kind=PrintJobKind.LABELS,
+        description=f"{len(labels)} labels for {', '.join(orders)}"[:255],
+        content_type=content_type,
+        document=document,
+        created_by=user,
+    )
+
+
+def enqueue_report(report, printer, user=None):
+    """
+    Queues a generated report.
+
+    Args:
+        report (Report): The report, with its PDF file.
+        printer (Printer): The printer.
+        user (User | None): The user printing it.
+
+    Returns:
+        PrintJob: The queued job.
+
+    Raises:
+        PrintingError: If the printer does not print PDF documents.
+    """
+    if printer.language != PrinterLanguage.PDF:
+        raise PrintingError(f"Printer {printer.code} cannot print reports")
+    with report.pdf_file.open("rb") as file:
+        document = file.read()
+    return PrintJob.objects.create(
+        printer=printer,
+        kind=PrintJobKind.REPORT,
+        description=f"Report for {report.order.order_no}",
+        content_type="application/pdf",
+        document=document,
+        created_by=user,
+    )
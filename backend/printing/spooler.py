@@ -0,0 +1,413 @@
+"""Asyncio print spooler with a FIFO queue per printer.
+
+Print jobs are queued in `PrintJob` by the API and return at once, so a
+collection desk never waits on a printer. `PrintSpooler` runs one worker
+per active printer. Each worker claims the printer's oldest queued jobs in
+a batch, sends them and records the outcomes with one UPDATE per outcome:
+
+- ZPL printers take the whole batch over one connection, as one stream of
+  label formats.
+- PDF printers take one connection per job, since a raw (port 9100)
+  printer prints everything it receives on a connection as one document.
+  Their batches hold only the jobs that can be sent before
+  `PRINT_STALE_AFTER`.
+
+Jobs are claimed with a conditional UPDATE stamped with the worker's id,
+so several spooler processes can share printers without printing a job
+twice, and outcomes are saved only for jobs the worker still holds. When
+a printer cannot be reached, the job is retried, and the jobs behind it
+wait, with exponential backoff; after `PRINT_MAX_ATTEMPTS` it is marked
+FAILED and the queue moves on. Delivery is at least once: jobs claimed by
+a worker that stopped are claimed again after `PRINT_STALE_AFTER` seconds.
+"""
+
+import asyncio
+import logging
+import math
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Printer, PrinterLanguage, PrintJob, PrintJobStatus
+
+logger = logging.getLogger(__name__)
+
+# Port of raw network printing (AppSocket/JetDirect)
+DEFAULT_PRINTER_PORT = 9100
+
+# Errors of an unreachable or unresponsive printer
+TARGET_ERRORS = (OSError, TimeoutError)
+
+# Timeouts a connection to a printer can take: connecting, sending, closing
+CONNECTION_TIMEOUTS = 3
+
+
+def parse_target(target):
+    """
+    Reads a printer target.
+
+    Args:
+        target (str): `tcp://host[:port]` or `file:///path`.
+
+    Returns:
+        tuple[str, str, int | None]: The scheme, and the host and port of a
+            network printer or the path of a file.
+
+    Raises:
+        ValueError: If the target is not a supported URL.
+    """
+    parts = urlsplit(target)
+    if parts.scheme == "tcp" and parts.hostname:
+        return "tcp", parts.hostname, parts.port or DEFAULT_PRINTER_PORT
+    if parts.scheme == "file" and parts.path:
+        return "file", parts.path, None
+    raise ValueError(
+        f"Printer target must be tcp://host[:port] or file:///path, got {target!r}"
+    )
+
+
+def _append(path, documents):
+    with open(path, "ab") as file:
+        for document in documents:
+            file.write(document)
+
+
+async def send_documents(target, documents, timeout):
+    """
+    Sends raw documents to a printer over one connection.
+
+    Args:
+        target (str): The printer target.
+        documents (list[bytes]): The documents, sent in order.
+        timeout (float): Seconds to wait for the printer.
+
+    Raises:
+        OSError: If the printer cannot be reached or written to.
+        TimeoutError: If the printer does not take the data in time.
+    """
+    scheme, location, port = parse_target(target)
+    if scheme == "file":
+        await asyncio.to_thread(_append, location, documents)
+        return
+    _, writer = await asyncio.wait_for(asyncio.open_connection(location, port), timeout)
+    try:
+        for document in documents:
+            writer.write(document)
+        await asyncio.wait_for(writer.drain(), timeout)
+    finally:
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), timeout)
+        except TARGET_ERRORS:
+            pass
+
+
+@dataclass
+class SpoolerStats:
+    """
+    Counters of the spooler's activity.
+
+    Attributes:
+        printed (int): Jobs sent to their printer.
+        retried (int): Failed attempts that will be retried.
+        failed (int): Jobs given up on.
+        batches (int): Batches claimed.
+        connections (int): Printer connections that delivered jobs.
+    """
+
+    printed: int = 0
+    retried: int = 0
+    failed: int = 0
+    batches: int = 0
+    connections: int = 0
+
+
+class PrintSpooler:
+    """
+    Sends queued print jobs to their printers.
+
+    Args:
+        printers (Iterable[str] | None): The codes of the printers to serve;
+            every active printer when None.
+        batch_size (int): The most jobs claimed per printer at once.
+        poll_interval (float): Seconds to wait when a printer has no jobs,
+            and between checks for new printers.
+        timeout (float): Seconds to wait for a printer.
+        retry_delay (float): Seconds before the first retry; the delay
+            doubles with every further failed attempt.
+        max_attempts (int): The attempts before a job is marked FAILED.
+        stale_after (float): Seconds after which jobs claimed by another
+            worker are claimed again; longer than a connection can take.
+
+    Raises:
+        ValueError: If a connection can outlast `stale_after`.
+    """
+
+    def __init__(
+        self,
+        printers=None,
+        batch_size=None,
+        poll_interval=None,
+        timeout=None,
+        retry_delay=None,
+        max_attempts=None,
+        stale_after=None,
+    ):
+        self.printers = None if printers is None else list(printers)
+        self.batch_size = batch_size or settings.PRINT_BATCH_SIZE
+        self.poll_interval = (
+            settings.PRINT_POLL_INTERVAL if poll_interval is None else poll_interval
+        )
+        self.timeout = timeout or settings.PRINT_TIMEOUT
+        self.retry_delay = (
+            settings.PRINT_RETRY_DELAY if retry_delay is None else retry_delay
+        )
+        self.max_attempts = max_attempts or settings.PRINT_MAX_ATTEMPTS
+        self.stale_after = (
+            settings.PRINT_STALE_AFTER if stale_after is None else stale_after
+        )
+        if self.stale_after <= CONNECTION_TIMEOUTS * self.timeout:
+            raise ValueError(
+                f"stale_after ({self.stale_after}s) must be longer than "
+                f"{CONNECTION_TIMEOUTS} timeouts ({self.timeout}s each)"
+            )
+        self.worker_id = uuid.uuid4().hex
+        self.stats = SpoolerStats()
+
+    def load_printers(self):
+        """
+        Loads the printers to serve.
+
+        Returns:
+            list[Printer]: The active printers, filtered by `printers`.
+        """
+        close_old_connections()
+        printers = Printer.objects.filter(is_active=True)
+        if self.printers is not None:
+            printers = printers.filter(code__in=self.printers)
+        return list(printers)
+
+    def batch_limit(self, printer):
+        """
+        Returns the most jobs of a printer to claim at once.
+
+        A batch is sent before its claim goes stale, or another worker
+        would print its jobs again. A ZPL printer takes a batch over one
+        connection; a PDF printer takes a connection per job, so its
+        batches hold the jobs whose connections fit in `stale_after`.
+
+        Args:
+            printer (Printer): The printer.
+
+        Returns:
+            int: At most `batch_size`.
+        """
+        if printer.language == PrinterLanguage.ZPL:
+            return self.batch_size
+        connection = CONNECTION_TIMEOUTS * self.timeout
+        return min(self.batch_size, math.ceil(self.stale_after / connection) - 1)
+
+    def claim(self, printer_id, limit=None):
+        """
+        Claims the next batch of a printer's jobs.
+
+        Args:
+            printer_id (int): The printer.
+            limit (int | None): The most jobs to claim; `batch_size` if
+                None.
+
+        Returns:
+            list[PrintJob]: The claimed jobs with their printer, oldest
+                first; jobs claimed meanwhile by another worker are left out.
+        """
+        close_old_connections()
+        now = timezone.now()
+        claimable = Q(status=PrintJobStatus.QUEUED) | Q(
+            status=PrintJobStatus.PRINTING,
+            claimed_at__lt=now - timedelta(seconds=self.stale_after),
+        )
+        ids = list(
+            PrintJob.objects.filter(
+                claimable, printer_id=printer_id, printer__is_active=True
+            )
+            .order_by("id")
+            .values_list("id", flat=True)[: limit or self.batch_size]
+        )
+        if not ids:
+            return []
+        PrintJob.objects.filter(claimable, pk__in=ids).update(
+            status=PrintJobStatus.PRINTING, worker=self.worker_id, claimed_at=now
+        )
+        return list(
+            PrintJob.objects.filter(
+                pk__in=ids,
+                status=PrintJobStatus.PRINTING,
+                worker=self.worker_id,
+                claimed_at=now,
+            )
+            .select_related("printer")
+            .order_by("id")
+        )
+
+    def record(self, jobs):
+        """
+        Saves the outcome of claimed jobs, with one query per outcome.
+
+        Only jobs this worker still holds are saved: a job whose claim went
+        stale and was taken by another worker keeps that worker's outcome.
+
+        Args:
+            jobs (list[PrintJob]): The jobs, with their outcome set.
+
+        Returns:
+            int: The jobs saved.
+        """
+        outcomes = defaultdict(list)
+        for job in jobs:
+            outcome = (job.status, job.attempts, job.last_error, job.printed_at)
+            outcomes[outcome].append(job.pk)
+        saved = 0
+        for (status, attempts, last_error, printed_at), ids in outcomes.items():
+            saved += PrintJob.objects.filter(
+                pk__in=ids, status=PrintJobStatus.PRINTING, worker=self.worker_id
+            ).update(
+                status=status,
+                attempts=attempts,
+                last_error=last_error,
+                printed_at=printed_at,
+            )
+        if saved < len(jobs):
+            logger.warning(
+                "%s print jobs were claimed again by another worker",
+                len(jobs) - saved,
+            )
+        return saved
+
+    def fail(self, job, error):
+        """
+        Records a failed attempt.
+
+        Args:
+            job (PrintJob): The job.
+            error (str): The reason.
+        """
+        job.attempts += 1
+        job.last_error = error[:1000]
+        if job.attempts >= self.max_attempts:
+            job.status = PrintJobStatus.FAILED
+            self.stats.failed += 1
+            logger.error("Giving up on print job %s: %s", job.pk, error)
+        else:
+            job.status = PrintJobStatus.QUEUED
+            self.stats.retried += 1
+
+    async def print_batch(self, jobs):
+        """
+        Sends claimed jobs of one printer.
+
+        Sending stops at the first failure; the jobs behind it are queued
+        again unchanged, so the printer's queue keeps its order.
+
+        Returns:
+            bool: Whether every job was sent.
+        """
+        printer = jobs[0].printer
+        if printer.language == PrinterLanguage.ZPL:
+            groups = [jobs]
+        else:
+            groups = [[job] for job in jobs]
+
+        for number, group in enumerate(groups):
+            try:
+                await send_documents(
+                    printer.target, [bytes(job.document) for job in group], self.timeout
+                )
+            except (*TARGET_ERRORS, ValueError) as error:
+                for job in group:
+                    self.fail(job, f"{type(error).__name__}: {error}")
+                for later in groups[number + 1 :]:
+                    for job in later:
+                        job.status = PrintJobStatus.QUEUED
+                return False
+            self.stats.connections += 1
+            printed_at = timezone.now()
+            for job in group:
+                job.status = PrintJobStatus.PRINTED
+                job.attempts += 1
+                job.last_error = ""
+                job.printed_at = printed_at
+                self.stats.printed += 1
+        return True
+
+    async def work(self, printer, stop_when_idle=False):
+        """
+        Prints one printer's jobs in order until cancelled.
+
+        Args:
+            printer (Printer): The printer.
+            stop_when_idle (bool): Return once the printer has no jobs
+                instead of waiting for more.
+        """
+        failures = 0
+        while True:
+            jobs = await sync_to_async(self.claim)(
+                printer.pk, self.batch_limit(printer)
+            )
+            if not jobs:
+                if stop_when_idle:
+                    return
+                await asyncio.sleep(self.poll_interval)
+                continue
+            self.stats.batches += 1
+            sent = await self.print_batch(jobs)
+            await sync_to_async(self.record)(jobs)
+            if sent:
+                failures = 0
+                continue
+            failures += 1
+            logger.warning("Cannot print on %s (%s)", printer.code, printer.target)
+            await asyncio.sleep(self.retry_delay * 2 ** (failures - 1))
+
+    async def run(self, stop_when_idle=False):
+        """
+        Runs a worker per printer until cancelled.
+
+        New printers are picked up, and workers that stopped on an error
+        restarted, every `poll_interval` seconds.
+
+        Args:
+            stop_when_idle (bool): Return once every printer's queue is
+                empty instead of waiting for more jobs.
+        """
+        if stop_when_idle:
+            printers = await sync_to_async(self.load_printers)()
+            await asyncio.gather(*(self.work(printer, True) for printer in printers))
+            return
+
+        workers = {}
+        try:
+            while True:
+                for printer in await sync_to_async(self.load_printers)():
+                    worker = workers.get(printer.pk)
+                    if worker is not None and not worker.done():
+                        continue
+                    if worker is not None and worker.exception() is not None:
+                        logger.error(
+                            "Print worker for %s stopped",
+                            printer.code,
+                            exc_info=worker.exception(),
+                        )
+                    workers[printer.pk] = asyncio.create_task(self.work(printer))
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            for worker in workers.values():
+                worker.cancel()
+            await asyncio.gather(*workers.values(), return_exceptions=True)
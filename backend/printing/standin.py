@@ -0,0 +1,83 @@
+"""Local raw printer standing in for a network printer.
+
+Lets the print spooler be exercised in development and tests without a
+printer: `PrinterStandIn` listens like a raw (port 9100) printer and keeps
+what it receives on each connection. With `output`, it also appends the
+data to a file, so labels and reports can be inspected.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PrinterStandIn:
+    """
+    Receives raw print data as a network printer does.
+
+    Args:
+        host (str): The address to listen on.
+        port (int): The TCP port; 0 picks a free port.
+        output (str | None): A file the received data is appended to.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, output=None):
+        self.host = host
+        self.port = port
+        self.output = output
+        self.received = []
+        self.server = None
+        self.connections = set()
+
+    @property
+    def labels(self):
+        """Returns the number of ZPL label formats received."""
+        return sum(data.count(b"^XA") for data in self.received)
+
+    async def start(self):
+        """
+        Starts listening.
+
+        Returns:
+            int: The bound port.
+        """
+        self.server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        """Listens until cancelled."""
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stops listening, once the open connections are read."""
+        if self.server is not None:
+            self.server.close()
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        """Keeps everything sent on one connection as one print."""
+        task = asyncio.current_task()
+        self.connections.add(task)
+        task.add_done_callback(self.connections.discard)
+        try:
+            data = await reader.read()
+        except ConnectionError:
+            return
+        finally:
+            writer.close()
+        if not data:
+            return
+        self.received.append(data)
+        logger.info("Received %d bytes", len(data))
+        if self.output:
+            with open(self.output, "ab") as file:
+                file.write(data)
@@ -0,0 +1,369 @@
+"""Tests for printing app."""
+
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import Test, TestCatalog
+from orders.services import create_order
+from patients.models import Patient
+from reports.models import Report
+from samples.models import Sample
+from users.models import User, UserRole
+
+from .models import Printer, PrinterLanguage, PrintJob, PrintJobKind, PrintJobStatus
+from .services import PrintingError, report_printer
+from .spooler import PrintSpooler, parse_target
+from .standin import PrinterStandIn
+
+ZPL_LABEL = b"^XA^FDSAM-1^FS^XZ\n"
+
+
+class PrintingFixtures:
+    """Shared set-up: a user, a patient, an order and two printers."""
+
+    def setup_method(self):
+        """Create a user, an order and printers."""
+        self.client = APIClient()
+        self.user = User.objects.create(username="reception", role=UserRole.RECEPTION)
+        self.admin = User.objects.create(username="admin", role=UserRole.ADMIN)
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", dob=date(1990, 1, 1), sex="F", phone="03001234567"
+        )
+        self.test = TestCatalog.objects.create(
+            code="GLU",
+            name="Glucose",
+            category="Biochemistry",
+            sample_type="Blood",
+            price=300,
+            turnaround_time_hours=4,
+        )
+        self.order = create_order(test_ids=[self.test.pk], patient=self.patient)
+        self.labels = Printer.objects.create(
+            code="DESK1",
+            name="Collection desk",
+            target="tcp://127.0.0.1:9100",
+            language=PrinterLanguage.ZPL,
+        )
+        self.office = Printer.objects.create(
+            code="OFFICE",
+            name="Reporting office",
+            target="tcp://127.0.0.1:9100",
+            print_group="Chemistry",
+        )
+
+    def queue(self, printer, count, document=ZPL_LABEL):
+        return [
+            PrintJob.objects.create(
+                printer=printer,
+                kind=PrintJobKind.LABELS,
+                content_type="application/zpl",
+                document=document,
+            )
+            for _ in range(count)
+        ]
+
+
+def run_spooler(spooler, standin=None, printer=None):
+    """
+    Runs the spooler until its queues are empty.
+
+    With a stand-in, the printer is pointed at it first.
+    """
+
+    async def main():
+        if standin is not None:
+            port = await standin.start()
+            await sync_to_async(Printer.objects.filter(pk=printer.pk).update)(
+                target=f"tcp://127.0.0.1:{port}"
+            )
+        try:
+            await spooler.run(stop_when_idle=True)
+        finally:
+            if standin is not None:
+                await standin.close()
+
+    asyncio.run(main())
+
+
+class TestTargets:
+    """Test reading printer targets."""
+
+    def test_parse_target(self):
+        """Test that network printers default to the raw printing port."""
+        assert parse_target("tcp://printer.lab") == ("tcp", "printer.lab", 9100)
+        assert parse_target("tcp://10.0.0.5:9101") == ("tcp", "10.0.0.5", 9101)
+        assert parse_target("file:///dev/usb/lp0") == ("file", "/dev/usb/lp0", None)
+        with pytest.raises(ValueError):
+            parse_target("lpt1")
+
+
+@pytest.mark.django_db
+class TestClaim(PrintingFixtures):
+    """Test how workers claim jobs."""
+
+    def test_claims_oldest_jobs_of_one_printer(self):
+        """Test that a batch holds a printer's oldest queued jobs."""
+        first = self.queue(self.labels, 3)
+        self.queue(self.office, 2)
+        spooler = PrintSpooler(batch_size=2)
+
+        jobs = spooler.claim(self.labels.pk)
+
+        assert [job.pk for job in jobs] == [first[0].pk, first[1].pk]
+        assert {job.status for job in jobs} == {PrintJobStatus.PRINTING}
+
+    def test_claimed_jobs_are_not_claimed_again(self):
+        """Test that two workers never claim the same job."""
+        self.queue(self.labels, 2)
+        first, second = PrintSpooler(), PrintSpooler()
+
+        assert len(first.claim(self.labels.pk)) == 2
+        assert second.claim(self.labels.pk) == []
+
+    def test_stale_claims_are_claimed_again(self):
+        """Test that jobs of a stopped worker are printed after a while."""
+        self.queue(self.labels, 1)
+        PrintSpooler().claim(self.labels.pk)
+        PrintJob.objects.update(claimed_at=timezone.now() - timedelta(minutes=10))
+
+        assert len(PrintSpooler(stale_after=300).claim(self.labels.pk)) == 1
+
+    def test_stale_claims_keep_the_new_outcome(self):
+        """Test that a worker whose claim went stale saves no outcome."""
+        self.queue(self.labels, 2)
+        first = PrintSpooler()
+        jobs = first.claim(self.labels.pk)
+        PrintJob.objects.update(claimed_at=timezone.now() - timedelta(minutes=10))
+        second = PrintSpooler(stale_after=300)
+        [reclaimed, _] = second.claim(self.labels.pk)
+        reclaimed.status = PrintJobStatus.PRINTED
+        reclaimed.attempts = 1
+        reclaimed.printed_at = timezone.now()
+        assert second.record([reclaimed]) == 1
+
+        for job in jobs:
+            first.fail(job, "OSError: printer offline")
+        assert first.record(jobs) == 0
+
+        statuses = PrintJob.objects.order_by("id").values_list("status", flat=True)
+        assert list(statuses) == [PrintJobStatus.PRINTED, PrintJobStatus.PRINTING]
+
+    def test_pdf_batches_are_sent_before_going_stale(self):
+        """Test that PDF batches hold only the connections that fit."""
+        spooler = PrintSpooler(batch_size=50, timeout=30, stale_after=300)
+
+        assert spooler.batch_limit(self.labels) == 50
+        assert spooler.batch_limit(self.office) == 3
+        with pytest.raises(ValueError):
+            PrintSpooler(timeout=30, stale_after=90)
+
+    def test_inactive_printers_are_skipped(self):
+        """Test that jobs of a deactivated printer wait."""
+        self.queue(self.labels, 1)
+        Printer.objects.filter(pk=self.labels.pk).update(is_active=False)
+
+        assert PrintSpooler().claim(self.labels.pk) == []
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSpooler(PrintingFixtures):
+    """Test printing queued jobs end to end with a stand-in printer."""
+
+    def test_zpl_jobs_are_batched_per_printer(self):
+        """Test that a ZPL printer gets a whole batch over one connection."""
+        self.queue(self.labels, 5)
+        standin = PrinterStandIn()
+        spooler = PrintSpooler(printers=["DESK1"], batch_size=10)
+
+        run_spooler(spooler, standin, self.labels)
+
+        assert standin.received == [ZPL_LABEL * 5]
+        assert spooler.stats.printed == 5
+        assert spooler.stats.connections == 1
+        assert not PrintJob.objects.exclude(status=PrintJobStatus.PRINTED).exists()
+
+    def test_pdf_jobs_are_printed_in_order(self):
+        """Test that a PDF printer gets one connection per job, in order."""
+        documents = [b"%PDF-1 first", b"%PDF-2 second", b"%PDF-3 third"]
+        for document in documents:
+            self.queue(self.office, 1, document)
+        standin = PrinterStandIn()
+        spooler = PrintSpooler(printers=["OFFICE"])
+
+        run_spooler(spooler, standin, self.office)
+
+        assert standin.received == documents
+        assert spooler.stats.connections == 3
+
+    def test_file_target(self, tmp_path):
+        """Test that jobs can be appended to a file or device."""
+        output = tmp_path / "printer.zpl"
+        Printer.objects.filter(pk=self.labels.pk).update(target=f"file://{output}")
+        self.queue(self.labels, 2)
+
+        run_spooler(PrintSpooler(printers=["DESK1"]))
+
+        assert output.read_bytes() == ZPL_LABEL * 2
+
+    def test_unreachable_printer_fails_after_retries(self):
+        """Test that jobs are retried in order, then marked FAILED."""
+        Printer.objects.filter(pk=self.labels.pk).update(target="tcp://127.0.0.1:1")
+        self.queue(self.labels, 2)
+        spooler = PrintSpooler(
+            printers=["DESK1"], retry_delay=0, max_attempts=2, timeout=1
+        )
+
+        run_spooler(spooler)
+
+        jobs = list(PrintJob.objects.order_by("id"))
+        assert [job.status for job in jobs] == [PrintJobStatus.FAILED] * 2
+        assert [job.attempts for job in jobs] == [2, 2]
+        assert jobs[0].last_error
+        assert spooler.stats.failed == 2
+
+
+@pytest.mark.django_db
+class TestReportPrinter(PrintingFixtures):
+    """Test choosing the printer for a report."""
+
+    def test_default_printer_code_of_tests(self):
+        """Test that the printer named in the master data is chosen."""
+        lab = Printer.objects.create(code="LAB2", name="Lab", target="tcp://lab")
+        Test.objects.create(code="GLU", name="Glucose", default_printer_code="LAB2")
+
+        assert report_printer(self.order) == lab
+
+    def test_print_group_of_tests(self):
+        """Test that a printer serving the tests' print group is chosen."""
+        Test.objects.create(code="GLU", name="Glucose", default_print_group="Chemistry")
+
+        assert report_printer(self.order) == self.office
+
+    def test_configured_default(self, settings):
+        """Test that the configured printer is used last."""
+        settings.PRINT_REPORT_PRINTER = ""
+        with pytest.raises(PrintingError):
+            report_printer(self.order)
+
+        settings.PRINT_REPORT_PRINTER = "OFFICE"
+        assert report_printer(self.order) == self.office
+
+
+@pytest.mark.django_db
+class TestPrintingAPI(PrintingFixtures):
+    """Test the printing endpoints."""
+
+    def test_print_order_labels(self):
+        """Test that labels are queued in the printer's language."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            "/api/printing/jobs/labels/",
+            {"order": self.order.pk, "printer": "DESK1"},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data["status"] == PrintJobStatus.QUEUED
+        assert response.data["printer_code"] == "DESK1"
+        job = PrintJob.objects.get(pk=response.data["id"])
+        assert job.content_type == "application/zpl"
+        barcode = Sample.objects.get(order=self.order).barcode
+        assert f"^FD{barcode}^FS".encode() in bytes(job.document)
+
+    def test_print_labels_needs_a_printer(self, settings):
+        """Test that labels need a printer when no default is set."""
+        settings.PRINT_LABEL_PRINTER = ""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            "/api/printing/jobs/labels/", {"order": self.order.pk}, format="json"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        settings.PRINT_LABEL_PRINTER = "DESK1"
+        response = self.client.post(
+            "/api/printing/jobs/labels/", {"order": self.order.pk}, format="json"
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED
+
+    def test_print_report(self, settings, tmp_path):
+        """Test that a generated report is queued as PDF."""
+        settings.MEDIA_ROOT = tmp_path
+        report = Report.objects.create(order=self.order)
+        report.pdf_file.save("report.pdf", ContentFile(b"%PDF report"))
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            "/api/printing/jobs/reports/",
+            {"order": self.order.pk, "printer": "OFFICE"},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert bytes(PrintJob.objects.get().document) == b"%PDF report"
+
+        response = self.client.post(
+            "/api/printing/jobs/reports/",
+            {"order": self.order.pk, "printer": "DESK1"},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_print_report_not_generated(self):
+        """Test that an order without a report is not found."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            "/api/printing/jobs/reports/", {"order": self.order.pk}, format="json"
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_list_jobs(self):
+        """Test that jobs are listed newest first without their document."""
+        self.queue(self.labels, 2)
+        self.queue(self.office, 1)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get("/api/printing/jobs/", {"printer": "DESK1"})
+
+        assert response.status_code == status.HTTP_200_OK
+        jobs = response.data["results"]
+        assert len(jobs) == 2
+        assert jobs[0]["id"] > jobs[1]["id"]
+        assert "document" not in jobs[0]
+
+    def test_retry_failed_job(self):
+        """Test that only failed jobs can be queued again."""
+        job = self.queue(self.labels, 1)[0]
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(f"/api/printing/jobs/{job.pk}/retry/")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        PrintJob.objects.filter(pk=job.pk).update(
+            status=PrintJobStatus.FAILED, attempts=5, last_error="Timeout"
+        )
+        response = self.client.post(f"/api/printing/jobs/{job.pk}/retry/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["status"] == PrintJobStatus.QUEUED
+        assert response.data["attempts"] == 0
+
+    def test_printers_are_admin_only(self):
+        """Test that only admins add printers, with a valid target."""
+        data = {"code": "DESK2", "name": "Desk 2", "target": "tcp://10.0.0.9"}
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post("/api/printing/printers/", data, format="json")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(
+            "/api/printing/printers/", {**data, "target": "lpt1"}, format="json"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.post("/api/printing/printers/", data, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
@@ -0,0 +1,23 @@
+"""URL configuration for printing app."""
+
+from django.urls import path
+
+from .views import (
+    PrinterDetailView,
+    PrinterListCreateView,
+    PrintJobDetailView,
+    PrintJobListView,
+    print_labels,
+    print_report,
+    retry_print_job,
+)
+
+urlpatterns = [
+    path("printers/", PrinterListCreateView.as_view(), name="printer-list"),
+    path("printers/<int:pk>/", PrinterDetailView.as_view(), name="printer-detail"),
+    path("jobs/", PrintJobListView.as_view(), name="print-job-list"),
+    path("jobs/labels/", print_labels, name="print-labels"),
+    path("jobs/reports/", print_report, name="print-report"),
+    path("jobs/<int:pk>/", PrintJobDetailView.as_view(), name="print-job-detail"),
+    path("jobs/<int:pk>/retry/", retry_print_job, name="print-job-retry"),
+]
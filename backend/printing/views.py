@@ -0,0 +1,175 @@
+"""Printing views."""
+
+from rest_framework import generics, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.permissions import IsAdminOrReadOnly
+from reports.models import Report
+from samples.labels import LabelRequestError, requested_labels
+
+from .models import Printer, PrintJob, PrintJobStatus
+from .serializers import PrinterSerializer, PrintJobSerializer
+from .services import (
+    PrintingError,
+    enqueue_labels,
+    enqueue_report,
+    label_printer,
+    report_printer,
+)
+
+
+class PrinterListCreateView(generics.ListCreateAPIView):
+    """
+    List all printers or add a new one.
+
+    Creation is restricted to admin users.
+    """
+
+    queryset = Printer.objects.all()
+    serializer_class = PrinterSerializer
+    permission_classes = [IsAdminOrReadOnly]
+
+
+class PrinterDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Retrieve, update, or delete a printer.
+
+    Update and delete operations are restricted to admin users.
+    """
+
+    queryset = Printer.objects.all()
+    serializer_class = PrinterSerializer
+    permission_classes = [IsAdminOrReadOnly]
+
+
+class PrintJobListView(generics.ListAPIView):
+    """
+    List print jobs, newest first.
+
+    Filtering:
+    - `printer` (string): Filters jobs by printer code.
+    - `status` (string): Filters jobs by status.
+    """
+
+    queryset = PrintJob.objects.select_related("printer").defer("document")
+    serializer_class = PrintJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """
+        Optionally filters the queryset by printer and status.
+
+        Returns:
+            QuerySet: The filtered queryset of `PrintJob` objects.
+        """
+        queryset = super().get_queryset().order_by("-id")
+        printer = self.request.query_params.get("printer")
+        if printer:
+            queryset = queryset.filter(printer__code=printer)
+        job_status = self.request.query_params.get("status")
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+        return queryset
+
+
+class PrintJobDetailView(generics.RetrieveAPIView):
+    """
+    Retrieve a print job.
+    """
+
+    queryset = PrintJob.objects.select_related("printer").defer("document")
+    serializer_class = PrintJobSerializer
+    permission_classes = [IsAuthenticated]
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def print_labels(request):
+    """
+    Queues the labels of an order or a list of samples for printing.
+
+    Args:
+        request: The request object, containing either `order` (an order
+            id) or `samples` (a list of sample ids), and optionally
+            `printer` (a printer code; `PRINT_LABEL_PRINTER` by default).
+
+    Returns:
+        Response: The queued job (202), or an error message.
+    """
+    try:
+        printer = label_printer(request.data.get("printer"))
+        labels = requested_labels(request.data)
+    except (LabelRequestError, PrintingError) as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    if not labels:
+        return Response({"error": "No samples found"}, status=status.HTTP_404_NOT_FOUND)
+
+    job = enqueue_labels(labels, printer, request.user)
+    return Response(PrintJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def print_report(request):
+    """
+    Queues the generated report of an order for printing.
+
+    Args:
+        request: The request object, containing `order` (an order id) and
+            optionally `printer` (a printer code; chosen from the order's
+            tests by default).
+
+    Returns:
+        Response: The queued job (202), or an error message.
+    """
+    try:
+        report = Report.objects.select_related("order").get(
+            order_id=request.data.get("order")
+        )
+    except (Report.DoesNotExist, TypeError, ValueError):
+        return Response({"error": "Report not found"}, status=status.HTTP_404_NOT_FOUND)
+    if not report.pdf_file:
+        return Response(
+            {"error": "PDF file not available"}, status=status.HTTP_404_NOT_FOUND
+        )
+
+    try:
+        printer = report_printer(report.order, request.data.get("printer"))
+        job = enqueue_report(report, printer, request.user)
+    except PrintingError as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(PrintJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def retry_print_job(request, pk):
+    """
+    Queues a failed print job again.
+
+    Args:
+        request: The request object.
+        pk (int): The primary key of the job.
+
+    Returns:
+        Response: The queued job, or an error message if the job has not
+            failed.
+    """
+    updated = PrintJob.objects.filter(pk=pk, status=PrintJobStatus.FAILED).update(
+        status=PrintJobStatus.QUEUED, attempts=0, last_error=""
+    )
+    job = (
+        PrintJob.objects.select_related("printer").defer("document").filter(pk=pk)
+    ).first()
+    if job is None:
+        return Response(
+            {"error": "Print job not found"}, status=status.HTTP_404_NOT_FOUND
+        )
+    if not updated:
+        return Response(
+            {"error": f"Cannot retry print job with status {job.status}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response(PrintJobSerializer(job).data)
@@ -15,6 +15,8 @@ from reportlab.platypus import (
     TableStyle,
 )
 
+from results.models import Result
+
 
 def generate_report_pdf(order):
     """Generate PDF report for an order using Al Shifa template."""
@@ -65,18 +67,21 @@ def generate_report_pdf(order):
     # Results Table
     results_data = [["Test Name", "Result", "Unit", "Reference Range", "Flag"]]
 
-    for item in order.items.all():
-        results = item.results.filter(status="PUBLISHED")
-        for result in results:
-            results_data.append(
-                [
-                    item.test.name,
-                    result.value,
-                    result.unit or "-",
-                    result.reference_range or "-",
-                    result.flags or "N",
-                ]
-            )
+    results = (
+        Result.objects.filter(order_item__order=order, status="PUBLISHED")
+        .select_related("order_item__test")
+        .order_by("order_item_id", "id")
+    )
+    for result in results:
+        results_data.append(
+            [
+                result.order_item.test.name,
+                result.value,
+                result.unit or "-",
+                result.reference_range or "-",
+                result.flags or "N",
+            ]
+        )
 
     results_table = Table(
         results_data,
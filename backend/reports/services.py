@@ -0,0 +1,92 @@
+"""Report generation services."""
+
+import logging
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from orders.models import OrderItem
+from results.models import ResultStatus
+
+from .models import Report
+from .pdf_generator import generate_report_pdf
+
+logger = logging.getLogger(__name__)
+
+
+def is_fully_published(order):
+    """
+    Checks whether every order item has a published result.
+
+    Args:
+        order (Order): The order to check.
+
+    Returns:
+        bool: True if a report can be generated for the order.
+    """
+    return not order.items.exclude(results__status=ResultStatus.PUBLISHED).exists()
+
+
+def fully_published_order_ids(order_ids):
+    """
+    Returns the orders in `order_ids` whose items all have a published result.
+
+    Args:
+        order_ids (Iterable[int]): The orders to check.
+
+    Returns:
+        list[int]: The fully published orders, in ascending order.
+    """
+    order_ids = set(order_ids)
+    incomplete = set(
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .exclude(results__status=ResultStatus.PUBLISHED)
+        .values_list("order_id", flat=True)
+    )
+    return sorted(order_ids - incomplete)
+
+
+def generate_order_report(order, user=None):
+    """
+    Renders the PDF report of an order and stores it.
+
+    An existing report of the order is regenerated.
+
+    Args:
+        order (Order): The order, with its patient selected.
+        user (User | None): The user the report is generated for.
+
+    Returns:
+        tuple[Report, bool]: The report and whether it was created.
+    """
+    pdf_buffer = generate_report_pdf(order)
+    report, created = Report.objects.get_or_create(order=order)
+    report.generated_by = user
+    report.pdf_file.save(
+        f"report_{order.order_no}.pdf", ContentFile(pdf_buffer.read()), save=True
+    )
+    return report, created
+
+
+def enqueue_report_generation(order_ids, user=None):
+    """
+    Queues report generation for orders once the transaction commits.
+
+    Args:
+        order_ids (Iterable[int]): The orders to generate reports for.
+        user (User | None): The user the reports are generated for.
+    """
+    from .tasks import generate_order_report_task
+
+    order_ids = list(order_ids)
+    user_id = user.pk if user else None
+
+    def enqueue():
+        for order_id in order_ids:
+            try:
+                generate_order_report_task.delay(order_id, user_id)
+            except Exception:
+                logger.exception("Could not queue the report of order %s", order_id)
+
+    if order_ids:
+        transaction.on_commit(enqueue)
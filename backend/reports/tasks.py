@@ -0,0 +1,34 @@
+"""Background report tasks."""
+
+import logging
+
+from celery import shared_task
+
+from orders.models import Order
+from users.models import User
+
+from .services import generate_order_report, is_fully_published
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def generate_order_report_task(order_id, user_id=None):
+    """
+    Generates the PDF report of a fully published order.
+
+    Args:
+        order_id (int): The order to generate the report for.
+        user_id (int | None): The user the report is generated for.
+
+    Returns:
+        int | None: The report id, or None if the order no longer exists or
+            is not fully published.
+    """
+    order = Order.objects.select_related("patient").filter(pk=order_id).first()
+    if order is None or not is_fully_published(order):
+        logger.info("Skipping report of order %s: not fully published", order_id)
+        return None
+    user = User.objects.filter(pk=user_id).first() if user_id else None
+    report, _ = generate_order_report(order, user)
+    return report.pk
@@ -4,10 +4,13 @@ from datetime import date
 from unittest.mock import MagicMock, patch
 
 import pytest
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.test import AsyncClient, override_settings
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
 from catalog.models import TestCatalog
 from orders.models import Order, OrderItem
@@ -89,7 +92,7 @@ class TestReportAPI:
             status="PUBLISHED",
         )
 
-    @patch("reports.views.generate_report_pdf")
+    @patch("reports.services.generate_report_pdf")
     def test_generate_report_as_pathologist(self, mock_pdf):
         """Test generating a report as pathologist."""
         mock_pdf.return_value = MagicMock(read=lambda: b"PDF content")
@@ -100,7 +103,7 @@ class TestReportAPI:
         assert response.status_code == status.HTTP_201_CREATED
         assert Report.objects.filter(order=self.order).exists()
 
-    @patch("reports.views.generate_report_pdf")
+    @patch("reports.services.generate_report_pdf")
     def test_generate_report_as_admin(self, mock_pdf):
         """Test generating a report as admin."""
         mock_pdf.return_value = MagicMock(read=lambda: b"PDF content")
@@ -175,6 +178,42 @@ class TestReportAPI:
 
         assert response.status_code == status.HTTP_200_OK
 
+    def test_download_report_asgi_with_jwt(self):
+        """Test downloading a report through the ASGI handler with a JWT."""
+        report = Report.objects.create(
+            order=self.order, generated_by=self.pathologist_user
+        )
+        report.pdf_file.save("test.pdf", ContentFile(b"PDF content"))
+        token = AccessToken.for_user(self.pathologist_user)
+
+        with override_settings(METRICS_TIMING_HEADERS=True):
+            response = async_to_sync(AsyncClient().get)(
+                f"/api/reports/{report.id}/download/",
+                headers={"Authorization": f"Bearer {token}"},
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/pdf"
+        # Queries run in worker threads are still attributed to the request
+        assert int(response["X-Query-Count"]) >= 1
+        content = async_to_sync(self._read_streaming_content)(response)
+        assert content == b"PDF content"
+
+    @staticmethod
+    async def _read_streaming_content(response):
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    def test_download_report_unauthenticated(self):
+        """Test that downloading a report requires authentication."""
+        report = Report.objects.create(
+            order=self.order, generated_by=self.pathologist_user
+        )
+        report.pdf_file.save("test.pdf", ContentFile(b"PDF content"))
+
+        response = self.client.get(f"/api/reports/{report.id}/download/")
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
     def test_download_nonexistent_report(self):
         """Test downloading non-existent report."""
         self.client.force_authenticate(user=self.pathologist_user)
@@ -193,6 +232,31 @@ class TestReportAPI:
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
+    @patch("reports.services.generate_report_pdf")
+    def test_report_task_generates_published_order(self, mock_pdf):
+        """Test that the background task stores the report of the order."""
+        from io import BytesIO
+
+        from .tasks import generate_order_report_task
+
+        mock_pdf.return_value = BytesIO(b"%PDF")
+        report_id = generate_order_report_task(self.order.id, self.pathologist_user.id)
+
+        report = Report.objects.get(pk=report_id)
+        assert report.order == self.order
+        assert report.generated_by == self.pathologist_user
+
+    def test_report_task_skips_unpublished_order(self):
+        """Test that the task skips orders with unpublished results."""
+        from .tasks import generate_order_report_task
+
+        self.result.status = "VERIFIED"
+        self.result.save()
+
+        assert generate_order_report_task(self.order.id) is None
+        assert generate_order_report_task(99999) is None
+        assert not Report.objects.exists()
+
     def test_pdf_generation_integration(self):
         """Test actual PDF generation (integration test)."""
         from .pdf_generator import generate_report_pdf
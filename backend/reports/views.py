@@ -1,18 +1,21 @@
 """Report views."""
 
-from django.core.files.base import ContentFile
-from django.http import FileResponse
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, JsonResponse
+from django.views.decorators.http import require_GET
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from core.authentication import authenticate_request
 from orders.models import Order
 from users.models import UserRole
 
 from .models import Report
-from .pdf_generator import generate_report_pdf
 from .serializers import ReportSerializer
+from .services import generate_order_report, is_fully_published
 
 
 class ReportListView(generics.ListAPIView):
@@ -52,7 +55,7 @@ def generate_report(request, order_id):
         Response: A response object with the report data or an error message.
     """
     try:
-        order = Order.objects.get(pk=order_id)
+        order = Order.objects.select_related("patient").get(pk=order_id)
     except Order.DoesNotExist:
         return Response({"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -62,21 +65,14 @@ def generate_report(request, order_id):
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    for item in order.items.all():
-        if not item.results.filter(status="PUBLISHED").exists():
-            return Response(
-                {"error": "All results must be published before generating a report"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-    pdf_buffer = generate_report_pdf(order)
-
-    report, created = Report.objects.get_or_create(order=order)
-    report.generated_by = request.user
-    report.pdf_file.save(
-        f"report_{order.order_no}.pdf", ContentFile(pdf_buffer.read()), save=True
-    )
+    # Every order item needs at least one published result
+    if not is_fully_published(order):
+        return Response(
+            {"error": "All results must be published before generating a report"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
+    report, created = generate_order_report(order, request.user)
     serializer = ReportSerializer(report)
     return Response(
         serializer.data,
@@ -84,31 +80,56 @@ def generate_report(request, order_id):
     )
 
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def download_report(request, pk):
+async def _aiter_file(file, block_size):
+    """Reads `file` in blocks in a worker thread without blocking the loop."""
+    try:
+        while block := await sync_to_async(file.read)(block_size):
+            yield block
+    finally:
+        await sync_to_async(file.close)()
+
+
+@require_GET
+async def download_report(request, pk):
     """
     Downloads the PDF file for a specific report.
 
+    This is an async view: under ASGI the file is streamed without tying up
+    a worker while slow clients download it.
+
     Args:
         request: The request object.
         pk (int): The primary key of the report to download.
 
     Returns:
-        FileResponse: A file response with the PDF report, or a 404 error.
+        FileResponse: A file response with the PDF report, or a 401/404 error.
     """
+    if await authenticate_request(request) is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
     try:
-        report = Report.objects.get(pk=pk)
+        report = await Report.objects.select_related("order").aget(pk=pk)
     except Report.DoesNotExist:
-        return Response({"error": "Report not found"}, status=status.HTTP_404_NOT_FOUND)
+        return JsonResponse(
+            {"error": "Report not found"}, status=status.HTTP_404_NOT_FOUND
+        )
 
     if not report.pdf_file:
-        return Response(
+        return JsonResponse(
             {"error": "PDF file not available"}, status=status.HTTP_404_NOT_FOUND
         )
 
-    return FileResponse(
-        report.pdf_file.open("rb"),
+    file = await sync_to_async(report.pdf_file.open)("rb")
+    response = FileResponse(
+        file,
         as_attachment=True,
         filename=f"report_{report.order.order_no}.pdf",
     )
+    if isinstance(request, ASGIRequest):
+        # Stream with an async iterator; FileResponse would otherwise read
+        # the whole file into memory to serve it asynchronously
+        response.streaming_content = _aiter_file(file, response.block_size)
+    return response
@@ -0,0 +1,250 @@
+"""Rule-based autoverification of entered results.
+
+An `AutoverificationRule` lists the checks a result must pass to skip manual
+verification: value within the reference range, no delta-check failure, no
+critical value, and only allowed instrument flags. The active rules are
+cached under the `autoverification` namespace and compiled into an
+`Autoverifier`, which picks the most specific rule of a result with a few
+dictionary lookups and runs its checks against the cached limits table,
+without any query per result.
+"""
+
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import cache_aside
+from core.transitions import TRANSITIONS, apply_transition
+from events.broker import publish_events
+from settings.utils import should_skip_verification
+
+from .critical import critical_direction, critical_limits, matching_range
+from .models import AutoverificationRecord, AutoverificationRule, Result, parse_numeric
+
+
+@dataclass(frozen=True)
+class Decision:
+    """
+    The outcome of evaluating a result against its rule.
+
+    Attributes:
+        rule_id (int): The applied rule.
+        verified (bool): Whether every check passed.
+        failed_checks (tuple[str, ...]): The names of the failed checks.
+    """
+
+    rule_id: int
+    verified: bool
+    failed_checks: tuple = ()
+
+
+def _load_rules():
+    return list(
+        AutoverificationRule.objects.filter(is_active=True)
+        .order_by("name", "pk")
+        .values(
+            "id",
+            "test_id",
+            "parameter_id",
+            "require_reference_range",
+            "require_no_delta_failure",
+            "require_no_critical",
+            "allowed_flags",
+        )
+    )
+
+
+def _within_reference_range(result, limits, today):
+    value = parse_numeric(result.value)
+    reference_range = matching_range(limits, result, today)
+    if value is None or reference_range is None:
+        return False
+    low, high = reference_range[3:5]
+    if low is None and high is None:
+        return False
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def _no_delta_failure(result, limits, today):
+    return not result.delta_flag
+
+
+def _no_critical(result, limits, today):
+    return critical_direction(limits, result, today) is None
+
+
+def _flags_check(allowed_flags):
+    allowed = {flag.strip() for flag in allowed_flags.split(",") if flag.strip()}
+
+    def _clean_flags(result, limits, today):
+        flags = result.flags.strip()
+        return not flags or flags in allowed
+
+    return _clean_flags
+
+
+class Autoverifier:
+    """
+    Evaluates results against compiled autoverification rules.
+
+    Args:
+        rules (list[dict]): The active rules, as returned by the cache.
+        limits (dict): The table returned by `critical_limits`.
+    """
+
+    def __init__(self, rules, limits):
+        self.limits = limits
+        self.rules = {}
+        for rule in rules:
+            checks = []
+            if rule["require_reference_range"]:
+                checks.append(("reference_range", _within_reference_range))
+            if rule["require_no_delta_failure"]:
+                checks.append(("delta", _no_delta_failure))
+            if rule["require_no_critical"]:
+                checks.append(("critical", _no_critical))
+            checks.append(("flags", _flags_check(rule["allowed_flags"])))
+            key = (rule["test_id"], rule["parameter_id"])
+            self.rules.setdefault(key, (rule["id"], tuple(checks)))
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def rule_for(self, result):
+        """
+        Finds the most specific rule for a result.
+
+        Args:
+            result (Result): The result.
+
+        Returns:
+            tuple | None: The rule id and its checks, or None.
+        """
+        test_id = result.order_item.test_id
+        parameter_id = result.parameter_id
+        for key in (
+            (test_id, parameter_id),
+            (test_id, None),
+            (None, parameter_id),
+            (None, None),
+        ):
+            if key in self.rules:
+                return self.rules[key]
+        return None
+
+    def evaluate(self, result, today=None):
+        """
+        Evaluates an entered result.
+
+        Args:
+            result (Result): The result, with its `patient` and
+                `order_item.test` loaded and its delta check done.
+            today (date | None): The date patient ages are computed at.
+
+        Returns:
+            Decision | None: The decision, or None if no rule applies.
+        """
+        rule = self.rule_for(result)
+        if rule is None:
+            return None
+        rule_id, checks = rule
+        today = today or timezone.localdate()
+        failed = tuple(
+            name for name, check in checks if not check(result, self.limits, today)
+        )
+        return Decision(rule_id, not failed, failed)
+
+
+def get_autoverifier():
+    """
+    Builds an autoverifier from the cached rules and limits.
+
+    Returns:
+        Autoverifier: The autoverifier; false if no rule is active or the
+            verification step is disabled in the workflow settings.
+    """
+    rules = cache_aside(
+        "autoverification-rules", _load_rules, namespaces=["autoverification"]
+    )
+    if rules and should_skip_verification():
+        rules = []
+    return Autoverifier(rules, critical_limits() if rules else {})
+
+
+def autoverify(results, now=None):
+    """
+    Applies autoverification to results being entered.
+
+    Results that pass their rule are moved to VERIFIED in memory; the caller
+    saves them. The decisions are returned as unsaved audit records.
+
+    Args:
+        results (Iterable[Result]): Results in ENTERED status, with their
+            `patient` and `order_item.test` loaded.
+        now (datetime | None): The verification time.
+
+    Returns:
+        list[AutoverificationRecord]: One record per result a rule applies to.
+    """
+    autoverifier = get_autoverifier()
+    if not autoverifier:
+        return []
+
+    transition = TRANSITIONS[Result]["autoverify"]
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    records = []
+    for result in results:
+        decision = autoverifier.evaluate(result, today)
+        if decision is None:
+            continue
+        if decision.verified:
+            result.status = transition.target
+            result.verified_at = now
+        records.append(
+            AutoverificationRecord(
+                result=result,
+                rule_id=decision.rule_id,
+                verified=decision.verified,
+                failed_checks=list(decision.failed_checks),
+            )
+        )
+    return records
+
+
+def save_records(records):
+    """
+    Saves the audit records of autoverification decisions.
+
+    Args:
+        records (list[AutoverificationRecord]): Records from `autoverify`.
+    """
+    if records:
+        AutoverificationRecord.objects.bulk_create(records)
+
+
+@transaction.atomic
+def autoverify_entered(result):
+    """
+    Autoverifies a result that has just been entered on its own.
+
+    A verified result is published on the event stream as `result.verified`
+    once the transaction commits.
+
+    Args:
+        result (Result): The result, with its `patient` and
+            `order_item.test` loaded and its delta check done.
+
+    Returns:
+        Result: The result, VERIFIED if it passed its rule.
+    """
+    records = autoverify([result])
+    if records and records[0].verified:
+        if not apply_transition(Result, result.pk, "autoverify"):
+            # Changed by another request since it was entered
+            return Result.objects.get(pk=result.pk)
+        result.refresh_from_db(fields=["status", "verified_at"])
+        publish_events("result.verified", [result])
+    save_records(records)
+    return result
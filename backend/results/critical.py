@@ -0,0 +1,238 @@
+"""Critical-value detection for entered results.
+
+The reference and critical limits of every parameter are compiled into one
+table from the reference ranges and the panic overrides of the test
+parameters. The table is cached under the `catalog` namespace, so it is
+rebuilt only after the catalog changes and checking a result is a
+dictionary lookup without any query. Values beyond a limit raise a
+`CriticalAlert`, which is pushed to the event stream as `critical.raised`
+and stays open until acknowledged.
+"""
+
+from django.db.models import Q
+from django.utils import timezone
+
+from catalog.models import ReferenceRange, TestParameter
+from core.cache import cache_aside
+from events.broker import publish_events
+
+from .models import AlertDirection, CriticalAlert, parse_numeric
+
+# Days per `ReferenceRange.age_unit`
+AGE_UNIT_DAYS = {"Years": 365, "Months": 30, "Weeks": 7, "Days": 1}
+
+
+def _build_critical_limits():
+    today = timezone.localdate()
+    ranges = {}
+    for reference_range in (
+        ReferenceRange.objects.filter(
+            Q(normal_low__isnull=False)
+            | Q(normal_high__isnull=False)
+            | Q(critical_low__isnull=False)
+            | Q(critical_high__isnull=False)
+        )
+        .filter(Q(effective_from__isnull=True) | Q(effective_from__lte=today))
+        .filter(Q(effective_to__isnull=True) | Q(effective_to__gte=today))
+        .order_by("parameter_id", "age_min")
+    ):
+        days = AGE_UNIT_DAYS.get(reference_range.age_unit, 365)
+        sex = reference_range.sex[:1].upper()
+        ranges.setdefault(reference_range.parameter_id, []).append(
+            (
+                None if sex == "A" else sex,
+                reference_range.age_min * days,
+                (reference_range.age_max + 1) * days,
+                reference_range.normal_low,
+                reference_range.normal_high,
+                reference_range.critical_low,
+                reference_range.critical_high,
+            )
+        )
+
+    overrides = {
+        (code, parameter_id): (low, high)
+        for code, parameter_id, low, high in TestParameter.objects.filter(
+            Q(panic_low_override__isnull=False) | Q(panic_high_override__isnull=False)
+        ).values_list(
+            "test__code", "parameter_id", "panic_low_override", "panic_high_override"
+        )
+    }
+    return {"ranges": ranges, "overrides": overrides}
+
+
+def critical_limits():
+    """
+    Returns the compiled critical limits.
+
+    Returns:
+        dict: `ranges`, the reference ranges of each parameter id as
+            `(sex, min age days, max age days, normal low, normal high,
+            critical low, critical high)` tuples with `sex` None for all,
+            and `overrides`, the `(low, high)` panic overrides keyed by
+            `(test code, parameter id)`.
+    """
+    return cache_aside(
+        "critical-limits", _build_critical_limits, namespaces=["catalog"]
+    )
+
+
+def _age_in_days(patient, today):
+    if patient.dob is not None:
+        return (today - patient.dob).days
+    if patient.age_years is None:
+        return None
+    return (
+        patient.age_years * 365
+        + (patient.age_months or 0) * 30
+        + (patient.age_days or 0)
+    )
+
+
+def matching_ranges(limits, result, today=None):
+    """
+    Finds the reference ranges that apply to a result.
+
+    Args:
+        limits (dict): The table returned by `critical_limits`.
+        result (Result): The result, with its `patient` loaded.
+        today (date | None): The date ages are computed at.
+
+    Yields:
+        tuple: The ranges of the parameter matching the patient's sex and
+            age, as stored in the table, by minimum age.
+    """
+    patient = result.patient
+    if patient is None:
+        return
+    age = _age_in_days(patient, today or timezone.localdate())
+    for reference_range in limits["ranges"].get(result.parameter_id, ()):
+        sex, min_days, max_days = reference_range[:3]
+        if sex not in (None, patient.sex):
+            continue
+        if age is not None and not min_days <= age < max_days:
+            continue
+        yield reference_range
+
+
+def matching_range(limits, result, today=None):
+    """
+    Finds the reference range whose normal limits apply to a result.
+
+    Args:
+        limits (dict): The table returned by `critical_limits`.
+        result (Result): The result, with its `patient` loaded.
+        today (date | None): The date ages are computed at.
+
+    Returns:
+        tuple | None: The first matching range with a normal limit, as
+            stored in the table, or None.
+    """
+    for reference_range in matching_ranges(limits, result, today):
+        if reference_range[3] is not None or reference_range[4] is not None:
+            return reference_range
+    return None
+
+
+def limits_for(limits, result, today=None):
+    """
+    Looks up the critical limits that apply to a result.
+
+    Each limit is taken from the first matching reference range that sets
+    it, so a range with only normal limits does not hide the critical
+    limits of a later one. The panic overrides of the test parameter
+    replace them.
+
+    Args:
+        limits (dict): The table returned by `critical_limits`.
+        result (Result): The result, with its `patient` and
+            `order_item.test` loaded.
+        today (date | None): The date ages are computed at.
+
+    Returns:
+        tuple[Decimal | None, Decimal | None]: The low and high limits.
+    """
+    low = high = None
+    for reference_range in matching_ranges(limits, result, today):
+        critical_low, critical_high = reference_range[5:]
+        low = critical_low if low is None else low
+        high = critical_high if high is None else high
+        if low is not None and high is not None:
+            break
+
+    override = limits["overrides"].get(
+        (result.order_item.test.code, result.parameter_id)
+    )
+    if override is not None:
+        low = override[0] if override[0] is not None else low
+        high = override[1] if override[1] is not None else high
+    return low, high
+
+
+def critical_direction(limits, result, today=None):
+    """
+    Checks whether a result value is beyond its critical limits.
+
+    Args:
+        limits (dict): The table returned by `critical_limits`.
+        result (Result): The result, with its `patient` and
+            `order_item.test` loaded.
+        today (date | None): The date ages are computed at.
+
+    Returns:
+        tuple[str, Decimal] | None: The `AlertDirection` and the crossed
+            limit, or None if the value is not critical.
+    """
+    if result.parameter_id is None:
+        return None
+    value = parse_numeric(result.value)
+    if value is None:
+        return None
+    low, high = limits_for(limits, result, today)
+    if low is not None and value < low:
+        return AlertDirection.LOW, low
+    if high is not None and value > high:
+        return AlertDirection.HIGH, high
+    return None
+
+
+def raise_critical_alerts(results):
+    """
+    Raises an alert for every entered result beyond its critical limits.
+
+    The alerts are published on the event stream once the transaction
+    commits.
+
+    Args:
+        results (Iterable[Result]): Entered results with their `patient`
+            and `order_item.test` loaded.
+
+    Returns:
+        list[CriticalAlert]: The raised alerts.
+    """
+    limits = critical_limits()
+    if not limits["ranges"] and not limits["overrides"]:
+        return []
+    today = timezone.localdate()
+    alerts = []
+    for result in results:
+        critical = critical_direction(limits, result, today)
+        if critical is None:
+            continue
+        direction, limit = critical
+        alerts.append(
+            CriticalAlert(
+                result=result,
+                order_item_id=result.order_item_id,
+                patient_id=result.patient_id,
+                parameter_id=result.parameter_id,
+                value=result.value,
+                direction=direction,
+                limit=limit,
+            )
+        )
+
+    if alerts:
+        CriticalAlert.objects.bulk_create(alerts)
+        publish_events("critical.raised", alerts)
+    return alerts
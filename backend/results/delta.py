@@ -0,0 +1,130 @@
+"""Delta checks against a patient's result history.
+
+A delta check compares a newly entered value with the same patient's
+previous result for the same parameter and flags changes too large to be
+plausible, which often point at a mislabelled sample. It applies to test
+parameters with `delta_check_enabled`.
+
+The previous result is read with a correlated subquery on the
+`(patient, parameter, entered_at)` index, so each lookup is a single index
+probe however long the patient's history is, and a whole worksheet is
+checked in the query that loads it.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+
+from catalog.models import TestParameter
+
+from .models import Result, parse_numeric
+
+
+def with_previous_result(queryset):
+    """
+    Annotates results with the patient's previous result for the parameter.
+
+    Adds `previous_value` and `previous_entered_at`, the value and entry time
+    of the same patient's last result for the parameter entered before the
+    result (before now for results not entered yet), or None if there is
+    none. Results entered at the same time are ordered by id, so a result
+    entered again or evaluated later is never compared with a later one.
+
+    Args:
+        queryset (QuerySet[Result]): The results to annotate.
+
+    Returns:
+        QuerySet[Result]: The annotated queryset.
+    """
+    entered_at = Coalesce(OuterRef("entered_at"), Now())
+    previous = Result.objects.filter(
+        Q(entered_at__lt=entered_at) | Q(entered_at=entered_at, pk__lt=OuterRef("pk")),
+        patient=OuterRef("patient"),
+        parameter=OuterRef("parameter"),
+    ).order_by("-entered_at", "-pk")
+    return queryset.annotate(
+        previous_value=Subquery(previous.values("value")[:1]),
+        previous_entered_at=Subquery(previous.values("entered_at")[:1]),
+    )
+
+
+def evaluate_delta(result, test_parameter):
+    """
+    Sets the delta-check fields of an entered result.
+
+    The change is flagged when it exceeds `delta_absolute` or
+    `delta_percent`; with neither set, `DELTA_CHECK_PERCENT` applies.
+    Previous results older than `delta_window_days` (default
+    `DELTA_CHECK_WINDOW_DAYS`) and non-numeric values are not compared.
+
+    Args:
+        result (Result): A result annotated by `with_previous_result`, with
+            its new value and `entered_at`.
+        test_parameter (TestParameter | None): The test parameter of the
+            result.
+
+    Returns:
+        bool: Whether the result is flagged.
+    """
+    result.delta_flag = False
+    result.delta_previous_value = ""
+    if (
+        test_parameter is None
+        or not test_parameter.delta_check_enabled
+        or test_parameter.parameter_id != result.parameter_id
+        or result.previous_value is None
+    ):
+        return False
+
+    window = test_parameter.delta_window_days or settings.DELTA_CHECK_WINDOW_DAYS
+    if result.entered_at - result.previous_entered_at > timedelta(days=window):
+        return False
+    current = parse_numeric(result.value)
+    previous = parse_numeric(result.previous_value)
+    if current is None or previous is None:
+        return False
+
+    result.delta_previous_value = result.previous_value
+    change = abs(current - previous)
+    absolute = test_parameter.delta_absolute
+    percent = test_parameter.delta_percent
+    if absolute is None and percent is None:
+        percent = Decimal(settings.DELTA_CHECK_PERCENT)
+    if absolute is not None and change > absolute:
+        result.delta_flag = True
+    if percent is not None and change > abs(previous) * percent / 100:
+        result.delta_flag = True
+    return result.delta_flag
+
+
+def check_delta(pk):
+    """
+    Runs the delta check for a result that has just been entered.
+
+    Args:
+        pk (int): The primary key of the result.
+
+    Returns:
+        Result: The result with its delta-check fields.
+    """
+    result = (
+        with_previous_result(Result.objects.filter(pk=pk))
+        .select_related("order_item__test", "patient")
+        .get()
+    )
+    if result.parameter_id is None or result.previous_value is None:
+        return result
+
+    code = result.order_item.test.code
+    evaluate_delta(result, TestParameter.for_test_codes([code]).get(code))
+    if result.delta_previous_value:
+        Result.objects.filter(pk=pk).update(
+            delta_flag=result.delta_flag,
+            delta_previous_value=result.delta_previous_value,
+            updated_at=timezone.now(),
+        )
+    return result
@@ -0,0 +1,174 @@
+"""Management command to apply autoverification rules to entered results."""
+
+from collections import Counter, defaultdict
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.transitions import apply_transition_batch
+from events.broker import publish_events
+from results.autoverification import get_autoverifier
+from results.models import AutoverificationRecord, Result, ResultStatus
+
+# Results loaded and evaluated per query
+CHUNK_SIZE = 2000
+
+
+def _parse_date(value, end=False):
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date: {value} (expected YYYY-MM-DD)") from None
+    return timezone.make_aware(datetime.combine(day, time.max if end else time.min))
+
+
+class Command(BaseCommand):
+    """
+    Applies the active autoverification rules to entered results.
+
+    Held results stay entered, so later runs evaluate them again; a hold is
+    only recorded again when the rule has changed since, or the result now
+    fails other checks.
+
+    With `--dry-run`, evaluates the historical results entered in a period
+    instead, as they were entered, and reports the share the rules would
+    have verified, per test and per failed check, without writing anything.
+    """
+
+    help = (
+        "Autoverify results awaiting verification, or report the "
+        "autoverification rate over historical results with --dry-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the autoverification rate without changing results.",
+        )
+        parser.add_argument(
+            "--since", help="First entry date to evaluate (YYYY-MM-DD)."
+        )
+        parser.add_argument("--until", help="Last entry date to evaluate (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        autoverifier = get_autoverifier()
+        if not autoverifier:
+            raise CommandError(
+                "No active autoverification rules, or verification is disabled"
+            )
+
+        results = Result.objects.filter(entered_at__isnull=False)
+        if options["since"]:
+            results = results.filter(entered_at__gte=_parse_date(options["since"]))
+        if options["until"]:
+            results = results.filter(
+                entered_at__lte=_parse_date(options["until"], end=True)
+            )
+        if options["dry_run"]:
+            results = results.exclude(status=ResultStatus.DRAFT)
+        else:
+            results = results.filter(status=ResultStatus.ENTERED)
+        results = results.select_related("order_item__test", "patient").order_by("pk")
+
+        evaluated = Counter()
+        verified = Counter()
+        failed_checks = Counter()
+        records = defaultdict(list)
+        for result in results.iterator(chunk_size=CHUNK_SIZE):
+            decision = autoverifier.evaluate(
+                result, timezone.localdate(result.entered_at)
+            )
+            if decision is None:
+                continue
+            code = result.order_item.test.code
+            evaluated[code] += 1
+            verified[code] += decision.verified
+            failed_checks.update(decision.failed_checks)
+            if not options["dry_run"]:
+                records[decision.verified].append(
+                    AutoverificationRecord(
+                        result_id=result.pk,
+                        rule_id=decision.rule_id,
+                        verified=decision.verified,
+                        failed_checks=list(decision.failed_checks),
+                    )
+                )
+                if len(records[True]) + len(records[False]) >= CHUNK_SIZE:
+                    self.save(records)
+                    records = defaultdict(list)
+        if not options["dry_run"]:
+            self.save(records)
+
+        self.report(evaluated, verified, failed_checks, options["dry_run"])
+
+    def unrecorded(self, held):
+        """
+        Leaves out holds already recorded under the same rule version.
+
+        Args:
+            held (list[AutoverificationRecord]): Unsaved held decisions.
+
+        Returns:
+            list[AutoverificationRecord]: The decisions no record of the
+                result has made under the rule as it is now, with the same
+                failed checks.
+        """
+        recorded = AutoverificationRecord.objects.filter(
+            result_id__in=[record.result_id for record in held],
+            verified=False,
+            created_at__gte=F("rule__updated_at"),
+        ).values_list("result_id", "rule_id", "failed_checks")
+        recorded = {
+            (result_id, rule_id, tuple(checks))
+            for result_id, rule_id, checks in recorded
+        }
+        return [
+            record
+            for record in held
+            if (record.result_id, record.rule_id, tuple(record.failed_checks))
+            not in recorded
+        ]
+
+    def save(self, records):
+        """Verifies the passing results and saves the new decisions."""
+        with transaction.atomic():
+            passed = {record.result_id: record for record in records[True]}
+            transitioned = apply_transition_batch(Result, passed, "autoverify")
+            AutoverificationRecord.objects.bulk_create(
+                self.unrecorded(records[False]) + [passed[pk] for pk in transitioned]
+            )
+            publish_events(
+                "result.verified",
+                Result.objects.filter(pk__in=transitioned).only(
+                    "pk", "status", "order_item_id"
+                ),
+            )
+
+    def report(self, evaluated, verified, failed_checks, dry_run):
+        """Writes the autoverification rate, overall and per test."""
+        total = sum(evaluated.values())
+        passed = sum(verified.values())
+        if not total:
+            self.stdout.write("No results matched an autoverification rule.")
+            return
+
+        action = "Would autoverify" if dry_run else "Autoverified"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {passed} of {total} results ({passed / total:.1%})"
+            )
+        )
+        self.stdout.write(f"{'Test':<12} {'Results':>8} {'Verified':>9} {'Rate':>7}")
+        for code, count in evaluated.most_common():
+            self.stdout.write(
+                f"{code:<12} {count:>8} {verified[code]:>9} "
+                f"{verified[code] / count:>7.1%}"
+            )
+        if failed_checks:
+            self.stdout.write("Failed checks:")
+            for check, count in failed_checks.most_common():
+                self.stdout.write(f"  {check}: {count}")
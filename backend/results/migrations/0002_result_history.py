@@ -0,0 +1,86 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def populate_result_history(apps, schema_editor):
+    """Copy the patient and parameter of existing results."""
+    Order = apps.get_model("orders", "Order")
+    Result = apps.get_model("results", "Result")
+    TestParameter = apps.get_model("catalog", "TestParameter")
+
+    Result.objects.update(
+        patient=Subquery(
+            Order.objects.filter(items=OuterRef("order_item")).values("patient")[:1]
+        )
+    )
+
+    # Only tests measuring exactly one parameter are mapped
+    single = (
+        TestParameter.objects.values("test__code")
+        .annotate(count=Count("id"))
+        .filter(count=1)
+        .values("test__code")
+    )
+    for code, parameter_id in TestParameter.objects.filter(
+        test__code__in=single
+    ).values_list("test__code", "parameter_id"):
+        Result.objects.filter(order_item__test__code=code).update(
+            parameter_id=parameter_id
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_testparameter_delta_thresholds"),
+        ("orders", "0002_alter_order_status_alter_orderitem_status"),
+        ("patients", "0003_patient_age_days_patient_age_months_and_more"),
+        ("results", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="result",
+            name="delta_flag",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="result",
+            name="delta_previous_value",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="result",
+            name="parameter",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="results",
+                to="catalog.parameter",
+            ),
+        ),
+        migrations.AddField(
+            model_name="result",
+            name="patient",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="results",
+                to="patients.patient",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="result",
+            index=models.Index(
+                fields=["patient", "parameter", "entered_at"],
+                name="results_history_idx",
+            ),
+        ),
+        migrations.RunPython(populate_result_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.2.7 on 2026-10-19 09:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_testparameter_delta_thresholds"),
+        ("orders", "0002_alter_order_status_alter_orderitem_status"),
+        ("patients", "0003_patient_age_days_patient_age_months_and_more"),
+        ("results", "0002_result_history"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CriticalAlert",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("value", models.CharField(max_length=255)),
+                (
+                    "direction",
+                    models.CharField(
+                        choices=[
+                            ("LOW", "Critically low"),
+                            ("HIGH", "Critically high"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("limit", models.DecimalField(decimal_places=4, max_digits=12)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("OPEN", "Open"), ("ACKNOWLEDGED", "Acknowledged")],
+                        default="OPEN",
+                        max_length=20,
+                    ),
+                ),
+                ("acknowledged_at", models.DateTimeField(blank=True, null=True)),
+                ("acknowledgement_note", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "acknowledged_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="acknowledged_alerts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "order_item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="critical_alerts",
+                        to="orders.orderitem",
+                    ),
+                ),
+                (
+                    "parameter",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="critical_alerts",
+                        to="catalog.parameter",
+                    ),
+                ),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="critical_alerts",
+                        to="patients.patient",
+                    ),
+                ),
+                (
+                    "result",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="critical_alerts",
+                        to="results.result",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "critical_alerts",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"],
+                        name="critical_al_status_b15257_idx",
+                    )
+                ],
+            },
+        ),
+    ]
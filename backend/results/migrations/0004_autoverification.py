@@ -0,0 +1,102 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0004_testparameter_delta_thresholds"),
+        ("results", "0003_critical_alert"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AutoverificationRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                ("require_reference_range", models.BooleanField(default=True)),
+                ("require_no_delta_failure", models.BooleanField(default=True)),
+                ("require_no_critical", models.BooleanField(default=True)),
+                (
+                    "allowed_flags",
+                    models.CharField(blank=True, default="N", max_length=50),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "parameter",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="autoverification_rules",
+                        to="catalog.parameter",
+                    ),
+                ),
+                (
+                    "test",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="autoverification_rules",
+                        to="catalog.testcatalog",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "autoverification_rules",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="AutoverificationRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("verified", models.BooleanField()),
+                ("failed_checks", models.JSONField(default=list)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "result",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="autoverification_records",
+                        to="results.result",
+                    ),
+                ),
+                (
+                    "rule",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="records",
+                        to="results.autoverificationrule",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "autoverification_records",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("results", "0004_autoverification"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="result",
+            index=models.Index(
+                fields=["updated_at"], name="results_updated_3b3d2a_idx"
+            ),
+        ),
+    ]
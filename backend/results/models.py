@@ -1,7 +1,11 @@
 """Result models for test results and verification."""
 
+from decimal import Decimal, InvalidOperation
+
 from django.db import models
 
+from catalog.models import TestParameter
+from core.transitions import Transition, register_transitions
 from orders.models import OrderItem
 
 
@@ -16,12 +20,33 @@ class ResultStatus(models.TextChoices):
     PUBLISHED = "PUBLISHED", "Published"
 
 
+def parse_numeric(value):
+    """
+    Parses a result value as a number.
+
+    Args:
+        value (str): The result value.
+
+    Returns:
+        Decimal | None: The number, or None if the value is not numeric.
+    """
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        return None
+    return number if number.is_finite() else None
+
+
 class Result(models.Model):
     """
     Represents the result of a single test parameter for an order item.
 
     Attributes:
         order_item (ForeignKey): The order item this result is for.
+        patient (ForeignKey): The patient of the order, copied from the order
+            so a patient's history can be read from one index.
+        parameter (ForeignKey): The master-data parameter the test measures,
+            if the test has exactly one.
         value (CharField): The result value.
         unit (CharField): The unit of measurement for the result.
         reference_range (CharField): The reference range for this result.
@@ -33,6 +58,10 @@ class Result(models.Model):
         verified_at (DateTimeField): The timestamp when the result was verified.
         published_at (DateTimeField): The timestamp when the result was published.
         notes (TextField): Any notes or comments related to the result.
+        delta_flag (BooleanField): Whether the value changed from the
+            patient's previous result beyond the delta-check thresholds.
+        delta_previous_value (CharField): The previous value the delta check
+            compared against.
         created_at (DateTimeField): The timestamp when the result was created.
         updated_at (DateTimeField): The timestamp when the result was last updated.
     """
@@ -40,6 +69,19 @@ class Result(models.Model):
     order_item = models.ForeignKey(
         OrderItem, on_delete=models.CASCADE, related_name="results"
     )
+    patient = models.ForeignKey(
+        "patients.Patient",
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="results",
+    )
+    parameter = models.ForeignKey(
+        "catalog.Parameter",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="results",
+    )
     value = models.CharField(max_length=255)
     unit = models.CharField(max_length=50, blank=True)
     reference_range = models.CharField(max_length=255, blank=True)
@@ -65,6 +107,8 @@ class Result(models.Model):
     verified_at = models.DateTimeField(null=True, blank=True)
     published_at = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(blank=True)
+    delta_flag = models.BooleanField(default=False)
+    delta_previous_value = models.CharField(max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -73,8 +117,248 @@ class Result(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["status"]),
+            # Previous-result lookups of the delta check
+            models.Index(
+                fields=["patient", "parameter", "entered_at"],
+                name="results_history_idx",
+            ),
+            models.Index(fields=["updated_at"]),
         ]
 
     def __str__(self):
         """Returns a string representation of the result."""
         return f"{self.order_item} - {self.value} {self.unit}"
+
+    def save(self, *args, **kwargs):
+        """
+        Overrides the default save method to fill in the patient and
+        parameter of a new result from its order item.
+        """
+        if self._state.adding:
+            if self.patient_id is None:
+                self.patient_id = self.order_item.order.patient_id
+            if self.parameter_id is None:
+                code = self.order_item.test.code
+                test_parameter = TestParameter.for_test_codes([code]).get(code)
+                if test_parameter is not None:
+                    self.parameter = test_parameter.parameter
+        super().save(*args, **kwargs)
+
+
+register_transitions(
+    Result,
+    {
+        "enter": Transition(
+            (ResultStatus.DRAFT,), ResultStatus.ENTERED, "entered_at", "entered_by"
+        ),
+        "verify": Transition(
+            (ResultStatus.ENTERED,),
+            ResultStatus.VERIFIED,
+            "verified_at",
+            "verified_by",
+        ),
+        # Used by autoverification, which records the rule instead of a user
+        "autoverify": Transition(
+            (ResultStatus.ENTERED,), ResultStatus.VERIFIED, "verified_at"
+        ),
+        "publish": Transition(
+            (ResultStatus.VERIFIED,), ResultStatus.PUBLISHED, "published_at"
+        ),
+        # Used when the verification step is disabled in the workflow settings
+        "publish_unverified": Transition(
+            (ResultStatus.ENTERED,), ResultStatus.PUBLISHED, "published_at"
+        ),
+    },
+)
+
+
+class AlertStatus(models.TextChoices):
+    """
+    Enumeration for the status of a critical-value alert.
+    """
+
+    OPEN = "OPEN", "Open"
+    ACKNOWLEDGED = "ACKNOWLEDGED", "Acknowledged"
+
+
+class AlertDirection(models.TextChoices):
+    """
+    Enumeration for the critical limit a result value crossed.
+    """
+
+    LOW = "LOW", "Critically low"
+    HIGH = "HIGH", "Critically high"
+
+
+class CriticalAlert(models.Model):
+    """
+    Represents a result value beyond a critical limit, awaiting acknowledgement.
+
+    Attributes:
+        result (ForeignKey): The result with the critical value.
+        order_item (ForeignKey): The order item of the result.
+        patient (ForeignKey): The patient of the result.
+        parameter (ForeignKey): The parameter the limit belongs to.
+        value (CharField): The result value when the alert was raised.
+        direction (CharField): Whether the value is below or above the limit.
+        limit (DecimalField): The critical limit that was crossed.
+        status (CharField): Whether the alert has been acknowledged.
+        acknowledged_by (ForeignKey): The user who acknowledged the alert.
+        acknowledged_at (DateTimeField): The timestamp of the acknowledgement.
+        acknowledgement_note (TextField): A note, e.g. whom the value was
+            reported to.
+        created_at (DateTimeField): The timestamp when the alert was raised.
+        updated_at (DateTimeField): The timestamp when the alert was last updated.
+    """
+
+    result = models.ForeignKey(
+        Result, on_delete=models.CASCADE, related_name="critical_alerts"
+    )
+    order_item = models.ForeignKey(
+        OrderItem, on_delete=models.CASCADE, related_name="critical_alerts"
+    )
+    patient = models.ForeignKey(
+        "patients.Patient",
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="critical_alerts",
+    )
+    parameter = models.ForeignKey(
+        "catalog.Parameter",
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="critical_alerts",
+    )
+    value = models.CharField(max_length=255)
+    direction = models.CharField(max_length=10, choices=AlertDirection.choices)
+    limit = models.DecimalField(max_digits=12, decimal_places=4)
+    status = models.CharField(
+        max_length=20, choices=AlertStatus.choices, default=AlertStatus.OPEN
+    )
+    acknowledged_by = models.ForeignKey(
+        "users.User",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="acknowledged_alerts",
+    )
+    acknowledged_at = models.DateTimeField(null=True, blank=True)
+    acknowledgement_note = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "critical_alerts"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    def __str__(self):
+        """Returns a string representation of the alert."""
+        return f"{self.order_item} - {self.value} ({self.direction})"
+
+
+register_transitions(
+    CriticalAlert,
+    {
+        "acknowledge": Transition(
+            (AlertStatus.OPEN,),
+            AlertStatus.ACKNOWLEDGED,
+            "acknowledged_at",
+            "acknowledged_by",
+        ),
+    },
+)
+
+
+class AutoverificationRule(models.Model):
+    """
+    Represents the conditions under which results are verified automatically.
+
+    A rule applies to the results of one test, one parameter, or both; with
+    neither set it applies to every result. The most specific active rule
+    is used; among equally specific rules, the first by name.
+
+    Attributes:
+        name (CharField): A short description of the rule.
+        test (ForeignKey): The test the rule applies to.
+        parameter (ForeignKey): The parameter the rule applies to.
+        require_reference_range (BooleanField): Whether the value must be
+            numeric and within the patient's reference range.
+        require_no_delta_failure (BooleanField): Whether the result must pass
+            its delta check.
+        require_no_critical (BooleanField): Whether the value must be within
+            the critical limits.
+        allowed_flags (CharField): Comma-separated instrument flags that do
+            not block autoverification.
+        is_active (BooleanField): Whether the rule is in use.
+        created_at (DateTimeField): The timestamp when the rule was created.
+        updated_at (DateTimeField): The timestamp when the rule was last updated.
+    """
+
+    name = models.CharField(max_length=100)
+    test = models.ForeignKey(
+        "catalog.TestCatalog",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="autoverification_rules",
+    )
+    parameter = models.ForeignKey(
+        "catalog.Parameter",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="autoverification_rules",
+    )
+    require_reference_range = models.BooleanField(default=True)
+    require_no_delta_failure = models.BooleanField(default=True)
+    require_no_critical = models.BooleanField(default=True)
+    allowed_flags = models.CharField(max_length=50, blank=True, default="N")
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "autoverification_rules"
+        ordering = ["name"]
+
+    def __str__(self):
+        """Returns a string representation of the rule."""
+        return self.name
+
+
+class AutoverificationRecord(models.Model):
+    """
+    Records the autoverification decision for an entered result.
+
+    Attributes:
+        result (ForeignKey): The evaluated result.
+        rule (ForeignKey): The rule that was applied.
+        verified (BooleanField): Whether the result was verified.
+        failed_checks (JSONField): The names of the checks that failed.
+        created_at (DateTimeField): The timestamp of the decision.
+    """
+
+    result = models.ForeignKey(
+        Result, on_delete=models.CASCADE, related_name="autoverification_records"
+    )
+    rule = models.ForeignKey(
+        AutoverificationRule,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="records",
+    )
+    verified = models.BooleanField()
+    failed_checks = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "autoverification_records"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        """Returns a string representation of the decision."""
+        outcome = "verified" if self.verified else "held"
+        return f"{self.result_id} {outcome} by {self.rule}"
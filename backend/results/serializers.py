@@ -2,7 +2,11 @@
 
 from rest_framework import serializers
 
-from .models import Result
+from .models import AutoverificationRule, CriticalAlert, Result
+from .services import prepare_entries, save_worksheet
+
+# Rows accepted by one worksheet request
+MAX_WORKSHEET_SIZE = 500
 
 
 class ResultSerializer(serializers.ModelSerializer):
@@ -26,11 +30,19 @@ class ResultSerializer(serializers.ModelSerializer):
             "verified_at",
             "published_at",
             "notes",
+            "patient",
+            "parameter",
+            "delta_flag",
+            "delta_previous_value",
             "created_at",
             "updated_at",
         ]
         read_only_fields = [
             "id",
+            "patient",
+            "parameter",
+            "delta_flag",
+            "delta_previous_value",
             "entered_by",
             "entered_at",
             "verified_by",
@@ -39,3 +51,144 @@ class ResultSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+
+
+class CriticalAlertSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the CriticalAlert model.
+    """
+
+    patient_name = serializers.CharField(source="patient.full_name", read_only=True)
+    parameter_code = serializers.CharField(source="parameter.code", read_only=True)
+    parameter_name = serializers.CharField(source="parameter.name", read_only=True)
+
+    class Meta:
+        model = CriticalAlert
+        fields = [
+            "id",
+            "result",
+            "order_item",
+            "patient",
+            "patient_name",
+            "parameter",
+            "parameter_code",
+            "parameter_name",
+            "value",
+            "direction",
+            "limit",
+            "status",
+            "acknowledged_by",
+            "acknowledged_at",
+            "acknowledgement_note",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class AutoverificationRuleSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the AutoverificationRule model.
+    """
+
+    class Meta:
+        model = AutoverificationRule
+        fields = [
+            "id",
+            "name",
+            "test",
+            "parameter",
+            "require_reference_range",
+            "require_no_delta_failure",
+            "require_no_critical",
+            "allowed_flags",
+            "is_active",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["created_at", "updated_at"]
+
+    def validate_allowed_flags(self, value):
+        """Normalizes the flags to a comma-separated list without blanks."""
+        return ",".join(flag.strip() for flag in value.split(",") if flag.strip())
+
+
+class WorksheetEntrySerializer(serializers.Serializer):
+    """
+    Serializer for one row of a result entry worksheet.
+
+    A row identifies its result by `result_id`, or by the sample `barcode`
+    and the catalog `test` code.
+    """
+
+    result_id = serializers.IntegerField(required=False)
+    barcode = serializers.CharField(required=False)
+    test = serializers.CharField(required=False)
+    value = serializers.CharField(max_length=255)
+    unit = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    flags = serializers.CharField(max_length=50, required=False, allow_blank=True)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        """
+        Validate that the row identifies a result.
+
+        Args:
+            attrs (dict): The row fields.
+
+        Returns:
+            dict: The validated row.
+
+        Raises:
+            serializers.ValidationError: If neither `result_id` nor both
+                `barcode` and `test` are given.
+        """
+        if "result_id" not in attrs and not ("barcode" in attrs and "test" in attrs):
+            raise serializers.ValidationError("Provide result_id or barcode and test")
+        return attrs
+
+
+class WorksheetSerializer(serializers.Serializer):
+    """
+    Serializer for a worksheet of result values.
+
+    Validation resolves every row to its result and checks the value
+    against the parameter the test measures; the rows must be validated
+    inside the transaction that saves them, since their results are locked
+    while they are read.
+    """
+
+    entries = WorksheetEntrySerializer(
+        many=True, allow_empty=False, max_length=MAX_WORKSHEET_SIZE
+    )
+
+    def validate_entries(self, entries):
+        """
+        Validate that each row's result can be entered with its value.
+
+        Args:
+            entries (list[dict]): The worksheet rows.
+
+        Returns:
+            list[dict]: The rows prepared by `prepare_entries`.
+
+        Raises:
+            serializers.ValidationError: With one error per invalid row, if
+                any row is invalid.
+        """
+        cleaned, errors = prepare_entries(entries)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return cleaned
+
+    def create(self, validated_data):
+        """
+        Saves the worksheet values and marks the results as entered.
+
+        Args:
+            validated_data (dict): The validated worksheet.
+
+        Returns:
+            list[Result]: The entered results.
+        """
+        return save_worksheet(validated_data["entries"], self.context["request"].user)
@@ -0,0 +1,221 @@
+"""Result entry services."""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import F
+from django.utils import timezone
+
+from catalog.models import TestParameter
+from core.transitions import TRANSITIONS
+
+from .autoverification import autoverify, save_records
+from .critical import raise_critical_alerts
+from .delta import evaluate_delta, with_previous_result
+from .models import Result
+
+# Columns written by worksheet entry
+WORKSHEET_FIELDS = [
+    "value",
+    "unit",
+    "flags",
+    "notes",
+    "parameter",
+    "delta_flag",
+    "delta_previous_value",
+    "status",
+    "entered_by",
+    "entered_at",
+    "verified_at",
+    "updated_at",
+]
+
+
+def clean_value(parameter, value):
+    """
+    Validates a result value against its parameter definition.
+
+    Numeric parameters accept decimal numbers with at most
+    `decimal_places` digits after the point. Parameters with
+    `allowed_values` accept one of the comma-separated options,
+    case-insensitively.
+
+    Args:
+        parameter (Parameter | None): The parameter, or None to skip the
+            checks.
+        value (str): The entered value.
+
+    Returns:
+        str: The value, with allowed values in their canonical spelling.
+
+    Raises:
+        ValueError: If the value does not fit the parameter.
+    """
+    value = value.strip()
+    if parameter is None:
+        return value
+
+    if parameter.data_type == "Numeric":
+        try:
+            number = Decimal(value)
+        except InvalidOperation:
+            raise ValueError("Value must be numeric") from None
+        if not number.is_finite():
+            raise ValueError("Value must be numeric")
+        places = parameter.decimal_places
+        if places is not None and -number.as_tuple().exponent > places:
+            raise ValueError(f"Value must have at most {places} decimal places")
+
+    options = [
+        option.strip()
+        for option in parameter.allowed_values.split(",")
+        if option.strip()
+    ]
+    if options:
+        for option in options:
+            if option.casefold() == value.casefold():
+                return option
+        raise ValueError(f"Value must be one of: {', '.join(options)}")
+    return value
+
+
+def _lock_results(entries):
+    """
+    Locks the results referenced by worksheet rows, annotated with the
+    previous results the delta check compares against.
+
+    Returns:
+        dict: The results keyed by id and by `(barcode, test code)`.
+    """
+    ids = [entry["result_id"] for entry in entries if "result_id" in entry]
+    barcodes = [entry["barcode"] for entry in entries if "result_id" not in entry]
+    locked = with_previous_result(
+        Result.objects.select_for_update(of=("self",)).select_related(
+            "order_item__test", "patient"
+        )
+    )
+
+    results = {}
+    if ids:
+        results.update((result.pk, result) for result in locked.filter(pk__in=ids))
+    if barcodes:
+        for result in locked.filter(order_item__samples__barcode__in=barcodes).annotate(
+            sample_barcode=F("order_item__samples__barcode")
+        ):
+            results[(result.sample_barcode, result.order_item.test.code)] = result
+    return results
+
+
+def prepare_entries(entries):
+    """
+    Resolves worksheet rows to their results and validates their values.
+
+    The results are locked, so this must run in the transaction that saves
+    the rows.
+
+    Args:
+        entries (list[dict]): Rows with `result_id`, or `barcode` and the
+            catalog `test` code, the `value` and optional `unit`, `flags`
+            and `notes`.
+
+    Returns:
+        tuple[list[dict], list[dict]]: The valid rows with the locked
+            `result`, its `test_parameter` and the cleaned `value`, `unit`,
+            `flags` and `notes`; and one error dict per input row, empty
+            for valid rows.
+    """
+    results = _lock_results(entries)
+    test_parameters = TestParameter.for_test_codes(
+        result.order_item.test.code for result in results.values()
+    )
+    sources = TRANSITIONS[Result]["enter"].sources
+
+    cleaned = []
+    errors = []
+    seen = set()
+    for entry in entries:
+        if "result_id" in entry:
+            result = results.get(entry["result_id"])
+            missing = "Result not found"
+        else:
+            result = results.get((entry["barcode"], entry["test"]))
+            missing = f"No result for test {entry['test']} on sample {entry['barcode']}"
+
+        if result is None:
+            errors.append({"non_field_errors": [missing]})
+            continue
+        if result.pk in seen:
+            errors.append({"non_field_errors": ["Result appears more than once"]})
+            continue
+        if result.status not in sources:
+            errors.append(
+                {
+                    "non_field_errors": [
+                        f"Cannot enter result with status {result.status}"
+                    ]
+                }
+            )
+            continue
+
+        test_parameter = test_parameters.get(result.order_item.test.code)
+        parameter = test_parameter.parameter if test_parameter else None
+        try:
+            value = clean_value(parameter, entry["value"])
+        except ValueError as error:
+            errors.append({"value": [str(error)]})
+            continue
+
+        seen.add(result.pk)
+        default_unit = result.unit or (parameter.unit if parameter else "")
+        cleaned.append(
+            {
+                "result": result,
+                "test_parameter": test_parameter,
+                "value": value,
+                "unit": entry.get("unit", default_unit),
+                "flags": entry.get("flags", result.flags),
+                "notes": entry.get("notes", result.notes),
+            }
+        )
+        errors.append({})
+    return cleaned, errors
+
+
+def save_worksheet(entries, user):
+    """
+    Writes a validated worksheet and marks its results as entered.
+
+    Each value is delta-checked against the patient's previous result and
+    results passing their autoverification rule are marked as verified; all
+    results are saved with one `bulk_update`, and critical values raise
+    alerts. Must run in the transaction that locked the results and checked
+    that each one can be entered.
+
+    Args:
+        entries (list[dict]): The valid rows returned by `prepare_entries`.
+        user (User): The user entering the results.
+
+    Returns:
+        list[Result]: The updated results, VERIFIED for those autoverified.
+    """
+    transition = TRANSITIONS[Result]["enter"]
+    now = timezone.now()
+    results = []
+    for entry in entries:
+        result = entry["result"]
+        result.value = entry["value"]
+        result.unit = entry["unit"]
+        result.flags = entry["flags"]
+        result.notes = entry["notes"]
+        result.status = transition.target
+        result.entered_by = user
+        result.entered_at = now
+        result.updated_at = now
+        if entry["test_parameter"] is not None:
+            result.parameter = entry["test_parameter"].parameter
+        evaluate_delta(result, entry["test_parameter"])
+        results.append(result)
+    records = autoverify(results, now)
+    Result.objects.bulk_update(results, WORKSHEET_FIELDS)
+    save_records(records)
+    raise_critical_alerts(results)
+    return results
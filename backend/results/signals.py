@@ -0,0 +1,14 @@
+"""Cache invalidation for autoverification rules."""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import invalidate_on_commit
+
+from .models import AutoverificationRule
+
+
+@receiver([post_save, post_delete], sender=AutoverificationRule)
+def invalidate_autoverification_rules(sender, **kwargs):
+    """Invalidates the compiled rules when a rule changes."""
+    invalidate_on_commit("autoverification")
@@ -0,0 +1,370 @@
+"""Tests for rule-based autoverification."""
+
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import Parameter, ReferenceRange, Test, TestCatalog, TestParameter
+from events.broker import InMemoryBroker
+from orders.models import Order, OrderItem
+from patients.models import Patient
+from settings.models import WorkflowSettings
+from settings.permissions import TEMPORARY_FULL_ACCESS_MODE
+from users.models import User, UserRole
+
+from .autoverification import get_autoverifier
+from .models import AutoverificationRecord, AutoverificationRule, Result, ResultStatus
+
+
+class AutoverificationFixtures:
+    """Shared set-up for autoverification tests."""
+
+    def setup_method(self):
+        """Set up a potassium test with reference and critical limits."""
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            user=User.objects.create(username="tech", role=UserRole.TECHNOLOGIST)
+        )
+        self.patient = Patient.objects.create(
+            full_name="John Doe",
+            father_name="James Doe",
+            dob=date(1990, 1, 1),
+            sex="M",
+            phone="03001234567",
+        )
+        self.parameter = Parameter.objects.create(
+            code="K", name="Potassium", unit="mmol/L"
+        )
+        ReferenceRange.objects.create(
+            parameter=self.parameter,
+            sex="All",
+            age_min=18,
+            age_max=120,
+            normal_low=Decimal("3.5"),
+            normal_high=Decimal("5.1"),
+            critical_low=Decimal("2.5"),
+            critical_high=Decimal("6.5"),
+        )
+        self.test_parameter = TestParameter.objects.create(
+            test=Test.objects.create(code="K", name="Potassium"),
+            parameter=self.parameter,
+        )
+        self.test = TestCatalog.objects.create(
+            code="K",
+            name="Potassium",
+            category="Biochemistry",
+            sample_type="Blood",
+            price=300,
+            turnaround_time_hours=4,
+        )
+        self.rule = AutoverificationRule.objects.create(
+            name="Potassium", test=self.test
+        )
+
+    def create_result(self, value, **fields):
+        order = Order.objects.create(patient=self.patient)
+        item = OrderItem.objects.create(order=order, test=self.test)
+        return Result.objects.create(order_item=item, value=value, **fields)
+
+
+@pytest.mark.django_db
+class TestAutoverification(AutoverificationFixtures):
+    """Test that results passing their rule are verified on entry."""
+
+    def enter(self, value, **fields):
+        result = self.create_result(value, **fields)
+        response = self.client.post(f"/api/results/{result.id}/enter/")
+        assert response.status_code == status.HTTP_200_OK
+        return response.data
+
+    def test_normal_value_is_verified(self):
+        """Test that a value within the reference range is verified."""
+        data = self.enter("4.2")
+        assert data["status"] == ResultStatus.VERIFIED
+        assert data["verified_at"] is not None
+        assert data["verified_by"] is None
+
+        record = AutoverificationRecord.objects.get()
+        assert record.result_id == data["id"]
+        assert record.rule == self.rule
+        assert record.verified is True
+        assert record.failed_checks == []
+
+    @pytest.mark.parametrize(
+        "value, failed_checks",
+        [
+            ("5.8", ["reference_range"]),
+            ("7.2", ["reference_range", "critical"]),
+            ("Hemolysed", ["reference_range"]),
+        ],
+    )
+    def test_abnormal_value_is_held(self, value, failed_checks):
+        """Test that values outside the limits wait for manual verification."""
+        data = self.enter(value)
+        assert data["status"] == ResultStatus.ENTERED
+        record = AutoverificationRecord.objects.get()
+        assert record.verified is False
+        assert record.failed_checks == failed_checks
+
+    def test_delta_failure_is_held(self):
+        """Test that a failed delta check blocks autoverification."""
+        self.test_parameter.delta_check_enabled = True
+        self.test_parameter.save()
+        self.create_result(
+            "3.0",
+            status=ResultStatus.PUBLISHED,
+            entered_at=timezone.now() - timedelta(days=1),
+        )
+        data = self.enter("5.0")
+        assert data["delta_flag"] is True
+        assert data["status"] == ResultStatus.ENTERED
+        assert AutoverificationRecord.objects.get().failed_checks == ["delta"]
+
+    def test_instrument_flags(self):
+        """Test that only the allowed instrument flags pass."""
+        assert self.enter("4.2", flags="N")["status"] == ResultStatus.VERIFIED
+        assert self.enter("4.2", flags="QC")["status"] == ResultStatus.ENTERED
+
+        self.rule.allowed_flags = "N,QC"
+        self.rule.save()
+        assert self.enter("4.2", flags="QC")["status"] == ResultStatus.VERIFIED
+
+    def test_disabled_checks_are_skipped(self):
+        """Test that a rule only runs the checks it requires."""
+        self.rule.require_reference_range = False
+        self.rule.save()
+        assert self.enter("5.8")["status"] == ResultStatus.VERIFIED
+        assert self.enter("7.2")["status"] == ResultStatus.ENTERED
+
+    def test_most_specific_rule_applies(self):
+        """Test that a test rule wins over a rule for every result."""
+        self.rule.is_active = False
+        self.rule.save()
+        catch_all = AutoverificationRule.objects.create(
+            name="Default", require_reference_range=False
+        )
+        strict = AutoverificationRule.objects.create(
+            name="Potassium strict", test=self.test, parameter=self.parameter
+        )
+
+        self.enter("5.8")
+        record = AutoverificationRecord.objects.get()
+        assert record.rule == strict
+        assert record.verified is False
+
+        strict.delete()
+        assert self.enter("5.8")["status"] == ResultStatus.VERIFIED
+        assert AutoverificationRecord.objects.filter(rule=catch_all).exists()
+
+    def test_no_rule_leaves_result_entered(self):
+        """Test that results without a rule are not evaluated."""
+        self.rule.delete()
+        assert self.enter("4.2")["status"] == ResultStatus.ENTERED
+        assert not AutoverificationRecord.objects.exists()
+
+    def test_disabled_verification_step_skips_rules(self):
+        """Test that rules do not run when verification is switched off."""
+        settings = WorkflowSettings.load()
+        settings.enable_verification = False
+        settings.save()
+        assert self.enter("4.2")["status"] == ResultStatus.ENTERED
+        assert not AutoverificationRecord.objects.exists()
+
+    def test_verification_is_published(
+        self, settings, django_capture_on_commit_callbacks
+    ):
+        """Test that an autoverified result reaches the event stream."""
+        settings.EVENTS_BROKER = "memory"
+        with (
+            patch.object(InMemoryBroker, "publish") as publish,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            self.enter("4.2")
+
+        events = [json.loads(call.args[0]) for call in publish.call_args_list]
+        assert [(event["type"], event["status"]) for event in events] == [
+            ("result.entered", "ENTERED"),
+            ("result.verified", "VERIFIED"),
+        ]
+
+    def test_worksheet_autoverifies_rows(self):
+        """Test that worksheet entry verifies the rows passing their rule."""
+        results = [self.create_result("") for _ in range(3)]
+        response = self.client.post(
+            "/api/results/worksheet/",
+            {
+                "entries": [
+                    {"result_id": result.id, "value": value}
+                    for result, value in zip(
+                        results, ["4.2", "5.8", "3.9"], strict=True
+                    )
+                ]
+            },
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert [row["status"] for row in response.data["results"]] == [
+            "VERIFIED",
+            "ENTERED",
+            "VERIFIED",
+        ]
+        verified = Result.objects.filter(
+            status=ResultStatus.VERIFIED, verified_at__isnull=False
+        )
+        assert verified.count() == 2
+        assert AutoverificationRecord.objects.filter(verified=False).count() == 1
+
+    def test_evaluation_runs_without_queries(self):
+        """Test that compiled rules evaluate results without queries."""
+        autoverifier = get_autoverifier()
+        results = list(
+            Result.objects.filter(
+                pk__in=[self.create_result("4.0").pk for _ in range(5)]
+            ).select_related("order_item__test", "patient")
+        )
+        with CaptureQueriesContext(connection) as queries:
+            decisions = [autoverifier.evaluate(result) for result in results]
+        assert all(decision.verified for decision in decisions)
+        assert len(queries) == 0
+
+    def test_rule_change_takes_effect_immediately(self):
+        """Test that editing a rule invalidates the compiled rules."""
+        assert self.enter("4.2")["status"] == ResultStatus.VERIFIED
+        self.rule.is_active = False
+        self.rule.save()
+        assert self.enter("4.2")["status"] == ResultStatus.ENTERED
+
+
+@pytest.mark.django_db
+class TestAutoverifyCommand(AutoverificationFixtures):
+    """Test the autoverify management command."""
+
+    def call(self, *args):
+        out = StringIO()
+        call_command("autoverify", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_reports_rate(self):
+        """Test that a dry run reports the rate without changing results."""
+        for value in ["4.2", "4.8", "5.8", "2.0"]:
+            self.create_result(
+                value,
+                status=ResultStatus.PUBLISHED,
+                entered_at=timezone.now() - timedelta(days=3),
+            )
+        self.create_result("4.2")
+
+        output = self.call("--dry-run")
+        assert "Would autoverify 2 of 4 results (50.0%)" in output
+        assert "reference_range: 2" in output
+        assert "critical: 1" in output
+        assert not AutoverificationRecord.objects.exists()
+        assert not Result.objects.filter(status=ResultStatus.VERIFIED).exists()
+
+    def test_dry_run_filters_by_entry_date(self):
+        """Test that only results entered in the period are evaluated."""
+        for days in (40, 3):
+            self.create_result(
+                "4.2",
+                status=ResultStatus.PUBLISHED,
+                entered_at=timezone.now() - timedelta(days=days),
+            )
+        since = (timezone.localdate() - timedelta(days=10)).isoformat()
+        assert "1 of 1 results" in self.call("--dry-run", "--since", since)
+
+        with pytest.raises(CommandError, match="Invalid date"):
+            self.call("--dry-run", "--since", "last week")
+
+    def test_applies_rules_to_entered_results(self):
+        """Test that entered results awaiting verification are processed."""
+        now = timezone.now()
+        verified = self.create_result(
+            "4.2", status=ResultStatus.ENTERED, entered_at=now
+        )
+        held = self.create_result("5.8", status=ResultStatus.ENTERED, entered_at=now)
+
+        assert "Autoverified 1 of 2 results" in self.call()
+        verified.refresh_from_db()
+        held.refresh_from_db()
+        assert verified.status == ResultStatus.VERIFIED
+        assert verified.verified_at is not None
+        assert held.status == ResultStatus.ENTERED
+        assert AutoverificationRecord.objects.count() == 2
+
+    def test_holds_are_recorded_once_per_rule_version(self):
+        """Test that a held result is not recorded again by every run."""
+        held = self.create_result(
+            "5.8", status=ResultStatus.ENTERED, entered_at=timezone.now()
+        )
+        self.call()
+        self.call()
+        assert held.autoverification_records.count() == 1
+
+        # A changed rule is a new decision
+        self.rule.allowed_flags = "N,H"
+        self.rule.save()
+        self.call()
+        assert held.autoverification_records.count() == 2
+
+    def test_requires_active_rules(self):
+        """Test that the command refuses to run without rules."""
+        self.rule.delete()
+        with pytest.raises(CommandError, match="No active autoverification rules"):
+            self.call("--dry-run")
+
+
+@pytest.mark.django_db
+class TestAutoverificationRuleAPI:
+    """Test the autoverification rule endpoints."""
+
+    def setup_method(self):
+        """Set up an admin and a technologist."""
+        self.client = APIClient()
+        self.admin = User.objects.create(username="admin", role=UserRole.ADMIN)
+        self.tech = User.objects.create(username="tech", role=UserRole.TECHNOLOGIST)
+
+    def test_admin_manages_rules(self):
+        """Test that admins create and update rules."""
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(
+            "/api/results/autoverification-rules/",
+            {"name": "Default", "allowed_flags": " N , ,QC "},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["allowed_flags"] == "N,QC"
+        assert response.data["require_reference_range"] is True
+
+        response = self.client.patch(
+            f"/api/results/autoverification-rules/{response.data['id']}/",
+            {"is_active": False},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["is_active"] is False
+
+    @pytest.mark.skipif(
+        TEMPORARY_FULL_ACCESS_MODE,
+        reason="Test skipped when TEMPORARY_FULL_ACCESS_MODE is enabled",
+    )
+    def test_non_admin_reads_only(self):
+        """Test that other users can list but not create rules."""
+        self.client.force_authenticate(user=self.tech)
+        response = self.client.get("/api/results/autoverification-rules/")
+        assert response.status_code == status.HTTP_200_OK
+        response = self.client.post(
+            "/api/results/autoverification-rules/", {"name": "Default"}
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
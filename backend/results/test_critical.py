@@ -0,0 +1,264 @@
+"""Tests for critical-value alerts."""
+
+import json
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import Parameter, ReferenceRange, Test, TestCatalog, TestParameter
+from events.broker import InMemoryBroker
+from orders.models import Order, OrderItem
+from patients.models import Patient
+from users.models import User, UserRole
+
+from .critical import critical_limits, raise_critical_alerts
+from .models import AlertDirection, AlertStatus, CriticalAlert, Result, ResultStatus
+
+
+@pytest.mark.django_db
+class TestCriticalAlerts:
+    """Test that critical values raise alerts that can be acknowledged."""
+
+    def setup_method(self):
+        """Set up a potassium test with critical limits."""
+        cache.clear()
+        self.client = APIClient()
+        self.tech = User.objects.create(username="tech", role=UserRole.TECHNOLOGIST)
+        self.pathologist = User.objects.create(
+            username="path", role=UserRole.PATHOLOGIST
+        )
+        self.client.force_authenticate(user=self.tech)
+        self.patient = Patient.objects.create(
+            full_name="John Doe",
+            father_name="James Doe",
+            dob=date(1990, 1, 1),
+            sex="M",
+            phone="03001234567",
+        )
+        self.parameter = Parameter.objects.create(
+            code="K", name="Potassium", unit="mmol/L"
+        )
+        ReferenceRange.objects.create(
+            parameter=self.parameter,
+            sex="All",
+            age_min=18,
+            age_max=120,
+            normal_low=Decimal("3.5"),
+            normal_high=Decimal("5.1"),
+            critical_low=Decimal("2.5"),
+            critical_high=Decimal("6.5"),
+        )
+        self.test_parameter = TestParameter.objects.create(
+            test=Test.objects.create(code="K", name="Potassium"),
+            parameter=self.parameter,
+        )
+        self.test = TestCatalog.objects.create(
+            code="K",
+            name="Potassium",
+            category="Biochemistry",
+            sample_type="Blood",
+            price=300,
+            turnaround_time_hours=4,
+        )
+
+    def create_result(self, value, patient=None):
+        order = Order.objects.create(patient=patient or self.patient)
+        item = OrderItem.objects.create(order=order, test=self.test)
+        return Result.objects.create(order_item=item, value=value)
+
+    def enter(self, value, patient=None):
+        result = self.create_result(value, patient)
+        response = self.client.post(f"/api/results/{result.id}/enter/")
+        assert response.status_code == status.HTTP_200_OK
+        return result
+
+    @pytest.mark.parametrize(
+        "value, direction, limit",
+        [("2.1", "LOW", Decimal("2.5")), ("7.2", "HIGH", Decimal("6.5"))],
+    )
+    def test_critical_value_raises_alert(self, value, direction, limit):
+        """Test that values beyond a critical limit raise an alert."""
+        result = self.enter(value)
+
+        alert = CriticalAlert.objects.get()
+        assert alert.result == result
+        assert alert.patient == self.patient
+        assert alert.parameter == self.parameter
+        assert alert.direction == direction
+        assert alert.limit == limit
+        assert alert.status == AlertStatus.OPEN
+
+    def test_normal_value_raises_nothing(self):
+        """Test that values within the limits raise no alert."""
+        self.enter("5.8")
+        assert not CriticalAlert.objects.exists()
+
+    def test_ranges_match_patient_age_and_sex(self):
+        """Test that a range only applies to the patients it describes."""
+        child = Patient.objects.create(
+            full_name="Baby Doe", dob=date.today(), sex="M", phone="03001234567"
+        )
+        self.enter("2.1", patient=child)
+        reference_range = ReferenceRange.objects.get()
+        reference_range.sex = "F"
+        reference_range.save()
+        self.enter("2.1")
+        assert not CriticalAlert.objects.exists()
+
+    def test_panic_override_replaces_limit(self):
+        """Test that test-parameter panic overrides win over the range."""
+        self.test_parameter.panic_high_override = Decimal("6.0")
+        self.test_parameter.save()
+
+        self.enter("6.2")
+        alert = CriticalAlert.objects.get()
+        assert alert.direction == "HIGH"
+        assert alert.limit == Decimal("6.0")
+
+    def test_alert_is_published(self, settings, django_capture_on_commit_callbacks):
+        """Test that alerts reach the event stream after commit."""
+        settings.EVENTS_BROKER = "memory"
+        with (
+            patch.object(InMemoryBroker, "publish") as publish,
+            django_capture_on_commit_callbacks(execute=True),
+        ):
+            self.enter("7.2")
+
+        events = [json.loads(call.args[0]) for call in publish.call_args_list]
+        assert [event["type"] for event in events] == [
+            "critical.raised",
+            "result.entered",
+        ]
+        assert events[0]["status"] == "OPEN"
+
+    def test_worksheet_raises_alerts(self):
+        """Test that worksheet entry checks every row."""
+        results = [self.create_result("") for _ in range(3)]
+        response = self.client.post(
+            "/api/results/worksheet/",
+            {
+                "entries": [
+                    {"result_id": result.id, "value": value}
+                    for result, value in zip(
+                        results, ["2.0", "4.2", "8.0"], strict=True
+                    )
+                ]
+            },
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(CriticalAlert.objects.values_list("value", flat=True)) == [
+            "2.0",
+            "8.0",
+        ]
+
+    def test_check_runs_without_queries_once_cached(self):
+        """Test that the compiled limits are reused from the cache."""
+        critical_limits()
+        results = list(
+            Result.objects.filter(
+                pk__in=[self.create_result("4.0").pk for _ in range(5)]
+            ).select_related("order_item__test", "patient")
+        )
+        with CaptureQueriesContext(connection) as queries:
+            assert raise_critical_alerts(results) == []
+        assert len(queries) == 0
+
+    def test_normal_only_range_does_not_hide_critical_limits(self):
+        """Test that critical limits apply behind a range without them."""
+        glucose = Parameter.objects.create(code="GLU", name="Glucose", unit="mg/dL")
+        ReferenceRange.objects.create(
+            parameter=glucose,
+            sex="All",
+            age_min=0,
+            age_max=120,
+            normal_low=Decimal("70"),
+            normal_high=Decimal("110"),
+        )
+        ReferenceRange.objects.create(
+            parameter=glucose,
+            sex="All",
+            age_min=18,
+            age_max=120,
+            critical_low=Decimal("40"),
+            critical_high=Decimal("400"),
+        )
+        result = self.create_result("25")
+        result.parameter = glucose
+        result.save()
+
+        response = self.client.post(f"/api/results/{result.id}/enter/")
+        assert response.status_code == status.HTTP_200_OK
+        alert = CriticalAlert.objects.get()
+        assert (alert.direction, alert.limit) == (AlertDirection.LOW, Decimal("40"))
+
+    def test_failed_entry_is_rolled_back(self):
+        """Test that a failure after the checks leaves the result a draft."""
+        result = self.create_result("7.2")
+        with patch(
+            "results.views.autoverify_entered", side_effect=RuntimeError("lost")
+        ):
+            with pytest.raises(RuntimeError):
+                self.client.post(f"/api/results/{result.id}/enter/")
+
+        result.refresh_from_db()
+        assert result.status == ResultStatus.DRAFT
+        assert not CriticalAlert.objects.exists()
+        self.client.post(f"/api/results/{result.id}/enter/")
+        assert CriticalAlert.objects.count() == 1
+
+    def test_catalog_change_rebuilds_limits(self):
+        """Test that editing a reference range takes effect immediately."""
+        self.enter("3.0")
+        reference_range = ReferenceRange.objects.get()
+        reference_range.critical_low = Decimal("3.2")
+        reference_range.save()
+        self.enter("3.0")
+        assert CriticalAlert.objects.count() == 1
+
+    def test_acknowledge_alert(self):
+        """Test that a pathologist acknowledges an open alert once."""
+        self.enter("7.2")
+        alert = CriticalAlert.objects.get()
+        self.client.force_authenticate(user=self.pathologist)
+
+        response = self.client.post(
+            f"/api/results/critical-alerts/{alert.id}/acknowledge/",
+            {"note": "Called Dr. Khan"},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["status"] == "ACKNOWLEDGED"
+        assert response.data["acknowledged_by"] == self.pathologist.id
+        assert response.data["acknowledgement_note"] == "Called Dr. Khan"
+
+        response = self.client.post(
+            f"/api/results/critical-alerts/{alert.id}/acknowledge/"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["error"] == (
+            "Cannot acknowledge alert with status ACKNOWLEDGED"
+        )
+
+        response = self.client.post("/api/results/critical-alerts/99999/acknowledge/")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_list_open_alerts(self):
+        """Test that alerts can be filtered by status."""
+        self.enter("7.2")
+        self.enter("2.0")
+        CriticalAlert.objects.filter(value="2.0").update(
+            status=AlertStatus.ACKNOWLEDGED
+        )
+
+        response = self.client.get("/api/results/critical-alerts/?status=OPEN")
+        assert response.status_code == status.HTTP_200_OK
+        assert [alert["value"] for alert in response.data["results"]] == ["7.2"]
+        assert response.data["results"][0]["parameter_code"] == "K"
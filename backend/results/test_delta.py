@@ -0,0 +1,172 @@
+"""Tests for delta checks against the patient's result history."""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import Parameter, Test, TestCatalog, TestParameter
+from orders.models import Order, OrderItem
+from patients.models import Patient
+from samples.models import Sample
+from users.models import User, UserRole
+
+from .delta import check_delta, with_previous_result
+from .models import Result, ResultStatus
+
+
+@pytest.mark.django_db
+class TestDeltaCheck:
+    """Test that entered values are compared with the previous result."""
+
+    def setup_method(self):
+        """Set up a patient with a previous hemoglobin result."""
+        self.client = APIClient()
+        self.client.force_authenticate(
+            user=User.objects.create(username="tech", role=UserRole.TECHNOLOGIST)
+        )
+        self.patient = Patient.objects.create(
+            full_name="John Doe",
+            father_name="James Doe",
+            dob=date(1990, 1, 1),
+            sex="M",
+            phone="03001234567",
+        )
+        self.parameter = Parameter.objects.create(
+            code="HB", name="Hemoglobin", unit="g/dL", decimal_places=1
+        )
+        self.test_parameter = TestParameter.objects.create(
+            test=Test.objects.create(code="HB", name="Hemoglobin"),
+            parameter=self.parameter,
+            delta_check_enabled=True,
+        )
+        self.test = TestCatalog.objects.create(
+            code="HB",
+            name="Hemoglobin",
+            category="Hematology",
+            sample_type="Blood",
+            price=300,
+            turnaround_time_hours=24,
+        )
+        self.previous = self.create_result(
+            value="14.0",
+            status=ResultStatus.PUBLISHED,
+            entered_at=timezone.now() - timedelta(days=10),
+        )
+
+    def create_result(self, patient=None, **fields):
+        order = Order.objects.create(patient=patient or self.patient)
+        item = OrderItem.objects.create(order=order, test=self.test)
+        sample = Sample.objects.create(order=order, sample_type="Blood")
+        sample.order_items.add(item)
+        return Result.objects.create(order_item=item, **fields)
+
+    def enter(self, value, patient=None):
+        result = self.create_result(patient=patient, value=value)
+        response = self.client.post(f"/api/results/{result.id}/enter/")
+        assert response.status_code == status.HTTP_200_OK
+        return response.data
+
+    def test_new_result_links_patient_and_parameter(self):
+        """Test that a new result copies its patient and parameter."""
+        assert self.previous.patient == self.patient
+        assert self.previous.parameter == self.parameter
+
+    @pytest.mark.parametrize("value, flagged", [("12.5", False), ("6.0", True)])
+    @override_settings(DELTA_CHECK_PERCENT=50)
+    def test_default_percent_threshold(self, value, flagged):
+        """Test that the default percent change applies without thresholds."""
+        data = self.enter(value)
+        assert data["delta_flag"] is flagged
+        assert data["delta_previous_value"] == "14.0"
+        assert Result.objects.get(pk=data["id"]).delta_flag is flagged
+
+    def test_absolute_threshold(self):
+        """Test that changes beyond the absolute threshold are flagged."""
+        self.test_parameter.delta_absolute = Decimal("1.5")
+        self.test_parameter.save()
+        assert self.enter("15.0")["delta_flag"] is False
+        assert self.enter("12.0")["delta_flag"] is True
+
+    def test_compares_most_recent_result(self):
+        """Test that the latest previous result is the reference."""
+        self.create_result(
+            value="7.0",
+            status=ResultStatus.VERIFIED,
+            entered_at=timezone.now() - timedelta(days=1),
+        )
+        data = self.enter("7.5")
+        assert data["delta_previous_value"] == "7.0"
+        assert data["delta_flag"] is False
+
+    def test_ignores_later_results(self):
+        """Test that a result is compared with an earlier one, never a later one."""
+        earlier = timezone.now() - timedelta(days=5)
+        back_entered = self.create_result(
+            value="7.0", status=ResultStatus.ENTERED, entered_at=earlier
+        )
+        self.create_result(value="7.5", status=ResultStatus.ENTERED, entered_at=earlier)
+        self.create_result(
+            value="7.2",
+            status=ResultStatus.VERIFIED,
+            entered_at=timezone.now() - timedelta(days=1),
+        )
+
+        results = with_previous_result(
+            Result.objects.filter(entered_at=earlier).order_by("pk")
+        )
+        assert [result.previous_value for result in results] == ["14.0", "7.0"]
+        assert check_delta(back_entered.pk).delta_previous_value == "14.0"
+
+    def test_ignores_results_outside_window(self):
+        """Test that previous results older than the window are not compared."""
+        self.test_parameter.delta_window_days = 7
+        self.test_parameter.save()
+        data = self.enter("6.0")
+        assert data["delta_flag"] is False
+        assert data["delta_previous_value"] == ""
+
+    def test_ignores_other_patients_and_disabled_parameters(self):
+        """Test that only the same patient's history of enabled tests counts."""
+        other = Patient.objects.create(
+            full_name="Jane Doe", dob=date(1985, 1, 1), sex="F", phone="03007654321"
+        )
+        assert self.enter("6.0", patient=other)["delta_previous_value"] == ""
+
+        self.test_parameter.delta_check_enabled = False
+        self.test_parameter.save()
+        assert self.enter("6.0")["delta_flag"] is False
+
+    def test_worksheet_checks_every_row(self):
+        """Test that worksheet entry delta-checks each result."""
+        other = Patient.objects.create(
+            full_name="Jane Doe", dob=date(1985, 1, 1), sex="F", phone="03007654321"
+        )
+        flagged = self.create_result(value="")
+        unflagged = self.create_result(patient=other, value="")
+
+        response = self.client.post(
+            "/api/results/worksheet/",
+            {
+                "entries": [
+                    {"result_id": flagged.id, "value": "5.0"},
+                    {"result_id": unflagged.id, "value": "5.0"},
+                ]
+            },
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+        flagged.refresh_from_db()
+        unflagged.refresh_from_db()
+        assert flagged.delta_flag is True
+        assert flagged.delta_previous_value == "14.0"
+        assert unflagged.delta_flag is False
+
+    def test_previous_result_lookup_uses_history_index(self):
+        """Test that the previous result is read from the history index."""
+        plan = with_previous_result(Result.objects.all()).explain()
+        assert "results_history_idx" in plan
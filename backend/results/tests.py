@@ -1,15 +1,19 @@
 """Tests for results app."""
 
 from datetime import date
+from io import BytesIO
+from unittest.mock import patch
 
 import pytest
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from catalog.models import TestCatalog
+from catalog.models import Parameter, Test, TestCatalog, TestParameter
 from orders.models import Order, OrderItem
 from patients.models import Patient
+from reports.models import Report
+from samples.models import Sample
 from settings.permissions import TEMPORARY_FULL_ACCESS_MODE
 
 from .models import Result
@@ -272,3 +276,293 @@ class TestResultAPI:
 
         response = self.client.post(f"/api/results/{result.id}/publish/")
         assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+class TestResultBatchAPI:
+    """Test the batch verify and publish endpoints."""
+
+    def setup_method(self):
+        """Set up two orders with two entered results each."""
+        self.client = APIClient()
+        self.pathologist_user = User.objects.create(username="path", role="PATHOLOGIST")
+        self.tech_user = User.objects.create(username="tech", role="TECHNOLOGIST")
+        self.client.force_authenticate(user=self.pathologist_user)
+
+        patient = Patient.objects.create(
+            full_name="John Doe",
+            father_name="James Doe",
+            dob=date(1990, 1, 1),
+            sex="M",
+            phone="03001234567",
+        )
+        tests = [
+            TestCatalog.objects.create(
+                code=code,
+                name=code,
+                category="Hematology",
+                sample_type="Blood",
+                price=500,
+                turnaround_time_hours=24,
+            )
+            for code in ("CBC", "ESR")
+        ]
+        self.orders = [Order.objects.create(patient=patient) for _ in range(2)]
+        self.results = [
+            Result.objects.create(
+                order_item=OrderItem.objects.create(order=order, test=test),
+                value="1.0",
+                status="ENTERED",
+            )
+            for order in self.orders
+            for test in tests
+        ]
+
+    def test_verify_batch_by_result_ids(self):
+        """Test that entered results are verified and others skipped."""
+        Result.objects.filter(pk=self.results[1].pk).update(status="DRAFT")
+        ids = [result.id for result in self.results[:2]]
+
+        response = self.client.post(
+            "/api/results/verify-batch/",
+            {"result_ids": [*ids, 99999]},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["updated"] == [ids[0]]
+        assert response.data["skipped"] == [{"id": ids[1], "status": "DRAFT"}]
+        assert response.data["not_found"] == [99999]
+        verified = Result.objects.get(pk=ids[0])
+        assert verified.status == "VERIFIED"
+        assert verified.verified_by == self.pathologist_user
+        assert verified.verified_at is not None
+
+    def test_verify_batch_by_order_ids(self):
+        """Test that every result of the given orders is verified."""
+        response = self.client.post(
+            "/api/results/verify-batch/",
+            {"order_ids": [self.orders[0].id]},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["updated"] == [r.id for r in self.results[:2]]
+        assert Result.objects.filter(status="VERIFIED").count() == 2
+
+    def test_publish_batch_requires_verified_results(self):
+        """Test that entered results are skipped while verification is on."""
+        response = self.client.post(
+            "/api/results/publish-batch/",
+            {"order_ids": [self.orders[0].id]},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["updated"] == []
+        assert len(response.data["skipped"]) == 2
+        assert response.data["reports_queued"] == []
+
+    @patch("reports.services.generate_report_pdf")
+    def test_publish_batch_generates_reports(
+        self, mock_pdf, django_capture_on_commit_callbacks
+    ):
+        """Test that reports are queued only for fully published orders."""
+        mock_pdf.return_value = BytesIO(b"%PDF")
+        Result.objects.update(status="VERIFIED")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self.client.post(
+                "/api/results/publish-batch/",
+                {
+                    "result_ids": [r.id for r in self.results[:3]],
+                    "generate_reports": True,
+                },
+                format="json",
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["updated"]) == 3
+        assert response.data["reports_queued"] == [self.orders[0].id]
+        report = Report.objects.get()
+        assert report.order == self.orders[0]
+        assert report.generated_by == self.pathologist_user
+
+    def test_publish_batch_report_generation_requires_pathologist(self):
+        """Test that only pathologists and admins can queue reports."""
+        self.client.force_authenticate(user=self.tech_user)
+        response = self.client.post(
+            "/api/results/publish-batch/",
+            {"order_ids": [self.orders[0].id], "generate_reports": True},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {},
+            {"result_ids": "1,2"},
+            {"order_ids": [1, "2"]},
+            {"result_ids": list(range(501))},
+        ],
+    )
+    def test_batch_rejects_invalid_payload(self, payload):
+        """Test that malformed or oversized batches are rejected."""
+        response = self.client.post(
+            "/api/results/verify-batch/", payload, format="json"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "error" in response.data
+
+
+@pytest.mark.django_db
+class TestResultWorksheetAPI:
+    """Test the worksheet result entry endpoint."""
+
+    def setup_method(self):
+        """Set up draft results for a numeric and a coded test."""
+        self.client = APIClient()
+        self.tech_user = User.objects.create(username="tech", role="TECHNOLOGIST")
+        self.client.force_authenticate(user=self.tech_user)
+
+        patient = Patient.objects.create(
+            full_name="John Doe",
+            father_name="James Doe",
+            dob=date(1990, 1, 1),
+            sex="M",
+            phone="03001234567",
+        )
+        order = Order.objects.create(patient=patient)
+        hb = Parameter.objects.create(
+            code="HB", name="Hemoglobin", unit="g/dL", decimal_places=1
+        )
+        hbsag = Parameter.objects.create(
+            code="HBSAG",
+            name="HBsAg",
+            data_type="Text",
+            decimal_places=None,
+            allowed_values="Reactive,Non Reactive",
+        )
+        self.results = {}
+        self.samples = {}
+        for code, parameter in (("HB", hb), ("HBSAG", hbsag)):
+            TestParameter.objects.create(
+                test=Test.objects.create(code=code, name=code), parameter=parameter
+            )
+            item = OrderItem.objects.create(
+                order=order,
+                test=TestCatalog.objects.create(
+                    code=code,
+                    name=code,
+                    category="Pathology",
+                    sample_type="Blood",
+                    price=500,
+                    turnaround_time_hours=24,
+                ),
+            )
+            self.samples[code] = Sample.objects.create(
+                order=item.order, sample_type="Blood"
+            )
+            self.samples[code].order_items.add(item)
+            self.results[code] = Result.objects.create(order_item=item, value="")
+
+    def post(self, entries):
+        return self.client.post(
+            "/api/results/worksheet/", {"entries": entries}, format="json"
+        )
+
+    def test_enters_all_rows(self):
+        """Test that every row is saved and marked as entered."""
+        response = self.post(
+            [
+                {"result_id": self.results["HB"].id, "value": "13.5"},
+                {
+                    "barcode": self.samples["HBSAG"].barcode,
+                    "test": "HBSAG",
+                    "value": "non reactive",
+                    "notes": "Rapid test",
+                },
+            ]
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) == 2
+
+        hb = Result.objects.get(pk=self.results["HB"].pk)
+        assert hb.value == "13.5"
+        assert hb.unit == "g/dL"
+        assert hb.status == "ENTERED"
+        assert hb.entered_by == self.tech_user
+        assert hb.entered_at is not None
+        hbsag = Result.objects.get(pk=self.results["HBSAG"].pk)
+        assert hbsag.value == "Non Reactive"
+        assert hbsag.notes == "Rapid test"
+
+    @pytest.mark.parametrize(
+        "value, error",
+        [
+            ("high", "Value must be numeric"),
+            ("13.55", "Value must have at most 1 decimal places"),
+        ],
+    )
+    def test_rejects_invalid_numeric_value(self, value, error):
+        """Test that numeric values are checked against the parameter."""
+        response = self.post([{"result_id": self.results["HB"].id, "value": value}])
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["error"]["details"]["entries"][0]["value"] == [error]
+
+    def test_invalid_row_saves_nothing(self):
+        """Test that one invalid row rejects the whole worksheet."""
+        response = self.post(
+            [
+                {"result_id": self.results["HB"].id, "value": "13.5"},
+                {"result_id": self.results["HBSAG"].id, "value": "Maybe"},
+            ]
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["error"]["details"]["entries"][0] == {}
+        assert response.data["error"]["details"]["entries"][1]["value"] == [
+            "Value must be one of: Reactive, Non Reactive"
+        ]
+        assert not Result.objects.filter(status="ENTERED").exists()
+
+    def test_rejects_unknown_and_entered_results(self):
+        """Test that rows must reference draft results."""
+        Result.objects.filter(pk=self.results["HB"].pk).update(status="VERIFIED")
+        response = self.post(
+            [
+                {"result_id": self.results["HB"].id, "value": "13.5"},
+                {"barcode": "SAM-0", "test": "HBSAG", "value": "Reactive"},
+                {"result_id": 99999, "value": "1"},
+            ]
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        errors = [
+            row.get("non_field_errors")
+            for row in response.data["error"]["details"]["entries"]
+        ]
+        assert errors == [
+            ["Cannot enter result with status VERIFIED"],
+            ["No result for test HBSAG on sample SAM-0"],
+            ["Result not found"],
+        ]
+
+    def test_rows_must_identify_a_result(self):
+        """Test that a row needs a result id or a barcode and test code."""
+        response = self.post([{"test": "HB", "value": "13.5"}])
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["error"]["details"]["entries"][0]["non_field_errors"] == [
+            "Provide result_id or barcode and test"
+        ]
+
+    @pytest.mark.skipif(
+        TEMPORARY_FULL_ACCESS_MODE,
+        reason="Test skipped when TEMPORARY_FULL_ACCESS_MODE is enabled",
+    )
+    def test_requires_entry_permission(self):
+        """Test that users who cannot enter results are refused."""
+        self.client.force_authenticate(
+            user=User.objects.create(username="reception", role="RECEPTION")
+        )
+        response = self.post([{"result_id": self.results["HB"].id, "value": "13.5"}])
+        assert response.status_code == status.HTTP_403_FORBIDDEN
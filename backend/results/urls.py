@@ -3,15 +3,45 @@
 from django.urls import path
 
 from .views import (
+    AutoverificationRuleDetailView,
+    AutoverificationRuleListCreateView,
+    CriticalAlertListView,
     ResultDetailView,
     ResultListCreateView,
+    acknowledge_alert,
     enter_result,
+    enter_worksheet,
+    publish_batch,
     publish_result,
+    verify_batch,
     verify_result,
 )
 
 urlpatterns = [
     path("", ResultListCreateView.as_view(), name="result-list-create"),
+    path(
+        "critical-alerts/",
+        CriticalAlertListView.as_view(),
+        name="critical-alert-list",
+    ),
+    path(
+        "critical-alerts/<int:pk>/acknowledge/",
+        acknowledge_alert,
+        name="critical-alert-acknowledge",
+    ),
+    path(
+        "autoverification-rules/",
+        AutoverificationRuleListCreateView.as_view(),
+        name="autoverification-rule-list-create",
+    ),
+    path(
+        "autoverification-rules/<int:pk>/",
+        AutoverificationRuleDetailView.as_view(),
+        name="autoverification-rule-detail",
+    ),
+    path("worksheet/", enter_worksheet, name="result-worksheet"),
+    path("verify-batch/", verify_batch, name="result-verify-batch"),
+    path("publish-batch/", publish_batch, name="result-publish-batch"),
     path("<int:pk>/", ResultDetailView.as_view(), name="result-detail"),
     path("<int:pk>/enter/", enter_result, name="result-enter"),
     path("<int:pk>/verify/", verify_result, name="result-verify"),
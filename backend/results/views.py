@@ -1,20 +1,42 @@
 """Result views."""
 
-from django.utils import timezone
+from django.db import transaction
+from django.db.models import Q
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from core.permissions import IsAdminOrReadOnly
+from core.transitions import (
+    apply_transition,
+    apply_transition_batch,
+    transition_failure,
+)
+from events.broker import publish_event, publish_events
+from interfaces.services import enqueue_result_messages
+from reports.services import enqueue_report_generation, fully_published_order_ids
 from settings.permissions import (
     user_can_enter_result,
     user_can_publish,
     user_can_verify,
 )
 from settings.utils import should_skip_verification
+from users.models import UserRole
+
+from .autoverification import autoverify_entered
+from .critical import raise_critical_alerts
+from .delta import check_delta
+from .models import AutoverificationRule, CriticalAlert, Result, ResultStatus
+from .serializers import (
+    AutoverificationRuleSerializer,
+    CriticalAlertSerializer,
+    ResultSerializer,
+    WorksheetSerializer,
+)
 
-from .models import Result
-from .serializers import ResultSerializer
+# Result and order ids accepted by one batch request
+MAX_BATCH_SIZE = 500
 
 
 class ResultListCreateView(generics.ListCreateAPIView):
@@ -41,11 +63,95 @@ class ResultDetailView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
 
+class CriticalAlertListView(generics.ListAPIView):
+    """
+    Lists critical-value alerts, newest first.
+
+    Filter with `?status=OPEN` for the alerts awaiting acknowledgement.
+    """
+
+    serializer_class = CriticalAlertSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Returns the alerts, filtered by the `status` query parameter."""
+        queryset = CriticalAlert.objects.select_related("patient", "parameter")
+        alert_status = self.request.query_params.get("status")
+        if alert_status:
+            queryset = queryset.filter(status=alert_status)
+        return queryset
+
+
+class AutoverificationRuleListCreateView(generics.ListCreateAPIView):
+    """
+    Lists and creates autoverification rules.
+
+    Creating rules is restricted to admin users.
+    """
+
+    queryset = AutoverificationRule.objects.select_related("test", "parameter")
+    serializer_class = AutoverificationRuleSerializer
+    permission_classes = [IsAdminOrReadOnly]
+
+
+class AutoverificationRuleDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Retrieves, updates, or deletes an autoverification rule.
+
+    Update and delete operations are restricted to admin users.
+    """
+
+    queryset = AutoverificationRule.objects.all()
+    serializer_class = AutoverificationRuleSerializer
+    permission_classes = [IsAdminOrReadOnly]
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def acknowledge_alert(request, pk):
+    """
+    Acknowledges an open critical-value alert.
+
+    This action is typically performed by the pathologist who reported the
+    value to the clinician.
+
+    Args:
+        request: The request object, with an optional `note`.
+        pk (int): The primary key of the alert.
+
+    Returns:
+        Response: The acknowledged alert or an error message.
+    """
+    if not user_can_verify(request.user):
+        return Response(
+            {"error": "You do not have permission to acknowledge alerts"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    note = request.data.get("note", "")
+    if not isinstance(note, str):
+        return Response(
+            {"error": "note must be a string"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    if not apply_transition(
+        CriticalAlert, pk, "acknowledge", user=request.user, acknowledgement_note=note
+    ):
+        raise transition_failure(
+            CriticalAlert, pk, "Cannot acknowledge alert with status {status}"
+        )
+    alert = CriticalAlert.objects.select_related("patient", "parameter").get(pk=pk)
+    publish_event("critical.acknowledged", alert)
+
+    serializer = CriticalAlertSerializer(alert)
+    return Response(serializer.data)
+
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def enter_result(request, pk):
     """
-    Marks a result as entered.
+    Marks a draft result as entered, runs its delta and critical-value
+    checks and verifies it if it passes its autoverification rule.
 
     This action is typically performed by a technologist.
 
@@ -56,21 +162,23 @@ def enter_result(request, pk):
     Returns:
         Response: A response object with the updated result data or an error message.
     """
-    try:
-        result = Result.objects.get(pk=pk)
-    except Result.DoesNotExist:
-        return Response({"error": "Result not found"}, status=status.HTTP_404_NOT_FOUND)
-
     if not user_can_enter_result(request.user):
         return Response(
             {"error": "You do not have permission to enter results"},
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    result.status = "ENTERED"
-    result.entered_at = timezone.now()
-    result.entered_by = request.user
-    result.save()
+    # The result is only entered together with its checks and alerts, so a
+    # failure cannot leave a critical value entered without an alert
+    with transaction.atomic():
+        if not apply_transition(Result, pk, "enter", user=request.user):
+            raise transition_failure(
+                Result, pk, "Cannot enter result with status {status}"
+            )
+        result = check_delta(pk)
+        raise_critical_alerts([result])
+        publish_event("result.entered", result)
+        result = autoverify_entered(result)
 
     serializer = ResultSerializer(result)
     return Response(serializer.data)
@@ -80,7 +188,7 @@ def enter_result(request, pk):
 @permission_classes([IsAuthenticated])
 def verify_result(request, pk):
     """
-    Marks a result as verified.
+    Marks an entered result as verified.
 
     This action is typically performed by a pathologist.
 
@@ -91,27 +199,18 @@ def verify_result(request, pk):
     Returns:
         Response: A response object with the updated result data or an error message.
     """
-    try:
-        result = Result.objects.get(pk=pk)
-    except Result.DoesNotExist:
-        return Response({"error": "Result not found"}, status=status.HTTP_404_NOT_FOUND)
-
     if not user_can_verify(request.user):
         return Response(
             {"error": "You do not have permission to verify results"},
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    if result.status != "ENTERED":
-        return Response(
-            {"error": "Result must be entered before verification"},
-            status=status.HTTP_400_BAD_REQUEST,
+    if not apply_transition(Result, pk, "verify", user=request.user):
+        raise transition_failure(
+            Result, pk, "Result must be entered before verification"
         )
-
-    result.status = "VERIFIED"
-    result.verified_at = timezone.now()
-    result.verified_by = request.user
-    result.save()
+    result = Result.objects.get(pk=pk)
+    publish_event("result.verified", result)
 
     serializer = ResultSerializer(result)
     return Response(serializer.data)
@@ -124,7 +223,8 @@ def publish_result(request, pk):
     Marks a result as published.
 
     This action is typically performed by a pathologist and is the final step
-    in the result workflow.
+    in the result workflow. If the order came from a hospital system, an
+    `ORU^R01` message with the result is queued for it.
 
     Args:
         request: The request object.
@@ -133,31 +233,224 @@ def publish_result(request, pk):
     Returns:
         Response: A response object with the updated result data or an error message.
     """
-    try:
+    if not user_can_publish(request.user):
+        return Response(
+            {"error": "You do not have permission to publish results"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    if should_skip_verification():
+        action = "publish_unverified"
+        error_message = "Result must be entered before publishing"
+    else:
+        action = "publish"
+        error_message = "Result must be verified before publishing"
+
+    with transaction.atomic():
+        if not apply_transition(Result, pk, action):
+            raise transition_failure(Result, pk, error_message)
         result = Result.objects.get(pk=pk)
-    except Result.DoesNotExist:
-        return Response({"error": "Result not found"}, status=status.HTTP_404_NOT_FOUND)
+        enqueue_result_messages([pk])
+    publish_event("result.published", result)
+
+    serializer = ResultSerializer(result)
+    return Response(serializer.data)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def enter_worksheet(request):
+    """
+    Enters the values of many draft results at once.
+
+    Each row is validated against the data type, decimal places and allowed
+    values of the parameter its test measures. The worksheet is saved only
+    if every row is valid: all results are written with one `bulk_update`
+    and marked as entered, or as verified when they pass their
+    autoverification rule, in a single transaction.
 
+    Args:
+        request: The request object, containing `entries`, a list of rows
+            with `result_id` (or the sample `barcode` and the catalog `test`
+            code), `value` and optional `unit` and `notes`.
+
+    Returns:
+        Response: The entered results, or the errors of the invalid rows.
+    """
+    if not user_can_enter_result(request.user):
+        return Response(
+            {"error": "You do not have permission to enter results"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    serializer = WorksheetSerializer(data=request.data, context={"request": request})
+    with transaction.atomic():
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        publish_events("result.entered", results)
+        publish_events(
+            "result.verified",
+            [result for result in results if result.status == ResultStatus.VERIFIED],
+        )
+
+    return Response({"results": ResultSerializer(results, many=True).data})
+
+
+def _parse_batch(data):
+    """
+    Reads the result and order ids of a batch request.
+
+    Returns:
+        tuple[list[int], list[int], Response | None]: The result ids, the
+            order ids and an error response if the payload is invalid.
+    """
+    ids = {}
+    for field in ("result_ids", "order_ids"):
+        value = data.get(field, [])
+        if not isinstance(value, list) or not all(
+            isinstance(item, int) and not isinstance(item, bool) for item in value
+        ):
+            error = f"{field} must be a list of integers"
+            return (
+                [],
+                [],
+                Response({"error": error}, status=status.HTTP_400_BAD_REQUEST),
+            )
+        ids[field] = value
+
+    if not ids["result_ids"] and not ids["order_ids"]:
+        error = "Provide result_ids or order_ids"
+        return [], [], Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids["result_ids"]) + len(ids["order_ids"]) > MAX_BATCH_SIZE:
+        error = f"A batch can contain at most {MAX_BATCH_SIZE} ids"
+        return [], [], Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+    return ids["result_ids"], ids["order_ids"], None
+
+
+def _transition_batch(request, action, event_type, result_ids, order_ids):
+    """
+    Applies a result transition to a batch and publishes the events.
+
+    Returns:
+        tuple[dict, list[Result]]: The response payload and the transitioned
+            results with their order items.
+    """
+    candidates = dict(
+        Result.objects.filter(
+            Q(pk__in=result_ids) | Q(order_item__order_id__in=order_ids)
+        ).values_list("pk", "status")
+    )
+    updated = apply_transition_batch(Result, candidates, action, user=request.user)
+    results = list(
+        Result.objects.filter(pk__in=updated)
+        .select_related("order_item")
+        .only("id", "status", "order_item__order_id")
+    )
+    publish_events(event_type, results)
+
+    updated_ids = set(updated)
+    payload = {
+        "updated": updated,
+        "skipped": [
+            {"id": pk, "status": candidates[pk]}
+            for pk in sorted(candidates)
+            if pk not in updated_ids
+        ],
+        "not_found": sorted(set(result_ids) - candidates.keys()),
+    }
+    return payload, results
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def verify_batch(request):
+    """
+    Verifies many entered results at once.
+
+    Permissions are checked once and all eligible results are updated with
+    a single UPDATE. Results that are not in ENTERED status are skipped.
+
+    Args:
+        request: The request object, containing `result_ids` and/or
+            `order_ids` (every result of those orders).
+
+    Returns:
+        Response: The `updated` result ids, the `skipped` results with their
+            current status and the `not_found` result ids.
+    """
+    if not user_can_verify(request.user):
+        return Response(
+            {"error": "You do not have permission to verify results"},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    result_ids, order_ids, error = _parse_batch(request.data)
+    if error:
+        return error
+
+    payload, _ = _transition_batch(
+        request, "verify", "result.verified", result_ids, order_ids
+    )
+    return Response(payload)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def publish_batch(request):
+    """
+    Publishes many results at once.
+
+    Results must be VERIFIED, or ENTERED when verification is disabled in
+    the workflow settings; others are skipped. With `generate_reports`,
+    report generation is queued for every order whose results are all
+    published afterwards. Orders from a hospital system get one `ORU^R01`
+    message with their published results.
+
+    Args:
+        request: The request object, containing `result_ids` and/or
+            `order_ids`, and the optional boolean `generate_reports`.
+
+    Returns:
+        Response: The `updated`, `skipped` and `not_found` results and the
+            orders in `reports_queued`.
+    """
     if not user_can_publish(request.user):
         return Response(
             {"error": "You do not have permission to publish results"},
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    skip_verification = should_skip_verification()
-    required_status = "ENTERED" if skip_verification else "VERIFIED"
-
-    if result.status != required_status:
-        error_message = (
-            "Result must be verified before publishing"
-            if not skip_verification
-            else "Result must be entered before publishing"
+    generate_reports = request.data.get("generate_reports", False)
+    if not isinstance(generate_reports, bool):
+        return Response(
+            {"error": "generate_reports must be a boolean"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if generate_reports and request.user.role not in [
+        UserRole.PATHOLOGIST,
+        UserRole.ADMIN,
+    ]:
+        return Response(
+            {"error": "Only pathologists can generate reports"},
+            status=status.HTTP_403_FORBIDDEN,
         )
-        return Response({"error": error_message}, status=status.HTTP_400_BAD_REQUEST)
 
-    result.status = "PUBLISHED"
-    result.published_at = timezone.now()
-    result.save()
+    result_ids, order_ids, error = _parse_batch(request.data)
+    if error:
+        return error
 
-    serializer = ResultSerializer(result)
-    return Response(serializer.data)
+    action = "publish_unverified" if should_skip_verification() else "publish"
+    with transaction.atomic():
+        payload, results = _transition_batch(
+            request, action, "result.published", result_ids, order_ids
+        )
+        if results:
+            enqueue_result_messages(payload["updated"])
+
+    payload["reports_queued"] = []
+    if generate_reports and results:
+        payload["reports_queued"] = fully_published_order_ids(
+            result.order_item.order_id for result in results
+        )
+        enqueue_report_generation(payload["reports_queued"], request.user)
+    return Response(payload)
@@ -0,0 +1,338 @@
+"""Barcode label rendering for sample tubes.
+
+Labels are rendered for a batch of samples at once, either as a PDF sheet
+for office printers or as ZPL for thermal label printers. Each label
+carries the sample's Code 128 barcode, the patient, the order and the
+tests on the tube.
+
+The bars of a barcode are computed once per value and cached, so reprints
+and repeated renders of the same tubes skip encoding altogether. Bars are
+drawn as vector rectangles rather than raster images, which keeps the PDF
+small and sharp at any printer resolution. Thermal printers draw the
+barcode themselves from the ZPL `^BC` command.
+"""
+
+import datetime
+import io
+from dataclasses import dataclass
+from functools import lru_cache
+
+from barcode import get_barcode_class
+from django.db.models import Prefetch
+from django.utils import timezone
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+from reportlab.pdfgen.pathobject import PDFPathObject
+
+from orders.models import OrderItem
+
+from .models import Sample
+
+LABEL_FORMATS = ("pdf", "zpl")
+
+# Most samples labelled in one request
+MAX_LABELS = 500
+
+# PDF sheet: 50 × 25 mm labels, 4 across and 11 down an A4 page
+LABEL_WIDTH = 50 * mm
+LABEL_HEIGHT = 25 * mm
+SHEET_COLUMNS = 4
+SHEET_ROWS = 11
+LABEL_PADDING = 2 * mm
+BARCODE_HEIGHT = 9 * mm
+QUIET_ZONE_MODULES = 10
+
+# ZPL: the same label at 203 dpi (8 dots/mm)
+ZPL_WIDTH_DOTS = 400
+ZPL_HEIGHT_DOTS = 200
+
+# Characters kept per text line, so long names do not run off the label
+NAME_LENGTH = 28
+DETAILS_LENGTH = 34
+
+_code128 = get_barcode_class("code128")
+
+
+@dataclass(frozen=True)
+class Label:
+    """
+    The text and barcode printed on one sample tube.
+
+    Attributes:
+        barcode (str): The sample barcode.
+        patient_name (str): The patient's full name.
+        mrn (str): The patient's medical record number.
+        order_no (str): The order number.
+        sample_type (str): The specimen type, e.g. 'Blood'.
+        container_type (str): The container, e.g. 'SST'; may be empty.
+        tests (tuple[str, ...]): The codes of the tests on the tube.
+        date (date): The collection date, or the order date before
+            collection.
+    """
+
+    barcode: str
+    patient_name: str
+    mrn: str
+    order_no: str
+    sample_type: str
+    container_type: str
+    tests: tuple
+    date: datetime.date
+
+    @property
+    def details(self):
+        """Returns the specimen, container and date line."""
+        parts = [self.sample_type, self.container_type, self.date.isoformat()]
+        return " ".join(part for part in parts if part)
+
+
+def load_labels(samples):
+    """
+    Builds the labels of some samples in two queries.
+
+    Args:
+        samples (QuerySet[Sample]): The samples to label.
+
+    Returns:
+        list[Label]: One label per sample, in barcode order.
+    """
+    samples = (
+        samples.select_related("order__patient")
+        .prefetch_related(
+            Prefetch(
+                "order_items",
+                queryset=OrderItem.objects.select_related("test").order_by("id"),
+            )
+        )
+        .order_by("barcode")
+    )
+    labels = []
+    for sample in samples:
+        order = sample.order
+        labels.append(
+            Label(
+                barcode=sample.barcode,
+                patient_name=order.patient.full_name,
+                mrn=order.patient.mrn,
+                order_no=order.order_no,
+                sample_type=sample.sample_type,
+                container_type=sample.container_type,
+                tests=tuple(item.test.code for item in sample.order_items.all()),
+                date=timezone.localtime(sample.collected_at or order.created_at).date(),
+            )
+        )
+    return labels
+
+
+class LabelRequestError(ValueError):
+    """Raised when a label request names no valid samples to label."""
+
+
+def requested_labels(data):
+    """
+    Builds the labels a request asks for.
+
+    Args:
+        data (dict): The request data, with either `order` (an order id)
+            or `samples` (a list of at most `MAX_LABELS` sample ids).
+
+    Returns:
+        list[Label]: The labels; empty when no sample matched.
+
+    Raises:
+        LabelRequestError: If the request is malformed.
+    """
+    order_id = data.get("order")
+    sample_ids = data.get("samples")
+    if (order_id is None) == (sample_ids is None):
+        raise LabelRequestError("Provide either an order or a list of samples")
+    if sample_ids is not None:
+        if not isinstance(sample_ids, list) or not sample_ids:
+            raise LabelRequestError("Samples must be a non-empty list of sample ids")
+        if len(sample_ids) > MAX_LABELS:
+            raise LabelRequestError(
+                f"At most {MAX_LABELS} labels can be rendered at once"
+            )
+
+    try:
+        if order_id is not None:
+            return load_labels(Sample.objects.filter(order_id=order_id))
+        return load_labels(Sample.objects.filter(pk__in=sample_ids))
+    except (TypeError, ValueError):
+        raise LabelRequestError("Order and sample ids must be integers") from None
+
+
+@lru_cache(maxsize=4096)
+def bar_runs(value):
+    """
+    Encodes a value as Code 128 bars.
+
+    Args:
+        value (str): The barcode value.
+
+    Returns:
+        tuple[int, tuple[tuple[int, int], ...]]: The symbol width in
+            modules, and the start and width in modules of each bar.
+    """
+    modules = _code128(value).build()[0]
+    runs = []
+    start = None
+    for position, module in enumerate(modules):
+        if module == "1" and start is None:
+            start = position
+        elif module == "0" and start is not None:
+            runs.append((start, position - start))
+            start = None
+    if start is not None:
+        runs.append((start, len(modules) - start))
+    return len(modules), tuple(runs)
+
+
+@lru_cache(maxsize=4096)
+def bar_path(value):
+    """
+    Draws the bars of a value once, scaled to fit a label.
+
+    The path is drawn at the origin and placed on each label by
+    translating the canvas, so it is reused for every label of the value.
+
+    Args:
+        value (str): The barcode value.
+
+    Returns:
+        tuple[float, PDFPathObject]: The symbol width in points, and the
+            bars.
+    """
+    width, runs = bar_runs(value)
+    module = (LABEL_WIDTH - 2 * LABEL_PADDING) / (width + 2 * QUIET_ZONE_MODULES)
+    path = PDFPathObject()
+    for start, run in runs:
+        path.rect(start * module, 0, run * module, BARCODE_HEIGHT)
+    return width * module, path
+
+
+def _draw_label(pdf, label, x, y):
+    top = y + LABEL_HEIGHT - LABEL_PADDING
+    left = x + LABEL_PADDING
+    width, path = bar_path(label.barcode)
+    bars_bottom = top - 16 - BARCODE_HEIGHT
+
+    pdf.saveState()
+    pdf.translate(x + (LABEL_WIDTH - width) / 2, bars_bottom)
+    pdf.drawPath(path, stroke=0, fill=1)
+    pdf.restoreState()
+
+    # One text object per label, moving between lines relative to the last
+    text = pdf.beginText(left, top - 7)
+    text.setFont("Helvetica-Bold", 7)
+    text.textOut(label.patient_name[:NAME_LENGTH])
+    text.setFont("Helvetica", 6)
+    text.moveCursor(0, 7)
+    text.textOut(f"{label.mrn}  {label.order_no}")
+    text.setFont("Helvetica-Bold", 6)
+    indent = (LABEL_WIDTH - 2 * LABEL_PADDING) / 2
+    indent -= pdf.stringWidth(label.barcode, "Helvetica-Bold", 6) / 2
+    text.moveCursor(indent, top - 14 - (bars_bottom - 6))
+    text.textOut(label.barcode)
+    text.setFont("Helvetica", 5.5)
+    text.moveCursor(-indent, bars_bottom - 6 - (y + LABEL_PADDING + 6))
+    text.textOut(label.details[:DETAILS_LENGTH])
+    text.moveCursor(0, 6)
+    text.textOut(" ".join(label.tests)[:DETAILS_LENGTH])
+    pdf.drawText(text)
+
+
+def render_pdf(labels):
+    """
+    Renders labels on A4 label sheets.
+
+    Args:
+        labels (Iterable[Label]): The labels, filled across then down.
+
+    Returns:
+        bytes: The PDF document.
+    """
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    pdf.setTitle("Sample labels")
+    page_width, page_height = A4
+    margin_x = (page_width - SHEET_COLUMNS * LABEL_WIDTH) / 2
+    margin_y = (page_height - SHEET_ROWS * LABEL_HEIGHT) / 2
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+
+    for number, label in enumerate(labels):
+        slot = number % per_page
+        if number and not slot:
+            pdf.showPage()
+        row, column = divmod(slot, SHEET_COLUMNS)
+        _draw_label(
+            pdf,
+            label,
+            margin_x + column * LABEL_WIDTH,
+            page_height - margin_y - (row + 1) * LABEL_HEIGHT,
+        )
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def _zpl_field(text):
+    """Escapes field data for `^FH`: `_`, `^` and `~` become hex codes."""
+    return text.replace("_", "_5F").replace("^", "_5E").replace("~", "_7E")
+
+
+def zpl_label(label):
+    """
+    Renders one label as a ZPL II label format.
+
+    Args:
+        label (Label): The label.
+
+    Returns:
+        str: The label, from `^XA` to `^XZ`.
+    """
+    name = _zpl_field(label.patient_name[:NAME_LENGTH])
+    ids = _zpl_field(f"{label.mrn}  {label.order_no}")
+    barcode = _zpl_field(label.barcode)
+    details = _zpl_field(label.details[:DETAILS_LENGTH])
+    tests = _zpl_field(" ".join(label.tests)[:DETAILS_LENGTH])
+    return (
+        f"^XA^CI28^PW{ZPL_WIDTH_DOTS}^LL{ZPL_HEIGHT_DOTS}\n"
+        f"^FO16,12^A0N,24,24^FH^FD{name}^FS\n"
+        f"^FO16,40^A0N,20,20^FH^FD{ids}^FS\n"
+        f"^FO16,64^BY2^BCN,60,N,N,N^FH^FD{barcode}^FS\n"
+        f"^FO16,130^A0N,22,22^FH^FD{barcode}^FS\n"
+        f"^FO16,156^A0N,20,20^FH^FD{details}^FS\n"
+        f"^FO16,178^A0N,18,18^FH^FD{tests}^FS\n"
+        "^XZ\n"
+    )
+
+
+def render_zpl(labels):
+    """
+    Renders labels as one ZPL job.
+
+    Args:
+        labels (Iterable[Label]): The labels, printed in order.
+
+    Returns:
+        str: The ZPL job, one format per label.
+    """
+    return "".join(zpl_label(label) for label in labels)
+
+
+def render_labels(labels, label_format):
+    """
+    Renders labels in a format.
+
+    Args:
+        labels (list[Label]): The labels.
+        label_format (str): One of `LABEL_FORMATS`.
+
+    Returns:
+        tuple[bytes, str]: The document and its content type.
+    """
+    if label_format == "zpl":
+        return render_zpl(labels).encode(), "application/zpl"
+    return render_pdf(labels), "application/pdf"
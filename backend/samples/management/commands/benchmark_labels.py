@@ -0,0 +1,123 @@
+"""Management command to benchmark barcode label rendering."""
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarking import (
+    LatencyRecorder,
+    format_summary,
+    run_metadata,
+    write_results,
+)
+from samples.labels import Label, bar_path, bar_runs, render_labels
+
+# Labels per second one core is expected to render
+TARGET_LABELS_PER_SECOND = 1000
+
+
+def sample_labels(count):
+    """
+    Builds labels with distinct barcodes, as a day of orders would print.
+
+    Args:
+        count (int): The number of labels.
+
+    Returns:
+        list[Label]: The labels.
+    """
+    today = date.today()
+    return [
+        Label(
+            barcode=f"SAM-{today:%Y%m%d}-{number:05d}",
+            patient_name="Muhammad Abdullah Khan",
+            mrn=f"PAT-{today:%Y%m%d}-{number // 3:04d}",
+            order_no=f"ORD-{today:%Y%m%d}-{number // 3:04d}",
+            sample_type="Blood",
+            container_type="SST",
+            tests=("GLU", "UREA", "CREAT", "NA", "K", "CL"),
+            date=today,
+        )
+        for number in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    """Measure how many labels a single process renders per second."""
+
+    help = (
+        "Benchmark barcode label rendering: renders labels in batches as PDF "
+        "sheets, with an empty barcode cache and again as reprints, and as "
+        "ZPL jobs"
+    )
+
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            "--labels",
+            type=int,
+            default=5000,
+            help="Labels rendered per pass (default: 5000)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=44,
+            help="Labels per document, one A4 sheet by default (default: 44)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=None,
+            help="JSON results file (default: benchmark-results/labels-*.json)",
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command."""
+        if min(options["labels"], options["batch_size"]) < 1:
+            raise CommandError("--labels and --batch-size must be >= 1")
+
+        labels = sample_labels(options["labels"])
+        batch_size = options["batch_size"]
+        batches = [
+            labels[start : start + batch_size]
+            for start in range(0, len(labels), batch_size)
+        ]
+        recorder = LatencyRecorder()
+        throughput = {}
+        recorder.start()
+        # PDF bars are cached by barcode value: render once with an empty
+        # cache, then again as reprints. Printers draw ZPL barcodes.
+        steps = [("pdf-cold", "pdf"), ("pdf-warm", "pdf"), ("zpl", "zpl")]
+        bar_runs.cache_clear()
+        bar_path.cache_clear()
+        for step, label_format in steps:
+            self.stdout.write(f"Rendering {len(labels)} labels ({step})...")
+            started = time.perf_counter()
+            for batch in batches:
+                start = time.perf_counter()
+                render_labels(batch, label_format)
+                recorder.record(step, time.perf_counter() - start, 200)
+            throughput[step] = len(labels) / (time.perf_counter() - started)
+        recorder.stop()
+
+        summary = recorder.summary()
+        payload = {
+            "meta": run_metadata(labels=len(labels), batch_size=batch_size),
+            "summary": summary,
+            "labels_per_second": throughput,
+            "target_labels_per_second": TARGET_LABELS_PER_SECOND,
+        }
+        path = write_results("labels", payload, options["output"])
+
+        for line in format_summary(summary):
+            self.stdout.write(line)
+        for step, rate in throughput.items():
+            line = f"{step:<16}{rate:>10.0f} labels/s"
+            if rate < TARGET_LABELS_PER_SECOND:
+                line = self.style.WARNING(
+                    f"{line} (below {TARGET_LABELS_PER_SECOND} labels/s)"
+                )
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"✓ Results saved to {path}"))
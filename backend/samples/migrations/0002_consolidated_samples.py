@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def link_order_items(apps, schema_editor):
+    """Link every existing sample to its order item and order."""
+    OrderItem = apps.get_model("orders", "OrderItem")
+    Sample = apps.get_model("samples", "Sample")
+
+    Sample.objects.update(
+        order=Subquery(
+            OrderItem.objects.filter(pk=OuterRef("order_item")).values("order")[:1]
+        )
+    )
+    Through = Sample.order_items.through
+    Through.objects.bulk_create(
+        [
+            Through(sample_id=sample_id, orderitem_id=order_item_id)
+            for sample_id, order_item_id in Sample.objects.values_list(
+                "pk", "order_item_id"
+            ).iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0002_alter_order_status_alter_orderitem_status"),
+        ("samples", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sample",
+            name="order",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="samples",
+                to="orders.order",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sample",
+            name="order_items",
+            field=models.ManyToManyField(related_name="samples", to="orders.orderitem"),
+        ),
+        migrations.AddField(
+            model_name="sample",
+            name="container_type",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.RunPython(link_order_items, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="sample",
+            name="order_item",
+        ),
+        migrations.AlterField(
+            model_name="sample",
+            name="order",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="samples",
+                to="orders.order",
+            ),
+        ),
+    ]
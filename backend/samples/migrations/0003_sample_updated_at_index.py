@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("samples", "0002_consolidated_samples"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sample",
+            index=models.Index(
+                fields=["updated_at"], name="samples_updated_1ef862_idx"
+            ),
+        ),
+    ]
@@ -2,7 +2,8 @@
 
 from django.db import models
 
-from orders.models import OrderItem
+from core.transitions import Transition, register_transitions
+from orders.models import Order, OrderItem
 
 
 class SampleStatus(models.TextChoices):
@@ -18,11 +19,18 @@ class SampleStatus(models.TextChoices):
 
 class Sample(models.Model):
     """
-    Represents a single lab specimen for an order item.
+    Represents a single lab specimen: one tube, one barcode and one label.
+
+    Tests of an order that take the same specimen in the same container
+    share one sample, so collecting, receiving or rejecting it applies to
+    every order item it carries.
 
     Attributes:
-        order_item (ForeignKey): The order item this sample is for.
+        order (ForeignKey): The order the sample was taken for.
+        order_items (ManyToManyField): The order items tested on the sample.
         sample_type (CharField): The type of sample (e.g., 'Blood', 'Urine').
+        container_type (CharField): The container the sample is collected
+            in (e.g., 'SST'); empty when the tests do not specify one.
         barcode (CharField): A unique, system-generated barcode for the
             sample.
         collected_at (DateTimeField): The timestamp when the sample was
@@ -38,10 +46,10 @@ class Sample(models.Model):
         updated_at (DateTimeField): The timestamp when the sample was last updated.
     """
 
-    order_item = models.ForeignKey(
-        OrderItem, on_delete=models.CASCADE, related_name="samples"
-    )
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="samples")
+    order_items = models.ManyToManyField(OrderItem, related_name="samples")
     sample_type = models.CharField(max_length=50)
+    container_type = models.CharField(max_length=100, blank=True)
     barcode = models.CharField(max_length=50, unique=True)
     collected_at = models.DateTimeField(null=True, blank=True)
     collected_by = models.ForeignKey(
@@ -71,6 +79,7 @@ class Sample(models.Model):
         indexes = [
             models.Index(fields=["barcode"]),
             models.Index(fields=["status"]),
+            models.Index(fields=["updated_at"]),
         ]
 
     def __str__(self):
@@ -84,18 +93,73 @@ class Sample(models.Model):
         The barcode is generated based on the current date and a sequential number.
         """
         if not self.barcode:
-            from django.utils import timezone
-
-            today = timezone.now().strftime("%Y%m%d")
-            last_sample = (
-                Sample.objects.filter(barcode__startswith=f"SAM-{today}")
-                .order_by("barcode")
-                .last()
-            )
-            if last_sample:
-                last_num = int(last_sample.barcode.split("-")[-1])
-                new_num = last_num + 1
-            else:
-                new_num = 1
-            self.barcode = f"SAM-{today}-{new_num:04d}"
+            self.barcode = Sample.allocate_barcodes(1)[0]
         super().save(*args, **kwargs)
+
+    @staticmethod
+    def allocate_barcodes(count):
+        """
+        Generates the next `count` sequential barcodes for today.
+
+        Looks up the last barcode issued today once, so a whole batch of
+        samples can be numbered without a query per sample.
+
+        Args:
+            count (int): The number of barcodes to generate.
+
+        Returns:
+            list[str]: Barcodes in the format SAM-YYYYMMDD-NNNN.
+        """
+        from django.utils import timezone
+
+        today = timezone.now().strftime("%Y%m%d")
+        last_barcode = (
+            Sample.objects.filter(barcode__startswith=f"SAM-{today}")
+            .order_by("barcode")
+            .values_list("barcode", flat=True)
+            .last()
+        )
+        last_num = int(last_barcode.split("-")[-1]) if last_barcode else 0
+        return [f"SAM-{today}-{last_num + i:04d}" for i in range(1, count + 1)]
+
+    @staticmethod
+    def link_order_items(links, batch_size=None):
+        """
+        Links samples to the order items they carry, in one query.
+
+        Args:
+            links (Iterable[tuple[Sample, OrderItem]]): Saved samples and
+                the order items tested on them.
+            batch_size (int | None): The most links inserted per query.
+        """
+        through = Sample.order_items.through
+        through.objects.bulk_create(
+            [
+                through(sample_id=sample.pk, orderitem_id=item.pk)
+                for sample, item in links
+            ],
+            batch_size=batch_size,
+        )
+
+
+register_transitions(
+    Sample,
+    {
+        "collect": Transition(
+            (SampleStatus.PENDING,),
+            SampleStatus.COLLECTED,
+            "collected_at",
+            "collected_by",
+        ),
+        "receive": Transition(
+            (SampleStatus.COLLECTED,),
+            SampleStatus.RECEIVED,
+            "received_at",
+            "received_by",
+        ),
+        "reject": Transition(
+            (SampleStatus.PENDING, SampleStatus.COLLECTED, SampleStatus.RECEIVED),
+            SampleStatus.REJECTED,
+        ),
+    },
+)
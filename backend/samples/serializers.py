@@ -8,14 +8,19 @@ from .models import Sample
 class SampleSerializer(serializers.ModelSerializer):
     """
     Serializer for the Sample model.
+
+    The sample's order is taken from its order items, which must all belong
+    to the same order.
     """
 
     class Meta:
         model = Sample
         fields = [
             "id",
-            "order_item",
+            "order",
+            "order_items",
             "sample_type",
+            "container_type",
             "barcode",
             "collected_at",
             "collected_by",
@@ -29,7 +34,49 @@ class SampleSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = [
             "id",
+            "order",
             "barcode",
             "created_at",
             "updated_at",
         ]
+
+    def validate_order_items(self, order_items):
+        """
+        Validates that the sample carries order items of one order.
+
+        Args:
+            order_items (list[OrderItem]): The order items to validate.
+
+        Returns:
+            list[OrderItem]: The validated order items.
+
+        Raises:
+            serializers.ValidationError: If no order item is given or the
+                items belong to different orders.
+        """
+        if not order_items:
+            raise serializers.ValidationError("At least one order item is required")
+        if len({item.order_id for item in order_items}) > 1:
+            raise serializers.ValidationError(
+                "Order items must belong to the same order"
+            )
+        if self.instance is not None and order_items[0].order_id != (
+            self.instance.order_id
+        ):
+            raise serializers.ValidationError(
+                "Order items must belong to the sample's order"
+            )
+        return order_items
+
+    def create(self, validated_data):
+        """
+        Creates a sample for the order of its order items.
+
+        Args:
+            validated_data (dict): The validated sample data.
+
+        Returns:
+            Sample: The created sample.
+        """
+        validated_data["order_id"] = validated_data["order_items"][0].order_id
+        return super().create(validated_data)
@@ -0,0 +1,196 @@
+"""Tests for barcode label rendering."""
+
+import json
+from datetime import date
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalog.models import TestCatalog
+from orders.services import create_order
+from patients.models import Patient
+from users.models import User, UserRole
+
+from .labels import MAX_LABELS, Label, bar_runs, load_labels, render_pdf, zpl_label
+from .models import Sample
+
+
+class LabelFixtures:
+    """Shared set-up: a patient and an order with two tubes."""
+
+    def setup_method(self):
+        """Create a user, a patient and an order."""
+        self.client = APIClient()
+        self.user = User.objects.create(username="reception", role=UserRole.RECEPTION)
+        self.patient = Patient.objects.create(
+            full_name="Jane Doe", dob=date(1990, 1, 1), sex="F", phone="03001234567"
+        )
+        tests = [
+            TestCatalog.objects.create(
+                code=code,
+                name=code,
+                category="Biochemistry",
+                sample_type=sample_type,
+                price=300,
+                turnaround_time_hours=4,
+            )
+            for code, sample_type in (("GLU", "Blood"), ("UA", "Urine"))
+        ]
+        self.order = create_order(
+            test_ids=[test.pk for test in tests], patient=self.patient
+        )
+        self.samples = list(Sample.objects.filter(order=self.order))
+
+
+def make_label(**fields):
+    values = {
+        "barcode": "SAM-20260101-0001",
+        "patient_name": "Jane Doe",
+        "mrn": "PAT-20260101-0001",
+        "order_no": "ORD-20260101-0001",
+        "sample_type": "Blood",
+        "container_type": "SST",
+        "tests": ("GLU", "K"),
+        "date": date(2026, 1, 1),
+    }
+    values.update(fields)
+    return Label(**values)
+
+
+@pytest.mark.django_db
+class TestLoadLabels(LabelFixtures):
+    """Test building labels from samples."""
+
+    def test_loads_labels_in_constant_queries(self, django_assert_num_queries):
+        """Test that an order's labels carry its patient and tests."""
+        with django_assert_num_queries(2):
+            labels = load_labels(Sample.objects.filter(order=self.order))
+
+        assert {(label.sample_type, label.tests) for label in labels} == {
+            ("Blood", ("GLU",)),
+            ("Urine", ("UA",)),
+        }
+        assert all(label.mrn == self.patient.mrn for label in labels)
+        assert all(label.order_no == self.order.order_no for label in labels)
+
+
+class TestRendering:
+    """Test the PDF and ZPL output."""
+
+    def test_bar_runs_are_cached_by_value(self):
+        """Test that encoding a value again is served from the cache."""
+        bar_runs.cache_clear()
+        width, runs = bar_runs("SAM-20260101-0001")
+        bar_runs("SAM-20260101-0001")
+
+        assert bar_runs.cache_info().hits == 1
+        # Code 128 ends with the stop pattern's two-module bar
+        assert runs[-1] == (width - 2, 2)
+        assert sum(run for _, run in runs) < width
+
+    def test_pdf_sheets(self):
+        """Test that labels beyond one sheet start a new page."""
+        pdf = render_pdf([make_label(barcode=f"SAM-{n}") for n in range(45)])
+
+        assert pdf.startswith(b"%PDF")
+        assert pdf.count(b"/Type /Page\n") == 2
+
+    def test_zpl_escapes_field_data(self):
+        """Test that control characters in text cannot end a field."""
+        zpl = zpl_label(make_label(patient_name="A^B~C_D"))
+
+        assert zpl.startswith("^XA") and zpl.endswith("^XZ\n")
+        assert "^FDA_5EB_7EC_5FD^FS" in zpl
+        assert "^BCN,60,N,N,N^FH^FDSAM-20260101-0001^FS" in zpl
+
+
+@pytest.mark.django_db
+class TestLabelAPI(LabelFixtures):
+    """Test the label endpoint."""
+
+    def test_order_labels_as_pdf(self):
+        """Test that an order's labels are rendered as one PDF sheet."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            "/api/samples/labels/", {"order": self.order.pk}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/pdf"
+        assert response.content.startswith(b"%PDF")
+        assert self.order.order_no in response["Content-Disposition"]
+
+    def test_sample_labels_as_zpl(self):
+        """Test that each selected sample gets one ZPL label."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            "/api/samples/labels/",
+            {"samples": [sample.pk for sample in self.samples], "format": "zpl"},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/zpl"
+        zpl = response.content.decode()
+        assert zpl.count("^XA") == 2
+        for sample in self.samples:
+            assert f"^FD{sample.barcode}^FS" in zpl
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            {},
+            {"order": 1, "samples": [1]},
+            {"samples": []},
+            {"samples": "1"},
+            {"samples": list(range(MAX_LABELS + 1))},
+            {"order": "abc"},
+            {"order": 1, "format": "png"},
+        ],
+    )
+    def test_invalid_requests(self, data):
+        """Test that malformed requests are refused."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post("/api/samples/labels/", data, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "error" in response.data
+
+    def test_unknown_order(self):
+        """Test that an order without samples is not found."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            "/api/samples/labels/", {"order": 999999}, format="json"
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_requires_authentication(self):
+        """Test that anonymous requests are refused."""
+        response = self.client.post(
+            "/api/samples/labels/", {"order": self.order.pk}, format="json"
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestBenchmarkLabelsCommand:
+    """Test the benchmark_labels command."""
+
+    def test_reports_throughput(self, tmp_path):
+        """Test that every step renders every label and is measured."""
+        output = tmp_path / "labels.json"
+
+        call_command(
+            "benchmark_labels",
+            labels=50,
+            batch_size=20,
+            output=str(output),
+            stdout=StringIO(),
+        )
+
+        results = json.loads(output.read_text())
+        assert results["summary"]["requests"] == 9
+        assert set(results["labels_per_second"]) == {"pdf-cold", "pdf-warm", "zpl"}
+        assert all(rate > 0 for rate in results["labels_per_second"].values())
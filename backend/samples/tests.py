@@ -1,15 +1,18 @@
 """Tests for samples app."""
 
 from datetime import date
+from unittest.mock import patch
 
 import pytest
 from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from catalog.models import TestCatalog
-from orders.models import Order, OrderItem
+from catalog.models import Test, TestCatalog
+from orders.models import Order, OrderItem, OrderStatus
+from orders.services import create_order
 from patients.models import Patient
+from results.models import Result
 from settings.permissions import TEMPORARY_FULL_ACCESS_MODE
 
 from .models import Sample
@@ -43,7 +46,8 @@ class TestSampleModel:
         )
         order_item = OrderItem.objects.create(order=order, test=test)
 
-        sample = Sample.objects.create(order_item=order_item, sample_type="Blood")
+        sample = Sample.objects.create(order=order, sample_type="Blood")
+        sample.order_items.add(order_item)
 
         assert sample.barcode.startswith("SAM-")
         assert sample.status == "PENDING"
@@ -71,8 +75,10 @@ class TestSampleModel:
         )
         order_item = OrderItem.objects.create(order=order, test=test)
 
-        sample1 = Sample.objects.create(order_item=order_item, sample_type="Blood")
-        sample2 = Sample.objects.create(order_item=order_item, sample_type="Serum")
+        sample1 = Sample.objects.create(order=order, sample_type="Blood")
+        sample1.order_items.add(order_item)
+        sample2 = Sample.objects.create(order=order, sample_type="Serum")
+        sample2.order_items.add(order_item)
 
         assert sample1.barcode != sample2.barcode
         assert sample1.barcode.startswith("SAM-")
@@ -120,7 +126,7 @@ class TestSampleAPI:
         """Test creating a sample."""
         self.client.force_authenticate(user=self.admin_user)
         data = {
-            "order_item": self.order_item.id,
+            "order_items": [self.order_item.id],
             "sample_type": "Blood",
         }
         response = self.client.post("/api/samples/", data)
@@ -131,7 +137,8 @@ class TestSampleAPI:
     def test_list_samples(self):
         """Test listing samples."""
         self.client.force_authenticate(user=self.admin_user)
-        Sample.objects.create(order_item=self.order_item, sample_type="Blood")
+        sample = Sample.objects.create(order=self.order, sample_type="Blood")
+        sample.order_items.add(self.order_item)
 
         response = self.client.get("/api/samples/")
         assert response.status_code == status.HTTP_200_OK
@@ -140,7 +147,8 @@ class TestSampleAPI:
     def test_collect_sample_as_phlebotomy(self):
         """Test collecting a sample as phlebotomy user."""
         self.client.force_authenticate(user=self.phlebotomy_user)
-        sample = Sample.objects.create(order_item=self.order_item, sample_type="Blood")
+        sample = Sample.objects.create(order=self.order, sample_type="Blood")
+        sample.order_items.add(self.order_item)
 
         response = self.client.post(f"/api/samples/{sample.id}/collect/")
         assert response.status_code == status.HTTP_200_OK
@@ -150,7 +158,8 @@ class TestSampleAPI:
     def test_collect_sample_as_admin(self):
         """Test collecting a sample as admin."""
         self.client.force_authenticate(user=self.admin_user)
-        sample = Sample.objects.create(order_item=self.order_item, sample_type="Blood")
+        sample = Sample.objects.create(order=self.order, sample_type="Blood")
+        sample.order_items.add(self.order_item)
 
         response = self.client.post(f"/api/samples/{sample.id}/collect/")
         assert response.status_code == status.HTTP_200_OK
@@ -163,7 +172,8 @@ class TestSampleAPI:
     def test_collect_sample_as_tech_forbidden(self):
         """Test that tech cannot collect samples."""
         self.client.force_authenticate(user=self.tech_user)
-        sample = Sample.objects.create(order_item=self.order_item, sample_type="Blood")
+        sample = Sample.objects.create(order=self.order, sample_type="Blood")
+        sample.order_items.add(self.order_item)
 
         response = self.client.post(f"/api/samples/{sample.id}/collect/")
         assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -172,10 +182,9 @@ class TestSampleAPI:
         """Test receiving a sample as tech user."""
         self.client.force_authenticate(user=self.tech_user)
         sample = Sample.objects.create(
-            order_item=self.order_item,
-            sample_type="Blood",
-            status="COLLECTED",
+            order=self.order, sample_type="Blood", status="COLLECTED"
         )
+        sample.order_items.add(self.order_item)
 
         response = self.client.post(f"/api/samples/{sample.id}/receive/")
         assert response.status_code == status.HTTP_200_OK
@@ -186,20 +195,42 @@ class TestSampleAPI:
         """Test that phlebotomy can receive samples."""
         self.client.force_authenticate(user=self.phlebotomy_user)
         sample = Sample.objects.create(
-            order_item=self.order_item,
-            sample_type="Blood",
-            status="COLLECTED",
+            order=self.order, sample_type="Blood", status="COLLECTED"
         )
+        sample.order_items.add(self.order_item)
 
         response = self.client.post(f"/api/samples/{sample.id}/receive/")
         assert response.status_code == status.HTTP_200_OK
         assert response.data["status"] == "RECEIVED"
         assert response.data["received_by"] == self.phlebotomy_user.id
 
+    def test_failed_receive_is_rolled_back(self):
+        """Test that a failure after the transition leaves the sample collected."""
+        self.client.force_authenticate(user=self.tech_user)
+        sample = Sample.objects.create(
+            order=self.order, sample_type="Blood", status="COLLECTED"
+        )
+        sample.order_items.add(self.order_item)
+        with patch(
+            "samples.views._update_order_status_on_sample_receive",
+            side_effect=RuntimeError("lost"),
+        ):
+            with pytest.raises(RuntimeError):
+                self.client.post(f"/api/samples/{sample.id}/receive/")
+
+        sample.refresh_from_db()
+        assert sample.status == "COLLECTED"
+        assert not Result.objects.exists()
+        response = self.client.post(f"/api/samples/{sample.id}/receive/")
+        assert response.status_code == status.HTTP_200_OK
+        self.order_item.refresh_from_db()
+        assert self.order_item.status == OrderStatus.IN_PROCESS
+
     def test_get_sample_detail(self):
         """Test getting sample detail."""
         self.client.force_authenticate(user=self.admin_user)
-        sample = Sample.objects.create(order_item=self.order_item, sample_type="Blood")
+        sample = Sample.objects.create(order=self.order, sample_type="Blood")
+        sample.order_items.add(self.order_item)
 
         response = self.client.get(f"/api/samples/{sample.id}/")
         assert response.status_code == status.HTTP_200_OK
@@ -221,10 +252,9 @@ class TestSampleAPI:
         """Test rejecting a sample as tech user."""
         self.client.force_authenticate(user=self.tech_user)
         sample = Sample.objects.create(
-            order_item=self.order_item,
-            sample_type="Blood",
-            status="RECEIVED",
+            order=self.order, sample_type="Blood", status="RECEIVED"
         )
+        sample.order_items.add(self.order_item)
 
         response = self.client.post(
             f"/api/samples/{sample.id}/reject/",
@@ -238,10 +268,9 @@ class TestSampleAPI:
         """Test that rejecting without a reason fails."""
         self.client.force_authenticate(user=self.tech_user)
         sample = Sample.objects.create(
-            order_item=self.order_item,
-            sample_type="Blood",
-            status="RECEIVED",
+            order=self.order, sample_type="Blood", status="RECEIVED"
         )
+        sample.order_items.add(self.order_item)
 
         response = self.client.post(f"/api/samples/{sample.id}/reject/", {})
         assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -251,10 +280,9 @@ class TestSampleAPI:
         """Test that rejecting a sample with invalid status fails."""
         self.client.force_authenticate(user=self.tech_user)
         sample = Sample.objects.create(
-            order_item=self.order_item,
-            sample_type="Blood",
-            status="REJECTED",  # Already rejected
-        )
+            order=self.order, sample_type="Blood", status="REJECTED"
+        )  # Already rejected
+        sample.order_items.add(self.order_item)
 
         response = self.client.post(
             f"/api/samples/{sample.id}/reject/",
@@ -267,10 +295,9 @@ class TestSampleAPI:
         """Test that phlebotomy can reject samples."""
         self.client.force_authenticate(user=self.phlebotomy_user)
         sample = Sample.objects.create(
-            order_item=self.order_item,
-            sample_type="Blood",
-            status="COLLECTED",
+            order=self.order, sample_type="Blood", status="COLLECTED"
         )
+        sample.order_items.add(self.order_item)
 
         response = self.client.post(
             f"/api/samples/{sample.id}/reject/",
@@ -288,3 +315,124 @@ class TestSampleAPI:
             {"rejection_reason": "Bad sample"},
         )
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestSpecimenConsolidation:
+    """Test that tests sharing a specimen and container share one sample."""
+
+    def setup_method(self):
+        """Set up tests with and without container master data."""
+        self.client = APIClient()
+        self.admin_user = User.objects.create_user(
+            username="admin", password="admin123", role="ADMIN"
+        )
+        self.patient = Patient.objects.create(
+            full_name="John Doe", dob=date(1990, 1, 1), sex="M", phone="03001234567"
+        )
+        self.tests = {}
+        for code, specimen, container in (
+            ("GLU", "Serum", "SST"),
+            ("K", "Serum", "SST"),
+            ("CBC", "Whole Blood", "EDTA"),
+            ("ESR", "Blood", ""),
+            ("CRP", None, None),
+        ):
+            if specimen is not None:
+                Test.objects.create(
+                    code=code,
+                    name=code,
+                    specimen_type=specimen,
+                    container_type=container,
+                )
+            self.tests[code] = TestCatalog.objects.create(
+                code=code,
+                name=code,
+                category="Biochemistry",
+                sample_type="Blood",
+                price=300,
+                turnaround_time_hours=4,
+            )
+
+    def create_order(self, *codes):
+        return create_order(
+            test_ids=[self.tests[code].pk for code in codes], patient=self.patient
+        )
+
+    def tube_tests(self, order):
+        return {
+            (sample.sample_type, sample.container_type): sorted(
+                item.test.code for item in sample.order_items.all()
+            )
+            for sample in order.samples.prefetch_related("order_items__test")
+        }
+
+    def test_groups_items_by_specimen_and_container(self):
+        """Test that one sample is created per specimen and container."""
+        order = self.create_order("GLU", "K", "CBC")
+
+        assert order.samples.count() == 2
+        assert self.tube_tests(order) == {
+            ("Serum", "SST"): ["GLU", "K"],
+            ("Whole Blood", "EDTA"): ["CBC"],
+        }
+
+    def test_tests_without_container_keep_own_sample(self):
+        """Test that tests without a container are never consolidated."""
+        order = self.create_order("ESR", "CRP", "GLU")
+
+        samples = list(order.samples.prefetch_related("order_items"))
+        assert len(samples) == 3
+        assert all(len(sample.order_items.all()) == 1 for sample in samples)
+
+    def test_collect_cascades_to_all_items(self):
+        """Test that collecting a shared sample collects every test on it."""
+        order = self.create_order("GLU", "K", "CBC")
+        sample = order.samples.get(container_type="SST")
+        self.client.force_authenticate(user=self.admin_user)
+
+        response = self.client.post(f"/api/samples/{sample.id}/collect/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert sorted(response.data["order_items"]) == sorted(
+            order.items.filter(test__code__in=["GLU", "K"]).values_list("pk", flat=True)
+        )
+        statuses = dict(order.items.values_list("test__code", "status"))
+        assert statuses == {
+            "GLU": OrderStatus.COLLECTED,
+            "K": OrderStatus.COLLECTED,
+            "CBC": OrderStatus.NEW,
+        }
+
+    def test_receive_creates_results_for_all_items(self):
+        """Test that receiving a shared sample readies every test on it."""
+        order = self.create_order("GLU", "K", "CBC")
+        self.client.force_authenticate(user=self.admin_user)
+        for sample in order.samples.all():
+            for step in ("collect", "receive"):
+                response = self.client.post(f"/api/samples/{sample.id}/{step}/")
+                assert response.status_code == status.HTTP_200_OK
+
+        assert Result.objects.filter(order_item__order=order).count() == 3
+        order.refresh_from_db()
+        assert order.status == OrderStatus.IN_PROCESS
+        assert set(order.items.values_list("status", flat=True)) == {
+            OrderStatus.IN_PROCESS
+        }
+
+    def test_create_sample_with_items_of_one_order(self):
+        """Test that a sample cannot carry items of different orders."""
+        first = self.create_order("GLU")
+        second = self.create_order("K")
+        self.client.force_authenticate(user=self.admin_user)
+
+        response = self.client.post(
+            "/api/samples/",
+            {
+                "order_items": [first.items.get().pk, second.items.get().pk],
+                "sample_type": "Serum",
+            },
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "order_items" in response.data["error"]["details"]
@@ -8,10 +8,12 @@ from .views import (
     collect_sample,
     receive_sample,
     reject_sample,
+    sample_labels,
 )
 
 urlpatterns = [
     path("", SampleListCreateView.as_view(), name="sample-list-create"),
+    path("labels/", sample_labels, name="sample-labels"),
     path("<int:pk>/", SampleDetailView.as_view(), name="sample-detail"),
     path("<int:pk>/collect/", collect_sample, name="sample-collect"),
     path("<int:pk>/receive/", receive_sample, name="sample-receive"),
@@ -1,16 +1,30 @@
 """Sample views."""
 
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import HttpResponse
 from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from orders.models import OrderStatus
+from catalog.models import TestParameter
+from core.cache import invalidate_on_commit
+from core.transitions import apply_transition, transition_failure
+from events.broker import publish_event
+from interfaces.hostquery import index_samples_on_commit
+from orders.models import OrderItem, OrderStatus
 from results.models import Result, ResultStatus
 from settings.permissions import user_can_collect
 from users.models import UserRole
 
+from .labels import (
+    LABEL_FORMATS,
+    LabelRequestError,
+    render_labels,
+    requested_labels,
+)
 from .models import Sample, SampleStatus
 from .serializers import SampleSerializer
 
@@ -20,8 +34,10 @@ class SampleListCreateView(generics.ListCreateAPIView):
     Lists and creates samples.
     """
 
-    queryset = Sample.objects.all().select_related(
-        "order_item", "collected_by", "received_by"
+    queryset = (
+        Sample.objects.all()
+        .select_related("collected_by", "received_by")
+        .prefetch_related("order_items")
     )
     serializer_class = SampleSerializer
     permission_classes = [IsAuthenticated]
@@ -32,39 +48,57 @@ class SampleDetailView(generics.RetrieveUpdateAPIView):
     Retrieves and updates a specific sample.
     """
 
-    queryset = Sample.objects.all().select_related(
-        "order_item", "collected_by", "received_by"
+    queryset = (
+        Sample.objects.all()
+        .select_related("collected_by", "received_by")
+        .prefetch_related("order_items")
     )
     serializer_class = SampleSerializer
     permission_classes = [IsAuthenticated]
 
 
-def _create_result_for_order_item(order_item):
+def _create_results_for_order_items(order, order_items):
     """
-    Creates a Result object for the given order item if one doesn't exist.
+    Creates Result objects for the given order items that don't have one.
 
-    This is called when a sample is received in the lab, enabling result entry.
+    This is called when a sample is received in the lab, enabling result entry
+    for every test carried by the sample.
 
     Args:
-        order_item: The OrderItem to create a result for.
+        order: The Order the items belong to.
+        order_items: The OrderItems to create results for, with their tests
+            and annotated with `has_result`.
 
     Returns:
-        Result: The created or existing Result object.
-    """
-    # Check if a result already exists for this order item
-    existing_result = Result.objects.filter(order_item=order_item).first()
-    if existing_result:
-        return existing_result
-
-    # Create a new DRAFT result for the order item
-    return Result.objects.create(
-        order_item=order_item,
-        value="",
-        status=ResultStatus.DRAFT,
+        list[Result]: The created Result objects.
+    """
+    # Skip order items that already have a result
+    missing = [item for item in order_items if not item.has_result]
+    if not missing:
+        return []
+
+    # Create new DRAFT results for the order items
+    parameter_ids = {
+        code: test_parameter.parameter_id
+        for code, test_parameter in TestParameter.for_test_codes(
+            item.test.code for item in missing
+        ).items()
+    }
+    return Result.objects.bulk_create(
+        [
+            Result(
+                order_item=item,
+                patient_id=order.patient_id,
+                parameter_id=parameter_ids.get(item.test.code),
+                value="",
+                status=ResultStatus.DRAFT,
+            )
+            for item in missing
+        ]
     )
 
 
-def _update_order_status_on_sample_receive(order_item):
+def _update_order_status_on_sample_receive(order, order_items):
     """
     Updates the order status when a sample is received.
 
@@ -72,17 +106,15 @@ def _update_order_status_on_sample_receive(order_item):
     to IN_PROCESS status (ready for result entry).
 
     Args:
-        order_item: The OrderItem whose sample was received.
+        order: The Order the sample was taken for.
+        order_items: The OrderItems carried by the received sample.
     """
-    order = order_item.order
-
-    # Check if all samples for all order items are received
-    all_samples_received = True
-    for item in order.items.all():
-        sample = item.samples.first()
-        if not sample or sample.status not in [SampleStatus.RECEIVED]:
-            all_samples_received = False
-            break
+    # Check if every order item has a received sample
+    all_samples_received = (
+        not OrderItem.objects.filter(order=order)
+        .exclude(samples__status=SampleStatus.RECEIVED)
+        .exists()
+    )
 
     # If all samples are received, update order status to IN_PROCESS
     if all_samples_received and order.status in [
@@ -90,19 +122,23 @@ def _update_order_status_on_sample_receive(order_item):
         OrderStatus.COLLECTED,
     ]:
         order.status = OrderStatus.IN_PROCESS
-        order.save()
+        order.save(update_fields=["status", "updated_at"])
 
-    # Also update the order item status
-    if order_item.status in [OrderStatus.NEW, OrderStatus.COLLECTED]:
-        order_item.status = OrderStatus.IN_PROCESS
-        order_item.save()
+    # Also update the status of the sample's order items
+    updated = OrderItem.objects.filter(
+        pk__in=[item.pk for item in order_items],
+        status__in=[OrderStatus.NEW, OrderStatus.COLLECTED],
+    ).update(status=OrderStatus.IN_PROCESS, updated_at=timezone.now())
+    if updated:
+        # update() does not send post_save
+        invalidate_on_commit(f"order:{order.pk}")
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def collect_sample(request, pk):
     """
-    Marks a sample as collected.
+    Marks a pending sample as collected.
 
     Args:
         request: The request object.
@@ -111,32 +147,34 @@ def collect_sample(request, pk):
     Returns:
         Response: A response object with the updated sample data or an error message.
     """
-    try:
-        sample = Sample.objects.get(pk=pk)
-    except Sample.DoesNotExist:
-        return Response({"error": "Sample not found"}, status=status.HTTP_404_NOT_FOUND)
-
     if not user_can_collect(request.user):
         return Response(
             {"error": "You do not have permission to collect samples"},
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    sample.status = SampleStatus.COLLECTED
-    sample.collected_at = timezone.now()
-    sample.collected_by = request.user
-    sample.save()
-
-    # Update order status to COLLECTED if this is the first collection
-    order = sample.order_item.order
-    if order.status == OrderStatus.NEW:
-        order.status = OrderStatus.COLLECTED
-        order.save()
-
-    # Update order item status
-    if sample.order_item.status == OrderStatus.NEW:
-        sample.order_item.status = OrderStatus.COLLECTED
-        sample.order_item.save()
+    # The sample is only collected together with its order and order items,
+    # so a failure cannot leave it collected while they are not
+    with transaction.atomic():
+        if not apply_transition(Sample, pk, "collect", user=request.user):
+            raise transition_failure(
+                Sample, pk, "Cannot collect sample with status {status}"
+            )
+        sample = Sample.objects.select_related("order").get(pk=pk)
+        publish_event("sample.collected", sample)
+
+        # Update order status to COLLECTED if this is the first collection
+        order = sample.order
+        if order.status == OrderStatus.NEW:
+            order.status = OrderStatus.COLLECTED
+            order.save(update_fields=["status", "updated_at"])
+
+        # Update the status of every order item on the sample
+        if sample.order_items.filter(status=OrderStatus.NEW).update(
+            status=OrderStatus.COLLECTED, updated_at=timezone.now()
+        ):
+            # update() does not send post_save
+            invalidate_on_commit(f"order:{order.pk}")
 
     serializer = SampleSerializer(sample)
     return Response(serializer.data)
@@ -146,10 +184,10 @@ def collect_sample(request, pk):
 @permission_classes([IsAuthenticated])
 def receive_sample(request, pk):
     """
-    Marks a sample as received in the lab.
+    Marks a collected sample as received in the lab.
 
-    This action also creates a Result object for the order item,
-    enabling result entry for this test.
+    This action also creates a Result object for every order item on the
+    sample, enabling result entry for its tests.
 
     Args:
         request: The request object.
@@ -158,11 +196,6 @@ def receive_sample(request, pk):
     Returns:
         Response: A response object with the updated sample data or an error message.
     """
-    try:
-        sample = Sample.objects.get(pk=pk)
-    except Sample.DoesNotExist:
-        return Response({"error": "Sample not found"}, status=status.HTTP_404_NOT_FOUND)
-
     if request.user.role not in [
         UserRole.PHLEBOTOMY,
         UserRole.TECHNOLOGIST,
@@ -174,16 +207,35 @@ def receive_sample(request, pk):
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    sample.status = SampleStatus.RECEIVED
-    sample.received_at = timezone.now()
-    sample.received_by = request.user
-    sample.save()
+    # The sample is only received together with its results and order
+    # status, so a failure cannot leave it received without them
+    with transaction.atomic():
+        if not apply_transition(Sample, pk, "receive", user=request.user):
+            raise transition_failure(
+                Sample, pk, "Cannot receive sample with status {status}"
+            )
+        sample = (
+            Sample.objects.select_related("order")
+            .prefetch_related(
+                Prefetch(
+                    "order_items",
+                    queryset=OrderItem.objects.select_related("test").annotate(
+                        has_result=Exists(
+                            Result.objects.filter(order_item=OuterRef("pk"))
+                        )
+                    ),
+                )
+            )
+            .get(pk=pk)
+        )
+        publish_event("sample.received", sample)
+        order_items = list(sample.order_items.all())
 
-    # Create a Result object for this order item (ready for result entry)
-    _create_result_for_order_item(sample.order_item)
+        # Create Result objects for the sample's order items (ready for entry)
+        _create_results_for_order_items(sample.order, order_items)
 
-    # Update order and order item status
-    _update_order_status_on_sample_receive(sample.order_item)
+        # Update order and order item status
+        _update_order_status_on_sample_receive(sample.order, order_items)
 
     serializer = SampleSerializer(sample)
     return Response(serializer.data)
@@ -202,11 +254,6 @@ def reject_sample(request, pk):
     Returns:
         Response: A response object with the updated sample data or an error message.
     """
-    try:
-        sample = Sample.objects.get(pk=pk)
-    except Sample.DoesNotExist:
-        return Response({"error": "Sample not found"}, status=status.HTTP_404_NOT_FOUND)
-
     if request.user.role not in [
         UserRole.PHLEBOTOMY,
         UserRole.TECHNOLOGIST,
@@ -218,16 +265,6 @@ def reject_sample(request, pk):
             status=status.HTTP_403_FORBIDDEN,
         )
 
-    if sample.status not in [
-        SampleStatus.PENDING,
-        SampleStatus.COLLECTED,
-        SampleStatus.RECEIVED,
-    ]:
-        return Response(
-            {"error": f"Cannot reject sample with status {sample.status}"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-
     rejection_reason = request.data.get("rejection_reason", "").strip()
     if not rejection_reason:
         return Response(
@@ -235,9 +272,53 @@ def reject_sample(request, pk):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    sample.status = SampleStatus.REJECTED
-    sample.rejection_reason = rejection_reason
-    sample.save()
+    with transaction.atomic():
+        if not apply_transition(
+            Sample, pk, "reject", rejection_reason=rejection_reason
+        ):
+            raise transition_failure(
+                Sample, pk, "Cannot reject sample with status {status}"
+            )
+        sample = Sample.objects.get(pk=pk)
+        publish_event("sample.rejected", sample)
+        # Analyzers must not run tests on a rejected sample
+        index_samples_on_commit({sample.barcode: []})
 
     serializer = SampleSerializer(sample)
     return Response(serializer.data)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def sample_labels(request):
+    """
+    Renders barcode labels for an order or a list of samples.
+
+    Args:
+        request: The request object, containing either `order` (an order
+            id) or `samples` (a list of sample ids), and `format`, `pdf`
+            (the default) or `zpl`.
+
+    Returns:
+        HttpResponse: The labels as a PDF sheet or a ZPL job, or an error
+            response.
+    """
+    label_format = request.data.get("format", "pdf")
+    if label_format not in LABEL_FORMATS:
+        return Response(
+            {"error": f"Format must be one of: {', '.join(LABEL_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        labels = requested_labels(request.data)
+    except LabelRequestError as error:
+        return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    if not labels:
+        return Response({"error": "No samples found"}, status=status.HTTP_404_NOT_FOUND)
+
+    document, content_type = render_labels(labels, label_format)
+    response = HttpResponse(document, content_type=content_type)
+    name = f"labels_{labels[0].order_no}" if "order" in request.data else "labels"
+    response["Content-Disposition"] = f'inline; filename="{name}.{label_format}"'
+    return response
@@ -53,6 +53,8 @@ const mockOrder = {
         updated_at: '2024-01-01T00:00:00Z',
       },
       status: 'NEW' as const,
+      due_at: null,
+      tat_flag: '' as const,
       created_at: '2024-01-01T00:00:00Z',
       updated_at: '2024-01-01T00:00:00Z',
     },
@@ -92,10 +92,7 @@ export function OrderDetailPage() {
   const fetchSamples = async () => {
     try {
       const allSamples = await sampleService.getAll()
-      const orderItemIds = order?.items.map(item => item.id) || []
-      const filteredSamples = allSamples.filter(s =>
-        orderItemIds.includes(s.order_item)
-      )
+      const filteredSamples = allSamples.filter(s => s.order === order?.id)
       setSamples(filteredSamples)
     } catch (error) {
       console.error('Failed to fetch samples:', error)
@@ -392,7 +389,7 @@ export function OrderDetailPage() {
   }
 
   const getSampleForItem = (orderItemId: number) => {
-    return samples.find(s => s.order_item === orderItemId)
+    return samples.find(s => s.order_items.includes(orderItemId))
   }
 
   const getResultForItem = (orderItemId: number) => {
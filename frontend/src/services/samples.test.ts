@@ -19,7 +19,8 @@ describe('sampleService', () => {
       const mockSamples = [
         {
           id: 1,
-          order_item: 1,
+          order: 1,
+          order_items: [1],
           barcode: 'SAM-20240101-0001',
           status: 'PENDING',
           sample_type: 'Blood',
@@ -37,7 +38,8 @@ describe('sampleService', () => {
       const mockSamples = [
         {
           id: 1,
-          order_item: 1,
+          order: 1,
+          order_items: [1],
           barcode: 'SAM-20240101-0001',
           status: 'COLLECTED',
           sample_type: 'Blood',
@@ -58,7 +60,8 @@ describe('sampleService', () => {
     it('should fetch a sample by id', async () => {
       const mockSample = {
         id: 1,
-        order_item: 1,
+        order: 1,
+        order_items: [1],
         barcode: 'SAM-20240101-0001',
         status: 'PENDING',
         sample_type: 'Blood',
@@ -76,7 +79,8 @@ describe('sampleService', () => {
     it('should mark sample as collected', async () => {
       const mockSample = {
         id: 1,
-        order_item: 1,
+        order: 1,
+        order_items: [1],
         barcode: 'SAM-20240101-0001',
         status: 'COLLECTED',
         sample_type: 'Blood',
@@ -94,7 +98,8 @@ describe('sampleService', () => {
     it('should mark sample as received', async () => {
       const mockSample = {
         id: 1,
-        order_item: 1,
+        order: 1,
+        order_items: [1],
         barcode: 'SAM-20240101-0001',
         status: 'RECEIVED',
         sample_type: 'Blood',
@@ -112,7 +117,8 @@ describe('sampleService', () => {
     it('should reject sample with reason', async () => {
       const mockSample = {
         id: 1,
-        order_item: 1,
+        order: 1,
+        order_items: [1],
         barcode: 'SAM-20240101-0001',
         status: 'REJECTED',
         sample_type: 'Blood',
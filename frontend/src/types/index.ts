@@ -131,11 +131,15 @@ export type OrderStatus =
 
 export type OrderPriority = 'ROUTINE' | 'URGENT' | 'STAT'
 
+export type TatFlag = '' | 'DUE_SOON' | 'OVERDUE'
+
 export interface OrderItem {
   id: number
   test: TestCatalog
   test_detail?: TestCatalog
   status: OrderStatus
+  due_at: string | null
+  tat_flag: TatFlag
   created_at: string
   updated_at: string
 }
@@ -159,10 +163,12 @@ export type SampleStatus = 'PENDING' | 'COLLECTED' | 'RECEIVED' | 'REJECTED'
 
 export interface Sample {
   id: number
-  order_item: number
+  order: number
+  order_items: number[]
   barcode: string
   status: SampleStatus
   sample_type: string
+  container_type?: string
   collected_at?: string
   collected_by?: number
   received_at?: string